@@ -17,6 +17,7 @@ from flask import (
     abort,
 )
 from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import or_, text, func
 
@@ -24,7 +25,6 @@ db = SQLAlchemy()
 
 from .models import (
     User,
-    ParticipantAccount,
     Session,
     SessionShipping,
     Client,
@@ -38,6 +38,7 @@ from .models import (
 )
 from .models import resource  # ensures app/models/resource.py is imported
 from .shared.rbac import app_admin_required
+from .shared.identity import current_identity
 from .shared.constants import LANGUAGE_NAMES
 from .shared.time import fmt_dt, fmt_time, fmt_time_range_with_tz
 from .shared.views import (
@@ -47,21 +48,27 @@ from .shared.views import (
     get_view_options,
 )
 from .shared.nav import build_menu
-from .shared.storage_resources import resource_fs_dir, resource_fs_path, resources_root
+from .shared.storage_resources import resource_key
 from .shared.acl import (
     is_admin,
     is_kcrm,
     is_delivery,
     is_contractor,
-    is_kt_staff,
     is_certificate_manager_only,
 )
 from .shared.languages import code_to_label
 from .shared.html import sanitize_prework_html
+from .shared.profile_images import DERIVATIVE_NAME_RE, PROFILE_ROOT
+from .shared.blobstore import BlobStoreError, assets_store, blob_response, get_store
+from .shared import audit, static_assets, template_perf
+from .services import materials_notifications
 
 
 def create_app():
     app = Flask(__name__, template_folder="templates")
+    # Caddy is the only proxy in front of the app: trust one X-Forwarded-For
+    # hop so request.remote_addr is the real client and cannot be spoofed.
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.getenv("PROXY_FIX_X_FOR", "1")))
     app.secret_key = os.getenv("SECRET_KEY", "dev")
     app.config.setdefault("CERT_ISSUER", "Kepner-Tregoe")
     app.config["PREFERRED_URL_SCHEME"] = "https"
@@ -97,21 +104,55 @@ def create_app():
 
     site_root = os.getenv("SITE_ROOT", "/srv")
     app.config["SITE_ROOT"] = site_root
+    # Signed certificate links hand the file to Caddy via X-Accel-Redirect
+    # when the proxy is configured for it (see caddy/Caddyfile).
+    app.config["CERT_DOWNLOAD_ACCEL"] = os.getenv("CERT_DOWNLOAD_ACCEL") == "1"
+    app.config["CERT_LINK_TTL_SECONDS"] = int(
+        os.getenv("CERT_LINK_TTL_SECONDS", "900")
+    )
+    # Blob storage for certificates, badges and uploads (app/shared/blobstore.py).
+    app.config["STORAGE_BACKEND"] = os.getenv("STORAGE_BACKEND", "local")
+    app.config["STORAGE_FSYNC"] = os.getenv("STORAGE_FSYNC", "1")
+    app.config["STORAGE_S3_BUCKET"] = os.getenv("STORAGE_S3_BUCKET", "")
+    app.config["STORAGE_S3_PREFIX"] = os.getenv("STORAGE_S3_PREFIX", "")
+    app.config["STORAGE_S3_ENDPOINT_URL"] = os.getenv("STORAGE_S3_ENDPOINT_URL") or None
 
     db.init_app(app)
+    audit.init_app(app)
+    static_assets.init_app(app)
+    template_perf.init_app(app)
+    materials_notifications.init_app(app)
 
     @app.route("/logo.png")
     def logo_passthrough():
         return send_from_directory(os.path.join(app.root_path, "static"), "ktlogo1.png")
 
+    def _stored_file(store, key: str, **kwargs):
+        try:
+            if not store.exists(key):
+                abort(404)
+        except BlobStoreError:
+            abort(404)
+        return blob_response(store, key, **kwargs)
+
     @app.get("/badges/<path:filename>")
     def badge_file(filename: str):
-        site_dir = "/srv/badges"
-        asset_dir = os.path.join(app.root_path, "assets", "badges")
-        site_path = os.path.join(site_dir, filename)
-        if os.path.isfile(site_path):
-            return send_from_directory(site_dir, filename, as_attachment=True)
-        return send_from_directory(asset_dir, filename, as_attachment=True)
+        key = f"badges/{filename}"
+        store = get_store()
+        try:
+            if not store.exists(key):
+                store = assets_store()
+        except BlobStoreError:
+            abort(404)
+        return _stored_file(store, key, download_name=os.path.basename(filename))
+
+    @app.get("/certificates/<path:subpath>")
+    def certificate_badge_file(subpath: str):
+        # Caddy serves these from disk; this covers remote storage backends.
+        # PDFs only go out through signed links (/certificate-downloads/).
+        if not subpath.lower().endswith(".png"):
+            abort(404)
+        return _stored_file(get_store(), f"certificates/{subpath}")
 
     @app.get("/resources/<path:subpath>")
     def resource_file(subpath: str):
@@ -120,68 +161,38 @@ def create_app():
             abort(404)
 
         parts = safe_subpath.split("/", 1)
-        file_path: str
-        directory: str
-
         if len(parts) == 2 and parts[0].isdigit():
-            resource_id = int(parts[0])
             filename = parts[1].strip("/\\")
             if not filename or "/" in filename or "\\" in filename:
                 abort(404)
-            directory = resource_fs_dir(resource_id)
-            file_path = resource_fs_path(resource_id, filename)
-            relative_name = os.path.basename(file_path)
+            key = resource_key(int(parts[0]), filename)
         else:
             if "/" in safe_subpath or "\\" in safe_subpath:
                 abort(404)
-            directory = resources_root()
-            relative_name = safe_subpath
-            file_path = os.path.join(directory, relative_name)
-
-        if not os.path.isfile(file_path):
-            abort(404)
-
-        return send_from_directory(directory, relative_name, conditional=True)
+            key = f"resources/{safe_subpath}"
+        return _stored_file(get_store(), key)
 
     @app.get("/uploads/profile_pics/<path:filename>")
     def profile_photo(filename: str):
-        base_dir = os.path.join(site_root, "uploads", "profile_pics")
-        safe_part = (filename or "").strip("/\\")
-        if not safe_part:
-            abort(404)
-        candidate = os.path.abspath(os.path.join(base_dir, safe_part))
-        if not candidate.startswith(os.path.abspath(base_dir) + os.sep) and candidate != os.path.abspath(base_dir):
-            abort(404)
-        if not os.path.isfile(candidate):
-            abort(404)
-        relative = os.path.relpath(candidate, base_dir)
-        return send_from_directory(base_dir, relative, conditional=True)
+        key = f"{PROFILE_ROOT}/{(filename or '').strip('/')}"
+        if DERIVATIVE_NAME_RE.match(os.path.basename(key)):
+            # Content-hashed thumbnails never change under the same name.
+            resp = _stored_file(get_store(), key, max_age=31536000)
+            resp.cache_control.immutable = True
+            return resp
+        return _stored_file(get_store(), key)
 
     @app.context_processor
     def inject_user():
-        user = None
-        is_csa = False
         show_prework_nav = False
         show_resources_nav = False
         show_certificates_nav = False
-        user_id = session.get("user_id")
-        account_id = session.get("participant_account_id")
-        user = None
-        account = None
+        identity = current_identity()
+        user_id = identity.user_id
+        user = identity.user
+        account = identity.account
+        account_id = identity.account_id
         if user_id:
-            user = db.session.get(User, user_id)
-            if not account_id:
-                account = (
-                    db.session.query(ParticipantAccount)
-                    .filter(
-                        func.lower(ParticipantAccount.email)
-                        == (user.email or "").lower()
-                    )
-                    .one_or_none()
-                )
-                account_id = account.id if account else None
-            else:
-                account = db.session.get(ParticipantAccount, account_id)
             show_resources_nav = (
                 db.session.query(Session.id)
                 .outerjoin(
@@ -197,7 +208,6 @@ def create_app():
                 is not None
             )
         elif account_id:
-            account = db.session.get(ParticipantAccount, account_id)
             show_prework_nav = (
                 db.session.query(PreworkAssignment.id)
                 .filter(
@@ -216,13 +226,8 @@ def create_app():
                 .first()
                 is not None
             )
+        is_csa = identity.is_csa
         if account_id:
-            is_csa = (
-                db.session.query(Session.id)
-                .filter(Session.csa_account_id == account_id)
-                .first()
-                is not None
-            )
             show_certificates_nav = (
                 db.session.query(Certificate.id)
                 .join(Participant, Certificate.participant_id == Participant.id)
@@ -243,7 +248,9 @@ def create_app():
             "active_view": active_view,
             "nav_menu": nav_menu,
             "view_options": view_opts,
-            "is_staff_user": is_kt_staff(user),
+            "is_staff_user": identity.is_kt_staff,
+            "can_global_search": identity.is_kt_staff
+            and not identity.is_certificate_manager_only,
         }
 
     @app.get("/health")
@@ -252,10 +259,11 @@ def create_app():
 
     @app.get("/home", endpoint="home")
     def index():  # pragma: no cover - trivial route
-        user_id = session.get("user_id")
-        account_id = session.get("participant_account_id")
+        identity = current_identity()
+        user_id = identity.user_id
+        account_id = identity.session_account_id
         if user_id:
-            user = db.session.get(User, user_id)
+            user = identity.user
             if not user:
                 return redirect(url_for("auth.login"))
             if is_certificate_manager_only(user):
@@ -303,13 +311,7 @@ def create_app():
             sessions_list = query.order_by(Session.start_date).all()
             return render_template("home.html", sessions=sessions_list)
         if account_id:
-            is_csa = (
-                db.session.query(Session.id)
-                .filter(Session.csa_account_id == account_id)
-                .first()
-                is not None
-            )
-            if is_csa:
+            if identity.is_csa:
                 return redirect(url_for("csa.my_sessions"))
             return redirect(url_for("learner.my_workshops"))
         return redirect(url_for("auth.login"))
@@ -337,7 +339,7 @@ def create_app():
             if len(password) < 8:
                 error = "Password must be at least 8 characters."
             else:
-                user = db.session.get(User, session["user_id"])
+                user = current_identity().user
                 user.set_password(password)
                 db.session.commit()
                 flash("Password updated.")
@@ -351,7 +353,7 @@ def create_app():
         allowed: list[str]
         user_id = session.get("user_id")
         if user_id:
-            user = db.session.get(User, user_id)
+            user = current_identity().user
             if user:
                 allowed = get_view_options(user)
                 if not allowed:
@@ -388,7 +390,7 @@ def create_app():
             "auth.reset_password",
         } or endpoint.startswith("static"):
             return None
-        account = db.session.get(ParticipantAccount, account_id)
+        account = current_identity().account
         if account and account.must_change_password:
             flash("Please set a new password to continue.", "error")
             return redirect(url_for("learner.profile") + "#password")
@@ -480,6 +482,9 @@ def create_app():
     from .routes.settings_resources import bp as settings_resources_bp
     from .routes.settings_roles import bp as settings_roles_bp
     from .routes.settings_cert_templates import bp as settings_cert_templates_bp
+    from .routes.search import bp as search_bp
+    from .routes.settings_performance import bp as settings_performance_bp
+    from .routes.verify import bp as verify_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(settings_mail_bp)
@@ -502,6 +507,9 @@ def create_app():
     app.register_blueprint(settings_resources_bp)
     app.register_blueprint(settings_roles_bp)
     app.register_blueprint(settings_cert_templates_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(settings_performance_bp)
+    app.register_blueprint(verify_bp)
 
     @app.get("/surveys")
     def surveys():
@@ -516,11 +524,12 @@ def create_app():
     @app.get("/verify/<int:cert_id>")
     def verify(cert_id: int):
         from .models import Certificate
+        from .shared.cert_verification import masked_name
 
         cert = db.session.get(Certificate, cert_id)
         if not cert:
             return jsonify({"ok": False}), 404
-        masked = (cert.certificate_name[0] + "***") if cert.certificate_name else "***"
+        masked = masked_name(cert.certificate_name)
         return jsonify(
             {
                 "ok": True,
@@ -537,6 +546,10 @@ def create_app():
             seed_initial_user_safely()
         if os.getenv("SEED_LANGUAGES"):
             seed_languages_safely()
+        audit.ensure_partitions_safely()
+        from .shared import cert_assets
+
+        cert_assets.get_catalog()
 
     return app
 
@@ -549,8 +562,9 @@ class AppSetting(db.Model):
 
 
 def get_setting(key: str, default=None):
-    s = db.session.get(AppSetting, key)
-    return s.value if s else default
+    from .shared import reference_data
+
+    return reference_data.app_setting(key, default)
 
 
 def set_setting(key: str, value: str) -> None:
@@ -3,6 +3,8 @@ import logging
 import os
 import smtplib
 import sys
+import threading
+from contextlib import contextmanager
 from email.message import EmailMessage
 from typing import Sequence
 
@@ -15,19 +17,90 @@ if not logger.handlers:
 logger.setLevel(logging.INFO)
 
 
+# SMTP servers commonly cap messages per connection; reconnect before that.
+BATCH_MESSAGES_PER_CONNECTION = 100
+
+_batch = threading.local()
+
+
 def _stringify_envelope(recipients: Sequence[str]) -> str:
     return json.dumps(list(recipients))
 
 
+@contextmanager
+def batch():
+    """Reuse one SMTP connection for every ``send`` in the block (per thread).
+
+    The connection is opened by the first real send, replaced after
+    ``BATCH_MESSAGES_PER_CONNECTION`` messages or when the server drops it, and
+    closed on exit. Nested blocks share the outer connection.
+    """
+
+    if getattr(_batch, "state", None) is not None:
+        yield
+        return
+    _batch.state = {"key": None, "server": None, "count": 0}
+    try:
+        yield
+    finally:
+        _close_batch_server(_batch.state)
+        _batch.state = None
+
+
+def _close_batch_server(state: dict) -> None:
+    server = state.get("server")
+    state.update(key=None, server=None, count=0)
+    if server is None:
+        return
+    try:
+        server.quit()
+    except Exception:  # pragma: no cover - connection already gone
+        pass
+
+
+def _connect(host: str, port_int: int, user: str | None, password: str | None):
+    if port_int == 465:
+        server = smtplib.SMTP_SSL(host, port_int)
+    else:
+        server = smtplib.SMTP(host, port_int)
+        if port_int == 587:
+            server.starttls()
+    if user and password:
+        server.login(user, password)
+    return server
+
+
+def _send_message(host, port_int, user, password, from_addr, envelope, message: str):
+    state = getattr(_batch, "state", None)
+    if state is None:
+        server = _connect(host, port_int, user, password)
+        server.sendmail(from_addr, envelope, message)
+        server.quit()
+        return
+    key = (host, port_int, user)
+    if state["key"] != key or state["count"] >= BATCH_MESSAGES_PER_CONNECTION:
+        _close_batch_server(state)
+    if state["server"] is not None:
+        try:
+            state["server"].sendmail(from_addr, envelope, message)
+            state["count"] += 1
+            return
+        except smtplib.SMTPServerDisconnected:
+            _close_batch_server(state)
+    state.update(key=key, server=_connect(host, port_int, user, password), count=0)
+    state["server"].sendmail(from_addr, envelope, message)
+    state["count"] += 1
+
+
 def send(
     recipients: Sequence[str] | str | None,
     subject: str,
     body: str,
     html: str | None = None,
 ):
-    from .models import Settings  # local import to avoid circular import at module load
+    from .shared import reference_data  # local import to avoid circular import at module load
 
-    settings = Settings.get()
+    settings = reference_data.mail_settings()
     host = (settings.smtp_host if settings and settings.smtp_host else os.getenv("SMTP_HOST"))
     port = (settings.smtp_port if settings and settings.smtp_port else os.getenv("SMTP_PORT"))
     user = (settings.smtp_user if settings and settings.smtp_user else os.getenv("SMTP_USER"))
@@ -63,14 +136,6 @@ def send(
 
     try:
         port_int = int(port)
-        if port_int == 465:
-            server = smtplib.SMTP_SSL(host, port_int)
-        else:
-            server = smtplib.SMTP(host, port_int)
-            if port_int == 587:
-                server.starttls()
-        if user and password:
-            server.login(user, password)
         msg = EmailMessage()
         msg["Subject"] = subject
         if header:
@@ -79,8 +144,9 @@ def send(
         msg.set_content(body)
         if html:
             msg.add_alternative(html, subtype="html")
-        server.sendmail(from_addr, envelope, msg.as_string())
-        server.quit()
+        _send_message(
+            host, port_int, user, password, from_addr, envelope, msg.as_string()
+        )
         logger.info(
             "[MAIL-OUT] mode=%s to_header=%s envelope=%s subject=\"%s\" host=%s result=sent",
             mode,
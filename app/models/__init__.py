@@ -42,6 +42,8 @@ class User(db.Model):
     state = db.Column(db.String(120))
     country = db.Column(db.String(120))
     profile_image_path = db.Column(db.String(255))
+    # {"64": "/uploads/profile_pics/<owner>/<hash>-64.webp", ...}
+    profile_image_variants = db.Column(db.JSON(none_as_null=True))
     __table_args__ = (
         db.Index("ix_users_email_lower", db.func.lower(email), unique=True),
     )
@@ -96,6 +98,8 @@ class ParticipantAccount(db.Model):
     state = db.Column(db.String(120))
     country = db.Column(db.String(120))
     profile_image_path = db.Column(db.String(255))
+    # {"64": "/uploads/profile_pics/<owner>/<hash>-64.webp", ...}
+    profile_image_variants = db.Column(db.JSON(none_as_null=True))
     __table_args__ = (
         db.Index(
             "ix_participant_accounts_email_lower",
@@ -183,6 +187,15 @@ class Settings(db.Model):
             return None
 
 
+class ReferenceDataVersion(db.Model):
+    """Write counter per cached reference table (see shared/reference_data.py)."""
+
+    __tablename__ = "reference_data_versions"
+
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
 class ProcessorAssignment(db.Model):
     __tablename__ = "processor_assignments"
 
@@ -486,6 +499,23 @@ class Session(db.Model):
         db.Integer, db.ForeignKey("participant_accounts.id", ondelete="SET NULL")
     )
     csa_notified_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index("ix_sessions_start_date", "start_date"),
+        db.Index("ix_sessions_region_start_date", "region", "start_date"),
+        db.Index(
+            "ix_sessions_lead_facilitator_id",
+            "lead_facilitator_id",
+            "start_date",
+            postgresql_where=db.text("lead_facilitator_id IS NOT NULL"),
+            sqlite_where=db.text("lead_facilitator_id IS NOT NULL"),
+        ),
+        db.Index(
+            "ix_sessions_csa_account_id",
+            "csa_account_id",
+            postgresql_where=db.text("csa_account_id IS NOT NULL"),
+            sqlite_where=db.text("csa_account_id IS NOT NULL"),
+        ),
+    )
 
     @validates("workshop_type")
     def _sync_code(self, key, wt):  # pragma: no cover - simple setter
@@ -533,6 +563,12 @@ class Participant(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     __table_args__ = (
         db.Index("ix_participants_email_lower", db.func.lower(email), unique=True),
+        db.Index(
+            "ix_participants_account_id",
+            "account_id",
+            postgresql_where=db.text("account_id IS NOT NULL"),
+            sqlite_where=db.text("account_id IS NOT NULL"),
+        ),
     )
 
     @validates("email")
@@ -571,6 +607,7 @@ class SessionParticipant(db.Model):
         db.UniqueConstraint(
             "session_id", "participant_id", name="uix_session_participant"
         ),
+        db.Index("ix_session_participants_participant_id", "participant_id"),
     )
 
     company_client = db.relationship("Client")
@@ -667,6 +704,7 @@ class Certificate(db.Model):
             "participant_id",
             name="uix_certificate_session_participant",
         ),
+        db.Index("ix_certificates_participant_id", "participant_id"),
     )
     session = db.relationship("Session")
 
@@ -677,6 +715,10 @@ class SessionFacilitator(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"))
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"))
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    __table_args__ = (
+        db.Index("ix_session_facilitators_session_id", "session_id"),
+        db.Index("ix_session_facilitators_user_id", "user_id", "session_id"),
+    )
 
 
 class MaterialType(db.Model):
@@ -922,6 +964,19 @@ class SessionShippingItem(db.Model):
     notes = db.Column(db.Text)
 
 
+class MaterialsNotificationQueue(db.Model):
+    """Session whose materials order changed since processors were last told
+    (see services/materials_notifications.py)."""
+
+    __tablename__ = "materials_notification_queue"
+
+    session_id = db.Column(
+        db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True
+    )
+    first_dirty_at = db.Column(db.DateTime, nullable=False)
+    dirty_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
 class Badge(db.Model):
     __tablename__ = "badges"
     id = db.Column(db.Integer, primary_key=True)
@@ -933,7 +988,14 @@ class Badge(db.Model):
 
 
 class AuditLog(db.Model):
+    # On PostgreSQL the table is partitioned by month on created_at and the
+    # primary key is (id, created_at); see migration 0089 and shared/audit.py.
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        db.Index("ix_audit_logs_session_created", "session_id", "created_at"),
+        db.Index("ix_audit_logs_user_created", "user_id", "created_at"),
+        db.Index("ix_audit_logs_participant_created", "participant_id", "created_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
         db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True
@@ -946,11 +1008,16 @@ class AuditLog(db.Model):
     )
     action = db.Column(db.String(255), nullable=False)
     details = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
 
 
 class UserAuditLog(db.Model):
+    # Partitioned by month on changed_at on PostgreSQL, like AuditLog.
     __tablename__ = "user_audit_logs"
+    __table_args__ = (
+        db.Index("ix_user_audit_logs_target_changed", "target_user_id", "changed_at"),
+        db.Index("ix_user_audit_logs_actor_changed", "actor_user_id", "changed_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     actor_user_id = db.Column(
         db.Integer, db.ForeignKey("users.id", ondelete="RESTRICT"), nullable=False
@@ -961,7 +1028,7 @@ class UserAuditLog(db.Model):
     field = db.Column(db.String(64), nullable=False)
     old_value = db.Column(db.String(255))
     new_value = db.Column(db.String(255))
-    changed_at = db.Column(db.DateTime, server_default=db.func.now())
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
 
 
 VIRTUAL_WORKSHOP_DEFAULTS = [
@@ -1013,6 +1080,7 @@ __all__ = [
     "ParticipantAccount",
     "Settings",
     "ProcessorAssignment",
+    "ReferenceDataVersion",
     "Language",
     "WorkshopType",
     "Client",
@@ -2,7 +2,10 @@ from __future__ import annotations
 
 from datetime import datetime
 
+from sqlalchemy.orm import validates
+
 from ..app import db
+from ..shared.html import content_hash, sanitize_prework_html
 
 
 class PreworkInvite(db.Model):
@@ -61,6 +64,10 @@ class PreworkQuestion(db.Model):
     )
     position = db.Column(db.Integer, nullable=False)
     text = db.Column(db.Text, nullable=False)
+    # Render-ready form of ``text`` (prework whitelist, links open in a new
+    # tab) and the SHA-256 of ``text`` it was derived from.
+    text_html = db.Column(db.Text)
+    text_hash = db.Column(db.String(64))
     required = db.Column(db.Boolean, nullable=False, default=True)
     kind = db.Column(
         db.Enum("TEXT", "LIST", name="prework_question_kind"),
@@ -73,6 +80,18 @@ class PreworkQuestion(db.Model):
         db.UniqueConstraint("template_id", "position", name="uq_prework_question_position"),
     )
 
+    @validates("text")
+    def _sanitize_text(self, key, value):
+        self.text_html = sanitize_prework_html(value or "")
+        self.text_hash = content_hash(value)
+        return value
+
+    @property
+    def rendered_html(self) -> str:
+        if self.text_html is not None and self.text_hash == content_hash(self.text):
+            return self.text_html
+        return sanitize_prework_html(self.text or "")
+
 
 class PreworkTemplateResource(db.Model):
     __tablename__ = "prework_template_resources"
@@ -108,6 +127,11 @@ class PreworkAssignment(db.Model):
         db.UniqueConstraint(
             "session_id", "participant_account_id", name="uq_prework_assignment_unique"
         ),
+        db.Index(
+            "ix_prework_assignments_participant_account_id",
+            "participant_account_id",
+            "due_at",
+        ),
     )
 
     session = db.relationship("Session")
@@ -6,6 +6,7 @@ from sqlalchemy import event
 from sqlalchemy.orm import validates
 
 from ..app import db
+from ..shared.html import content_hash, sanitize_html
 from ..shared.storage_resources import remove_resource_dir, remove_resource_file
 
 resource_workshop_types = db.Table(
@@ -34,6 +35,7 @@ class Resource(db.Model):
     type = db.Column(db.String(20), nullable=False)
     resource_value = db.Column(db.String(2048))
     description_html = db.Column(db.Text)
+    description_hash = db.Column(db.String(64))
     active = db.Column(db.Boolean, nullable=False, default=True)
     language = db.Column(
         db.String(8), nullable=False, default="en", server_default="en"
@@ -101,6 +103,17 @@ class Resource(db.Model):
             raise ValueError("invalid resource audience")
         return normalized
 
+    @validates("description_html")
+    def _sanitize_description(self, key, value):
+        # Forms sanitize already; re-running keeps every write path (seeds,
+        # scripts) render-safe. Re-saving the stored description unchanged
+        # matches its hash and skips the sanitizer.
+        if value and self.description_hash == content_hash(value):
+            return value
+        cleaned = sanitize_html(value) if value else value
+        self.description_hash = content_hash(cleaned) if cleaned else None
+        return cleaned
+
     @validates("language")
     def _normalize_language(self, key, value):
         language_code = (value or "en").strip().lower()
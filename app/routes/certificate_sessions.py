@@ -19,6 +19,7 @@ from ..models import (
     Session,
     WorkshopType,
 )
+from ..shared import reference_data
 from ..shared.acl import is_contractor
 from ..shared.languages import get_language_options
 from ..shared.rbac import certificate_session_manager_required
@@ -54,11 +55,7 @@ def new_certificate_session(current_user):
         .order_by(func.lower(Client.name))
         .all()
     )
-    workshop_types = (
-        WorkshopType.query.filter(WorkshopType.active == True)
-        .order_by(WorkshopType.code)
-        .all()
-    )
+    workshop_types = reference_data.workshop_types()
     facilitators = (
         User.query.filter(or_(User.is_kt_delivery == True, User.is_kt_contractor == True))
         .order_by(
@@ -15,15 +15,15 @@ from urllib.parse import urlparse
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError
 
-from ..app import db, User
+from ..app import db
 from ..models import (
     Client,
     Session,
     ClientWorkshopLocation,
     ClientShippingLocation,
-    ParticipantAccount,
     ensure_virtual_workshop_locations,
 )
+from ..shared.identity import current_identity
 from ..shared.acl import (
     is_kt_staff,
     can_manage_clients_locations,
@@ -48,12 +48,12 @@ def client_edit_required(fn):
         user_id = flask_session.get("user_id")
         account_id = flask_session.get("participant_account_id")
         if user_id:
-            user = db.session.get(User, user_id)
+            user = current_identity().user
             if not user or not can_manage_clients_locations(user):
                 abort(403)
             return fn(*args, **kwargs, current_user=user, csa_account=None)
         if account_id:
-            account = db.session.get(ParticipantAccount, account_id)
+            account = current_identity().account
             if not account:
                 abort(403)
             return fn(*args, **kwargs, current_user=None, csa_account=account)
@@ -68,7 +68,7 @@ def clients_access_required(fn):
         user_id = flask_session.get("user_id")
         if not user_id:
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not can_manage_clients_locations(user):
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -82,7 +82,7 @@ def staff_required(fn):
         user_id = flask_session.get("user_id")
         if not user_id:
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not can_manage_clients_locations(user):
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -100,7 +100,6 @@ def list_clients(current_user):
 @bp.route("/new", methods=["GET", "POST"])
 @clients_access_required
 def new_client(current_user):
-    users = User.query.order_by(User.email).all()
     next_url = _safe_next(request.values.get("next"))
     if request.method == "POST":
         name = (request.form.get("name") or "").strip()
@@ -126,7 +125,7 @@ def new_client(current_user):
         db.session.commit()
         ensure_virtual_workshop_locations(client.id)
         return redirect(next_url or url_for("clients.list_clients"))
-    return render_template("clients/form.html", client=None, users=users, next_url=next_url)
+    return render_template("clients/form.html", client=None, next_url=next_url)
 
 
 @bp.route("/<int:client_id>/edit", methods=["GET", "POST"])
@@ -138,7 +137,6 @@ def edit_client(client_id, current_user, csa_account):
     section = request.values.get("section") or "workshop"
     loc_id = request.values.get("loc_id")
     next_url = _safe_next(request.values.get("next"))
-    users = User.query.order_by(User.email).all()
     can_toggle = bool(
         current_user
         and (
@@ -253,7 +251,6 @@ def edit_client(client_id, current_user, csa_account):
     return render_template(
         "clients/edit.html",
         client=client,
-        users=users,
         section=section,
         next_url=next_url,
         workshop_locations=workshop_locations,
@@ -1,16 +1,14 @@
 from __future__ import annotations
 
-from functools import wraps
-
 from functools import wraps
 import re
+from typing import NamedTuple
 
 from flask import (
     Blueprint,
     abort,
     redirect,
     render_template,
-    send_file,
     session as flask_session,
     url_for,
     request,
@@ -21,10 +19,10 @@ from flask import (
 import os
 from datetime import date
 
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
 
-from ..app import db, User
+from ..app import db
 from ..models import (
     Certificate,
     Participant,
@@ -33,14 +31,19 @@ from ..models import (
     SessionParticipant,
     PreworkAssignment,
     PreworkAnswer,
+    WorkshopType,
 )
 from ..models import Resource, resource_workshop_types
+from ..shared.identity import current_identity
+from ..shared import learner_cache
+from ..shared.blobstore import blob_response, get_store
+from ..shared.cert_links import signed_certificate_url, verify_certificate_link
 from ..shared.languages import get_language_options, code_to_label
 from ..shared.storage import badge_png_exists, build_badge_public_url
 from ..shared.profile_images import (
     delete_profile_image,
     ProfileImageError,
-    resolve_profile_image,
+    profile_image_src,
     save_profile_image,
 )
 from ..shared.time import fmt_time_range_with_tz
@@ -66,52 +69,48 @@ def login_required(fn):
     return wrapper
 
 
-@bp.get("/my-workshops")
-@login_required
-def my_workshops():
-    """List sessions where the current user is a participant."""
-    account_id = flask_session.get("participant_account_id")
-    user_id = flask_session.get("user_id")
-    email = ""
-    account = None
-    if account_id:
-        account = db.session.get(ParticipantAccount, account_id)
-        email = (account.email or "").lower() if account else ""
-    elif user_id:
-        user = db.session.get(User, user_id)
-        email = (user.email or "").lower()
-        account = ParticipantAccount.query.filter(
-            func.lower(ParticipantAccount.email) == email
-        ).first()
-        account_id = account.id if account else None
-    else:
-        return redirect(url_for("auth.login"))
+class WorkshopTypeRef(NamedTuple):
+    id: int
+    name: str
+
+
+class ResourceCard(NamedTuple):
+    name: str
+    type: str
+    resource_value: str | None
+    description_html: str | None
+    public_url: str | None
+    document_filename: str | None
+
 
-    sessions = (
-        db.session.query(Session)
+def _current_account_id() -> int | None:
+    """Return the participant account behind the session, staff included."""
+
+    return current_identity().account_id
+
+
+def _workshop_cards(account_id: int) -> list[dict]:
+    rows = (
+        db.session.query(Session, PreworkAssignment)
+        .join(SessionParticipant, SessionParticipant.session_id == Session.id)
+        .join(Participant, SessionParticipant.participant_id == Participant.id)
+        .outerjoin(
+            PreworkAssignment,
+            (PreworkAssignment.session_id == Session.id)
+            & (PreworkAssignment.participant_account_id == account_id),
+        )
         .options(
             joinedload(Session.workshop_type),
-            joinedload(Session.client),
-            joinedload(Session.facilitators),
             joinedload(Session.lead_facilitator),
             joinedload(Session.workshop_location),
+            selectinload(Session.facilitators),
         )
-        .join(SessionParticipant, SessionParticipant.session_id == Session.id)
-        .join(Participant, SessionParticipant.participant_id == Participant.id)
-        .filter(func.lower(Participant.email) == email)
+        .filter(Participant.account_id == account_id)
         .order_by(Session.start_date)
         .all()
     )
-    assignments = {}
-    if account_id:
-        assignments = {
-            a.session_id: a
-            for a in PreworkAssignment.query.filter_by(
-                participant_account_id=account_id
-            ).all()
-        }
     cards: list[dict] = []
-    for sess in sessions:
+    for sess, assignment in rows:
         workshop_name = (
             sess.workshop_type.name if sess.workshop_type else (sess.title or "Workshop")
         )
@@ -142,7 +141,6 @@ def my_workshops():
         if not location_text:
             location_text = "Location TBD"
 
-        assignment = assignments.get(sess.id) if assignments else None
         has_prework = (
             not sess.prework_disabled
             and assignment
@@ -172,7 +170,9 @@ def my_workshops():
                     "name": fac.full_name or fac.email,
                     "email": fac.email,
                     "phone": (fac.phone or "").strip(),
-                    "photo": resolve_profile_image(fac.profile_image_path),
+                    "photo": profile_image_src(
+                        fac.profile_image_path, fac.profile_image_variants, 64
+                    ),
                 }
             )
 
@@ -190,7 +190,70 @@ def my_workshops():
                 "facilitators": facilitators,
             }
         )
+    return cards
+
+
+def _resource_groups(
+    account_id: int, today: date
+) -> list[tuple[WorkshopTypeRef, list[ResourceCard]]]:
+    # A resource is visible when the account attended (start date reached) a
+    # session of one of its workshop types in the resource's language.
+    attended = (
+        select(Session.id)
+        .join(SessionParticipant, SessionParticipant.session_id == Session.id)
+        .join(Participant, SessionParticipant.participant_id == Participant.id)
+        .where(
+            Participant.account_id == account_id,
+            Session.workshop_type_id == resource_workshop_types.c.workshop_type_id,
+            func.coalesce(func.nullif(Session.workshop_language, ""), "en")
+            == Resource.language,
+            Session.start_date.isnot(None),
+            Session.start_date <= today,
+        )
+        .exists()
+    )
+    rows = (
+        db.session.query(Resource, WorkshopType.id, WorkshopType.name)
+        .join(
+            resource_workshop_types,
+            resource_workshop_types.c.resource_id == Resource.id,
+        )
+        .join(WorkshopType, WorkshopType.id == resource_workshop_types.c.workshop_type_id)
+        .filter(Resource.active.is_(True))
+        .filter(Resource.audience.in_(["Participant", "Both"]))
+        .filter(attended)
+        .order_by(WorkshopType.name, WorkshopType.id, Resource.name)
+        .all()
+    )
+    grouped: list[tuple[WorkshopTypeRef, list[ResourceCard]]] = []
+    for resource, wt_id, wt_name in rows:
+        if not grouped or grouped[-1][0].id != wt_id:
+            grouped.append((WorkshopTypeRef(wt_id, wt_name), []))
+        grouped[-1][1].append(
+            ResourceCard(
+                name=resource.name,
+                type=resource.type,
+                resource_value=resource.resource_value,
+                description_html=resource.description_html,
+                public_url=resource.public_url,
+                document_filename=resource.document_filename,
+            )
+        )
+    return grouped
 
+
+@bp.get("/my-workshops")
+@login_required
+def my_workshops():
+    """List sessions where the current user is a participant."""
+    account_id = _current_account_id()
+    cards = (
+        learner_cache.cached(
+            "workshops", account_id, lambda: _workshop_cards(account_id)
+        )
+        if account_id
+        else []
+    )
     return render_template(
         "my_workshops.html",
         cards=cards,
@@ -201,53 +264,17 @@ def my_workshops():
 @bp.get("/my-resources")
 @login_required
 def my_resources():
-    if flask_session.get("user_id"):
-        user = db.session.get(User, flask_session.get("user_id"))
-        email = (user.email or "").lower()
-    else:
-        account = db.session.get(
-            ParticipantAccount, flask_session.get("participant_account_id")
-        )
-        email = (account.email or "").lower() if account else ""
+    account_id = _current_account_id()
     today = date.today()
-    sessions = (
-        db.session.query(Session)
-        .options(joinedload(Session.workshop_type))
-        .join(SessionParticipant, SessionParticipant.session_id == Session.id)
-        .join(Participant, SessionParticipant.participant_id == Participant.id)
-        .filter(func.lower(Participant.email) == email)
-        .filter(Session.start_date != None, Session.start_date <= today)
-        .all()
+    grouped = (
+        learner_cache.cached(
+            f"resources:{today.isoformat()}",
+            account_id,
+            lambda: _resource_groups(account_id, today),
+        )
+        if account_id
+        else []
     )
-    workshop_languages: dict[int, set[str]] = {}
-    workshop_types: dict[int, "WorkshopType"] = {}
-    for sess in sessions:
-        wt = sess.workshop_type
-        if not wt:
-            continue
-        workshop_types.setdefault(wt.id, wt)
-        lang = (sess.workshop_language or "en")
-        workshop_languages.setdefault(wt.id, set()).add(lang)
-    grouped: list[tuple["WorkshopType", list[Resource]]] = []
-    for wt_id, wt in sorted(
-        ((wt_id, wt) for wt_id, wt in workshop_types.items()),
-        key=lambda item: item[1].name,
-    ):
-        languages = workshop_languages.get(wt_id, {"en"})
-        try:
-            items = (
-                Resource.query.filter(Resource.active == True)
-                .join(resource_workshop_types)
-                .filter(resource_workshop_types.c.workshop_type_id == wt_id)
-                .filter(Resource.language.in_(languages))
-                .filter(Resource.audience.in_(["Participant", "Both"]))
-                .order_by(Resource.name)
-                .all()
-            )
-        except Exception:
-            items = []
-        if items:
-            grouped.append((wt, items))
     return render_template(
         "my_resources.html", grouped=grouped, active_nav="my-resources"
     )
@@ -418,15 +445,7 @@ def prework_download(assignment_id: int):
 @bp.get("/my-certificates")
 @login_required
 def my_certs():
-    account_id = flask_session.get("participant_account_id")
-    if not account_id and flask_session.get("user_id"):
-        user = db.session.get(User, flask_session.get("user_id"))
-        account = (
-            db.session.query(ParticipantAccount)
-            .filter(func.lower(ParticipantAccount.email) == (user.email or "").lower())
-            .one_or_none()
-        )
-        account_id = account.id if account else None
+    account_id = current_identity().account_id
     certs = []
     if account_id:
         certs = (
@@ -449,15 +468,25 @@ def my_certs():
             )
         cert.badge_url = public_url if has_png else None
         cert.badge_available = has_png
+        cert.download_url = signed_certificate_url(cert.id, cert.pdf_path)
     return render_template("my_certificates.html", certs=certs)
 
 
+def _profile_photo_url(user, account) -> str | None:
+    for owner in (user, account):
+        if owner and owner.profile_image_path:
+            return profile_image_src(
+                owner.profile_image_path, owner.profile_image_variants, 256
+            )
+    return None
+
+
 @bp.route("/profile", methods=["GET", "POST"])
 @login_required
 def profile():
     user_id = flask_session.get("user_id")
     if user_id:
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         email = (user.email or "").lower()
         account = (
             db.session.query(ParticipantAccount)
@@ -526,23 +555,31 @@ def profile():
 
         owner_key: str | None = None
         existing_photo = None
+        existing_variants = None
         if user_id and user:
             owner_key = str(user.id)
             existing_photo = user.profile_image_path
+            existing_variants = user.profile_image_variants
         elif account:
             owner_key = f"participant-{account.id}"
             existing_photo = account.profile_image_path
+            existing_variants = account.profile_image_variants
 
         new_photo_path: str | None = None
+        new_photo_variants: dict[str, str] | None = None
         if photo_file and photo_file.filename:
             if not owner_key:
                 errors.append("Unable to save profile photo right now.")
             else:
                 try:
                     result = save_profile_image(
-                        photo_file, owner_key, previous_path=existing_photo
+                        photo_file,
+                        owner_key,
+                        previous_path=existing_photo,
+                        previous_variants=existing_variants,
                     )
                     new_photo_path = result.relative_path
+                    new_photo_variants = result.variants
                     remove_photo = False
                 except ProfileImageError as exc:
                     errors.append(str(exc))
@@ -564,6 +601,7 @@ def profile():
             user.country = country or None
             if new_photo_path:
                 user.profile_image_path = new_photo_path
+                user.profile_image_variants = new_photo_variants
             cert_value = cert_name or full_name
             if account:
                 account.full_name = full_name or account.full_name
@@ -575,6 +613,7 @@ def profile():
                 account.country = country or None
                 if new_photo_path:
                     account.profile_image_path = new_photo_path
+                    account.profile_image_variants = new_photo_variants
             else:
                 account = ParticipantAccount(
                     email=email,
@@ -587,6 +626,7 @@ def profile():
                     state=state or None,
                     country=country or None,
                     profile_image_path=new_photo_path,
+                    profile_image_variants=new_photo_variants,
                 )
                 db.session.add(account)
         else:
@@ -600,6 +640,7 @@ def profile():
                 account.country = country or None
                 if new_photo_path:
                     account.profile_image_path = new_photo_path
+                    account.profile_image_variants = new_photo_variants
 
         if email:
             participant_rows = (
@@ -617,14 +658,19 @@ def profile():
 
         if remove_photo:
             to_clear = None
+            to_clear_variants = None
             if user_id and user:
                 to_clear = user.profile_image_path
+                to_clear_variants = user.profile_image_variants
                 user.profile_image_path = None
+                user.profile_image_variants = None
             if account:
                 to_clear = to_clear or account.profile_image_path
+                to_clear_variants = to_clear_variants or account.profile_image_variants
                 account.profile_image_path = None
+                account.profile_image_variants = None
             if to_clear:
-                delete_profile_image(to_clear)
+                delete_profile_image(to_clear, to_clear_variants)
         db.session.commit()
         flash("Profile updated.", "success")
         return redirect(url_for("learner.profile"))
@@ -684,23 +730,24 @@ def profile():
         or "",
         country=((user.country if user_id else account.country) if (user or account) else "")
         or "",
-        profile_image_url=resolve_profile_image(
-            (user.profile_image_path if user_id and user else None)
-            or (account.profile_image_path if account else None)
-        ),
+        profile_image_url=_profile_photo_url(user if user_id else None, account),
     )
 
 
 @bp.get("/certificates/<int:cert_id>")
 @login_required
 def download_certificate(cert_id: int):
-    cert = db.session.get(Certificate, cert_id)
-    if not cert:
+    row = (
+        db.session.query(Certificate.id, Certificate.pdf_path, Participant.email)
+        .outerjoin(Participant, Certificate.participant_id == Participant.id)
+        .filter(Certificate.id == cert_id)
+        .one_or_none()
+    )
+    if not row:
         abort(404)
     user_id = flask_session.get("user_id")
-    participant = db.session.get(Participant, cert.participant_id)
     if user_id:
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         email = (user.email or "").lower()
         staff = bool(user.is_app_admin or user.is_admin)
     else:
@@ -709,19 +756,44 @@ def download_certificate(cert_id: int):
         )
         email = (account.email or "").lower() if account else ""
         staff = False
-    if participant and participant.email.lower() == email:
-        allowed = True
-    else:
-        allowed = staff
-    if not allowed:
+    if not staff and (row.email or "").lower() != email:
         abort(403)
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    cert_root = os.path.join(site_root, "certificates")
-    rel_path = (cert.pdf_path or "").lstrip("/")
-    if rel_path.startswith("certificates/"):
-        rel_path = rel_path.split("/", 1)[1]
-    full_path = os.path.join(cert_root, rel_path)
-    if not os.path.isfile(full_path):
-        current_app.logger.warning("[CERT-MISSING] id=%s path=%s", cert.id, full_path)
+    url = signed_certificate_url(row.id, row.pdf_path)
+    if not url:
         abort(404)
-    return send_file(full_path, as_attachment=True, mimetype="application/pdf")
+    return redirect(url)
+
+
+@bp.get("/certificate-downloads/<int:cert_id>/<path:rel_path>")
+def signed_certificate_download(cert_id: int, rel_path: str):
+    """Serve a certificate PDF for a valid signed link; no session needed."""
+
+    if not verify_certificate_link(
+        cert_id,
+        rel_path,
+        request.args.get("expires", type=int),
+        request.args.get("sig"),
+    ):
+        abort(403)
+    if ".." in rel_path.split("/"):
+        abort(404)
+    filename = os.path.basename(rel_path)
+    store = get_store()
+    key = f"certificates/{rel_path}"
+    if current_app.config.get("CERT_DOWNLOAD_ACCEL") and store.local_path(key):
+        # Caddy's handle_response serves the file (with ETag/Last-Modified and
+        # conditional requests) so the worker never reads the PDF. Remote
+        # backends have no file for Caddy to serve and stream below.
+        response = current_app.response_class(status=200)
+        response.headers["X-Accel-Redirect"] = f"/certificates/{rel_path}"
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+        return response
+    if not store.exists(key):
+        current_app.logger.warning("[CERT-MISSING] id=%s path=%s", cert_id, key)
+        abort(404)
+    response = blob_response(
+        store, key, download_name=filename, mimetype="application/pdf"
+    )
+    response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return response
@@ -21,11 +21,11 @@ from ..models import (
     SessionShipping,
     MaterialsOption,
     ClientShippingLocation,
-    SimulationOutline,
     AuditLog,
-    WorkshopTypeMaterialDefault,
     MaterialOrderItem,
 )
+from ..shared.identity import current_identity
+from ..shared import catalog_refs, reference_data
 from ..shared.materials import material_format_choices
 from ..shared.languages import get_language_options
 from ..shared.sessions_lifecycle import (
@@ -34,7 +34,7 @@ from ..shared.sessions_lifecycle import (
     is_material_only_session,
 )
 from ..shared.acl import is_certificate_manager_only
-from ..services.materials_notifications import notify_materials_processors
+from ..services.materials_notifications import queue_materials_notification
 
 ROW_FORMAT_CHOICES = ["Digital", "Physical", "Self-paced"]
 CLIENT_RUN_BULK_ORDER = "Client-run Bulk order"
@@ -99,7 +99,7 @@ def materials_access(fn):
         user = None
         user_id = flask_session.get("user_id")
         if user_id:
-            user = db.session.get(User, user_id)
+            user = current_identity().user
             if user and is_certificate_manager_only(user):
                 abort(403)
             manageable = can_manage_shipment(user)
@@ -155,26 +155,23 @@ def _materials_shared_context(
     fmt = shipment.materials_format or (
         "SIM_ONLY" if shipment.order_type == "Simulation" else ""
     )
-    simulation_outlines = SimulationOutline.query.order_by(
-        SimulationOutline.number, SimulationOutline.skill
-    ).all()
+    simulation_outlines = reference_data.simulation_outlines()
     sim_base = bool(sess.workshop_type and sess.workshop_type.simulation_based)
     show_sim_outline = shipment.order_type == "Simulation" or sim_base
     show_credits = shipment.order_type == "Simulation" or sim_base
     language_options = get_language_options()
     default_formats: dict[int, str] = {}
     if sess.workshop_type_id:
-        defs = WorkshopTypeMaterialDefault.query.filter_by(
-            workshop_type_id=sess.workshop_type_id,
-            delivery_type=sess.delivery_type,
-            region_code=sess.region,
-            language=sess.workshop_language,
-            active=True,
-        ).all()
+        defs = reference_data.material_defaults(
+            sess.workshop_type_id,
+            sess.delivery_type,
+            sess.region,
+            sess.workshop_language,
+        )
         for d in defs:
-            kind, _, ident = d.catalog_ref.partition(":")
-            if kind == "materials_options" and ident.isdigit():
-                default_formats[int(ident)] = d.default_format
+            ref = catalog_refs.parse_ref(d.catalog_ref)
+            if ref and ref.kind == catalog_refs.MATERIALS_OPTION:
+                default_formats[ref.id] = d.default_format
     return {
         "shipping_locations": shipping_locations,
         "readonly": readonly,
@@ -416,7 +413,6 @@ def materials_view(
         action = request.form.get("action")
         if not can_manage:
             abort(403)
-        prior_notified = bool(sess.materials_notified_at)
         if action in {"update_header", "finalize"}:
             finalize = action == "finalize"
             ship_id = request.form.get("shipping_location_id")
@@ -723,10 +719,7 @@ def materials_view(
             should_notify = header_changed or items_changed or finalize
             db.session.commit()
             if should_notify:
-                notify_materials_processors(
-                    sess.id,
-                    reason="updated" if prior_notified else "created",
-                )
+                queue_materials_notification(sess.id)
             return redirect(url_for("materials.materials_view", session_id=session_id))
         if action == "mark_shipped":
             if not shipment.ship_date:
@@ -761,7 +754,6 @@ def apply_defaults(
 ):
     if not can_manage_shipment(current_user) or view_only:
         abort(403)
-    prior_notified = bool(sess.materials_notified_at)
     shipment = SessionShipping.query.filter_by(session_id=sess.id).first()
     if not shipment or shipment.material_sets <= 0:
         flash("Select # of Material sets first.", "error")
@@ -829,16 +821,11 @@ def apply_defaults(
     fmt_sel = request.form.get("materials_format")
     if fmt_sel is not None:
         shipment.materials_format = fmt_sel or None
-    defaults = (
-        WorkshopTypeMaterialDefault.query.filter_by(
-            workshop_type_id=sess.workshop_type_id,
-            delivery_type=sess.delivery_type,
-            region_code=sess.region,
-            language=sess.workshop_language,
-            active=True,
-        )
-        .order_by(WorkshopTypeMaterialDefault.id)
-        .all()
+    defaults = reference_data.material_defaults(
+        sess.workshop_type_id,
+        sess.delivery_type,
+        sess.region,
+        sess.workshop_language,
     )
     if not defaults:
         flash("No defaults found for this session's context.", "info")
@@ -850,38 +837,27 @@ def apply_defaults(
 
     qty_base = compute_default_qty(sess, shipment)
     created = 0
-    existing_refs = {
-        i.catalog_ref
-        for i in MaterialOrderItem.query.filter_by(session_id=sess.id).all()
-    }
+    existing_refs = set(
+        db.session.scalars(
+            db.select(MaterialOrderItem.catalog_ref).filter_by(session_id=sess.id)
+        )
+    )
+    resolved = catalog_refs.resolve(d.catalog_ref for d in defaults)
     for d in defaults:
-        kind, _, ident = d.catalog_ref.partition(":")
-        obj = None
-        title = None
-        desc = None
-        sku = None
+        snapshot = resolved.get(d.catalog_ref)
         fmt = d.default_format
-        basis = "Per learner"
-        if kind == "materials_options" and ident.isdigit():
-            obj = db.session.get(MaterialsOption, int(ident))
-            if not obj:
-                continue
-            bulk = "bulk"
-            if (
-                is_client_run_bulk_order(obj.order_type)
-                or (obj.title and bulk in obj.title.lower())
-                or (obj.description and bulk in obj.description.lower())
-            ):
+        if isinstance(snapshot, catalog_refs.MaterialOptionSnapshot):
+            if snapshot.is_bulk:
                 continue
-            title = obj.title
-            desc = obj.description
-            sku = obj.sku_physical
-            basis = obj.quantity_basis
-        elif kind in {"simulation_outline", "simulation_outlines"} and ident.isdigit():
-            obj = db.session.get(SimulationOutline, int(ident))
-            if not obj:
-                continue
-            title = obj.label
+            title = snapshot.title
+            desc = snapshot.description
+            sku = snapshot.sku_physical
+            basis = snapshot.quantity_basis
+        elif isinstance(snapshot, catalog_refs.SimulationOutlineSnapshot):
+            title = snapshot.label
+            desc = None
+            sku = None
+            basis = "Per learner"
             fmt = "Digital"
         else:
             continue
@@ -908,9 +884,7 @@ def apply_defaults(
         _set_if_changed(shipment, field, value)
     db.session.commit()
     if notify_needed:
-        notify_materials_processors(
-            sess.id, reason="updated" if prior_notified else "created"
-        )
+        queue_materials_notification(sess.id)
     flash(f"Applied defaults: {created} added.", "success")
     return redirect(
         url_for("materials.materials_view", session_id=session_id) + "#material-items"
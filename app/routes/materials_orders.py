@@ -19,6 +19,8 @@ from ..models import (
     Participant,
 )
 from .materials import ORDER_TYPES, ORDER_STATUSES, can_manage_shipment, is_view_only
+from ..shared.identity import current_identity
+from ..shared.exports import BATCH_SIZE as EXPORT_BATCH_SIZE, batched, export_response
 from ..shared.sessions_lifecycle import has_materials
 from ..shared.acl import is_certificate_manager_only
 from ..shared.names import combine_first_last
@@ -26,21 +28,43 @@ from ..shared.names import combine_first_last
 bp = Blueprint("materials_orders", __name__, url_prefix="/materials")
 
 
-@bp.route("")
-def list_orders():
-    user_id = flask_session.get("user_id")
-    if not user_id:
-        return redirect(url_for("auth.login"))
-    user = db.session.get(User, user_id)
-    if user and is_certificate_manager_only(user):
-        abort(403)
-    if not (can_manage_shipment(user) or is_view_only(user)):
-        abort(403)
-    client_id = request.args.get("client_id", type=int)
-    order_type = request.args.get("order_type")
-    status = request.args.get("status")
-    workshop_status_arg = request.args.get("workshop_status")
-    closed_flag = request.args.get("closed")
+def _format_processed(ts, name, email):
+    if not ts:
+        return ""
+    label = ts.strftime("%Y-%m-%d %H:%M") + " UTC"
+    display = (name or "").strip() or (email or "").strip()
+    if display:
+        label += f" {display}"
+    return label
+
+
+def _shipping_title(loc, client):
+    if not loc:
+        return ""
+    if loc.title:
+        return loc.title
+    pieces: list[str] = []
+    if client and client.name:
+        pieces.append(client.name)
+    if loc.city:
+        pieces.append(loc.city)
+    elif loc.address_line1:
+        pieces.append(loc.address_line1)
+    elif loc.contact_name:
+        pieces.append(loc.contact_name)
+    if not pieces:
+        return loc.display_name()
+    return " / ".join(pieces[:2])
+
+
+def _order_filters(args) -> dict:
+    """Parse the list page's filter parameters (shared with the export)."""
+
+    client_id = args.get("client_id", type=int)
+    order_type = args.get("order_type")
+    status = args.get("status")
+    workshop_status_arg = args.get("workshop_status")
+    closed_flag = args.get("closed")
     if workshop_status_arg is None and closed_flag is not None:
         workshop_status_arg = "all" if closed_flag == "1" else "not_closed"
     if workshop_status_arg is None:
@@ -62,8 +86,17 @@ def list_orders():
         else:
             workshop_status_filter = normalized
             workshop_status_param = normalized
-    sort = request.args.get("sort", "arrival_date")
-    direction = request.args.get("dir", "asc")
+    return {
+        "client_id": client_id,
+        "order_type": order_type,
+        "status": status,
+        "workshop_status_filter": workshop_status_filter,
+        "workshop_status_param": workshop_status_param,
+    }
+
+
+def _orders_query(filters: dict):
+    """Shipments joined with their session, client and latest processors."""
 
     latest_processed_sq = (
         db.session.query(
@@ -135,9 +168,9 @@ def list_orders():
         )
     )
 
-    if workshop_status_filter == "not_closed":
+    if filters["workshop_status_filter"] == "not_closed":
         query = query.filter(or_(Session.status.is_(None), Session.status != "Closed"))
-    elif workshop_status_filter == "Closed":
+    elif filters["workshop_status_filter"] == "Closed":
         query = query.filter(Session.status == "Closed")
     query = query.filter(Session.cancelled.is_(False))
     query = query.filter(
@@ -145,14 +178,21 @@ def list_orders():
         != "certificate only"
     )
 
-    if client_id:
-        query = query.filter(Session.client_id == client_id)
-    if order_type:
-        query = query.filter(SessionShipping.order_type == order_type)
-    if status:
-        query = query.filter(SessionShipping.status == status)
+    if filters["client_id"]:
+        query = query.filter(Session.client_id == filters["client_id"])
+    if filters["order_type"]:
+        query = query.filter(SessionShipping.order_type == filters["order_type"])
+    if filters["status"]:
+        query = query.filter(SessionShipping.status == filters["status"])
+    return query
 
-    shipments = query.all()
+
+def _order_rows(shipments: list) -> list[dict]:
+    """Build display rows for ``shipments`` (records from ``_orders_query``).
+
+    Order items and learners are loaded for the given records only, so the
+    export can call this once per streamed batch.
+    """
 
     session_ids = [sess.id for (_, sess, *_rest) in shipments]
     order_items_map: dict[int, list[MaterialOrderItem]] = {}
@@ -207,33 +247,6 @@ def list_orders():
                 continue
             participant_map.setdefault(sid, []).append(display)
 
-    def format_processed(ts, name, email):
-        if not ts:
-            return ""
-        label = ts.strftime("%Y-%m-%d %H:%M") + " UTC"
-        display = (name or "").strip() or (email or "").strip()
-        if display:
-            label += f" {display}"
-        return label
-
-    def shipping_title_for(loc, client):
-        if not loc:
-            return ""
-        if loc.title:
-            return loc.title
-        pieces: list[str] = []
-        if client and client.name:
-            pieces.append(client.name)
-        if loc.city:
-            pieces.append(loc.city)
-        elif loc.address_line1:
-            pieces.append(loc.address_line1)
-        elif loc.contact_name:
-            pieces.append(loc.contact_name)
-        if not pieces:
-            return loc.display_name()
-        return " / ".join(pieces[:2])
-
     rows = []
     for (
         shipment,
@@ -304,13 +317,13 @@ def list_orders():
                 "workshop_code": workshop_code,
                 "workshop_name": workshop_name,
                 "processed_digital_at": digital_processed_at,
-                "processed_digital_display": format_processed(
+                "processed_digital_display": _format_processed(
                     digital_processed_at,
                     digital_processor_name,
                     digital_processor_email,
                 ),
                 "processed_physical_at": physical_processed_at,
-                "processed_physical_display": format_processed(
+                "processed_physical_display": _format_processed(
                     physical_processed_at,
                     physical_processor_name,
                     physical_processor_email,
@@ -324,10 +337,36 @@ def list_orders():
                 "facilitators": facilitator_names,
                 "learners": learners,
                 "region": sess.region or "",
-                "shipping_title": shipping_title_for(ship_loc, client),
+                "shipping_title": _shipping_title(ship_loc, client),
                 "workshop_status": sess.computed_status,
             }
         )
+    return rows
+
+
+def _require_orders_viewer() -> None:
+    user = current_identity().user
+    if user and is_certificate_manager_only(user):
+        abort(403)
+    if not (can_manage_shipment(user) or is_view_only(user)):
+        abort(403)
+
+
+@bp.route("")
+def list_orders():
+    if not flask_session.get("user_id"):
+        return redirect(url_for("auth.login"))
+    _require_orders_viewer()
+    filters = _order_filters(request.args)
+    client_id = filters["client_id"]
+    order_type = filters["order_type"]
+    status = filters["status"]
+    workshop_status_filter = filters["workshop_status_filter"]
+    workshop_status_param = filters["workshop_status_param"]
+    sort = request.args.get("sort", "arrival_date")
+    direction = request.args.get("dir", "asc")
+
+    rows = _order_rows(_orders_query(filters).all())
 
     reverse = direction == "desc"
 
@@ -385,3 +424,87 @@ def list_orders():
         workshop_status_param=workshop_status_param,
         workshop_status_chip_label=workshop_status_chip_label,
     )
+
+
+ORDER_EXPORT_HEADER = [
+    "Order ID",
+    "Session ID",
+    "Title",
+    "Client",
+    "Region",
+    "Workshop Code",
+    "Workshop",
+    "Start Date",
+    "Workshop Status",
+    "Order Type",
+    "Materials Status",
+    "Arrival Date",
+    "Shipping Location",
+    "Bulk Receiver",
+    "Simulation Outline",
+    "Credits",
+    "Teams",
+    "Processed (Digital)",
+    "Processed (Physical)",
+    "Facilitators",
+    "Learners",
+]
+
+# SQL ordering for the export; computed list-page columns fall back to arrival date.
+_EXPORT_SORT_COLUMNS = {
+    "order_id": SessionShipping.id,
+    "title": Session.title,
+    "status": SessionShipping.status,
+    "materials_status": SessionShipping.status,
+    "start_date": Session.start_date,
+    "client": Client.name,
+    "order_type": SessionShipping.order_type,
+    "workshop_code": WorkshopType.code,
+    "arrival_date": SessionShipping.arrival_date,
+    "region": Session.region,
+}
+
+
+@bp.get("/export.<fmt>")
+def export_orders(fmt: str):
+    """Stream the filtered order list; takes the list page's query string."""
+
+    if not flask_session.get("user_id"):
+        return redirect(url_for("auth.login"))
+    _require_orders_viewer()
+    col = _EXPORT_SORT_COLUMNS.get(
+        request.args.get("sort", "arrival_date"), SessionShipping.arrival_date
+    )
+    ordered = col.desc() if request.args.get("dir") == "desc" else col.asc()
+    query = _orders_query(_order_filters(request.args)).order_by(
+        ordered, SessionShipping.id
+    )
+
+    def rows():
+        for chunk in batched(query.yield_per(EXPORT_BATCH_SIZE), EXPORT_BATCH_SIZE):
+            for row in _order_rows(chunk):
+                yield [
+                    row["order_id"],
+                    row["session_id"],
+                    row["title"],
+                    row["client"],
+                    row["region"],
+                    row["workshop_code"],
+                    row["workshop_name"],
+                    row["start_date"],
+                    row["workshop_status"],
+                    row["order_type"],
+                    row["status"],
+                    row["arrival_date"],
+                    row["shipping_title"],
+                    row["bulk_receiver"],
+                    row["outline"],
+                    row["credits"],
+                    row["teams"],
+                    row["processed_digital_display"],
+                    row["processed_physical_display"],
+                    row["facilitators"],
+                    row["learners"],
+                ]
+
+    return export_response(fmt, "materials-orders", ORDER_EXPORT_HEADER, rows())
@@ -17,11 +17,11 @@ from ..models import (
     Session,
     Client,
     Participant,
-    ParticipantAccount,
     SessionParticipant,
     PreworkAssignment,
     Certificate,
 )
+from ..shared.identity import current_identity
 from ..shared.acl import (
     is_admin,
     is_contractor,
@@ -46,8 +46,13 @@ def list_my_sessions():
             query = query.filter(
                 Session.finalized.is_(False), Session.cancelled.is_(False)
             )
-        user = db.session.get(User, user_id)
-        query = query.options(selectinload(Session.facilitators))
+        user = current_identity().user
+        query = query.options(
+            selectinload(Session.facilitators),
+            selectinload(Session.client),
+            selectinload(Session.workshop_type),
+            selectinload(Session.workshop_location),
+        )
         is_delivery_role = is_delivery(user)
         is_contractor_role = is_contractor(user)
         is_crm_only = is_kcrm(user) and not (
@@ -93,11 +98,15 @@ def list_my_sessions():
             show_edit_button=show_edit_button,
         )
     elif account_id:
-        account = db.session.get(ParticipantAccount, account_id)
+        account = current_identity().account
         if not account:
             return redirect(url_for("auth.login"))
         sessions = (
             db.session.query(Session)
+            .options(
+                selectinload(Session.workshop_type),
+                selectinload(Session.workshop_location),
+            )
             .join(SessionParticipant, SessionParticipant.session_id == Session.id)
             .join(Participant, SessionParticipant.participant_id == Participant.id)
             .filter(Participant.account_id == account_id)
@@ -0,0 +1,205 @@
+"""Typeahead option lookups for the session and client forms, plus the
+global search behind the nav search box.
+
+Each typeahead endpoint prefix-matches ``lower(column) LIKE 'q%'`` and returns at most
+``SEARCH_LIMIT`` rows, so the forms render only the selected options and fetch
+the rest on demand. On PostgreSQL the prefix filters are served by the
+``text_pattern_ops`` indexes from migration 0085. ``/search/global`` and the
+``/search/`` page delegate to ``app.shared.global_search``.
+"""
+
+from __future__ import annotations
+
+from functools import wraps
+
+from flask import (
+    Blueprint,
+    abort,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session as flask_session,
+    url_for,
+)
+from sqlalchemy import func, or_
+
+from ..app import User
+from ..models import Client
+from ..shared import global_search
+from ..shared.identity import current_identity
+from ..shared.acl import (
+    is_admin,
+    is_certificate_manager,
+    is_delivery,
+    is_kcrm,
+)
+
+bp = Blueprint("search", __name__, url_prefix="/search")
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+
+def search_access_required(fn):
+    """Allow staff who can open the session or client forms."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        user_id = flask_session.get("user_id")
+        if not user_id:
+            return redirect(url_for("auth.login"))
+        user = current_identity().user
+        if not user or not (
+            is_admin(user)
+            or is_kcrm(user)
+            or is_delivery(user)
+            or is_certificate_manager(user)
+        ):
+            abort(403)
+        return fn(*args, **kwargs, current_user=user)
+
+    return wrapper
+
+
+def _prefix() -> str | None:
+    """Return the escaped ``LIKE`` prefix pattern for ``?q=``, or ``None``."""
+
+    q = (request.args.get("q") or "").strip().lower()
+    if not q:
+        return None
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def _limit() -> int:
+    raw = request.args.get("limit", type=int)
+    if not raw or raw < 1:
+        return SEARCH_LIMIT
+    return min(raw, MAX_SEARCH_LIMIT)
+
+
+def _starts_with(column, pattern: str):
+    return func.lower(column).like(pattern, escape="\\")
+
+
+def _user_query(query):
+    pattern = _prefix()
+    if pattern:
+        query = query.filter(
+            or_(
+                _starts_with(User.email, pattern),
+                _starts_with(User.first_name, pattern),
+                _starts_with(User.last_name, pattern),
+                _starts_with(User.full_name, pattern),
+            )
+        )
+    return query
+
+
+def _user_results(users) -> list[dict]:
+    return [{"id": u.id, "label": u.display_name, "email": u.email} for u in users]
+
+
+@bp.get("/users")
+@search_access_required
+def users(current_user):
+    rows = (
+        _user_query(User.query)
+        .order_by(func.lower(User.email))
+        .limit(_limit())
+        .all()
+    )
+    return jsonify(results=_user_results(rows))
+
+
+@bp.get("/facilitators")
+@search_access_required
+def facilitators(current_user):
+    query = User.query.filter(
+        or_(User.is_kt_delivery == True, User.is_kt_contractor == True)
+    )
+    region = request.args.get("region")
+    if region and request.args.get("include_all") != "1":
+        query = query.filter(User.region == region)
+    rows = (
+        _user_query(query)
+        .order_by(
+            func.lower(User.last_name).nullslast(),
+            func.lower(User.first_name).nullslast(),
+            func.lower(User.full_name).nullslast(),
+            User.email,
+        )
+        .limit(_limit())
+        .all()
+    )
+    return jsonify(results=_user_results(rows))
+
+
+@bp.get("/clients")
+@search_access_required
+def clients(current_user):
+    query = Client.query.filter(Client.status == "active")
+    pattern = _prefix()
+    if pattern:
+        query = query.filter(_starts_with(Client.name, pattern))
+    rows = query.order_by(func.lower(Client.name)).limit(_limit()).all()
+    crm_ids = {c.crm_user_id for c in rows if c.crm_user_id}
+    crm_names = (
+        {u.id: u.display_name for u in User.query.filter(User.id.in_(crm_ids))}
+        if crm_ids
+        else {}
+    )
+    return jsonify(
+        results=[
+            {"id": c.id, "label": c.name, "crm": crm_names.get(c.crm_user_id, "")}
+            for c in rows
+        ]
+    )
+
+
+def global_search_required(fn):
+    """KT staff only; Certificate Managers are scoped to their own sessions."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not flask_session.get("user_id"):
+            return redirect(url_for("auth.login"))
+        identity = current_identity()
+        if not identity.is_kt_staff or identity.is_certificate_manager_only:
+            abort(403)
+        return fn(*args, **kwargs, current_user=identity.user)
+
+    return wrapper
+
+
+def _per_kind_limit() -> int:
+    raw = request.args.get("limit", type=int)
+    if not raw or raw < 1:
+        return global_search.PER_KIND_LIMIT
+    return min(raw, global_search.MAX_PER_KIND_LIMIT)
+
+
+@bp.get("/global")
+@global_search_required
+def global_lookup(current_user):
+    hits = global_search.search(request.args.get("q"), _per_kind_limit())
+    return jsonify(
+        results=[hit.as_dict() for hit in hits],
+        min_length=global_search.MIN_QUERY_LENGTH,
+    )
+
+
+@bp.get("/")
+@global_search_required
+def global_page(current_user):
+    q = request.args.get("q") or ""
+    hits = global_search.search(q, global_search.MAX_PER_KIND_LIMIT)
+    grouped = {kind: [hit for hit in hits if hit.kind == kind] for kind in global_search.KINDS}
+    return render_template(
+        "search_results.html",
+        q=q,
+        grouped=grouped,
+        total=len(hits),
+        min_length=global_search.MIN_QUERY_LENGTH,
+    )
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import csv
 import io
-import os
 import zipfile
 from urllib.parse import urlparse
 from collections import defaultdict
@@ -41,12 +40,12 @@ from ..models import (
     SessionShipping,
     MaterialOrderItem,
     ClientWorkshopLocation,
-    SimulationOutline,
     PreworkTemplate,
     PreworkAssignment,
     PreworkEmailLog,
-    Settings,
 )
+from ..shared.identity import current_identity
+from ..shared.exports import BATCH_SIZE as EXPORT_BATCH_SIZE, batched, export_response
 from ..shared.time import now_utc, fmt_time, fmt_dt
 from sqlalchemy import or_, func
 from sqlalchemy.orm import joinedload, selectinload
@@ -76,6 +75,7 @@ from ..shared.acl import (
     session_start_dt_utc,
     is_certificate_manager_only,
 )
+from ..shared import reference_data
 from ..shared.languages import get_language_options
 from ..shared.names import combine_first_last, split_full_name, greeting_name
 from ..shared.sessions_lifecycle import (
@@ -84,7 +84,10 @@ from ..shared.sessions_lifecycle import (
     is_material_only,
     is_material_only_session,
 )
+from ..shared.cert_links import signed_certificate_url
 from ..shared.storage import build_badge_public_url, badge_png_exists
+from ..shared.blobstore import get_store
+from ..shared.cert_reconcile import normalize_cert_path
 
 MATERIALS_OUTSTANDING_MESSAGE = "There are still material order items outstanding"
 
@@ -263,7 +266,7 @@ def staff_required(fn):
         user_id = flask_session.get("user_id")
         if not user_id:
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not (
             is_admin(user) or is_kcrm(user) or is_delivery(user) or is_contractor(user)
             or is_certificate_manager_only(user)
@@ -285,7 +288,7 @@ def attendance_edit_required(fn):
             if flask_session.get("participant_account_id"):
                 abort(403)
             return redirect(url_for("auth.login"))
-        current_user = db.session.get(User, user_id)
+        current_user = current_identity().user
         if not current_user or not (
             is_admin(current_user)
             or is_kcrm(current_user)
@@ -311,17 +314,57 @@ def attendance_edit_required(fn):
     return wrapper
 
 
-@bp.get("")
-@staff_required
-def list_sessions(current_user):
-    if is_certificate_manager_only(current_user):
-        abort(403)
-    show_global = request.args.get("global") == "1"
-    params = request.args.to_dict(flat=True)
-    base_params = dict(params)
-    base_params.pop("sort", None)
-    base_params.pop("dir", None)
-    flask_session["sessions_list_args"] = params
+def _facilitator_names(sess: Session) -> list[str]:
+    """Lead facilitator first, then the others by name, without duplicates."""
+
+    names: list[str] = []
+    seen_ids: set[int] = set()
+    if sess.lead_facilitator and sess.lead_facilitator.id:
+        seen_ids.add(sess.lead_facilitator.id)
+        display = (
+            (sess.lead_facilitator.full_name or "").strip()
+            or (sess.lead_facilitator.email or "").strip()
+        )
+        if display:
+            names.append(display)
+    extra_facilitators = sorted(
+        sess.facilitators,
+        key=lambda u: (u.full_name or u.email or "").lower(),
+    )
+    for fac in extra_facilitators:
+        if not fac or not fac.id or fac.id in seen_ids:
+            continue
+        seen_ids.add(fac.id)
+        display = (fac.full_name or "").strip() or (fac.email or "").strip()
+        if display:
+            names.append(display)
+    return names
+
+
+def _csa_display(sess: Session) -> str:
+    if not sess.csa_account:
+        return ""
+    return (
+        (sess.csa_account.full_name or "").strip()
+        or (sess.csa_account.email or "").strip()
+    )
+
+
+def _shipment_statuses(session_ids: list[int]) -> dict[int, str]:
+    if not session_ids:
+        return {}
+    shipments = (
+        SessionShipping.query.with_entities(
+            SessionShipping.session_id, SessionShipping.status
+        )
+        .filter(SessionShipping.session_id.in_(session_ids))
+        .all()
+    )
+    return {sid: status or "" for sid, status in shipments}
+
+
+def _session_list_query(current_user, args, sort: str, reverse: bool):
+    """Filtered, ordered session query shared by the list page and its export."""
 
     query = (
         db.session.query(Session)
@@ -335,10 +378,10 @@ def list_sessions(current_user):
             selectinload(Session.facilitators),
         )
     )
-    if not show_global and current_user.region:
+    if args.get("global") != "1" and current_user.region:
         query = query.filter(Session.region == current_user.region)
 
-    q = request.args.get("q")
+    q = args.get("q")
     if q:
         like = f"%{q}%"
         query = query.filter(
@@ -349,7 +392,7 @@ def list_sessions(current_user):
             )
         )
 
-    status = request.args.get("status")
+    status = args.get("status")
     if status == "Cancelled":
         query = query.filter(Session.cancelled.is_(True))
     elif status == "On Hold":
@@ -386,20 +429,20 @@ def list_sessions(current_user):
             Session.cancelled.is_(False),
         )
 
-    region = request.args.get("region")
+    region = args.get("region")
     if region:
         query = query.filter(Session.region == region)
-    delivery_type = request.args.get("delivery_type")
+    delivery_type = args.get("delivery_type")
     if delivery_type:
         query = query.filter(Session.delivery_type == delivery_type)
-    start_from = request.args.get("start_from")
+    start_from = args.get("start_from")
     if start_from:
         try:
             dt = datetime.strptime(start_from, "%Y-%m-%d").date()
             query = query.filter(Session.start_date >= dt)
         except ValueError:
             pass
-    start_to = request.args.get("start_to")
+    start_to = args.get("start_to")
     if start_to:
         try:
             dt = datetime.strptime(start_to, "%Y-%m-%d").date()
@@ -407,8 +450,6 @@ def list_sessions(current_user):
         except ValueError:
             pass
 
-    sort = request.args.get("sort", "start_date")
-    direction = request.args.get("dir", "asc")
     columns = {
         "id": Session.id,
         "title": Session.title,
@@ -421,59 +462,34 @@ def list_sessions(current_user):
         "material_order_status": None,
         "csa_name": None,
     }
+    # Computed columns are sorted in Python by the list page; everything else,
+    # and the export's fallback for computed columns, sorts in SQL.
+    col = columns.get(sort) or Session.start_date
+    return query.order_by(col.desc() if reverse else col.asc())
+
+
+@bp.get("")
+@staff_required
+def list_sessions(current_user):
+    if is_certificate_manager_only(current_user):
+        abort(403)
+    show_global = request.args.get("global") == "1"
+    params = request.args.to_dict(flat=True)
+    base_params = dict(params)
+    base_params.pop("sort", None)
+    base_params.pop("dir", None)
+    flask_session["sessions_list_args"] = params
+
+    sort = request.args.get("sort", "start_date")
+    direction = request.args.get("dir", "asc")
     reverse = direction == "desc"
-    special_sorts = {"status", "material_order_status", "csa_name"}
-    if sort not in special_sorts:
-        col = columns.get(sort) or Session.start_date
-        query = query.order_by(col.desc() if reverse else col.asc())
+    query = _session_list_query(current_user, request.args, sort, reverse)
     sessions = [s for s in query.all() if not is_material_only(s)]
     total_sessions = len(sessions)
 
-    session_ids = [s.id for s in sessions]
-    facilitator_map: dict[int, list[str]] = {}
-    csa_display_map: dict[int, str] = {}
-    for sess in sessions:
-        names: list[str] = []
-        seen_ids: set[int] = set()
-        if sess.lead_facilitator and sess.lead_facilitator.id:
-            seen_ids.add(sess.lead_facilitator.id)
-            display = (
-                (sess.lead_facilitator.full_name or "").strip()
-                or (sess.lead_facilitator.email or "").strip()
-            )
-            if display:
-                names.append(display)
-        extra_facilitators = sorted(
-            sess.facilitators,
-            key=lambda u: (u.full_name or u.email or "").lower(),
-        )
-        for fac in extra_facilitators:
-            if not fac or not fac.id or fac.id in seen_ids:
-                continue
-            seen_ids.add(fac.id)
-            display = (fac.full_name or "").strip() or (fac.email or "").strip()
-            if display:
-                names.append(display)
-        facilitator_map[sess.id] = names
-        csa_display = ""
-        if sess.csa_account:
-            csa_display = (
-                (sess.csa_account.full_name or "").strip()
-                or (sess.csa_account.email or "").strip()
-            )
-        csa_display_map[sess.id] = csa_display
-
-    material_status_map: dict[int, str] = {}
-    if session_ids:
-        shipments = (
-            SessionShipping.query.with_entities(
-                SessionShipping.session_id, SessionShipping.status
-            )
-            .filter(SessionShipping.session_id.in_(session_ids))
-            .all()
-        )
-        for session_id_value, status_value in shipments:
-            material_status_map[session_id_value] = status_value or ""
+    facilitator_map = {sess.id: _facilitator_names(sess) for sess in sessions}
+    csa_display_map = {sess.id: _csa_display(sess) for sess in sessions}
+    material_status_map = _shipment_statuses([s.id for s in sessions])
 
     if sort == "status":
         sessions.sort(key=lambda s: (s.computed_status or "").lower(), reverse=reverse)
@@ -503,6 +519,83 @@ def list_sessions(current_user):
     )
 
 
+SESSION_EXPORT_HEADER = [
+    "ID",
+    "Title",
+    "Client",
+    "Location",
+    "Workshop",
+    "Facilitator(s)",
+    "Start Date",
+    "End Date",
+    "Status",
+    "Material order status",
+    "CSA Name",
+    "Region",
+    "Delivery Type",
+]
+
+
+@bp.get("/export.<fmt>")
+@staff_required
+def export_sessions(fmt: str, current_user):
+    """Stream the filtered workshop list; takes the list page's query string."""
+
+    if is_certificate_manager_only(current_user):
+        abort(403)
+    sort = request.args.get("sort", "start_date")
+    reverse = request.args.get("dir", "asc") == "desc"
+    query = _session_list_query(current_user, request.args, sort, reverse)
+
+    def rows():
+        for chunk in batched(query.yield_per(EXPORT_BATCH_SIZE), EXPORT_BATCH_SIZE):
+            chunk = [sess for sess in chunk if not is_material_only(sess)]
+            statuses = _shipment_statuses([sess.id for sess in chunk])
+            for sess in chunk:
+                yield [
+                    sess.id,
+                    sess.title,
+                    sess.client.name if sess.client else "",
+                    sess.location,
+                    sess.workshop_type.name if sess.workshop_type else "",
+                    _facilitator_names(sess),
+                    sess.start_date,
+                    sess.end_date,
+                    sess.computed_status,
+                    statuses.get(sess.id, ""),
+                    _csa_display(sess),
+                    sess.region,
+                    sess.delivery_type,
+                ]
+
+    return export_response(fmt, "workshops", SESSION_EXPORT_HEADER, rows())
+
+
+def _client_options(*client_ids, keep_id: int | None = None) -> list[Client]:
+    """Return the selected clients; the form searches the rest via /search."""
+
+    ids = {int(cid) for cid in client_ids if cid and str(cid).isdigit()}
+    if not ids:
+        return []
+    return (
+        Client.query.filter(
+            Client.id.in_(ids),
+            or_(Client.status == "active", Client.id == keep_id),
+        )
+        .order_by(Client.name)
+        .all()
+    )
+
+
+def _facilitator_options(sess: Session) -> list[User]:
+    """Return the session's current facilitators as the preselected options."""
+
+    options = list(sess.facilitators)
+    if sess.lead_facilitator and sess.lead_facilitator not in options:
+        options.insert(0, sess.lead_facilitator)
+    return options
+
+
 @bp.route("/new", methods=["GET", "POST"])
 @staff_required
 def new_session(current_user):
@@ -510,34 +603,13 @@ def new_session(current_user):
         abort(403)
     if is_contractor(current_user):
         abort(403)
-    workshop_types = (
-        WorkshopType.query.filter(WorkshopType.active == True)
-        .order_by(WorkshopType.code)
-        .all()
-    )
+    workshop_types = reference_data.workshop_types()
     include_all = request.args.get("include_all_facilitators") == "1"
-    fac_query = User.query.filter(
-        or_(User.is_kt_delivery == True, User.is_kt_contractor == True)
-    )
-    if not include_all:
-        req_region = request.args.get("region")
-        if req_region:
-            fac_query = fac_query.filter(User.region == req_region)
-    facilitators = (
-        fac_query.order_by(
-            func.lower(User.last_name).nullslast(),
-            func.lower(User.first_name).nullslast(),
-            func.lower(User.full_name).nullslast(),
-            User.email,
-        ).all()
-    )
-    clients = (
-        Client.query.filter(Client.status == "active")
-        .order_by(Client.name)
-        .all()
-    )
-    users = User.query.order_by(User.email).all()
+    facilitators: list[User] = []
     cid_arg = request.args.get("client_id")
+    clients = _client_options(
+        request.form.get("client_id") if request.method == "POST" else cid_arg
+    )
     title_arg = request.args.get("title")
     workshop_locations: list[ClientWorkshopLocation] = []
     selected_client_id = None
@@ -553,9 +625,7 @@ def new_session(current_user):
                 .order_by(ClientWorkshopLocation.label)
                 .all()
             )
-    simulation_outlines = SimulationOutline.query.order_by(
-        SimulationOutline.number, SimulationOutline.skill
-    ).all()
+    simulation_outlines = reference_data.simulation_outlines()
     if request.method == "POST":
         action = request.form.get("action")
         raw_sfc_link = request.form.get("sfc_link")
@@ -731,7 +801,6 @@ def new_session(current_user):
                     workshop_types=workshop_types,
                     facilitators=facilitators,
                     clients=clients,
-                    users=users,
                     workshop_languages=get_language_options(),
                     include_all_facilitators=include_all,
                     participants_count=participants_count,
@@ -757,7 +826,6 @@ def new_session(current_user):
                     workshop_types=workshop_types,
                     facilitators=facilitators,
                     clients=clients,
-                    users=users,
                     workshop_languages=get_language_options(),
                     include_all_facilitators=include_all,
                     participants_count=participants_count,
@@ -783,7 +851,6 @@ def new_session(current_user):
                     workshop_types=workshop_types,
                     facilitators=facilitators,
                     clients=clients,
-                    users=users,
                     workshop_languages=get_language_options(),
                     include_all_facilitators=include_all,
                     participants_count=0,
@@ -809,7 +876,6 @@ def new_session(current_user):
                     workshop_types=workshop_types,
                     facilitators=facilitators,
                     clients=clients,
-                    users=users,
                     workshop_languages=get_language_options(),
                     include_all_facilitators=include_all,
                     participants_count=participants_count,
@@ -837,7 +903,6 @@ def new_session(current_user):
                     workshop_types=workshop_types,
                     facilitators=facilitators,
                     clients=clients,
-                    users=users,
                     workshop_languages=get_language_options(),
                     include_all_facilitators=include_all,
                     participants_count=participants_count,
@@ -1014,7 +1079,6 @@ def new_session(current_user):
         workshop_types=workshop_types,
         facilitators=facilitators,
         clients=clients,
-        users=users,
         workshop_languages=get_language_options(),
         include_all_facilitators=include_all,
         participants_count=0,
@@ -1040,44 +1104,14 @@ def edit_session(session_id: int, current_user):
     _enforce_certificate_manager_scope(current_user, sess)
     if is_contractor(current_user):
         abort(403)
-    workshop_types = (
-        WorkshopType.query.filter(
-            or_(
-                WorkshopType.active == True,
-                WorkshopType.id == sess.workshop_type_id,
-            )
-        )
-        .order_by(WorkshopType.code)
-        .all()
-    )
+    workshop_types = reference_data.workshop_types(include_id=sess.workshop_type_id)
     include_all = request.args.get("include_all_facilitators") == "1"
-    fac_query = User.query.filter(
-        or_(User.is_kt_delivery == True, User.is_kt_contractor == True)
-    )
-    if not include_all and sess.region:
-        fac_query = fac_query.filter(User.region == sess.region)
-    facilitators = (
-        fac_query.order_by(
-            func.lower(User.last_name).nullslast(),
-            func.lower(User.first_name).nullslast(),
-            func.lower(User.full_name).nullslast(),
-            User.email,
-        ).all()
-    )
-    clients = (
-        Client.query.filter(Client.status == "active")
-        .order_by(Client.name)
-        .all()
+    facilitators = _facilitator_options(sess)
+    clients = _client_options(
+        sess.client_id, request.form.get("client_id"), keep_id=sess.client_id
     )
-    if sess.client_id:
-        current_client = db.session.get(Client, sess.client_id)
-        if current_client and current_client.status != "active":
-            if not any(c.id == current_client.id for c in clients):
-                clients.append(current_client)
     title_arg = request.args.get("title")
-    simulation_outlines = SimulationOutline.query.order_by(
-        SimulationOutline.number, SimulationOutline.skill
-    ).all()
+    simulation_outlines = reference_data.simulation_outlines()
     participants_count = (
         db.session.query(SessionParticipant).filter_by(session_id=sess.id).count()
     )
@@ -1620,10 +1654,14 @@ def session_detail(session_id: int, sess, current_user, csa_view, csa_account):
             db.session.query(
                 SessionParticipant,
                 Participant,
+                Certificate.id,
                 Certificate.pdf_path,
                 Certificate.certification_number,
             )
-            .options(selectinload(SessionParticipant.company_client))
+            .options(
+                selectinload(SessionParticipant.company_client),
+                selectinload(Participant.account),
+            )
             .join(Participant, SessionParticipant.participant_id == Participant.id)
             .outerjoin(
                 Certificate,
@@ -1634,7 +1672,7 @@ def session_detail(session_id: int, sess, current_user, csa_view, csa_account):
             .all()
         )
         participants = []
-        for link, participant, pdf_path, certification_number in rows:
+        for link, participant, cert_id, pdf_path, certification_number in rows:
             badge_url = None
             badge_available = False
             if certification_number:
@@ -1649,6 +1687,9 @@ def session_detail(session_id: int, sess, current_user, csa_view, csa_account):
                     "participant": participant,
                     "link": link,
                     "pdf_path": pdf_path,
+                    "pdf_url": (
+                        signed_certificate_url(cert_id, pdf_path) if cert_id else None
+                    ),
                     "certification_number": certification_number,
                     "badge_url": badge_url,
                     "badge_available": badge_available,
@@ -2337,6 +2378,96 @@ def sample_csv(session_id: int, current_user):
     return resp
 
 
+@bp.get("/<int:session_id>/participants/export.<fmt>")
+@staff_required
+def export_participants(session_id: int, fmt: str, current_user):
+    sess = db.session.get(Session, session_id)
+    if not sess:
+        abort(404)
+    _enforce_certificate_manager_scope(current_user, sess)
+    days = list(range(1, (sess.number_of_class_days or 0) + 1))
+    header = [
+        "First Name",
+        "Last Name",
+        "Email",
+        "Title",
+        "Company",
+        "Completion Date",
+        "Certificate Number",
+    ] + [f"Day {day}" for day in days]
+    query = (
+        db.session.query(
+            Participant.id,
+            Participant.first_name,
+            Participant.last_name,
+            Participant.full_name,
+            Participant.email,
+            Participant.title,
+            Client.name,
+            SessionParticipant.completion_date,
+            Certificate.certification_number,
+        )
+        .join(Participant, SessionParticipant.participant_id == Participant.id)
+        .outerjoin(Client, SessionParticipant.company_client_id == Client.id)
+        .outerjoin(
+            Certificate,
+            (Certificate.session_id == session_id)
+            & (Certificate.participant_id == Participant.id),
+        )
+        .filter(SessionParticipant.session_id == session_id)
+        .order_by(
+            func.lower(Participant.last_name),
+            func.lower(Participant.first_name),
+            Participant.email,
+        )
+    )
+
+    def rows():
+        for chunk in batched(query.yield_per(EXPORT_BATCH_SIZE), EXPORT_BATCH_SIZE):
+            attendance: dict[int, dict[int, bool]] = defaultdict(dict)
+            if days:
+                records = (
+                    db.session.query(
+                        ParticipantAttendance.participant_id,
+                        ParticipantAttendance.day_index,
+                        ParticipantAttendance.attended,
+                    )
+                    .filter(
+                        ParticipantAttendance.session_id == session_id,
+                        ParticipantAttendance.participant_id.in_(
+                            [row[0] for row in chunk]
+                        ),
+                    )
+                    .all()
+                )
+                for pid, day_index, attended in records:
+                    attendance[pid][day_index] = bool(attended)
+            for (
+                pid,
+                first_name,
+                last_name,
+                full_name,
+                email,
+                title,
+                company,
+                completion_date,
+                certification_number,
+            ) in chunk:
+                if not (first_name or last_name) and full_name:
+                    first_name, last_name = split_full_name(full_name)
+                yield [
+                    first_name,
+                    last_name,
+                    email,
+                    title,
+                    company,
+                    completion_date,
+                    certification_number,
+                ] + [attendance[pid].get(day, False) for day in days]
+
+    return export_response(fmt, f"session-{session_id}-participants", header, rows())
+
+
 @bp.post("/<int:session_id>/participants/import-csv")
 @csa_allowed_for_session
 def import_csv(session_id: int, sess, current_user, csa_view, csa_account):
@@ -2597,33 +2728,34 @@ def export_certificates_zip(session_id: int, current_user):
         abort(404)
     _enforce_certificate_manager_scope(current_user, sess)
 
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    cert_root = os.path.join(site_root, "certificates")
-    pdf_files: list[str] = []
-    if os.path.isdir(cert_root):
-        for year_name in sorted(os.listdir(cert_root)):
-            year_dir = os.path.join(cert_root, year_name)
-            if not os.path.isdir(year_dir):
-                continue
-            session_dir = os.path.join(year_dir, str(sess.id))
-            if not os.path.isdir(session_dir):
-                continue
-            for filename in sorted(os.listdir(session_dir)):
-                full_path = os.path.join(session_dir, filename)
-                if not os.path.isfile(full_path):
-                    continue
-                if not filename.lower().endswith(".pdf"):
-                    continue
-                pdf_files.append(full_path)
+    # Certificates live under certificates/<year>/<session id>/; the years
+    # come from the session dates and the stored paths, not a directory scan.
+    years = {d.year for d in (sess.end_date, sess.start_date) if d}
+    for (pdf_path,) in db.session.query(Certificate.pdf_path).filter(
+        Certificate.session_id == sess.id, Certificate.pdf_path.isnot(None)
+    ):
+        year = (normalize_cert_path(pdf_path) or "").split("/", 1)[0]
+        if year.isdigit():
+            years.add(int(year))
+    store = get_store()
+    pdf_keys: list[str] = []
+    for year in sorted(years):
+        pdf_keys.extend(
+            sorted(
+                info.key
+                for info in store.list(f"certificates/{year}/{sess.id}")
+                if info.key.count("/") == 3 and info.key.lower().endswith(".pdf")
+            )
+        )
 
-    if not pdf_files:
+    if not pdf_keys:
         flash("No certificates found to export.", "error")
         return redirect(url_for("sessions.session_detail", session_id=session_id))
 
     buffer = io.BytesIO()
     with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
-        for file_path in pdf_files:
-            archive.write(file_path, arcname=os.path.basename(file_path))
+        for key in pdf_keys:
+            archive.writestr(key.rsplit("/", 1)[-1], store.read_bytes(key))
     buffer.seek(0)
     filename = f"session-{sess.id}-certificates.zip"
     return send_file(
@@ -2647,7 +2779,7 @@ def session_prework(session_id: int):
         return Response("", 403)
     if not user_id:
         return redirect(url_for("auth.login"))
-    current_user = db.session.get(User, user_id)
+    current_user = current_identity().user
     if not current_user:
         abort(403)
     if is_contractor(current_user):
@@ -2702,6 +2834,7 @@ def session_prework(session_id: int):
                         {
                             "index": idx,
                             "text": q.text,
+                            "html": q.rendered_html,
                             "required": q.required,
                             "kind": q.kind,
                             "min_items": q.min_items,
@@ -2763,7 +2896,7 @@ def session_prework(session_id: int):
             return redirect(url_for("sessions.session_prework", session_id=session_id))
 
         if action == "send_accounts":
-            settings_row = Settings.get()
+            settings_row = reference_data.mail_settings()
             invites_enabled = not (
                 settings_row
                 and settings_row.notify_account_invite_active is False
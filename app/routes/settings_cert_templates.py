@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import os
-import shutil
 from flask import (
     Blueprint,
     abort,
@@ -18,6 +17,9 @@ from werkzeug.utils import secure_filename
 
 from ..app import db
 from ..models import CertificateTemplateSeries, CertificateTemplate
+from ..shared import cert_assets
+from ..shared.blobstore import assets_store, get_store
+from ..shared.certificates import missing_series_assets
 from ..shared.rbac import manage_users_required
 from ..shared.languages import get_language_options
 from ..shared.certificates_layout import (
@@ -120,16 +122,9 @@ def edit_templates(series_id: int, current_user):
     for t in series.templates:
         if t.badge_filename and t.language not in badge_mapping:
             badge_mapping[t.language] = t.badge_filename
-    assets_dir = os.path.join(current_app.root_path, "assets")
-    files = sorted([f for f in os.listdir(assets_dir) if f.lower().endswith(".pdf")])
-    badge_dir = os.path.join(current_app.root_path, "assets", "badges")
-    badges = sorted(
-        [
-            f
-            for f in os.listdir(badge_dir)
-            if f.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp"))
-        ]
-    )
+    catalog = cert_assets.get_catalog()
+    files = catalog.template_names()
+    badges = catalog.badge_names()
     layout = sanitize_series_layout(series.layout_config)
     language_lookup = {code: name for code, name in languages}
     preview_languages = {"A4": [], "LETTER": []}
@@ -152,6 +147,7 @@ def edit_templates(series_id: int, current_user):
         files=files,
         badges=badges,
         badge_mapping=badge_mapping,
+        missing_assets=missing_series_assets(series),
         layout=layout,
         font_options=get_font_options(),
         detail_variables=DETAIL_VARIABLES,
@@ -220,8 +216,7 @@ def upload_pdfs(series_id: int, current_user):
     if not series:
         abort(404)
     files = request.files.getlist("files")
-    assets_dir = os.path.join(current_app.root_path, "assets")
-    os.makedirs(assets_dir, exist_ok=True)
+    store = assets_store()
     max_size = 10 * 1024 * 1024
     uploaded = replaced = skipped = 0
     for f in files:
@@ -237,19 +232,20 @@ def upload_pdfs(series_id: int, current_user):
             skipped += 1
             flash(f"Skipped {filename}: file too large", "error")
             continue
-        dest = os.path.join(assets_dir, filename)
-        action = "replaced" if os.path.exists(dest) else "uploaded"
-        f.save(dest)
+        action = "replaced" if store.exists(filename) else "uploaded"
+        stored = store.put_stream(filename, f.stream)
         current_app.logger.info(
-            "[TEMPLATE-PDF-UPLOAD] user=%s file=%s action=%s",
+            "[TEMPLATE-PDF-UPLOAD] user=%s file=%s action=%s sha256=%s",
             getattr(current_user, "email", ""),
             filename,
             action,
+            stored.sha256[:12],
         )
         if action == "replaced":
             replaced += 1
         else:
             uploaded += 1
+    cert_assets.invalidate()
     flash(f"Uploaded {uploaded}, replaced {replaced}, skipped {skipped}.", "success")
     return redirect(url_for("settings_cert_templates.edit_templates", series_id=series.id))
 
@@ -261,10 +257,8 @@ def upload_badges(series_id: int, current_user):
     if not series:
         abort(404)
     files = request.files.getlist("files")
-    badge_dir = os.path.join(current_app.root_path, "assets", "badges")
-    site_dir = os.path.join(current_app.config.get("SITE_ROOT", "/srv"), "badges")
-    os.makedirs(badge_dir, exist_ok=True)
-    os.makedirs(site_dir, exist_ok=True)
+    store = assets_store()
+    site_store = get_store()
     max_size = 5 * 1024 * 1024
     uploaded = replaced = skipped = 0
     for f in files:
@@ -280,20 +274,24 @@ def upload_badges(series_id: int, current_user):
             skipped += 1
             flash(f"Skipped {filename}: file too large", "error")
             continue
-        dest = os.path.join(badge_dir, filename)
-        action = "replaced" if os.path.exists(dest) else "uploaded"
-        f.save(dest)
-        shutil.copy2(dest, os.path.join(site_dir, filename))
+        key = f"badges/{filename}"
+        action = "replaced" if store.exists(key) else "uploaded"
+        data = f.read()
+        store.put_bytes(key, data)
+        stored = site_store.put_bytes(key, data)
         current_app.logger.info(
-            "[BADGE-UPLOAD] user=%s file=%s action=%s",
+            "[BADGE-UPLOAD] user=%s file=%s action=%s sha256=%s dedup=%s",
             getattr(current_user, "email", ""),
             filename,
             action,
+            stored.sha256[:12],
+            stored.deduplicated,
         )
         if action == "replaced":
             replaced += 1
         else:
             uploaded += 1
+    cert_assets.invalidate()
     flash(f"Uploaded {uploaded}, replaced {replaced}, skipped {skipped}.", "success")
     return redirect(url_for("settings_cert_templates.edit_templates", series_id=series.id))
 
@@ -124,22 +124,19 @@ def save_processors(current_user):
         for ptype in types:
             key = f"{region}-{ptype}"
             ids = sorted({int(x) for x in request.form.getlist(key) if x})
-            existing_ids = {
-                row.user_id
+            # Change rows through the session (not a query-level delete) so
+            # the after_flush hook bumps the processor_assignments version.
+            existing = {
+                row.user_id: row
                 for row in ProcessorAssignment.query.filter_by(
                     region=region, processing_type=ptype
                 )
             }
-            db.session.query(ProcessorAssignment).filter_by(
-                region=region, processing_type=ptype
-            ).delete()
+            for uid, row in existing.items():
+                if uid not in ids:
+                    db.session.delete(row)
             for uid in ids:
-                if uid in existing_ids:
-                    db.session.add(
-                        ProcessorAssignment(
-                            region=region, processing_type=ptype, user_id=uid
-                        )
-                    )
+                if uid in existing:
                     continue
                 user = db.session.get(User, uid)
                 if user and user.is_admin:
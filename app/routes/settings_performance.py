@@ -0,0 +1,33 @@
+import os
+
+from flask import Blueprint, current_app, flash, redirect, render_template, url_for
+
+from ..shared import template_perf
+from ..shared.rbac import app_admin_required
+
+bp = Blueprint("settings_performance", __name__, url_prefix="/settings/performance")
+
+
+@bp.get("/")
+@app_admin_required
+def report(current_user):
+    cache_dir = current_app.config.get("JINJA_BYTECODE_DIR")
+    cached = (
+        len(os.listdir(cache_dir)) if cache_dir and os.path.isdir(cache_dir) else 0
+    )
+    return render_template(
+        "settings_performance.html",
+        template_rows=template_perf.render_stats(),
+        cache_dir=cache_dir,
+        cache_entries=cached,
+        fingerprint=current_app.config.get("JINJA_TEMPLATES_FINGERPRINT"),
+        worker_pid=os.getpid(),
+    )
+
+
+@bp.post("/reset")
+@app_admin_required
+def reset(current_user):
+    template_perf.reset_stats()
+    flash("Template timings reset for this worker", "success")
+    return redirect(url_for("settings_performance.report"))
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import os
 from typing import Optional
 
 from flask import (
@@ -20,11 +19,13 @@ from werkzeug.datastructures import FileStorage
 from ..app import db, User
 from ..models import Resource, WorkshopType, AuditLog
 from ..forms.resource_forms import validate_resource_form
-from ..shared.storage import write_atomic
+from ..shared.identity import current_identity
+from ..shared.blobstore import get_store
 from ..shared.storage_resources import (
     remove_resource_dir,
-    resource_fs_dir,
-    resource_path_from_value,
+    remove_resource_file,
+    resource_key,
+    resource_key_from_value,
     resource_web_url,
     sanitize_filename,
 )
@@ -60,39 +61,30 @@ def _clear_file_metadata(resource: Resource) -> None:
 
 def _save_document_file(resource: Resource, upload: FileStorage) -> tuple[str, Optional[int], Optional[str], str]:
     filename = sanitize_filename(getattr(upload, "filename", "") or "resource")
-    directory = resource_fs_dir(resource.id)
-    os.makedirs(directory, mode=0o755, exist_ok=True)
     stream = getattr(upload, "stream", None)
     if stream and hasattr(stream, "seek"):
         try:
             stream.seek(0)
         except Exception:
             pass
-    data = upload.read()
-    dest_path = os.path.join(directory, filename)
-    write_atomic(dest_path, data)
-    os.chmod(dest_path, 0o644)
-    size = len(data) if isinstance(data, (bytes, bytearray)) else None
+    key = resource_key(resource.id, filename)
+    stored = get_store().put_stream(key, upload.stream)
+    size = stored.size
     content_type = getattr(upload, "mimetype", None) or getattr(upload, "content_type", None)
-    return filename, size, content_type, dest_path
+    return filename, size, content_type, key
 
 
-def _remove_previous_file(resource: Resource, previous_value: Optional[str], new_path: str) -> None:
-    old_path = resource_path_from_value(resource.id, previous_value)
-    if not old_path:
-        return
-    try:
-        if os.path.abspath(old_path) != os.path.abspath(new_path) and os.path.isfile(old_path):
-            os.remove(old_path)
-    except FileNotFoundError:
-        pass
+def _remove_previous_file(resource: Resource, previous_value: Optional[str], new_key: str) -> None:
+    old_key = resource_key_from_value(resource.id, previous_value)
+    if old_key and old_key != new_key:
+        remove_resource_file(resource.id, previous_value)
 
 
 def _current_user(require_edit: bool = False) -> "User | Response":
     user_id = session.get("user_id")
     if not user_id:
         return redirect(url_for("auth.login"))
-    user = db.session.get(User, user_id)
+    user = current_identity().user
     if not user:
         abort(403)
     can_view = (
@@ -185,7 +177,7 @@ def create_resource():
     if rtype == "DOCUMENT":
         file = cleaned["file"]
         if file and getattr(file, "filename", ""):
-            filename, size, content_type, _new_path = _save_document_file(res, file)
+            filename, size, content_type, _new_key = _save_document_file(res, file)
             res.resource_value = resource_web_url(res.id, filename)
             _set_file_metadata(res, filename, size, content_type)
         else:
@@ -253,8 +245,8 @@ def update_resource(res_id: int):
     if rtype == "DOCUMENT":
         file = cleaned["file"]
         if file and getattr(file, "filename", ""):
-            filename, size, content_type, new_path = _save_document_file(res, file)
-            _remove_previous_file(res, previous_value, new_path)
+            filename, size, content_type, new_key = _save_document_file(res, file)
+            _remove_previous_file(res, previous_value, new_key)
             res.resource_value = resource_web_url(res.id, filename)
             _set_file_metadata(res, filename, size, content_type)
         elif previous_type != "DOCUMENT":
@@ -263,13 +255,8 @@ def update_resource(res_id: int):
     else:
         res.resource_value = cleaned["link"]
         if previous_type == "DOCUMENT":
-            old_path = resource_path_from_value(res.id, previous_value)
             remove_resource_dir(res.id)
-            if old_path and os.path.isfile(old_path):
-                try:
-                    os.remove(old_path)
-                except FileNotFoundError:
-                    pass
+            remove_resource_file(res.id, previous_value)
             _clear_file_metadata(res)
     res.workshop_types = WorkshopType.query.filter(WorkshopType.id.in_(cleaned["workshop_type_ids"])).all()
     db.session.add(AuditLog(user_id=current_user.id, action="resource_update", details=name))
@@ -5,6 +5,7 @@ from sqlalchemy import func
 
 from ..app import db, User
 from ..models import SimulationOutline, AuditLog
+from ..shared.identity import current_identity
 from ..shared.acl import is_kt_staff, is_delivery, is_contractor
 
 bp = Blueprint("settings_simulations", __name__, url_prefix="/settings/simulations")
@@ -14,7 +15,7 @@ def _current_user(require_edit: bool = False) -> User | Response:
     user_id = session.get("user_id")
     if not user_id:
         return redirect(url_for("auth.login"))
-    user = db.session.get(User, user_id)
+    user = current_identity().user
     if not user:
         abort(403)
     can_view = is_kt_staff(user) or is_delivery(user) or is_contractor(user)
@@ -0,0 +1,91 @@
+"""Public certificate verification by certification number.
+
+``GET /verify/number/<number>`` checks one number. ``GET /verify/batch?numbers=A,B``
+or ``POST /verify/batch`` with ``{"numbers": [...]}`` checks up to
+``MAX_BATCH`` at once. GET answers are publicly cacheable with an ETag; every
+request counts against a per-client rate limit.
+"""
+
+from __future__ import annotations
+
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request
+
+from ..shared.cert_verification import (
+    CACHE_TTL_SECONDS,
+    MAX_BATCH,
+    RateLimiter,
+    lookup,
+)
+
+bp = Blueprint("verify", __name__, url_prefix="/verify")
+
+RATE_LIMIT = 30
+RATE_WINDOW_SECONDS = 60
+limiter = RateLimiter(RATE_LIMIT, RATE_WINDOW_SECONDS)
+
+
+def rate_limited(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        # remote_addr is the client Caddy saw (see ProxyFix in create_app);
+        # X-Forwarded-For itself is client-controlled.
+        client = request.remote_addr or "unknown"
+        wait = limiter.retry_after(client)
+        if wait:
+            current_app.logger.info("[VERIFY] rate limited client=%s", client)
+            resp = jsonify({"ok": False, "error": "Too many requests"})
+            resp.status_code = 429
+            resp.headers["Retry-After"] = str(wait)
+            return resp
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _cacheable(resp):
+    resp.headers["Cache-Control"] = f"public, max-age={CACHE_TTL_SECONDS}"
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
+@bp.get("/number/<path:number>")
+@rate_limited
+def verify_number(number: str):
+    (result,) = lookup([number])
+    resp = jsonify({"ok": result["valid"], **result})
+    if not result["valid"]:
+        resp.status_code = 404
+    return _cacheable(resp)
+
+
+@bp.route("/batch", methods=["GET", "POST"])
+@rate_limited
+def verify_batch():
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        numbers = data.get("numbers")
+        if not isinstance(numbers, list) or not all(
+            isinstance(n, str) for n in numbers
+        ):
+            return jsonify({"ok": False, "error": "numbers must be a list of strings"}), 400
+    else:
+        numbers = [
+            part
+            for raw in request.args.getlist("numbers")
+            for part in raw.split(",")
+            if part.strip()
+        ]
+    if not numbers:
+        return jsonify({"ok": False, "error": "numbers required"}), 400
+    if len(numbers) > MAX_BATCH:
+        return (
+            jsonify({"ok": False, "error": f"at most {MAX_BATCH} numbers per request"}),
+            400,
+        )
+    resp = jsonify({"ok": True, "results": lookup(numbers)})
+    if request.method == "GET":
+        return _cacheable(resp)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
@@ -14,7 +14,7 @@ from flask import (
 import re
 from types import SimpleNamespace
 
-from ..app import db, User
+from ..app import db
 from ..models import (
     WorkshopType,
     AuditLog,
@@ -23,11 +23,13 @@ from ..models import (
     CertificateTemplateSeries,
     MaterialsOption,
     WorkshopTypeMaterialDefault,
-    Language,
 )
+from ..shared.identity import current_identity
 from ..shared.html import sanitize_html
 from ..shared.languages import get_language_options, code_to_label, NAME_TO_CODE
+from ..shared.materials import friendly_order_type
 from ..shared.regions import get_region_options
+from ..shared import catalog_refs, reference_data
 from flask import jsonify
 
 bp = Blueprint("workshop_types", __name__, url_prefix="/workshop-types")
@@ -67,41 +69,6 @@ def _supported_language_codes(wt: WorkshopType) -> list[str]:
     return supported
 
 
-def query_material_options(
-    delivery_type: str, lang_name: str, include_bulk: bool = False
-):
-    """Return material options matching delivery type and language.
-
-    Language filtering uses ``Language.name`` because the table stores names
-    only. When ``include_bulk`` is false, options with "bulk" in the title or
-    description and the explicit "Client-run Bulk order" catalog are excluded.
-    ``delivery_type`` is reserved for future family rules.
-    """
-
-    q = MaterialsOption.query.filter(MaterialsOption.is_active == True)
-    if lang_name:
-        q = q.join(MaterialsOption.languages).filter(Language.name.ilike(lang_name))
-    if not include_bulk:
-        bulk = "%bulk%"
-        q = q.filter(
-            MaterialsOption.order_type != "Client-run Bulk order",
-            db.func.lower(MaterialsOption.title).notlike(bulk),
-            db.or_(
-                MaterialsOption.description.is_(None),
-                db.func.lower(MaterialsOption.description).notlike(bulk),
-            ),
-        )
-    return q.order_by(MaterialsOption.order_type, MaterialsOption.title).all()
-
-
-def friendly_order_type(order_type: str) -> str:
-    if order_type.startswith("KT-Run Standard materials"):
-        return order_type.replace("KT-Run Standard materials", "Standard", 1)
-    if order_type.startswith("KT-Run Modular materials"):
-        return order_type.replace("KT-Run Modular materials", "Modular", 1)
-    return order_type
-
-
 def staff_required(fn):
     from functools import wraps
     from flask import session as flask_session
@@ -111,7 +78,7 @@ def staff_required(fn):
         user_id = flask_session.get("user_id")
         if not user_id:
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not (user.is_app_admin or user.is_admin):
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -122,36 +89,25 @@ def staff_required(fn):
 @bp.get("/material-options")
 @staff_required
 def material_options(current_user):
-    delivery = request.args.get("delivery_type") or ""
-    lang_code = request.args.get("lang") or ""
-    lang_name = code_to_label(lang_code)
+    """Picker options for a language, served from the cached catalog.
+
+    ``delivery_type`` is accepted but reserved for future family rules.
+    ``exclude`` ids only apply to the list without bulk options.
+    """
+
+    lang_name = code_to_label(request.args.get("lang") or "")
     include_bulk = bool(request.args.get("include_bulk"))
-    exclude_raw = request.args.get("exclude") or ""
-    exclude_ids = {int(x) for x in exclude_raw.split(",") if x.isdigit()}
-    items = query_material_options(delivery, lang_name, include_bulk)
-    if exclude_ids and not include_bulk:
-        items = [it for it in items if it.id not in exclude_ids]
-    results = []
-    for item in items:
-        langs = []
-        for l in item.languages:
-            code = NAME_TO_CODE.get(l.name)
-            if code:
-                langs.append(code)
-        langs = sorted(langs)
-        label = f"{friendly_order_type(item.order_type)} • {item.title}"
-        if langs:
-            label += f" • [{', '.join(langs)}]"
-        results.append(
-            {
-                "id": item.id,
-                "label": label,
-                "langs": langs,
-                "formats": item.formats or [],
-                "basis": item.quantity_basis,
-            }
-        )
-    return jsonify(items=results)
+    exclude_ids = frozenset()
+    if not include_bulk:
+        exclude_raw = request.args.get("exclude") or ""
+        exclude_ids = frozenset(int(x) for x in exclude_raw.split(",") if x.isdigit())
+    view = reference_data.materials_catalog().view(lang_name, include_bulk)
+    body, etag = view.encode(exclude_ids)
+    resp = current_app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    # Browsers keep the body and revalidate each time; unchanged lists are 304s.
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp.make_conditional(request)
 
 
 @bp.post("/defaults/<int:default_id>/delete")
@@ -333,21 +289,17 @@ def edit_type(type_id: int, current_user):
         .all()
     )
     selected_opts: dict[int, dict[str, str]] = {}
+    resolved = catalog_refs.resolve(
+        (d.catalog_ref for d in defaults), with_languages=True
+    )
     for d in defaults:
-        opt_id = 0
-        if d.catalog_ref.startswith("materials_options:"):
-            try:
-                opt_id = int(d.catalog_ref.split(":", 1)[1])
-            except ValueError:
-                opt_id = 0
-        if opt_id:
-            opt = db.session.get(MaterialsOption, opt_id)
-            if opt:
-                langs = sorted(l.name.lower() for l in opt.languages)
-                label = f"{friendly_order_type(opt.order_type)} • {opt.title}"
-                if langs:
-                    label += f" • [{', '.join(langs)}]"
-                selected_opts[d.id] = {"id": opt.id, "label": label}
+        opt = resolved.get(d.catalog_ref)
+        if isinstance(opt, catalog_refs.MaterialOptionSnapshot):
+            langs = sorted(name.lower() for name in opt.language_names)
+            label = f"{friendly_order_type(opt.order_type)} • {opt.title}"
+            if langs:
+                label += f" • [{', '.join(langs)}]"
+            selected_opts[d.id] = {"id": opt.id, "label": label}
     supported_langs = sorted(
         {lang_key(lang) for lang in (wt.supported_languages or []) if lang_key(lang)}
     )
@@ -32,6 +32,7 @@ from ..models import (
     PreworkAssignment,
     resource_workshop_types,
 )
+from ..shared.identity import current_identity
 from ..shared.acl import (
     is_delivery,
     is_contractor,
@@ -52,6 +53,7 @@ from ..shared.accounts import ensure_participant_account
 from ..shared.constants import MAGIC_LINK_TTL_DAYS, DEFAULT_PARTICIPANT_PASSWORD
 from ..shared.time import now_utc
 from .. import emailer
+from ..shared.cert_links import signed_certificate_url
 from ..shared.storage import build_badge_public_url, badge_png_exists
 
 bp = Blueprint("workshops", __name__, url_prefix="/workshops")
@@ -63,7 +65,7 @@ def facilitator_required(fn):
         user_id = flask_session.get("user_id")
         if not user_id:
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if user and is_certificate_manager_only(user):
             abort(403)
         if not user or not (
@@ -180,6 +182,7 @@ def workshop_view(session_id: int, current_user):
             db.session.query(
                 SessionParticipant,
                 Participant,
+                Certificate.id,
                 Certificate.pdf_path,
                 Certificate.certification_number,
             )
@@ -195,7 +198,7 @@ def workshop_view(session_id: int, current_user):
         )
         statuses = get_participant_prework_status(session.id)
         participants = []
-        for link, participant, pdf_path, certification_number in rows:
+        for link, participant, cert_id, pdf_path, certification_number in rows:
             status = statuses.get(participant.id)
             badge_url = None
             badge_available = False
@@ -211,6 +214,9 @@ def workshop_view(session_id: int, current_user):
                     "participant": participant,
                     "link": link,
                     "pdf_path": pdf_path,
+                    "pdf_url": (
+                        signed_certificate_url(cert_id, pdf_path) if cert_id else None
+                    ),
                     "certification_number": certification_number,
                     "prework_status": status,
                     "prework_summary": summarize_prework_status(status),
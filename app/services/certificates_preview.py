@@ -7,7 +7,6 @@ import re
 import time
 from dataclasses import dataclass
 from io import BytesIO
-from types import SimpleNamespace
 from typing import Iterable
 
 from PIL import Image, ImageDraw, ImageFont
@@ -22,11 +21,8 @@ from ..shared.certificates import (
     DETAILS_FONT_SIZE_PT,
     DETAILS_LINE_SPACING_PT,
     LETTER_NAME_INSET_MM,
+    build_preview_context,
     compose_detail_panel_lines,
-    _available_font_codes,
-    _language_allowed_fonts,
-    _resolve_font,
-    resolve_series_template,
 )
 from ..shared.certificates_layout import (
     PAGE_HEIGHT_MM,
@@ -303,7 +299,11 @@ def generate_preview(
     size: str,
     layout: dict,
 ) -> PreviewResult:
-    resolution = resolve_series_template(series.id, size, language)
+    font_warnings: list[str] = []
+    ctx = build_preview_context(
+        series, paper_size=size, language=language, layout=layout, warnings=font_warnings
+    )
+    resolution = ctx.template
     template_path = resolution.path
     template_mtime = resolution.mtime
 
@@ -331,30 +331,18 @@ def generate_preview(
     if cached and now - cached[0] < _CACHE_TTL_SECONDS:
         return cached[1]
 
-    allowed_fonts = _language_allowed_fonts(language)
-    available_fonts = _available_font_codes()
-    session_stub = SimpleNamespace(id=f"series-{series.id}", workshop_language=language)
-
-    def resolve_font(preferred: str, line: str) -> str:
-        resolved = _resolve_font(
-            preferred,
-            allowed_fonts,
-            available_fonts,
-            session_stub,
-            size,
-            line,
-            warnings,
-        )
-        if preferred and resolved != preferred:
+    allowed_fonts = list(ctx.allowed_fonts)
+    warnings.extend(m for m in font_warnings if m not in warnings)
+    for line in ("name", "workshop", "date"):
+        preferred = layout[line]["font"]
+        if preferred and ctx.fonts[line] != preferred:
             _append_preview_warning(
                 warnings,
-                f"[preview-font-fallback] {line.title()} font replaced with {resolved}",
+                f"[preview-font-fallback] {line.title()} font replaced with {ctx.fonts[line]}",
             )
-        return resolved
-
-    name_font_code = resolve_font(layout["name"]["font"], "name")
-    workshop_font_code = resolve_font(layout["workshop"]["font"], "workshop")
-    date_font_code = resolve_font(layout["date"]["font"], "date")
+    name_font_code = ctx.fonts["name"]
+    workshop_font_code = ctx.fonts["workshop"]
+    date_font_code = ctx.fonts["date"]
 
     center_x_px = (page_width * _PREVIEW_SCALE) / 2.0
 
@@ -416,7 +404,7 @@ def generate_preview(
     if details_cfg.get("enabled"):
         detail_lines = _sample_details_lines(size, details_cfg.get("variables", []))
         if detail_lines:
-            detail_font_code = resolve_font(date_font_code, "details")
+            detail_font_code = ctx.fonts["details"]
             try:
                 size_percent_int = int(details_cfg.get("size_percent", DETAIL_SIZE_MAX_PERCENT))
             except (TypeError, ValueError):
@@ -1,23 +1,45 @@
+"""Materials order emails to the processors of a session's region and bucket.
+
+Order saves call :func:`queue_materials_notification`, which only records the
+session in ``materials_notification_queue``. Once the session has been quiet
+for ``MATERIALS_NOTIFY_QUIET_SECONDS`` (or dirty for
+``MATERIALS_NOTIFY_MAX_WAIT_SECONDS`` while edits keep coming),
+:func:`flush_pending` compares its snapshot with the fingerprint of the last
+email and notifies only when the order really changed; sessions due in the
+same pass that resolve to the same recipients share one digest. A background
+thread per worker flushes the queue, and workers claim rows by deleting them,
+so each change is sent once; sessions whose email fails are queued again.
+A quiet period of 0 sends immediately.
+
+Background flushes have no request to build links from, so queuing needs
+``MATERIALS_NOTIFY_SERVER_NAME`` (or Flask's ``SERVER_NAME``); without either,
+:func:`init_app` falls back to sending inline.
+"""
+
 from __future__ import annotations
 
 import hashlib
 import json
-from typing import Iterable, Literal
-
-from flask import current_app, render_template, url_for
-from sqlalchemy import func
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Iterable, Literal, NamedTuple
+
+from flask import current_app, has_request_context, render_template, url_for
+from sqlalchemy import delete, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 
 from .. import emailer
 from ..app import db
 from ..models import (
     MaterialOrderItem,
-    ProcessorAssignment,
+    MaterialsNotificationQueue,
     Session,
     SessionShipping,
-    User,
-    Settings,
 )
+from ..shared import reference_data
 from ..shared.mail_utils import normalize_recipients
 from ..shared.regions import code_to_label
 from ..shared.time import now_utc
@@ -26,8 +48,13 @@ __all__ = [
     "materials_bucket_for",
     "resolve_processor_emails",
     "notify_materials_processors",
+    "queue_materials_notification",
+    "flush_pending",
 ]
 
+QUIET_SECONDS = 60
+MAX_WAIT_SECONDS = 600
+
 
 def materials_bucket_for(order: SessionShipping | None, session: Session | None) -> str:
     """Return the processing bucket for a materials order."""
@@ -56,23 +83,8 @@ def materials_bucket_for(order: SessionShipping | None, session: Session | None)
 
 
 def _fetch_processor_emails(region: str, bucket: str) -> list[str]:
-    rows = (
-        ProcessorAssignment.query.join(User)
-        .with_entities(User.email)
-        .filter(
-            ProcessorAssignment.region == region,
-            ProcessorAssignment.processing_type == bucket,
-        )
-        .order_by(
-            func.lower(User.last_name).nullslast(),
-            func.lower(User.first_name).nullslast(),
-            func.lower(User.full_name).nullslast(),
-            User.email,
-        )
-        .all()
-    )
     emails: list[str] = []
-    for (email,) in rows:
+    for email in reference_data.processor_emails(region, bucket):
         if not email:
             continue
         normalized = email.strip().lower()
@@ -84,25 +96,7 @@ def _fetch_processor_emails(region: str, bucket: str) -> list[str]:
 def resolve_processor_emails(region: str | None, bucket: str) -> list[str]:
     """Resolve processor emails using the configured fallback chain."""
 
-    region_key = (region or "").strip() or "Other"
-    bucket_key = bucket or "Other"
-    candidates = [
-        (region_key, bucket_key),
-        (region_key, "Other"),
-        ("Other", bucket_key),
-        ("Other", "Other"),
-    ]
-    seen: set[str] = set()
-    for region_candidate, bucket_candidate in candidates:
-        emails = _fetch_processor_emails(region_candidate, bucket_candidate)
-        resolved: list[str] = []
-        for email in emails:
-            if email not in seen:
-                seen.add(email)
-                resolved.append(email)
-        if resolved:
-            return resolved
-    return []
+    return list(reference_data.processor_routing().recipients(region, bucket))
 
 
 def _serialize_items(items: Iterable[MaterialOrderItem]) -> list[dict]:
@@ -187,24 +181,35 @@ def _compute_fingerprint(snapshot: dict) -> str:
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-def notify_materials_processors(
-    session_id: int,
-    *,
-    reason: Literal["created", "updated"] | None = None,
-) -> bool:
-    """Send materials order email to processors when appropriate.
+class _Notice(NamedTuple):
+    session: Session
+    shipment: SessionShipping
+    items: list[MaterialOrderItem]
+    snapshot: dict
+    fingerprint: str
+    reason: Literal["created", "updated"]
+    bucket: str
+    recipients: list[str]
+    recipient_header: str
 
-    Returns True when an email is sent.
-    """
 
-    settings_row = Settings.get()
+def _processors_enabled(session_ids: Iterable[int]) -> bool:
+    settings_row = reference_data.mail_settings()
     if settings_row and settings_row.notify_materials_processors_active is False:
-        current_app.logger.info(
-            "[MAIL-SKIP] materials processors disabled session=%s", session_id
-        )
+        for session_id in session_ids:
+            current_app.logger.info(
+                "[MAIL-SKIP] materials processors disabled session=%s", session_id
+            )
         return False
+    return True
+
 
-    session = (
+def _load_orders(
+    session_ids: list[int],
+) -> dict[int, tuple[Session, SessionShipping, list[MaterialOrderItem]]]:
+    """Sessions that have a shipment, with their items, in three queries."""
+
+    sessions = (
         db.session.query(Session)
         .options(
             joinedload(Session.client),
@@ -213,30 +218,39 @@ def notify_materials_processors(
             joinedload(Session.workshop_location),
             joinedload(Session.shipping_location),
         )
-        .filter(Session.id == session_id)
-        .one_or_none()
+        .filter(Session.id.in_(session_ids))
+        .all()
     )
-    if not session:
-        return False
+    shipments = {
+        shipment.session_id: shipment
+        for shipment in db.session.query(SessionShipping)
+        .options(joinedload(SessionShipping.client_shipping_location))
+        .filter(SessionShipping.session_id.in_(session_ids))
+    }
+    items: dict[int, list[MaterialOrderItem]] = {}
+    for item in db.session.query(MaterialOrderItem).filter(
+        MaterialOrderItem.session_id.in_(session_ids)
+    ):
+        items.setdefault(item.session_id, []).append(item)
+    return {
+        session.id: (session, shipments[session.id], items.get(session.id, []))
+        for session in sessions
+        if session.id in shipments
+    }
+
+
+def _prepare(
+    session: Session,
+    shipment: SessionShipping,
+    items: list[MaterialOrderItem],
+    reason: Literal["created", "updated"] | None = None,
+) -> _Notice | None:
+    """The email due for ``session``, or None when nothing should be sent."""
 
     delivery_type = (session.delivery_type or "").strip().lower()
     if delivery_type == "workshop only":
-        return False
-
-    shipment = (
-        db.session.query(SessionShipping)
-        .options(joinedload(SessionShipping.client_shipping_location))
-        .filter(SessionShipping.session_id == session_id)
-        .one_or_none()
-    )
-    if not shipment:
-        return False
+        return None
 
-    items = (
-        db.session.query(MaterialOrderItem)
-        .filter(MaterialOrderItem.session_id == session_id)
-        .all()
-    )
     snapshot = _serialize_snapshot(session, shipment, items)
     fingerprint = _compute_fingerprint(snapshot)
     already_notified = bool(session.materials_notified_at)
@@ -254,9 +268,9 @@ def notify_materials_processors(
         final_reason = "updated"
 
     if final_reason == "updated" and previous_fp and previous_fp == fingerprint:
-        return False
+        return None
     if final_reason == "created" and previous_fp and previous_fp == fingerprint and already_notified:
-        return False
+        return None
 
     bucket = materials_bucket_for(shipment, session)
     recipients = resolve_processor_emails(session.region, bucket)
@@ -268,18 +282,8 @@ def notify_materials_processors(
             session.region or "Other",
             bucket,
         )
-        return False
+        return None
 
-    subject_reason = "NEW" if final_reason == "created" else "UPDATED"
-    client_name = session.client.name if session.client else "Unknown client"
-    workshop_code = (
-        session.workshop_type.code
-        if session.workshop_type and session.workshop_type.code
-        else (session.code or "—")
-    )
-    subject = (
-        f"[CBS] {subject_reason} Materials Order – {client_name} – {workshop_code} – Session #{session.id}"
-    )
     items_sorted = sorted(
         items,
         key=lambda item: (
@@ -288,49 +292,343 @@ def notify_materials_processors(
             item.format or "",
         ),
     )
-    view_url = url_for("materials.materials_view", session_id=session.id, _external=True)
-    region_label = code_to_label(session.region or "Other")
-    html_body = render_template(
-        "email/materials_processors_notification.html",
+    return _Notice(
         session=session,
         shipment=shipment,
         items=items_sorted,
-        reason=final_reason,
         snapshot=snapshot,
-        view_url=view_url,
-        processing_bucket=bucket,
-        region_label=region_label,
-    )
-    text_body = render_template(
-        "email/materials_processors_notification.txt",
-        session=session,
-        shipment=shipment,
-        items=items_sorted,
+        fingerprint=fingerprint,
         reason=final_reason,
-        snapshot=snapshot,
-        view_url=view_url,
-        processing_bucket=bucket,
-        region_label=region_label,
+        bucket=bucket,
+        recipients=normalized_recipients,
+        recipient_header=recipient_header,
+    )
+
+
+def _template_context(notice: _Notice) -> dict:
+    session = notice.session
+    return {
+        "session": session,
+        "shipment": notice.shipment,
+        "items": notice.items,
+        "reason": notice.reason,
+        "snapshot": notice.snapshot,
+        "view_url": url_for("materials.materials_view", session_id=session.id, _external=True),
+        "processing_bucket": notice.bucket,
+        "region_label": code_to_label(session.region or "Other"),
+    }
+
+
+def _send_one(notice: _Notice) -> str | None:
+    """Email ``notice`` on its own; return the subject when it was sent."""
+
+    session = notice.session
+    subject_reason = "NEW" if notice.reason == "created" else "UPDATED"
+    client_name = session.client.name if session.client else "Unknown client"
+    workshop_code = (
+        session.workshop_type.code
+        if session.workshop_type and session.workshop_type.code
+        else (session.code or "—")
+    )
+    subject = (
+        f"[CBS] {subject_reason} Materials Order – {client_name} – {workshop_code} – Session #{session.id}"
     )
-    result = emailer.send(normalized_recipients, subject, text_body, html=html_body)
+    context = _template_context(notice)
+    html_body = render_template("email/materials_processors_notification.html", **context)
+    text_body = render_template("email/materials_processors_notification.txt", **context)
+    result = emailer.send(notice.recipients, subject, text_body, html=html_body)
     if not result.get("ok"):
         current_app.logger.warning(
             "[MATERIALS-NOTIFY] Failed to send materials order email session=%s error=%s",
             session.id,
             result.get("detail"),
         )
-        return False
+        return None
+    return subject
+
+
+def _send_digest(notices: list[_Notice]) -> str | None:
+    """Email several orders bound for the same recipients as one message."""
+
+    created = sum(1 for notice in notices if notice.reason == "created")
+    subject = (
+        f"[CBS] Materials Orders – {len(notices)} sessions "
+        f"({created} new, {len(notices) - created} updated)"
+    )
+    orders = [_template_context(notice) for notice in notices]
+    html_body = render_template("email/materials_processors_digest.html", orders=orders)
+    text_body = render_template("email/materials_processors_digest.txt", orders=orders)
+    result = emailer.send(notices[0].recipients, subject, text_body, html=html_body)
+    if not result.get("ok"):
+        current_app.logger.warning(
+            "[MATERIALS-NOTIFY] Failed to send materials digest sessions=%s error=%s",
+            ",".join(str(notice.session.id) for notice in notices),
+            result.get("detail"),
+        )
+        return None
+    return subject
+
 
+def _mark_sent(notices: list[_Notice], subject: str) -> None:
     sent_at = now_utc()
-    session.materials_notified_at = sent_at
-    session.materials_order_fingerprint = fingerprint
+    for notice in notices:
+        notice.session.materials_notified_at = sent_at
+        notice.session.materials_order_fingerprint = notice.fingerprint
     db.session.commit()
-    current_app.logger.info(
-        "[MATERIALS-NOTIFY] session=%s recipients=%s subject=\"%s\" reason=%s bucket=%s",
-        session.id,
-        recipient_header,
-        subject,
-        final_reason,
-        bucket,
-    )
+    for notice in notices:
+        current_app.logger.info(
+            "[MATERIALS-NOTIFY] session=%s recipients=%s subject=\"%s\" reason=%s bucket=%s",
+            notice.session.id,
+            notice.recipient_header,
+            subject,
+            notice.reason,
+            notice.bucket,
+        )
+
+
+def notify_materials_processors(
+    session_id: int,
+    *,
+    reason: Literal["created", "updated"] | None = None,
+) -> bool:
+    """Send materials order email to processors when appropriate.
+
+    Returns True when an email is sent.
+    """
+
+    if not _processors_enabled([session_id]):
+        return False
+    order = _load_orders([session_id]).get(session_id)
+    if not order:
+        return False
+    notice = _prepare(*order, reason=reason)
+    if notice is None:
+        return False
+    subject = _send_one(notice)
+    if subject is None:
+        return False
+    _mark_sent([notice], subject)
     return True
+
+
+def _naive_utc():
+    return now_utc().replace(tzinfo=None)
+
+
+def queue_materials_notification(session_id: int) -> None:
+    """Record that ``session_id``'s order changed; processors hear about it
+    after the quiet period (immediately when it is 0)."""
+
+    if current_app.config["MATERIALS_NOTIFY_QUIET_SECONDS"] <= 0:
+        notify_materials_processors(session_id)
+        return
+    now = _naive_utc()
+    row = db.session.get(MaterialsNotificationQueue, session_id)
+    if row is None:
+        db.session.add(
+            MaterialsNotificationQueue(session_id=session_id, first_dirty_at=now, dirty_at=now)
+        )
+    else:
+        row.dirty_at = now
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker queued the same session first.
+        db.session.rollback()
+        db.session.execute(
+            MaterialsNotificationQueue.__table__.update()
+            .where(MaterialsNotificationQueue.session_id == session_id)
+            .values(dirty_at=now)
+        )
+        db.session.commit()
+    flusher = current_app.extensions.get("materials_notify_flusher")
+    if flusher is not None:
+        flusher.ensure_running()
+
+
+def _link_host(config) -> str:
+    return config["MATERIALS_NOTIFY_SERVER_NAME"] or config.get("SERVER_NAME") or ""
+
+
+def _claim_due(now, *, force: bool) -> list[int]:
+    queue = MaterialsNotificationQueue
+    query = select(queue.session_id, queue.dirty_at).order_by(queue.first_dirty_at)
+    if not force:
+        config = current_app.config
+        quiet = timedelta(seconds=config["MATERIALS_NOTIFY_QUIET_SECONDS"])
+        max_wait = timedelta(seconds=config["MATERIALS_NOTIFY_MAX_WAIT_SECONDS"])
+        query = query.where(
+            or_(queue.dirty_at <= now - quiet, queue.first_dirty_at <= now - max_wait)
+        )
+    claimed: list[int] = []
+    for session_id, dirty_at in db.session.execute(query).all():
+        # A row edited since it was read keeps waiting; a row another worker
+        # already took is gone.
+        result = db.session.execute(
+            delete(queue).where(queue.session_id == session_id, queue.dirty_at == dirty_at)
+        )
+        if result.rowcount:
+            claimed.append(session_id)
+    db.session.commit()
+    return claimed
+
+
+def flush_pending(*, now=None, force: bool = False) -> dict:
+    """Notify processors for every queued session that is due (all with
+    ``force``). Returns counts for logging."""
+
+    if not has_request_context():
+        # Templates and external links need a request; borrow one for the host.
+        config = current_app.config
+        host = _link_host(config)
+        if not host:
+            raise RuntimeError(
+                "MATERIALS_NOTIFY_SERVER_NAME must be set to flush queued materials emails"
+            )
+        with current_app.test_request_context(
+            base_url=f"{config['PREFERRED_URL_SCHEME']}://{host}/"
+        ):
+            return flush_pending(now=now, force=force)
+
+    now = now or _naive_utc()
+    claimed = _claim_due(now, force=force)
+    summary = {"sessions": len(claimed), "unchanged": 0, "emails": 0, "sent": 0, "failed": 0}
+    if not claimed or not _processors_enabled(claimed):
+        return summary
+
+    # Claimed rows are already gone; anything not sent by the end goes back
+    # on the queue, including when rendering or loading raises.
+    unsent = set(claimed)
+    try:
+        orders = _load_orders(claimed)
+        groups: dict[tuple[str, ...], list[_Notice]] = {}
+        for session_id in claimed:
+            notice = _prepare(*orders[session_id]) if session_id in orders else None
+            if notice is None:
+                summary["unchanged"] += 1
+                unsent.discard(session_id)
+                continue
+            groups.setdefault(tuple(notice.recipients), []).append(notice)
+
+        for notices in groups.values():
+            try:
+                subject = _send_one(notices[0]) if len(notices) == 1 else _send_digest(notices)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception(
+                    "[MATERIALS-NOTIFY] Failed to build materials email sessions=%s",
+                    ",".join(str(notice.session.id) for notice in notices),
+                )
+                subject = None
+            if subject is None:
+                summary["failed"] += len(notices)
+                continue
+            _mark_sent(notices, subject)
+            unsent.difference_update(notice.session.id for notice in notices)
+            summary["emails"] += 1
+            summary["sent"] += len(notices)
+    finally:
+        if unsent:
+            _requeue(sorted(unsent), now)
+    return summary
+
+
+def _requeue(session_ids: list[int], now) -> None:
+    """Put claimed sessions back after a failed send; they wait another
+    quiet period so a broken mail server is not retried every pass."""
+
+    db.session.rollback()
+    queue = MaterialsNotificationQueue
+    for _attempt in range(3):
+        existing = set(
+            db.session.execute(
+                select(queue.session_id).where(queue.session_id.in_(session_ids))
+            ).scalars()
+        )
+        db.session.add_all(
+            queue(session_id=session_id, first_dirty_at=now, dirty_at=now)
+            for session_id in session_ids
+            if session_id not in existing
+        )
+        try:
+            db.session.commit()
+            return
+        except IntegrityError:
+            # A new edit queued one of them meanwhile; that row sends it.
+            db.session.rollback()
+
+
+class NotificationFlusher:
+    """Runs :func:`flush_pending` every few seconds from a daemon thread."""
+
+    def __init__(self, app, *, interval: float):
+        self.app = app
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def ensure_running(self) -> None:
+        # Forked workers inherit the object but not the thread.
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="materials-notify", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    summary = flush_pending()
+                    if summary["sessions"]:
+                        self.app.logger.info(
+                            "[MATERIALS-NOTIFY] flushed %s",
+                            " ".join(f"{key}={value}" for key, value in summary.items()),
+                        )
+                except Exception:  # pragma: no cover - keep the thread alive
+                    db.session.rollback()
+                    self.app.logger.exception("[MATERIALS-NOTIFY] flush failed")
+                finally:
+                    db.session.remove()
+
+
+def init_app(app) -> None:
+    app.config.setdefault(
+        "MATERIALS_NOTIFY_QUIET_SECONDS",
+        float(os.getenv("MATERIALS_NOTIFY_QUIET_SECONDS", QUIET_SECONDS)),
+    )
+    app.config.setdefault(
+        "MATERIALS_NOTIFY_MAX_WAIT_SECONDS",
+        float(os.getenv("MATERIALS_NOTIFY_MAX_WAIT_SECONDS", MAX_WAIT_SECONDS)),
+    )
+    app.config.setdefault(
+        "MATERIALS_NOTIFY_SERVER_NAME", os.getenv("MATERIALS_NOTIFY_SERVER_NAME", "")
+    )
+    app.config.setdefault(
+        "MATERIALS_NOTIFY_FLUSHER", os.getenv("MATERIALS_NOTIFY_FLUSHER", "1") != "0"
+    )
+    quiet = app.config["MATERIALS_NOTIFY_QUIET_SECONDS"]
+    if quiet <= 0:
+        return
+    if not _link_host(app.config):
+        app.logger.warning(
+            "[MATERIALS-NOTIFY] MATERIALS_NOTIFY_SERVER_NAME is not set; sending inline"
+        )
+        app.config["MATERIALS_NOTIFY_QUIET_SECONDS"] = 0
+        return
+    if app.config["MATERIALS_NOTIFY_FLUSHER"]:
+        flusher = NotificationFlusher(app, interval=max(1.0, min(quiet / 4, 15.0)))
+        app.extensions["materials_notify_flusher"] = flusher
+
+        # Rows left queued by a previous process are sent without waiting for
+        # a new edit; each forked worker starts its own thread.
+        @app.before_request
+        def _start_materials_flusher():
+            flusher.ensure_running()
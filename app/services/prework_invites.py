@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import hashlib
+import re
 import secrets
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 from typing import Iterable, Sequence
 
 from flask import current_app, render_template, url_for
+from markupsafe import escape
+from sqlalchemy import insert
 from sqlalchemy.orm import joinedload
 
 from .. import emailer
@@ -20,10 +24,11 @@ from ..models import (
     PreworkTemplate,
     Session,
     SessionParticipant,
-    Settings,
 )
-from ..shared.accounts import ensure_participant_account
-from ..shared.constants import MAGIC_LINK_TTL_DAYS
+from ..shared import reference_data
+from ..shared.accounts import resolve_participant_accounts
+from ..shared.constants import DEFAULT_PARTICIPANT_PASSWORD, MAGIC_LINK_TTL_DAYS
+from ..shared.passwords import hash_passwords
 from ..shared.prework_status import ParticipantPreworkStatus, get_participant_prework_status
 from ..shared.time import now_utc
 from ..shared.names import greeting_name
@@ -53,6 +58,7 @@ def _snapshot_for_template(template: PreworkTemplate) -> dict:
             {
                 "index": index,
                 "text": q.text,
+                "html": q.rendered_html,
                 "required": q.required,
                 "kind": q.kind,
                 "min_items": q.min_items,
@@ -92,71 +98,85 @@ def _ensure_assignment(
     return assignment
 
 
-def _send_prework_email(
-    session: Session,
-    assignment: PreworkAssignment,
-    account: ParticipantAccount,
-    temp_password: str | None,
-    participant: Participant | None = None,
-) -> bool:
+class _InviteRenderer:
+    """Render the prework email once per session, then fill in recipients.
+
+    The templates are rendered with placeholder tokens for the recipient's
+    name, magic link, username and temporary password (once per due date and
+    with/without a password); each recipient then costs a string substitution
+    instead of two template renders.
+    """
+
+    _FIELDS = ("greeting_name", "link", "email", "temp_password")
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.subject = f"Prework for Workshop: {session.title}"
+        nonce = secrets.token_hex(4)
+        self._tokens = {name: f"[[{nonce}:{name}]]" for name in self._FIELDS}
+        self._fields_by_token = {token: name for name, token in self._tokens.items()}
+        self._pattern = re.compile("|".join(map(re.escape, self._tokens.values())))
+        self._parts: dict[tuple, tuple[str, str]] = {}
+
+    def _template_parts(
+        self, assignment: PreworkAssignment, with_password: bool
+    ) -> tuple[str, str]:
+        key = (assignment.due_at, with_password)
+        parts = self._parts.get(key)
+        if parts is None:
+            context = {
+                "session": self.session,
+                "assignment": assignment,
+                "link": self._tokens["link"],
+                "account": SimpleNamespace(email=self._tokens["email"]),
+                "temp_password": self._tokens["temp_password"] if with_password else None,
+                "greeting_name": self._tokens["greeting_name"],
+            }
+            parts = (
+                render_template("email/prework.txt", **context),
+                render_template("email/prework.html", **context),
+            )
+            self._parts[key] = parts
+        return parts
+
+    def render(
+        self,
+        assignment: PreworkAssignment,
+        values: dict[str, str],
+    ) -> tuple[str, str]:
+        text, html = self._template_parts(assignment, bool(values.get("temp_password")))
+        escaped = {name: str(escape(value)) for name, value in values.items()}
+        body = self._pattern.sub(
+            lambda m: values[self._fields_by_token[m.group(0)]], text
+        )
+        html_body = self._pattern.sub(
+            lambda m: escaped[self._fields_by_token[m.group(0)]], html
+        )
+        return body, html_body
+
+
+def _issue_magic_link(assignment: PreworkAssignment, expires: datetime) -> str:
     token = secrets.token_urlsafe(16)
     assignment.magic_token_hash = hashlib.sha256(
         (token + current_app.secret_key).encode()
     ).hexdigest()
-    assignment.magic_token_expires = now_utc() + timedelta(days=MAGIC_LINK_TTL_DAYS)
-    db.session.flush()
-
-    link = url_for(
+    assignment.magic_token_expires = expires
+    return url_for(
         "auth.prework_magic",
         assignment_id=assignment.id,
         token=token,
         _external=True,
         _scheme="https",
     )
-    recipient_name = greeting_name(participant=participant, account=account)
-    subject = f"Prework for Workshop: {session.title}"
-    body = render_template(
-        "email/prework.txt",
-        session=session,
-        assignment=assignment,
-        link=link,
-        account=account,
-        temp_password=temp_password,
-        greeting_name=recipient_name,
-    )
-    html_body = render_template(
-        "email/prework.html",
-        session=session,
-        assignment=assignment,
-        link=link,
-        account=account,
-        temp_password=temp_password,
-        greeting_name=recipient_name,
-    )
-    try:
-        res = emailer.send(account.email, subject, body, html=html_body)
-    except Exception as exc:  # pragma: no cover - defensive logging
-        res = {"ok": False, "detail": str(exc)}
-
-    if res.get("ok"):
-        assignment.status = "SENT"
-        assignment.sent_at = now_utc()
-        db.session.add(
-            PreworkEmailLog(
-                assignment_id=assignment.id,
-                to_email=account.email,
-                subject=subject,
-            )
-        )
-        current_app.logger.info(
-            f'[MAIL-OUT] prework session={session.id} pa={account.id} to={account.email} subject="{subject}"'
-        )
-        return True
 
-    current_app.logger.info(
-        f"[MAIL-FAIL] prework session={session.id} pa={account.id} to={account.email} error=\"{res.get('detail')}\""
-    )
-    return False
+
+def _set_temp_passwords(accounts: list[ParticipantAccount]) -> set[int]:
+    """Hash the default temporary password for ``accounts`` in one batch."""
+
+    hashes = hash_passwords([DEFAULT_PARTICIPANT_PASSWORD] * len(accounts))
+    for account, password_hash in zip(accounts, hashes):
+        account.password_hash = password_hash
+    return {account.id for account in accounts}
 
 
 def _eligible_participant_ids(
@@ -214,7 +234,7 @@ def send_prework_invites(
         statuses, participant_ids, allow_completed_resend
     )
 
-    settings_row = Settings.get()
+    settings_row = reference_data.mail_settings()
     if settings_row and settings_row.notify_prework_invite_active is False:
         current_app.logger.info(
             "[MAIL-SKIP] prework invite disabled session=%s", session.id
@@ -250,40 +270,88 @@ def send_prework_invites(
         for a in PreworkAssignment.query.filter_by(session_id=session.id).all()
     }
 
-    sent_count = 0
-    failure_count = 0
-    account_cache: dict[str, ParticipantAccount] = {}
-
+    # Stage 1: accounts for every participant, in bulk.
+    resolved = resolve_participant_accounts(participants)
+    # Stage 2: temporary passwords, hashed together.
+    needs_password: dict[int, ParticipantAccount] = {}
+    for account, needs in resolved.values():
+        if needs:
+            needs_password.setdefault(account.id, account)
+    temp_password_ids = _set_temp_passwords(list(needs_password.values()))
+
+    # Stage 3: assignments, flushed once so magic links can carry their ids.
+    recipients: list[tuple[Participant, ParticipantAccount, PreworkAssignment]] = []
     for participant in participants:
-        try:
-            account, temp_password = ensure_participant_account(participant, account_cache)
-        except ValueError:
+        if participant.id not in resolved:
             skipped_count += 1
             continue
-
+        account, _needs = resolved[participant.id]
         assignment = _ensure_assignment(session, account, template, assignments)
         if assignment.status == "WAIVED":
             skipped_count += 1
             continue
-
         if not allow_completed_resend and assignment.completed_at:
             skipped_count += 1
             continue
+        recipients.append((participant, account, assignment))
+    db.session.flush()
 
-        if _send_prework_email(
-            session, assignment, account, temp_password, participant
-        ):
-            sent_count += 1
-            db.session.add(
-                PreworkInvite(
-                    session_id=session.id,
-                    participant_id=participant.id,
-                    sender_id=sender_id,
-                    sent_at=assignment.sent_at or now_utc(),
+    # Stage 4: render once, fill per recipient, send over one SMTP connection.
+    renderer = _InviteRenderer(session)
+    subject = renderer.subject
+    expires = now_utc() + timedelta(days=MAGIC_LINK_TTL_DAYS)
+    sent_count = 0
+    failure_count = 0
+    email_logs: list[dict] = []
+    invites: list[dict] = []
+    with emailer.batch():
+        for participant, account, assignment in recipients:
+            body, html_body = renderer.render(
+                assignment,
+                {
+                    "greeting_name": greeting_name(participant=participant, account=account),
+                    "link": _issue_magic_link(assignment, expires),
+                    "email": account.email,
+                    "temp_password": (
+                        DEFAULT_PARTICIPANT_PASSWORD
+                        if account.id in temp_password_ids
+                        else ""
+                    ),
+                },
+            )
+            try:
+                res = emailer.send(account.email, subject, body, html=html_body)
+            except Exception as exc:  # pragma: no cover - defensive logging
+                res = {"ok": False, "detail": str(exc)}
+            if not res.get("ok"):
+                failure_count += 1
+                current_app.logger.info(
+                    f"[MAIL-FAIL] prework session={session.id} pa={account.id} to={account.email} error=\"{res.get('detail')}\""
                 )
+                continue
+            sent_count += 1
+            sent_at = now_utc()
+            assignment.status = "SENT"
+            assignment.sent_at = sent_at
+            email_logs.append(
+                {"assignment_id": assignment.id, "to_email": account.email, "subject": subject}
+            )
+            invites.append(
+                {
+                    "session_id": session.id,
+                    "participant_id": participant.id,
+                    "sender_id": sender_id,
+                    "sent_at": sent_at,
+                }
             )
-        else:
-            failure_count += 1
+            current_app.logger.info(
+                f'[MAIL-OUT] prework session={session.id} pa={account.id} to={account.email} subject="{subject}"'
+            )
+
+    # Stage 5: record outcomes in bulk.
+    if email_logs:
+        db.session.execute(insert(PreworkEmailLog), email_logs)
+        db.session.execute(insert(PreworkInvite), invites)
 
     if sent_count > 0 and not session.info_sent:
         session.info_sent = True
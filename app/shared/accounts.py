@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional
 import secrets
 
 from flask import current_app
@@ -108,6 +108,95 @@ def ensure_participant_account(
     return account, temp_password
 
 
+def resolve_participant_accounts(
+    participants: Iterable[Participant],
+) -> Dict[int, tuple[ParticipantAccount, bool]]:
+    """Bulk counterpart of ``ensure_participant_account``.
+
+    Looks up staff users and existing accounts for every email in two
+    queries, creates the missing accounts with one flush and links each
+    participant. Passwords are not hashed here: the returned flag is True
+    when the account needs the default temporary password, so the caller can
+    hash them together (``hash_passwords``). Participants without an email
+    are left out of the result.
+    """
+
+    participants = list(participants)
+    emails = {normalize_email(p.email or "") for p in participants} - {""}
+    if not emails:
+        return {}
+    users: Dict[str, User] = {}
+    for user in User.query.filter(func.lower(User.email).in_(emails)).order_by(User.id):
+        users.setdefault(normalize_email(user.email), user)
+    accounts: Dict[str, ParticipantAccount] = {}
+    for account in ParticipantAccount.query.filter(
+        func.lower(ParticipantAccount.email).in_(emails)
+    ).order_by(ParticipantAccount.id):
+        accounts.setdefault(normalize_email(account.email), account)
+
+    resolved: Dict[int, tuple[ParticipantAccount, bool]] = {}
+    created: list[ParticipantAccount] = []
+    for participant in participants:
+        email_norm = normalize_email(participant.email or "")
+        if not email_norm:
+            continue
+        user = users.get(email_norm)
+        if user:
+            if not participant.first_name and user.first_name:
+                participant.first_name = user.first_name
+            if not participant.last_name and user.last_name:
+                participant.last_name = user.last_name
+            if not participant.full_name:
+                participant.full_name = user.display_name
+            if not getattr(participant, "title", None) and user.title:
+                participant.title = user.title
+        base_name = (
+            participant.full_name
+            or combine_first_last(participant.first_name, participant.last_name)
+            or (user.display_name if user else "")
+            or (participant.email or email_norm)
+        )
+        account = accounts.get(email_norm)
+        if account is None:
+            account = ParticipantAccount(
+                email=email_norm,
+                full_name=base_name,
+                certificate_name=base_name,
+                is_active=True,
+            )
+            db.session.add(account)
+            accounts[email_norm] = account
+            created.append(account)
+        elif base_name and not account.full_name:
+            account.full_name = base_name
+            if not account.certificate_name:
+                account.certificate_name = base_name
+        participant.account = account
+        resolved[participant.id] = (account, account.password_hash is None)
+
+    if created:
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Another request created one of these emails first; the
+            # per-participant path re-reads and reuses existing accounts.
+            db.session.rollback()
+            resolved = {}
+            cache: Dict[str, ParticipantAccount] = {}
+            for participant in participants:
+                if not normalize_email(participant.email or ""):
+                    continue
+                account, temp_password = ensure_participant_account(participant, cache)
+                resolved[participant.id] = (account, temp_password is not None)
+            return resolved
+        current_app.logger.info(
+            "[ACCOUNT] created %d pa=%s",
+            len(created),
+            ",".join(str(account.id) for account in created),
+        )
+    return resolved
+
+
 def promote_participant_to_user(email: str, role_names: list[str], actor) -> User:
     """Promote a participant account to a staff user."""
     account = get_participant_account_by_email(email)
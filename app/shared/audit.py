@@ -0,0 +1,419 @@
+"""Audit log partitions, retention and the optional buffered writer.
+
+On PostgreSQL ``audit_logs`` and ``user_audit_logs`` are range-partitioned by
+month on their timestamp (migration 0089). Monthly partitions are named
+``<table>_pYYYYMM``; a ``<table>_default`` partition catches anything outside
+them so inserts never fail. :func:`ensure_partitions` creates the coming
+months (at startup and from ``manage.py audit_maintain``), moving any rows the
+default partition already holds for that month.
+
+:func:`archive_before` writes whole months older than the retention window to
+``<table>_pYYYYMM.csv.gz`` and then drops them (detaching the partition on
+PostgreSQL, deleting the rows elsewhere).
+
+With ``AUDIT_BUFFERED=1`` audit rows added to ``db.session`` are taken out of
+the request's flush and handed to a background writer once the request
+commits; rows from rolled-back transactions are discarded. The writer inserts
+them in batches, so a crash can lose up to ``AUDIT_BUFFER_INTERVAL`` seconds of
+audit history. Leave it off where every audit row must commit atomically with
+the change it records.
+"""
+
+from __future__ import annotations
+
+import atexit
+import csv
+import gzip
+import logging
+import os
+import queue
+import threading
+from datetime import date, datetime
+
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.engine import Connection
+
+from ..app import db
+from ..models import AuditLog, UserAuditLog
+
+logger = logging.getLogger("cbs.audit")
+
+# Partitioned table -> partition key column.
+AUDIT_TABLES = {"audit_logs": "created_at", "user_audit_logs": "changed_at"}
+_MODELS = (AuditLog, UserAuditLog)
+
+PARTITION_MONTHS_AHEAD = 2
+BUFFER_BATCH_SIZE = 200
+BUFFER_INTERVAL_SECONDS = 1.0
+# Serializes partition DDL between Gunicorn workers starting together.
+_PARTITION_LOCK_KEY = 0x61756474
+
+_PENDING_KEY = "audit_pending"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _partition_month(table: str, name: str) -> date | None:
+    suffix = name[len(table) + 2 :]
+    if not name.startswith(f"{table}_p") or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table "
+                "AND c.relnamespace = current_schema()::regnamespace"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def list_partitions(conn: Connection, table: str) -> list[str]:
+    return list(
+        conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table "
+                "AND p.relnamespace = current_schema()::regnamespace "
+                "ORDER BY c.relname"
+            ),
+            {"table": table},
+        ).scalars()
+    )
+
+
+def create_partition(conn: Connection, table: str, month: date) -> str | None:
+    """Create the partition for ``month`` unless it exists; return its name.
+
+    The table is built standalone, filled with whatever the default partition
+    holds for the month, then attached, so the attach never conflicts with
+    rows that arrived before the partition existed.
+    """
+
+    name = partition_name(table, month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return None
+    column = AUDIT_TABLES[table]
+    lo, hi = month.isoformat(), add_months(month, 1).isoformat()
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    if conn.execute(
+        text("SELECT to_regclass(:name)"), {"name": f"{table}_default"}
+    ).scalar():
+        conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table}_default "
+                f"WHERE {column} >= :lo AND {column} < :hi RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            {"lo": lo, "hi": hi},
+        )
+    conn.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{lo}') TO ('{hi}')"
+        )
+    )
+    return name
+
+
+def ensure_partitions(
+    conn: Connection,
+    *,
+    today: date | None = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+) -> list[str]:
+    """Create this month's and the next ``months_ahead`` partitions."""
+
+    created: list[str] = []
+    current = month_start(today or datetime.utcnow().date())
+    for table in AUDIT_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PARTITION_LOCK_KEY}
+        )
+        for offset in range(months_ahead + 1):
+            name = create_partition(conn, table, add_months(current, offset))
+            if name:
+                created.append(name)
+    return created
+
+
+def ensure_partitions_safely() -> None:
+    """Startup hook: add upcoming partitions, never blocking the boot."""
+
+    try:
+        with db.engine.begin() as conn:
+            created = ensure_partitions(conn)
+        if created:
+            logger.info("[AUDIT] created partitions %s", ",".join(created))
+    except Exception as exc:  # pragma: no cover - defensive
+        logger.error("[AUDIT] partition check failed: %s", exc)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _write_archive(path: str, columns: list[str], rows) -> int:
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with gzip.open(tmp_path, "wt", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(_cell(value) for value in row)
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def _archive_partitioned(
+    conn: Connection, table: str, cutoff: date, out_dir: str
+) -> list[tuple[str, int]]:
+    archived = []
+    for name in list_partitions(conn, table):
+        month = _partition_month(table, name)
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        result = conn.execute(
+            text(f"SELECT * FROM {name} ORDER BY id"),
+            execution_options={"stream_results": True},
+        )
+        count = _write_archive(
+            os.path.join(out_dir, f"{name}.csv.gz"), list(result.keys()), result
+        )
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        archived.append((name, count))
+    return archived
+
+
+def _archive_rows(
+    conn: Connection, table: str, cutoff: date, out_dir: str
+) -> list[tuple[str, int]]:
+    model_table = db.metadata.tables[table]
+    column = model_table.c[AUDIT_TABLES[table]]
+    oldest = conn.execute(
+        select(db.func.min(column)).where(column < cutoff)
+    ).scalar()
+    archived = []
+    if oldest is None:
+        return archived
+    month = month_start(oldest)
+    while month < cutoff:
+        upper = add_months(month, 1)
+        window = (column >= month, column < upper)
+        rows = conn.execute(
+            select(model_table).where(*window).order_by(model_table.c.id)
+        )
+        name = partition_name(table, month)
+        count = _write_archive(
+            os.path.join(out_dir, f"{name}.csv.gz"), list(rows.keys()), rows
+        )
+        if count:
+            conn.execute(model_table.delete().where(*window))
+            archived.append((name, count))
+        else:
+            os.remove(os.path.join(out_dir, f"{name}.csv.gz"))
+        month = upper
+    return archived
+
+
+def archive_before(
+    conn: Connection, cutoff: date, out_dir: str
+) -> list[tuple[str, int]]:
+    """Archive and drop every whole month before ``cutoff``.
+
+    Returns ``(archive name, rows)`` pairs. Each month's file is complete
+    before its rows are dropped, and a rerun rewrites the file of any month
+    that is still present.
+    """
+
+    cutoff = month_start(cutoff)
+    os.makedirs(out_dir, exist_ok=True)
+    archived: list[tuple[str, int]] = []
+    for table in AUDIT_TABLES:
+        if is_partitioned(conn, table):
+            archived.extend(_archive_partitioned(conn, table, cutoff, out_dir))
+        else:
+            archived.extend(_archive_rows(conn, table, cutoff, out_dir))
+    return archived
+
+
+class AuditWriter:
+    """Inserts queued audit rows in batches from a daemon thread."""
+
+    def __init__(self, app, *, batch_size: int, interval: float):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def submit(self, rows: list[tuple]) -> None:
+        self._ensure_thread()
+        for item in rows:
+            self._queue.put(item)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_thread(self) -> None:
+        # Forked workers inherit the object but not the thread.
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._pid = os.getpid()
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _drain(self) -> list[tuple]:
+        items = []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def flush(self) -> int:
+        """Write everything queued so far; return the number of rows."""
+
+        written = 0
+        while True:
+            items = self._drain()
+            if not items:
+                return written
+            by_table: dict[str, list[dict]] = {}
+            for table, values in items:
+                by_table.setdefault(table, []).append(values)
+            with self.app.app_context():
+                try:
+                    for table, rows in by_table.items():
+                        db.session.execute(insert(db.metadata.tables[table]), rows)
+                    db.session.commit()
+                    written += len(items)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("[AUDIT] dropped %d buffered rows", len(items))
+                finally:
+                    db.session.remove()
+
+
+def _writer() -> AuditWriter | None:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("audit_writer")
+
+
+def _row_values(obj) -> dict:
+    table = obj.__table__
+    values = {
+        column.key: getattr(obj, column.key)
+        for column in table.columns
+        if column.key != "id"
+    }
+    stamp = AUDIT_TABLES[table.name]
+    if values.get(stamp) is None:
+        values[stamp] = datetime.utcnow()
+    return values
+
+
+def _take_audit_rows(session, flush_context, instances) -> None:
+    if _writer() is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new):
+        if isinstance(obj, _MODELS):
+            pending.append((obj.__table__.name, _row_values(obj)))
+            session.expunge(obj)
+
+
+def _submit_after_commit(session) -> None:
+    rows = session.info.pop(_PENDING_KEY, None)
+    writer = _writer()
+    if rows and writer is not None:
+        writer.submit(rows)
+
+
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def flush() -> int:
+    """Write buffered audit rows now (no-op when buffering is off)."""
+
+    writer = _writer()
+    return writer.flush() if writer is not None else 0
+
+
+def init_app(app) -> None:
+    app.config.setdefault("AUDIT_BUFFERED", os.getenv("AUDIT_BUFFERED") == "1")
+    app.config.setdefault(
+        "AUDIT_BUFFER_INTERVAL",
+        float(os.getenv("AUDIT_BUFFER_INTERVAL", BUFFER_INTERVAL_SECONDS)),
+    )
+    app.config.setdefault(
+        "AUDIT_BUFFER_BATCH", int(os.getenv("AUDIT_BUFFER_BATCH", BUFFER_BATCH_SIZE))
+    )
+    app.config.setdefault(
+        "AUDIT_ARCHIVE_DIR",
+        os.getenv(
+            "AUDIT_ARCHIVE_DIR",
+            os.path.join(app.config.get("SITE_ROOT", "/srv"), "audit-archive"),
+        ),
+    )
+    if not app.config["AUDIT_BUFFERED"]:
+        return
+    writer = AuditWriter(
+        app,
+        batch_size=app.config["AUDIT_BUFFER_BATCH"],
+        interval=app.config["AUDIT_BUFFER_INTERVAL"],
+    )
+    app.extensions["audit_writer"] = writer
+    atexit.register(writer.flush)
+    if not event.contains(FlaskSession, "before_flush", _take_audit_rows):
+        event.listen(FlaskSession, "before_flush", _take_audit_rows)
+        event.listen(FlaskSession, "after_commit", _submit_after_commit)
+        event.listen(FlaskSession, "after_rollback", _discard_after_rollback)
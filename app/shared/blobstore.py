@@ -0,0 +1,514 @@
+"""Content-addressed blob storage for files written under ``SITE_ROOT``.
+
+Callers address files by *key*, the path relative to the store root (for
+example ``certificates/2025/12/FN_jane_2025-01-02.pdf``), so URLs and the Caddy
+layout stay unchanged. Every write:
+
+* streams into a temporary file while computing its SHA-256,
+* is fsynced (file and directory) unless ``STORAGE_FSYNC=0``,
+* lands as ``_blobs/<aa>/<sha256>`` and is hard-linked into place with an
+  atomic rename, so identical uploads share one inode on disk.
+
+A blob whose link count drops to one is no longer referenced by any key;
+``LocalBlobStore.gc()`` (``manage.py blobstore_gc``) removes those. Hard-linked
+keys share one inode, so a file under the root must never be rewritten in
+place (``cp`` onto an existing file does that); replace it through the store.
+
+``S3BlobStore`` implements the same interface against any S3-compatible
+service (MinIO, AWS), so several app nodes can share one bucket instead of a
+bind mount. It records the digest as object metadata and skips uploads whose
+content is already stored under the key. ``boto3`` is only needed when
+``STORAGE_BACKEND=s3``. Reads, listings and deletes all go through the store;
+only the local backend hands out filesystem paths (``local_path``), which is
+what lets Caddy serve files and X-Accel downloads straight from disk.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from stat import S_ISREG
+from typing import BinaryIO, Iterator
+
+from flask import Response, current_app, request, send_file
+
+CHUNK_SIZE = 64 * 1024
+BLOB_DIR = "_blobs"
+GC_MIN_AGE_SECONDS = 3600
+_SPOOL_LIMIT = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    key: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    key: str
+    size: int
+    mtime: float
+
+
+class BlobStoreError(ValueError):
+    pass
+
+
+def normalize_key(key: str) -> str:
+    parts = [part for part in (key or "").replace("\\", "/").split("/") if part]
+    if not parts or any(part in (".", "..") for part in parts):
+        raise BlobStoreError(f"Invalid storage key: {key!r}")
+    if parts[0] == BLOB_DIR:
+        raise BlobStoreError(f"Reserved storage key: {key!r}")
+    return "/".join(parts)
+
+
+def _normalize_prefix(prefix: str) -> str:
+    return normalize_key(prefix) + "/" if prefix.strip("/\\") else ""
+
+
+class BlobStore:
+    """Interface shared by the storage backends."""
+
+    def put_stream(self, key: str, stream: BinaryIO, *, mode: int = 0o644) -> StoredBlob:
+        raise NotImplementedError
+
+    def put_bytes(self, key: str, data: bytes, *, mode: int = 0o644) -> StoredBlob:
+        return self.put_stream(key, BytesIO(data), mode=mode)
+
+    def open_range(
+        self, key: str, start: int = 0, length: int | None = None
+    ) -> Iterator[bytes]:
+        """Yield the bytes of ``key`` from ``start`` (``length`` bytes or to EOF)."""
+
+        raise NotImplementedError
+
+    def read_bytes(self, key: str) -> bytes:
+        return b"".join(self.open_range(key))
+
+    def stat(self, key: str) -> BlobInfo | None:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    def size(self, key: str) -> int:
+        info = self.stat(key)
+        if info is None:
+            raise FileNotFoundError(key)
+        return info.size
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        """Yield every key under the directory-style ``prefix``."""
+
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> str | None:
+        """Return a filesystem path for ``key`` when the backend has one."""
+
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str, *, fsync: bool = True, dedupe: bool = True):
+        self.root = os.path.abspath(root)
+        self.fsync = fsync
+        self.dedupe = dedupe
+        self.blob_root = os.path.join(self.root, BLOB_DIR)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *normalize_key(key).split("/"))
+
+    def local_path(self, key: str) -> str:
+        return self._path(key)
+
+    def _sync_dir(self, path: str) -> None:
+        if not self.fsync:
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _spool(self, stream: BinaryIO, directory: str) -> tuple[str, str, int]:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    size += len(chunk)
+                    fh.write(chunk)
+                fh.flush()
+                if self.fsync:
+                    os.fsync(fh.fileno())
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path, digest.hexdigest(), size
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_root, sha256[:2], sha256)
+
+    def put_stream(self, key: str, stream: BinaryIO, *, mode: int = 0o644) -> StoredBlob:
+        dest = self._path(key)
+        dest_dir = os.path.dirname(dest)
+        os.makedirs(dest_dir, exist_ok=True)
+        if not self.dedupe:
+            tmp_path, sha256, size = self._spool(stream, dest_dir)
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, dest)
+            self._sync_dir(dest_dir)
+            return StoredBlob(normalize_key(key), sha256, size, False)
+
+        tmp_path, sha256, size = self._spool(stream, self.blob_root)
+        blob_path = self._blob_path(sha256)
+        if os.path.exists(dest) and os.path.isfile(blob_path) and os.path.samefile(dest, blob_path):
+            os.unlink(tmp_path)
+            return StoredBlob(normalize_key(key), sha256, size, True)
+        link_tmp = os.path.join(
+            dest_dir, f".link-{os.getpid()}-{sha256[:16]}-{os.urandom(4).hex()}"
+        )
+        # Link an existing blob first: the extra link keeps gc() away from it
+        # without touching the mtime or mode other keys share through the inode.
+        deduplicated = self._link_or_copy(blob_path, link_tmp, mode)
+        if deduplicated:
+            os.unlink(tmp_path)
+        else:
+            os.chmod(tmp_path, mode)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp_path, blob_path)
+            self._sync_dir(os.path.dirname(blob_path))
+            self._link_or_copy(blob_path, link_tmp, mode)
+        os.replace(link_tmp, dest)
+        self._sync_dir(dest_dir)
+        return StoredBlob(normalize_key(key), sha256, size, deduplicated)
+
+    def _link_or_copy(self, blob_path: str, link_path: str, mode: int) -> bool:
+        """Place ``blob_path`` at ``link_path``; ``False`` when the blob is missing."""
+
+        try:
+            os.link(blob_path, link_path)
+        except FileNotFoundError:
+            return False
+        except OSError as exc:
+            if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            # Different filesystem or no hardlink support: fall back to a copy.
+            try:
+                shutil.copyfile(blob_path, link_path)
+            except FileNotFoundError:
+                return False
+            os.chmod(link_path, mode)
+        return True
+
+    def open_range(
+        self, key: str, start: int = 0, length: int | None = None
+    ) -> Iterator[bytes]:
+        path = self._path(key)
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                want = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                chunk = fh.read(want)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def stat(self, key: str) -> BlobInfo | None:
+        try:
+            st = os.stat(self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not S_ISREG(st.st_mode):
+            return None
+        return BlobInfo(normalize_key(key), st.st_size, st.st_mtime)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        prefix = _normalize_prefix(prefix)
+        stack = [(os.path.join(self.root, *prefix.split("/")), prefix)]
+        while stack:
+            path, rel_dir = stack.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                # Temp uploads and links start with a dot; _blobs is internal.
+                if entry.name.startswith(".") or (not rel_dir and entry.name == BLOB_DIR):
+                    continue
+                rel = f"{rel_dir}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, f"{rel}/"))
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    yield BlobInfo(rel, st.st_size, st.st_mtime)
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def gc(self, min_age_seconds: int = GC_MIN_AGE_SECONDS) -> tuple[int, int]:
+        """Remove blobs no key links to; return ``(removed, bytes_freed)``.
+
+        Blobs touched within ``min_age_seconds`` are kept so writes that are
+        between storing the blob and linking it are never collected.
+        """
+
+        cutoff = time.time() - min_age_seconds
+        removed = freed = 0
+        if not os.path.isdir(self.blob_root):
+            return 0, 0
+        for dirpath, _dirs, files in os.walk(self.blob_root):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                stale_upload = name.startswith(".upload-")
+                if stat.st_mtime > cutoff:
+                    continue
+                if stat.st_nlink <= 1 and (len(name) == 64 or stale_upload):
+                    os.unlink(path)
+                    removed += 1
+                    freed += stat.st_size
+        return removed, freed
+
+
+def _is_missing(exc: Exception) -> bool:
+    error = getattr(exc, "response", {}).get("Error", {})
+    return str(error.get("Code")) in {"404", "NoSuchKey", "NotFound"}
+
+
+class S3BlobStore(BlobStore):
+    """S3-compatible backend; ``client`` follows the boto3 S3 client API."""
+
+    def __init__(self, client, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _object_key(self, key: str) -> str:
+        key = normalize_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _head(self, key: str) -> dict | None:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as exc:
+            if _is_missing(exc):
+                return None
+            raise
+
+    def put_stream(self, key: str, stream: BinaryIO, *, mode: int = 0o644) -> StoredBlob:
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_LIMIT) as spool:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+            sha256 = digest.hexdigest()
+            head = self._head(key)
+            if head and (head.get("Metadata") or {}).get("sha256") == sha256:
+                return StoredBlob(normalize_key(key), sha256, size, True)
+            spool.seek(0)
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                Body=spool,
+                ContentLength=size,
+                Metadata={"sha256": sha256},
+            )
+        return StoredBlob(normalize_key(key), sha256, size, False)
+
+    def open_range(
+        self, key: str, start: int = 0, length: int | None = None
+    ) -> Iterator[bytes]:
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if start or length is not None:
+            end = "" if length is None else str(start + length - 1)
+            params["Range"] = f"bytes={start}-{end}"
+        try:
+            body = self.client.get_object(**params)["Body"]
+        except Exception as exc:
+            if _is_missing(exc):
+                raise FileNotFoundError(key) from exc
+            raise
+        try:
+            while True:
+                chunk = body.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    def stat(self, key: str) -> BlobInfo | None:
+        head = self._head(key)
+        if head is None:
+            return None
+        modified = head.get("LastModified")
+        return BlobInfo(
+            normalize_key(key),
+            int(head["ContentLength"]),
+            modified.timestamp() if modified else 0.0,
+        )
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        prefix = _normalize_prefix(prefix)
+        root = f"{self.prefix}/" if self.prefix else ""
+        params = {"Bucket": self.bucket, "Prefix": root + prefix}
+        while True:
+            page = self.client.list_objects_v2(**params)
+            for obj in page.get("Contents", []):
+                modified = obj.get("LastModified")
+                yield BlobInfo(
+                    obj["Key"][len(root):],
+                    int(obj["Size"]),
+                    modified.timestamp() if modified else 0.0,
+                )
+            if not page.get("IsTruncated"):
+                return
+            params["ContinuationToken"] = page["NextContinuationToken"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+def _fsync_enabled() -> bool:
+    return str(current_app.config.get("STORAGE_FSYNC", "1")) != "0"
+
+
+def get_store() -> BlobStore:
+    """Return the ``SITE_ROOT`` store configured for the current app."""
+
+    store = current_app.extensions.get("blobstore")
+    root = os.path.abspath(current_app.config.get("SITE_ROOT", "/srv"))
+    if store is not None and getattr(store, "root", root) == root:
+        return store
+    if current_app.config.get("STORAGE_BACKEND", "local") == "s3":
+        try:
+            import boto3
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3") from exc
+        client = boto3.client(
+            "s3", endpoint_url=current_app.config.get("STORAGE_S3_ENDPOINT_URL")
+        )
+        store = S3BlobStore(
+            client,
+            current_app.config["STORAGE_S3_BUCKET"],
+            current_app.config.get("STORAGE_S3_PREFIX", ""),
+        )
+    else:
+        store = LocalBlobStore(root, fsync=_fsync_enabled())
+    current_app.extensions["blobstore"] = store
+    return store
+
+
+def assets_store() -> LocalBlobStore:
+    """Return the local store for certificate template and badge assets.
+
+    Writes are atomic but not deduplicated: operators re-seed this bind mount
+    with ``cp``, which rewrites existing files in place and would change every
+    key hard-linked to the same blob.
+    """
+
+    return LocalBlobStore(
+        os.path.join(current_app.root_path, "assets"),
+        fsync=_fsync_enabled(),
+        dedupe=False,
+    )
+
+
+def blob_response(
+    store: BlobStore,
+    key: str,
+    *,
+    mimetype: str | None = None,
+    download_name: str | None = None,
+    max_age: int = 0,
+) -> Response:
+    """Send ``key`` with conditional and range support.
+
+    ``download_name`` makes it an attachment. Local files go through
+    ``send_file``; other backends stream the requested byte range.
+    """
+
+    path = store.local_path(key)
+    if path is not None:
+        return send_file(
+            path,
+            as_attachment=download_name is not None,
+            download_name=download_name,
+            mimetype=mimetype,
+            conditional=True,
+            etag=True,
+            max_age=max_age,
+        )
+    info = store.stat(key)
+    if info is None:
+        raise FileNotFoundError(key)
+    mimetype = mimetype or mimetypes.guess_type(key)[0] or "application/octet-stream"
+    size = info.size
+    status = 200
+    start, length = 0, size
+    byte_range = request.range
+    content_range = byte_range.range_for_length(size) if byte_range else None
+    if content_range:
+        start, stop = content_range
+        length = stop - start
+        status = 206
+    response = Response(
+        store.open_range(key, start, length), status=status, mimetype=mimetype
+    )
+    response.headers["Content-Length"] = str(length)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.last_modified = info.mtime
+    response.cache_control.max_age = max_age
+    response.cache_control.public = max_age > 0
+    if download_name is not None:
+        response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    if status == 206:
+        response.headers["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+    return response
@@ -0,0 +1,107 @@
+"""Parse and batch-resolve ``catalog_ref`` strings.
+
+Material defaults and order items point at the catalog with strings such as
+``materials_options:42`` or ``simulation_outline:7`` (older rows use
+``simulation_outlines:7``). :func:`resolve` parses a batch of refs once and
+loads every referenced row with one ``IN`` query per kind, returning plain
+snapshots keyed by the original ref string.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from ..app import db
+from ..models import MaterialsOption, SimulationOutline
+from .materials_catalog import is_bulk
+
+MATERIALS_OPTION = "materials_options"
+SIMULATION_OUTLINE = "simulation_outline"
+_KIND_ALIASES = {
+    MATERIALS_OPTION: MATERIALS_OPTION,
+    SIMULATION_OUTLINE: SIMULATION_OUTLINE,
+    "simulation_outlines": SIMULATION_OUTLINE,
+}
+
+
+class CatalogRef(NamedTuple):
+    kind: str
+    id: int
+
+
+class MaterialOptionSnapshot(NamedTuple):
+    id: int
+    order_type: str
+    title: str
+    description: str | None
+    sku_physical: str | None
+    quantity_basis: str
+    language_names: tuple[str, ...]
+
+    @property
+    def is_bulk(self) -> bool:
+        """Client-run bulk catalog, or "bulk" in the title or description."""
+
+        return is_bulk(self.order_type, self.title, self.description)
+
+
+class SimulationOutlineSnapshot(NamedTuple):
+    id: int
+    label: str
+
+
+def parse_ref(raw: str | None) -> CatalogRef | None:
+    kind, _, ident = (raw or "").partition(":")
+    kind = _KIND_ALIASES.get(kind)
+    if not kind or not ident.isdigit():
+        return None
+    return CatalogRef(kind, int(ident))
+
+
+def resolve(
+    refs: Iterable[str | None], *, with_languages: bool = False
+) -> dict[str, MaterialOptionSnapshot | SimulationOutlineSnapshot]:
+    """Snapshots for every ref that parses and points at an existing row.
+
+    ``with_languages`` also loads each option's language names (one more
+    ``IN`` query); otherwise ``language_names`` is empty.
+    """
+
+    parsed = {raw: parse_ref(raw) for raw in set(refs) if raw}
+    ids: dict[str, set[int]] = {MATERIALS_OPTION: set(), SIMULATION_OUTLINE: set()}
+    for ref in parsed.values():
+        if ref:
+            ids[ref.kind].add(ref.id)
+
+    rows: dict[CatalogRef, MaterialOptionSnapshot | SimulationOutlineSnapshot] = {}
+    if ids[MATERIALS_OPTION]:
+        query = select(MaterialsOption).where(
+            MaterialsOption.id.in_(ids[MATERIALS_OPTION])
+        )
+        if with_languages:
+            query = query.options(selectinload(MaterialsOption.languages))
+        for opt in db.session.scalars(query):
+            rows[CatalogRef(MATERIALS_OPTION, opt.id)] = MaterialOptionSnapshot(
+                id=opt.id,
+                order_type=opt.order_type,
+                title=opt.title,
+                description=opt.description,
+                sku_physical=opt.sku_physical,
+                quantity_basis=opt.quantity_basis,
+                language_names=(
+                    tuple(lang.name for lang in opt.languages) if with_languages else ()
+                ),
+            )
+    if ids[SIMULATION_OUTLINE]:
+        for outline in db.session.scalars(
+            select(SimulationOutline).where(
+                SimulationOutline.id.in_(ids[SIMULATION_OUTLINE])
+            )
+        ):
+            rows[CatalogRef(SIMULATION_OUTLINE, outline.id)] = SimulationOutlineSnapshot(
+                id=outline.id, label=outline.label
+            )
+    return {raw: rows[ref] for raw, ref in parsed.items() if ref and ref in rows}
@@ -0,0 +1,186 @@
+"""Catalog of certificate template PDFs and badge art.
+
+Template and badge resolution used to probe the filesystem for every
+candidate name on every render. The catalog walks ``app/assets`` and the badge
+roots once, then answers lookups from dicts. It rebuilds when an upload calls
+``invalidate()`` or when one of the scanned directories changes mtime (checked
+at most every ``POLL_SECONDS``), so files dropped onto the volume by hand are
+picked up too.
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, NamedTuple
+
+from flask import current_app
+
+from .blobstore import BLOB_DIR
+
+POLL_SECONDS = 5.0
+BADGE_LIST_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+class AssetFile(NamedTuple):
+    path: str
+    mtime: float
+
+
+def _within(root: str, path: str) -> bool:
+    return path == root or path.startswith(f"{root}{os.sep}")
+
+
+def _asset_key(root: str, name: str | None) -> str | None:
+    """Normalize ``name`` to a ``/``-separated path relative to ``root``."""
+
+    raw = (name or "").strip()
+    if not raw:
+        return None
+    if os.path.isabs(raw):
+        raw = os.path.relpath(os.path.normpath(raw), root)
+    key = posixpath.normpath(raw.replace(os.sep, "/"))
+    if key in (".", "..") or key.startswith("../"):
+        return None
+    return key
+
+
+def _scan(
+    root: str, *, suffix: str | None = None, skip: Iterable[str] = ()
+) -> tuple[dict[str, AssetFile], list[tuple[str, int]]]:
+    files: dict[str, AssetFile] = {}
+    dirs: list[tuple[str, int]] = []
+    skipped = {BLOB_DIR, *skip}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in skipped)
+        dirs.append((dirpath, os.stat(dirpath).st_mtime_ns))
+        for name in filenames:
+            if suffix and not name.lower().endswith(suffix):
+                continue
+            path = os.path.join(dirpath, name)
+            resolved = os.path.realpath(path)
+            if not _within(root, resolved) or not os.path.isfile(resolved):
+                continue
+            key = os.path.relpath(path, root).replace(os.sep, "/")
+            files[key] = AssetFile(resolved, os.path.getmtime(resolved))
+    return files, dirs
+
+
+@dataclass
+class AssetCatalog:
+    assets_dir: str
+    badge_roots: tuple[str, ...]
+    templates: dict[str, AssetFile] = field(default_factory=dict)
+    badges: tuple[dict[str, AssetFile], ...] = ()
+    watched: tuple[tuple[str, int | None], ...] = ()
+
+    @classmethod
+    def build(cls, assets_dir: str, badge_dirs: Iterable[str]) -> "AssetCatalog":
+        assets_root = os.path.realpath(assets_dir)
+        watched: list[tuple[str, int | None]] = []
+        templates: dict[str, AssetFile] = {}
+        if os.path.isdir(assets_root):
+            templates, dirs = _scan(assets_root, suffix=".pdf", skip=("badges",))
+            watched.extend(dirs)
+        else:
+            watched.append((assets_root, None))
+        roots: list[str] = []
+        badges: list[dict[str, AssetFile]] = []
+        for candidate in badge_dirs:
+            resolved = os.path.realpath(candidate)
+            if resolved in roots:
+                continue
+            if not os.path.isdir(resolved):
+                watched.append((resolved, None))
+                continue
+            files, dirs = _scan(resolved)
+            roots.append(resolved)
+            badges.append(files)
+            watched.extend(dirs)
+        return cls(assets_root, tuple(roots), templates, tuple(badges), tuple(watched))
+
+    def is_stale(self) -> bool:
+        for path, mtime_ns in self.watched:
+            try:
+                current = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                current = None
+            if current != mtime_ns:
+                return True
+        return False
+
+    def template(self, name: str | None) -> AssetFile | None:
+        key = _asset_key(self.assets_dir, name)
+        return self.templates.get(key) if key else None
+
+    def template_path(self, name: str | None) -> str | None:
+        """Return where ``name`` would live, or ``None`` if it escapes the root."""
+
+        key = _asset_key(self.assets_dir, name)
+        return os.path.join(self.assets_dir, *key.split("/")) if key else None
+
+    def template_names(self) -> list[str]:
+        return sorted(key for key in self.templates if "/" not in key)
+
+    def badge(self, candidates: Iterable[str]) -> AssetFile | None:
+        names = list(candidates)
+        for root, files in zip(self.badge_roots, self.badges):
+            for name in names:
+                key = _asset_key(root, name)
+                if key and key in files:
+                    return files[key]
+        return None
+
+    def badge_names(self) -> list[str]:
+        """Top-level image files in the upload target ``app/assets/badges``."""
+
+        upload_root = os.path.realpath(os.path.join(self.assets_dir, "badges"))
+        for root, files in zip(self.badge_roots, self.badges):
+            if root == upload_root:
+                return sorted(
+                    key
+                    for key in files
+                    if "/" not in key and key.lower().endswith(BADGE_LIST_EXTENSIONS)
+                )
+        return []
+
+
+_lock = threading.Lock()
+_catalogs: dict[tuple[str, ...], tuple[AssetCatalog, float]] = {}
+
+
+def badge_asset_dirs() -> tuple[str, ...]:
+    return (
+        os.path.join(current_app.root_path, "assets", "badges"),
+        os.path.join(current_app.root_path, "..", "data", "cert-assets", "badges"),
+    )
+
+
+def get_catalog() -> AssetCatalog:
+    assets_dir = os.path.join(current_app.root_path, "assets")
+    badge_dirs = badge_asset_dirs()
+    key = (assets_dir, *badge_dirs)
+    now = time.monotonic()
+    with _lock:
+        cached = _catalogs.get(key)
+        if cached and now - cached[1] < POLL_SECONDS:
+            return cached[0]
+        if cached and not cached[0].is_stale():
+            _catalogs[key] = (cached[0], now)
+            return cached[0]
+        catalog = AssetCatalog.build(assets_dir, badge_dirs)
+        _catalogs[key] = (catalog, now)
+    current_app.logger.info(
+        "[cert-assets] catalog built templates=%d badges=%d",
+        len(catalog.templates),
+        sum(len(files) for files in catalog.badges),
+    )
+    return catalog
+
+
+def invalidate() -> None:
+    with _lock:
+        _catalogs.clear()
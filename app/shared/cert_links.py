@@ -0,0 +1,78 @@
+"""Short-lived signed certificate download links.
+
+A link carries the certificate id, its path under ``<SITE_ROOT>/certificates``
+and an expiry, authenticated by an HMAC keyed from the app secret. Verifying
+one needs no database access or login session, so the download route can hand
+the file to Caddy (``X-Accel-Redirect``) straight away.
+
+Expiries are rounded up to a ``CERT_LINK_TTL_SECONDS`` bucket so pages rendered
+within the same window emit identical URLs, which keeps browser caches and
+ETag revalidation effective. A link stays valid for between one and two TTLs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import time
+
+from flask import current_app, url_for
+
+DEFAULT_TTL_SECONDS = 15 * 60
+
+
+def normalize_pdf_path(pdf_path: str | None) -> str:
+    """Return ``pdf_path`` relative to the certificates root."""
+
+    rel_path = (pdf_path or "").lstrip("/")
+    if rel_path.startswith("certificates/"):
+        rel_path = rel_path.split("/", 1)[1]
+    return rel_path
+
+
+def _ttl() -> int:
+    return int(current_app.config.get("CERT_LINK_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+def _signature(cert_id: int, rel_path: str, expires: int) -> str:
+    secret = current_app.config.get("CERT_LINK_SECRET") or current_app.secret_key
+    key = hashlib.sha256(b"cert-download:" + str(secret).encode()).digest()
+    message = f"{cert_id}\n{rel_path}\n{expires}".encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+
+def signed_certificate_url(
+    cert_id: int, pdf_path: str | None, *, now: float | None = None
+) -> str | None:
+    """Return a signed download URL, or ``None`` when no PDF is recorded."""
+
+    rel_path = normalize_pdf_path(pdf_path)
+    if not rel_path:
+        return None
+    ttl = _ttl()
+    current = int(time.time() if now is None else now)
+    expires = (current // ttl + 2) * ttl
+    return url_for(
+        "learner.signed_certificate_download",
+        cert_id=cert_id,
+        rel_path=rel_path,
+        expires=expires,
+        sig=_signature(cert_id, rel_path, expires),
+    )
+
+
+def verify_certificate_link(
+    cert_id: int,
+    rel_path: str,
+    expires: int | None,
+    sig: str | None,
+    *,
+    now: float | None = None,
+) -> bool:
+    if not expires or not sig:
+        return False
+    current = time.time() if now is None else now
+    if expires < current:
+        return False
+    expected = _signature(cert_id, rel_path, expires)
+    return hmac.compare_digest(expected, sig)
@@ -0,0 +1,263 @@
+"""Diff stored certificate PDFs against ``certificates.pdf_path``.
+
+Used by ``manage.py purge_orphan_certs`` and ``backfill_cert_paths``. The
+database side is streamed in batches into a set of normalized paths. The
+storage side is listed through the blob store; on the local backend the
+``certificates`` directory is walked with ``os.scandir``, one worker per
+top-level (year) directory. Both sides are compared as paths relative to
+``certificates/``, which is how ``render_certificate`` stores ``pdf_path``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import select, update
+
+from ..app import db
+from ..models import Certificate
+from .blobstore import BlobStore
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_WORKERS = 4
+SAMPLE_LIMIT = 5
+RECENT_GRACE_SECONDS = 3600
+
+CERT_PREFIX = "certificates"
+
+_LEGACY_RE = re.compile(r"^\d{4}/[^/0-9][^/]*/")
+
+
+def normalize_cert_path(value: str | None) -> str | None:
+    """Return ``value`` relative to the certificates root, ``/``-separated."""
+
+    rel = (value or "").replace(os.sep, "/").lstrip("/")
+    if rel.startswith("certificates/"):
+        rel = rel.split("/", 1)[1]
+    return rel or None
+
+
+def iter_db_paths(batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    stmt = (
+        select(Certificate.pdf_path)
+        .where(Certificate.pdf_path.isnot(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for value in db.session.execute(stmt).scalars():
+        rel = normalize_cert_path(value)
+        if rel:
+            yield rel
+
+
+def _path_variants(rel: str) -> tuple[str, ...]:
+    return (rel, f"/{rel}", f"certificates/{rel}", f"/certificates/{rel}")
+
+
+def referenced_paths(rel_paths: list[str]) -> set[str]:
+    """The subset of ``rel_paths`` that some ``Certificate`` row points at now."""
+
+    variants = {variant: rel for rel in rel_paths for variant in _path_variants(rel)}
+    found: set[str] = set()
+    names = list(variants)
+    for start in range(0, len(names), 500):
+        for value in db.session.execute(
+            select(Certificate.pdf_path).where(
+                Certificate.pdf_path.in_(names[start : start + 500])
+            )
+        ).scalars():
+            found.add(variants[value])
+    return found
+
+
+def _is_cert_pdf(rel: str) -> bool:
+    parts = rel.split("/")
+    return parts[-1].lower().endswith(".pdf") and not any(
+        part.startswith("_") for part in parts[:-1]
+    )
+
+
+def _scan_tree(root: str, prefix: str) -> list[tuple[str, int, float]]:
+    found: list[tuple[str, int, float]] = []
+    stack = [(root, prefix)]
+    while stack:
+        path, rel_dir = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            rel = f"{rel_dir}{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("_"):
+                    stack.append((entry.path, f"{rel}/"))
+            elif entry.name.lower().endswith(".pdf") and entry.is_file(follow_symlinks=False):
+                st = entry.stat(follow_symlinks=False)
+                found.append((rel, st.st_size, st.st_mtime))
+    return found
+
+
+def scan_cert_files(
+    store: BlobStore, workers: int = DEFAULT_WORKERS
+) -> dict[str, tuple[int, float]]:
+    """Map every certificate PDF (skipping ``_*`` dirs) to ``(size, mtime)``."""
+
+    cert_root = store.local_path(CERT_PREFIX)
+    if cert_root is None:
+        skip = len(CERT_PREFIX) + 1
+        return {
+            info.key[skip:]: (info.size, info.mtime)
+            for info in store.list(CERT_PREFIX)
+            if _is_cert_pdf(info.key[skip:])
+        }
+    files: dict[str, tuple[int, float]] = {}
+    subdirs: list[tuple[str, str]] = []
+    try:
+        with os.scandir(cert_root) as it:
+            entries = list(it)
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if not entry.name.startswith("_"):
+                subdirs.append((entry.path, f"{entry.name}/"))
+        elif entry.name.lower().endswith(".pdf") and entry.is_file(follow_symlinks=False):
+            st = entry.stat(follow_symlinks=False)
+            files[entry.name] = (st.st_size, st.st_mtime)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for found in pool.map(lambda item: _scan_tree(*item), subdirs):
+            files.update((rel, (size, mtime)) for rel, size, mtime in found)
+    return files
+
+
+@dataclass
+class ReconcileReport:
+    scanned: int = 0
+    scanned_bytes: int = 0
+    referenced: int = 0
+    orphans: list[tuple[str, int]] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+    recent: int = 0
+
+    @property
+    def orphan_bytes(self) -> int:
+        return sum(size for _, size in self.orphans)
+
+    def summary(self) -> str:
+        return (
+            f"scanned={self.scanned} bytes={self.scanned_bytes} "
+            f"referenced={self.referenced} orphans={len(self.orphans)} "
+            f"orphan_bytes={self.orphan_bytes} missing={len(self.missing)} "
+            f"recent={self.recent}"
+        )
+
+
+def reconcile(
+    store: BlobStore,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    grace_seconds: float = RECENT_GRACE_SECONDS,
+) -> ReconcileReport:
+    started = time.time()
+    # Files first: a PDF rendered after the scan cannot look orphaned.
+    files = scan_cert_files(store, workers)
+    referenced = set(iter_db_paths(batch_size))
+    report = ReconcileReport(
+        scanned=len(files),
+        scanned_bytes=sum(size for size, _mtime in files.values()),
+        referenced=len(referenced),
+    )
+    for rel, (size, mtime) in sorted(files.items()):
+        if rel in referenced:
+            continue
+        if mtime >= started - grace_seconds:
+            report.recent += 1
+        else:
+            report.orphans.append((rel, size))
+    report.missing = sorted(referenced.difference(files))
+    return report
+
+
+class Checkpoint:
+    """Last processed certificate id, persisted as JSON between runs."""
+
+    def __init__(self, path: str | None):
+        self.path = path
+
+    def load(self) -> int:
+        if not self.path or not os.path.isfile(self.path):
+            return 0
+        with open(self.path, encoding="utf-8") as fh:
+            return int(json.load(fh).get("last_id", 0))
+
+    def save(self, last_id: int) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"last_id": last_id}, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def legacy_cert_path(rel: str, session_id: int) -> str | None:
+    """Map ``YYYY/<workshop code>/file.pdf`` to ``YYYY/<session id>/file.pdf``."""
+
+    if not _LEGACY_RE.match(rel):
+        return None
+    year, rest = rel.split("/", 1)
+    _old_code, filename = rest.split("/", 1)
+    return f"{year}/{session_id}/{filename}"
+
+
+def backfill_legacy_paths(
+    store: BlobStore,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    checkpoint: Checkpoint | None = None,
+) -> tuple[int, int]:
+    """Rewrite legacy ``pdf_path`` values in keyset batches, committing each.
+
+    Returns ``(updated, skipped)``. With a checkpoint, an interrupted run
+    resumes after the last committed batch.
+    """
+
+    checkpoint = checkpoint or Checkpoint(None)
+    last_id = checkpoint.load()
+    updated = skipped = 0
+    while True:
+        rows = db.session.execute(
+            select(Certificate.id, Certificate.session_id, Certificate.pdf_path)
+            .where(Certificate.id > last_id)
+            .order_by(Certificate.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        changes = []
+        for cert_id, session_id, pdf_path in rows:
+            new_rel = legacy_cert_path(normalize_cert_path(pdf_path) or "", session_id)
+            if not new_rel:
+                continue
+            if store.exists(f"{CERT_PREFIX}/{new_rel}"):
+                changes.append({"id": cert_id, "pdf_path": new_rel})
+            else:
+                skipped += 1
+        if changes:
+            db.session.execute(update(Certificate), changes)
+            updated += len(changes)
+        db.session.commit()
+        last_id = rows[-1].id
+        checkpoint.save(last_id)
+    checkpoint.clear()
+    return updated, skipped
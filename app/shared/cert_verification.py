@@ -0,0 +1,139 @@
+"""Certificate verification by certification number.
+
+Partner HR systems verify whole cohorts at once, so lookups are batched into
+one ``IN`` query and answers (including "not found") are cached per worker for
+``CACHE_TTL_SECONDS``. A commit that touches a certificate clears the cache in
+the committing worker; other workers converge within the TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+MAX_BATCH = 100
+CACHE_TTL_SECONDS = 300
+_MAX_ENTRIES = 20000
+
+_lock = threading.Lock()
+_entries: dict[str, tuple[float, dict | None]] = {}
+_PENDING_KEY = "cert_verification_dirty"
+
+
+def normalize_number(raw: str | None) -> str:
+    return (raw or "").strip().upper()
+
+
+def masked_name(name: str | None) -> str:
+    return (name[0] + "***") if name else "***"
+
+
+def _payload(number: str, found: dict | None) -> dict:
+    if not found:
+        return {"certification_number": number, "valid": False}
+    return {"certification_number": number, "valid": True, **found}
+
+
+def lookup(numbers: Iterable[str]) -> list[dict]:
+    """Return one verification result per number, in request order."""
+
+    from ..app import db
+    from ..models import Certificate
+
+    wanted = [normalize_number(n) for n in numbers]
+    now = time.monotonic()
+    found: dict[str, dict | None] = {}
+    with _lock:
+        for number in wanted:
+            entry = _entries.get(number)
+            if entry and now - entry[0] < CACHE_TTL_SECONDS:
+                found[number] = entry[1]
+    missing = sorted({n for n in wanted if n and n not in found})
+    if missing:
+        rows = db.session.execute(
+            db.select(
+                Certificate.certification_number,
+                Certificate.certificate_name,
+                Certificate.workshop_name,
+                Certificate.workshop_date,
+            ).where(Certificate.certification_number.in_(missing))
+        ).all()
+        fetched: dict[str, dict | None] = dict.fromkeys(missing)
+        for number, name, workshop_name, workshop_date in rows:
+            fetched[number] = {
+                "workshop_name": workshop_name,
+                "completion_date": workshop_date.isoformat() if workshop_date else None,
+                "participant": masked_name(name),
+            }
+        with _lock:
+            if len(_entries) + len(fetched) > _MAX_ENTRIES:
+                _entries.clear()
+            for number, value in fetched.items():
+                _entries[number] = (now, value)
+        found.update(fetched)
+    return [_payload(number, found.get(number)) for number in wanted]
+
+
+def clear_cache() -> None:
+    with _lock:
+        _entries.clear()
+
+
+class RateLimiter:
+    """Sliding-window request limiter keyed by client address."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window = window_seconds
+        self._hits: dict[str, deque[float]] = {}
+        self._prune_at = _MAX_ENTRIES
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: str) -> int:
+        """Record a hit for ``key``; return seconds to wait, or 0 if allowed."""
+
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.setdefault(key, deque())
+            while hits and now - hits[0] >= self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return max(1, int(self.window - (now - hits[0])) + 1)
+            hits.append(now)
+            if len(self._hits) > self._prune_at:
+                # Deques are only trimmed when their own key returns, so drop
+                # clients whose newest hit has left the window.
+                self._hits = {
+                    k: v for k, v in self._hits.items() if v and now - v[-1] < self.window
+                }
+                self._prune_at = max(_MAX_ENTRIES, 2 * len(self._hits))
+            return 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hits.clear()
+            self._prune_at = _MAX_ENTRIES
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _mark_dirty(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if type(obj).__name__ == "Certificate":
+            session.info[_PENDING_KEY] = True
+            return
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _clear_on_commit(session):
+    if session.info.pop(_PENDING_KEY, False):
+        clear_cache()
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
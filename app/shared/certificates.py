@@ -2,24 +2,30 @@ from __future__ import annotations
 
 import os
 import re
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from io import BytesIO
-from typing import Iterable, NamedTuple, Sequence
+from types import MappingProxyType, SimpleNamespace
+from typing import Any, Iterable, Mapping, NamedTuple, Sequence
 
 from flask import current_app
-from PIL import Image, PngImagePlugin
+from PIL import Image
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.pdfmetrics import stringWidth
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
 from ..app import db
 from ..models import (
     Certificate,
     CertificateTemplate,
     CertificateTemplateSeries,
-    Language,
     Participant,
     ParticipantAccount,
     ParticipantAttendance,
@@ -35,7 +41,9 @@ from ..shared.certificates_layout import (
     sanitize_series_layout,
 )
 from ..shared.languages import LANG_CODE_NAMES
-from .storage import ensure_dir, write_atomic
+from . import reference_data
+from .blobstore import LocalBlobStore, get_store
+from .cert_assets import get_catalog as get_asset_catalog
 
 
 _VALID_PAPER_SIZES = {"a4", "letter"}
@@ -54,6 +62,11 @@ DETAIL_RENDER_SEQUENCE: tuple[str, ...] = (
 )
 
 _BADGE_EXTENSIONS: tuple[str, ...] = (".webp", ".png")
+_BADGE_SIZE = 600
+_BADGE_BASE_CACHE_LIMIT = 32
+_badge_base_cache: dict[tuple[str, int, int], bytes] = {}
+_badge_base_lock = threading.Lock()
+BADGE_WORKERS = 4
 
 US_COUNTRY_CODES = {
     "US",
@@ -176,22 +189,6 @@ class TemplateResolution(NamedTuple):
     mtime: float
 
 
-def _safe_template_path(assets_dir: str, candidate: str | None) -> str | None:
-    raw = (candidate or "").strip()
-    if not raw:
-        return None
-    assets_root = os.path.realpath(assets_dir)
-    if os.path.isabs(raw):
-        resolved = os.path.realpath(raw)
-        if resolved == assets_root or resolved.startswith(f"{assets_root}{os.sep}"):
-            return resolved
-        return None
-    resolved = os.path.realpath(os.path.join(assets_dir, raw))
-    if resolved == assets_root or resolved.startswith(f"{assets_root}{os.sep}"):
-        return resolved
-    return None
-
-
 def _normalized_template_language(value: str | None) -> str:
     return (value or "").strip().lower().replace("_", "-")
 
@@ -201,7 +198,7 @@ def resolve_series_template(
 ) -> TemplateResolution:
     normalized_size = _normalize_paper_size(paper_size)
     normalized_lang = _normalize_language_code(lang_code)
-    assets_dir = os.path.join(current_app.root_path, "assets")
+    catalog = get_asset_catalog()
 
     templates = (
         db.session.query(CertificateTemplate)
@@ -231,65 +228,61 @@ def resolve_series_template(
         ranked_templates.sort(key=lambda item: (item[0], item[1].language or ""))
         explicit_template = ranked_templates[0][1]
         explicit_display = explicit_template.filename
-        explicit_attempt = _safe_template_path(assets_dir, explicit_template.filename)
-        if explicit_attempt and os.path.isfile(explicit_attempt):
-            mtime = os.path.getmtime(explicit_attempt)
+        explicit_attempt = catalog.template_path(explicit_template.filename)
+        explicit_file = catalog.template(explicit_template.filename)
+        if explicit_file:
             resolution = TemplateResolution(
                 display_name=os.path.basename(explicit_display),
-                path=explicit_attempt,
+                path=explicit_file.path,
                 source="explicit",
                 paper=normalized_size,
                 language=normalized_lang,
-                mtime=mtime,
+                mtime=explicit_file.mtime,
             )
             _log_template_resolution(resolution)
             return resolution
 
     pattern_name = f"fncert_template_{normalized_size}_{normalized_lang}.pdf"
-    pattern_path = _safe_template_path(assets_dir, pattern_name)
-    if pattern_path and os.path.isfile(pattern_path):
+    pattern_path = catalog.template_path(pattern_name)
+    pattern_file = catalog.template(pattern_name)
+    if pattern_file:
         if explicit_template:
             current_app.logger.info(
                 "[cert-template] explicit mapping missing; falling back source=pattern"
             )
-        mtime = os.path.getmtime(pattern_path)
         resolution = TemplateResolution(
             display_name=pattern_name,
-            path=pattern_path,
+            path=pattern_file.path,
             source="pattern",
             paper=normalized_size,
             language=normalized_lang,
-            mtime=mtime,
+            mtime=pattern_file.mtime,
         )
         _log_template_resolution(resolution)
         return resolution
 
     legacy_name = f"fncert_{normalized_size}_{normalized_lang}.pdf"
-    legacy_path = _safe_template_path(assets_dir, legacy_name)
-    if legacy_path and os.path.isfile(legacy_path):
+    legacy_path = catalog.template_path(legacy_name)
+    legacy_file = catalog.template(legacy_name)
+    if legacy_file:
         if explicit_template:
             current_app.logger.info(
                 "[cert-template] explicit mapping missing; falling back source=legacy"
             )
-        mtime = os.path.getmtime(legacy_path)
         resolution = TemplateResolution(
             display_name=legacy_name,
-            path=legacy_path,
+            path=legacy_file.path,
             source="legacy",
             paper=normalized_size,
             language=normalized_lang,
-            mtime=mtime,
+            mtime=legacy_file.mtime,
         )
         _log_template_resolution(resolution)
         return resolution
 
-    available = []
-    if os.path.isdir(assets_dir):
-        available = sorted(
-            name
-            for name in os.listdir(assets_dir)
-            if name.lower().startswith("fncert") and name.lower().endswith(".pdf")
-        )[:10]
+    available = [
+        name for name in catalog.template_names() if name.lower().startswith("fncert")
+    ][:10]
     explicit_details: str
     if explicit_template:
         if explicit_attempt:
@@ -330,29 +323,6 @@ class CertificateAttendanceError(RuntimeError):
     """Raised when certificate generation is blocked by attendance rules."""
 
 
-def _participant_has_full_attendance(session: Session, participant_id: int) -> bool:
-    days = session.number_of_class_days or 0
-    if session.materials_only or days <= 0:
-        return True
-    required_days = set(range(1, days + 1))
-    attendance_rows = (
-        db.session.query(
-            ParticipantAttendance.day_index, ParticipantAttendance.attended
-        )
-        .filter(
-            ParticipantAttendance.session_id == session.id,
-            ParticipantAttendance.participant_id == participant_id,
-        )
-        .all()
-    )
-    if not attendance_rows:
-        return False
-    attended_days = {
-        day_index for day_index, attended in attendance_rows if bool(attended)
-    }
-    return required_days.issubset(attended_days)
-
-
 def get_template_mapping(session: Session) -> tuple[CertificateTemplate | None, str]:
     region_val = (session.region or "").strip().lower()
     na_regions = {
@@ -471,42 +441,6 @@ def _badge_output_paths(
     return abs_path, rel_path, abs_dir
 
 
-def _badge_asset_roots() -> tuple[str, ...]:
-    raw_roots = [
-        os.path.join(current_app.root_path, "assets", "badges"),
-        os.path.join(
-            current_app.root_path, "..", "data", "cert-assets", "badges"
-        ),
-    ]
-    normalized: list[str] = []
-    seen: set[str] = set()
-    for candidate in raw_roots:
-        resolved = os.path.realpath(candidate)
-        if not os.path.isdir(resolved):
-            continue
-        if resolved in seen:
-            continue
-        seen.add(resolved)
-        normalized.append(resolved)
-    return tuple(normalized)
-
-
-def _safe_badge_path(root: str, candidate: str | None) -> str | None:
-    raw = (candidate or "").strip()
-    if not raw:
-        return None
-    root_real = os.path.realpath(root)
-    if os.path.isabs(raw):
-        resolved = os.path.realpath(raw)
-        if resolved == root_real or resolved.startswith(f"{root_real}{os.sep}"):
-            return resolved
-        return None
-    resolved = os.path.realpath(os.path.join(root_real, raw))
-    if resolved == root_real or resolved.startswith(f"{root_real}{os.sep}"):
-        return resolved
-    return None
-
-
 def _badge_filename_candidates(
     series_code: str, explicit: str | None
 ) -> list[str]:
@@ -578,87 +512,341 @@ def _badge_filename_candidates(
 
 def _resolve_badge_source(series_code: str, explicit: str | None) -> str:
     candidates = _badge_filename_candidates(series_code, explicit)
-    roots = _badge_asset_roots()
-    for root in roots:
-        for candidate in candidates:
-            resolved = _safe_badge_path(root, candidate)
-            if resolved and os.path.isfile(resolved):
-                return resolved
+    catalog = get_asset_catalog()
+    found = catalog.badge(candidates)
+    if found:
+        return found.path
     attempted = [
-        os.path.join(root, name) for root in roots for name in candidates
+        os.path.join(root, name) for root in catalog.badge_roots for name in candidates
     ]
     raise FileNotFoundError(
         f"Badge asset not found for series {series_code!r}; attempted {attempted}"
     )
 
 
-def _render_badge_png(
-    source_path: str, dest_path: str, pnginfo: PngImagePlugin.PngInfo | None = None
-) -> None:
+def missing_series_assets(series: CertificateTemplateSeries) -> list[str]:
+    """Describe mapped template PDFs and badge art the asset catalog lacks."""
+
+    catalog = get_asset_catalog()
+    missing: list[str] = []
+    badge_names: set[str | None] = set()
+    for tmpl in sorted(series.templates, key=lambda t: (t.language or "", t.size or "")):
+        if tmpl.filename and not catalog.template(tmpl.filename):
+            missing.append(f"{tmpl.size} / {tmpl.language}: template {tmpl.filename}")
+        badge_names.add(tmpl.badge_filename or None)
+    if not badge_names:
+        badge_names.add(None)
+    for badge_name in sorted(badge_names, key=lambda name: name or ""):
+        if not catalog.badge(_badge_filename_candidates(series.code, badge_name)):
+            missing.append(f"badge {badge_name or f'for series code {series.code}'}")
+    return missing
+
+
+class BadgeSource(NamedTuple):
+    source_path: str
+    series_name: str
+
+
+def _badge_base_png(source_path: str) -> bytes:
+    """Return the encoded 600×600 badge for ``source_path`` without metadata.
+
+    Pixels only depend on the source file, so the composite is decoded,
+    scaled and encoded once per (path, mtime, size) and reused for every
+    certificate in the series.
+    """
+
+    stat = os.stat(source_path)
+    key = (source_path, stat.st_mtime_ns, stat.st_size)
+    with _badge_base_lock:
+        cached = _badge_base_cache.get(key)
+    if cached is not None:
+        return cached
     resampling = getattr(Image, "Resampling", None)
     resample_filter = (
         resampling.LANCZOS if resampling is not None else Image.LANCZOS
     )
     with Image.open(source_path) as img:
         badge = img.convert("RGBA")
-        badge.thumbnail((600, 600), resample_filter)
-        canvas_image = Image.new("RGBA", (600, 600), (0, 0, 0, 0))
-        offset_x = (600 - badge.width) // 2
-        offset_y = (600 - badge.height) // 2
-        canvas_image.paste(badge, (offset_x, offset_y), badge)
-        canvas_image.save(dest_path, format="PNG", pnginfo=pnginfo)
+    badge.thumbnail((_BADGE_SIZE, _BADGE_SIZE), resample_filter)
+    canvas_image = Image.new("RGBA", (_BADGE_SIZE, _BADGE_SIZE), (0, 0, 0, 0))
+    offset_x = (_BADGE_SIZE - badge.width) // 2
+    offset_y = (_BADGE_SIZE - badge.height) // 2
+    canvas_image.paste(badge, (offset_x, offset_y), badge)
+    buf = BytesIO()
+    canvas_image.save(buf, format="PNG")
+    data = buf.getvalue()
+    with _badge_base_lock:
+        if len(_badge_base_cache) >= _BADGE_BASE_CACHE_LIMIT:
+            _badge_base_cache.clear()
+        _badge_base_cache[key] = data
+    return data
+
+
+def _png_text_chunk(key: str, value: str) -> bytes:
+    try:
+        chunk_type = b"tEXt"
+        payload = key.encode("latin-1") + b"\0" + value.encode("latin-1")
+    except UnicodeEncodeError:
+        # Same fallback as PngInfo.add_text: uncompressed UTF-8 iTXt.
+        chunk_type = b"iTXt"
+        payload = key.encode("latin-1") + b"\0\0\0\0\0" + value.encode("utf-8")
+    crc = zlib.crc32(chunk_type + payload) & 0xFFFFFFFF
+    return struct.pack(">I", len(payload)) + chunk_type + payload + struct.pack(">I", crc)
+
+
+def _badge_png_bytes(source_path: str, text: Sequence[tuple[str, str]]) -> bytes:
+    base = _badge_base_png(source_path)
+    # The 8-byte signature is always followed by the 25-byte IHDR chunk; text
+    # chunks may go anywhere after it, so splice them in without re-encoding.
+    chunks = b"".join(_png_text_chunk(key, value) for key, value in text)
+    return base[:33] + chunks + base[33:]
+
+
+def _badge_text(source: BadgeSource, certification_number: str) -> list[tuple[str, str]]:
+    series_name = source.series_name or str(certification_number)
+    return [
+        ("Title", f"{series_name} badge"),
+        ("Certification#", str(certification_number)),
+        ("Issuer", current_app.config.get("CERT_ISSUER", "Kepner-Tregoe")),
+        ("CreationTime", datetime.utcnow().isoformat(timespec="seconds") + "Z"),
+    ]
 
 
-def write_badge_png_for_certificate(cert: Certificate) -> None:
-    if not cert.certification_number:
-        return
-    session = cert.session or db.session.get(Session, cert.session_id)
-    if not session:
-        return
+def _certificate_key(rel_path: str) -> str:
+    return "certificates/" + rel_path.replace(os.sep, "/")
+
+
+def _write_badge_file(
+    store: LocalBlobStore, rel_path: str, source_path: str, text: Sequence[tuple[str, str]]
+) -> None:
+    store.put_bytes(_certificate_key(rel_path), _badge_png_bytes(source_path, text))
+
+
+def resolve_badge_source(session: Session) -> BadgeSource:
+    """Resolve the badge art and series name for ``session`` once."""
 
     mapping, _ = get_template_mapping(session)
     series = getattr(mapping, "series", None) if mapping else None
     series_code = _resolve_badge_series_code(session, series)
     badge_filename = getattr(mapping, "badge_filename", None) if mapping else None
-
     source_path = _resolve_badge_source(series_code, badge_filename)
-    abs_path, _, output_dir = _badge_output_paths(
-        session, cert.certification_number
-    )
-    if os.path.exists(abs_path):
+    if series is None and series_code:
+        series = CertificateTemplateSeries.query.filter_by(code=series_code).one_or_none()
+    series_name = (series.name or series_code).strip() if series else ""
+    return BadgeSource(source_path, series_name or str(series_code or "").strip())
+
+
+def write_badge_png_for_certificate(
+    cert: Certificate, source: BadgeSource | None = None
+) -> None:
+    if not cert.certification_number:
         return
+    session = cert.session or db.session.get(Session, cert.session_id)
+    if not session:
+        return
+    _abs_path, rel_path, _ = _badge_output_paths(session, cert.certification_number)
+    store = get_store()
+    if store.exists(_certificate_key(rel_path)):
+        return
+    source = source or resolve_badge_source(session)
+    _write_badge_file(
+        store,
+        rel_path,
+        source.source_path,
+        _badge_text(source, cert.certification_number),
+    )
+    current_app.logger.info("[BADGE] wrote %s", _certificate_key(rel_path))
+
+
+def write_badge_pngs(certs: Iterable[Certificate]) -> int:
+    """Write missing badge PNGs for ``certs`` on a thread pool.
+
+    Series lookups happen once per session and each source is composited once
+    before the pool starts, so workers only splice metadata and write files.
+    Returns the number of badges written.
+    """
 
-    ensure_dir(output_dir)
-    series_lookup = (
-        CertificateTemplateSeries.query.filter_by(code=series_code).one_or_none()
-        if series_code
-        else None
+    store = get_store()
+    jobs: list[tuple[LocalBlobStore, str, str, list[tuple[str, str]]]] = []
+    sources: dict[int, BadgeSource | None] = {}
+    for cert in certs:
+        if not cert.certification_number:
+            continue
+        session = cert.session or db.session.get(Session, cert.session_id)
+        if not session:
+            continue
+        _abs_path, rel_path, _ = _badge_output_paths(session, cert.certification_number)
+        if store.exists(_certificate_key(rel_path)):
+            continue
+        if session.id not in sources:
+            try:
+                sources[session.id] = resolve_badge_source(session)
+            except FileNotFoundError:
+                current_app.logger.exception("[BADGE-FAIL] session=%s", session.id)
+                sources[session.id] = None
+        source = sources[session.id]
+        if source is None:
+            continue
+        jobs.append(
+            (
+                store,
+                rel_path,
+                source.source_path,
+                _badge_text(source, cert.certification_number),
+            )
+        )
+    if not jobs:
+        return 0
+    for source_path in {job[2] for job in jobs}:
+        _badge_base_png(source_path)
+    workers = max(1, min(int(current_app.config.get("BADGE_WORKERS", BADGE_WORKERS)), len(jobs)))
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_write_badge_file, *job): job[1] for job in jobs}
+        for future, rel_path in futures.items():
+            try:
+                future.result()
+            except OSError:
+                current_app.logger.exception("[BADGE-FAIL] path=%s", rel_path)
+                continue
+            written += 1
+            current_app.logger.info("[BADGE] wrote %s", rel_path)
+    return written
+
+
+@dataclass(frozen=True)
+class CertificateRenderContext:
+    """Everything a certificate render needs that does not depend on the learner.
+
+    Built once per session (or per series/size/language for previews) so bulk
+    generation does the mapping, template, font and detail lookups once.
+    """
+
+    series_id: int
+    series_code: str
+    paper_size: str
+    language: str
+    template: TemplateResolution
+    layout: Mapping[str, Any]
+    allowed_fonts: tuple[str, ...]
+    fonts: Mapping[str, str]
+    template_pdf: bytes = b""
+    session: Session | None = None
+    session_id: int | None = None
+    workshop_name: str = ""
+    workshop_code: str = "WORKSHOP"
+    default_completion: date | None = None
+    rel_dir: str = ""
+    detail_values: Mapping[str, str | None] = field(
+        default_factory=lambda: MappingProxyType({})
     )
-    series_name = (
-        (series_lookup.name or series_code).strip() if series_lookup else ""
+    required_days: frozenset[int] = frozenset()
+    attended_days: Mapping[int, frozenset[int]] = field(
+        default_factory=lambda: MappingProxyType({})
     )
-    if not series_name:
-        series_name = str(series_code or cert.certification_number or "").strip()
-
-    meta = PngImagePlugin.PngInfo()
-    meta.add_text("Title", f"{series_name} badge")
-    meta.add_text("Certification#", str(cert.certification_number))
-    meta.add_text("Issuer", current_app.config.get("CERT_ISSUER", "Kepner-Tregoe"))
-    meta.add_text(
-        "CreationTime", datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+    def has_full_attendance(self, participant_id: int) -> bool:
+        if not self.required_days:
+            return True
+        attended = self.attended_days.get(participant_id)
+        if not attended:
+            return False
+        return self.required_days.issubset(attended)
+
+    def detail_lines(self, certification_number: str | None) -> list[str]:
+        details_cfg = self.layout.get("details", {})
+        if not details_cfg.get("enabled"):
+            return []
+        variables = details_cfg.get("variables", [])
+        ordered = [var for var in DETAIL_RENDER_SEQUENCE if var in variables]
+        if not ordered:
+            return []
+        return compose_detail_panel_lines(
+            ordered,
+            certification_number=(
+                certification_number if "certification_number" in ordered else None
+            ),
+            **self.detail_values,
+        )
+
+    def badge_paths(self, certification_number: str) -> tuple[str, str]:
+        """Return ``(abs_path, rel_path)`` for a badge PNG in this session."""
+
+        rel_path = os.path.join(self.rel_dir, f"{certification_number}.png")
+        site_root = current_app.config.get("SITE_ROOT", "/srv")
+        return os.path.join(site_root, "certificates", rel_path), rel_path
+
+
+class CertificateRecipient(NamedTuple):
+    participant_id: int
+    email: str
+    display_name: str
+    completion_date: date | None
+
+
+def _resolve_context_fonts(
+    size_layout: Mapping[str, Any],
+    allowed_fonts: Sequence[str],
+    owner: Any,
+    paper_size: str,
+    warnings: list[str] | None = None,
+) -> dict[str, str]:
+    available_fonts = _available_font_codes()
+    fonts = {
+        line: _resolve_font(
+            size_layout[line]["font"],
+            allowed_fonts,
+            available_fonts,
+            owner,
+            paper_size,
+            line,
+            warnings,
+        )
+        for line in ("name", "workshop", "date")
+    }
+    if size_layout.get("details", {}).get("enabled"):
+        fonts["details"] = _resolve_font(
+            fonts["date"],
+            allowed_fonts,
+            available_fonts,
+            owner,
+            paper_size,
+            "details",
+            warnings,
+        )
+    return fonts
+
+
+def build_preview_context(
+    series: CertificateTemplateSeries,
+    *,
+    paper_size: str,
+    language: str,
+    layout: Mapping[str, Any],
+    warnings: list[str] | None = None,
+) -> CertificateRenderContext:
+    """Resolve template and fonts for a series preview (no session data)."""
+
+    resolution = resolve_series_template(series.id, paper_size, language)
+    allowed_fonts = tuple(_language_allowed_fonts(language))
+    owner = SimpleNamespace(id=f"series-{series.id}", workshop_language=language)
+    return CertificateRenderContext(
+        series_id=series.id,
+        series_code=(series.code or "").strip().upper(),
+        paper_size=paper_size,
+        language=language,
+        template=resolution,
+        layout=MappingProxyType(dict(layout)),
+        allowed_fonts=allowed_fonts,
+        fonts=MappingProxyType(
+            _resolve_context_fonts(layout, allowed_fonts, owner, paper_size, warnings)
+        ),
     )
 
-    _render_badge_png(source_path, abs_path, pnginfo=meta)
-    os.chmod(abs_path, 0o644)
-    current_app.logger.info("[BADGE] wrote %s", abs_path)
 
+def build_render_context(session: Session) -> CertificateRenderContext:
+    """Resolve everything learner-independent for rendering ``session``."""
 
-def render_certificate(
-    session: Session,
-    participant_account: ParticipantAccount,
-    layout_version: str = "v1",
-) -> str:
-    assets_dir = os.path.join(current_app.root_path, "assets")
     mapping, effective_size = get_template_mapping(session)
     series = mapping.series if mapping else None
     if not series and session.workshop_type and session.workshop_type.cert_series:
@@ -679,100 +867,113 @@ def render_certificate(
         or "en"
     )
     resolution = resolve_series_template(series.id, effective_size, language)
-    template_path = resolution.path
+    with open(resolution.path, "rb") as fh:
+        template_pdf = fh.read()
 
-    participant = (
-        db.session.query(Participant)
-        .filter(
-            (Participant.account_id == participant_account.id)
-            | (db.func.lower(Participant.email) == participant_account.email.lower())
+    series_layout = sanitize_series_layout(series.layout_config)
+    size_layout = series_layout.get(effective_size, series_layout["A4"])
+    allowed_fonts = tuple(_language_allowed_fonts(session.workshop_language))
+    fonts = _resolve_context_fonts(size_layout, allowed_fonts, session, effective_size)
+
+    variables = size_layout.get("details", {}).get("variables", [])
+    detail_values: dict[str, str | None] = {}
+    if size_layout.get("details", {}).get("enabled"):
+        formatters = {
+            "facilitators": ("facilitators", _format_facilitators),
+            "location": ("location_title", _format_location),
+            "dates": ("dates", _format_session_dates),
+            "class_days": ("class_days", _format_class_days),
+            "contact_hours": ("contact_hours", _format_contact_hours),
+        }
+        for key, (variable, formatter) in formatters.items():
+            detail_values[key] = formatter(session) if variable in variables else None
+
+    days = session.number_of_class_days or 0
+    required_days: frozenset[int] = frozenset()
+    attended: dict[int, set[int]] = {}
+    if not session.materials_only and days > 0:
+        required_days = frozenset(range(1, days + 1))
+        rows = (
+            db.session.query(
+                ParticipantAttendance.participant_id,
+                ParticipantAttendance.day_index,
+            )
+            .filter(
+                ParticipantAttendance.session_id == session.id,
+                ParticipantAttendance.attended.is_(True),
+            )
+            .all()
         )
-        .first()
-    )
-    if not participant:
-        raise ValueError("participant not found")
-    link = (
-        db.session.query(SessionParticipant)
-        .filter_by(session_id=session.id, participant_id=participant.id)
-        .one_or_none()
+        for participant_id, day_index in rows:
+            attended.setdefault(participant_id, set()).add(day_index)
+
+    _, rel_dir, _ = _certificate_storage_paths(session)
+    return CertificateRenderContext(
+        series_id=series.id,
+        series_code=series_code,
+        paper_size=effective_size,
+        language=language,
+        template=resolution,
+        template_pdf=template_pdf,
+        layout=MappingProxyType(size_layout),
+        allowed_fonts=allowed_fonts,
+        fonts=MappingProxyType(fonts),
+        session=session,
+        session_id=session.id,
+        workshop_name=(
+            session.workshop_type.name
+            if session.workshop_type
+            else (session.title or "")
+        ),
+        workshop_code=(
+            session.workshop_type.code
+            if session.workshop_type and session.workshop_type.code
+            else "WORKSHOP"
+        ),
+        default_completion=session.end_date,
+        rel_dir=rel_dir,
+        detail_values=MappingProxyType(detail_values),
+        required_days=required_days,
+        attended_days=MappingProxyType(
+            {pid: frozenset(days_) for pid, days_ in attended.items()}
+        ),
     )
-    if not link:
-        raise ValueError("participant not in session")
-    if not _participant_has_full_attendance(session, participant.id):
-        current_app.logger.info(
-            "[cert-gate] blocked generation: participant_id=%s session_id=%s reason=not_full_attendance",
-            participant.id,
-            session.id,
-        )
-        raise CertificateAttendanceError(
-            "Full attendance required to generate certificate."
-        )
-    completion = link.completion_date or session.end_date
-    if not completion:
-        raise ValueError("missing completion date")
 
-    workshop = (
-        session.workshop_type.name if session.workshop_type else (session.title or "")
-    )
+
+def certificate_recipient(
+    ctx: CertificateRenderContext,
+    participant: Participant,
+    participant_account: ParticipantAccount,
+    link: SessionParticipant,
+) -> CertificateRecipient:
     display_name = (
         (participant_account.certificate_name or "").strip()
         or participant_account.full_name
         or participant_account.email
     )
-
-    participant_id = participant.id
-    cert = (
-        db.session.query(Certificate)
-        .filter_by(session_id=session.id, participant_id=participant_id)
-        .one_or_none()
+    return CertificateRecipient(
+        participant_id=participant.id,
+        email=participant_account.email,
+        display_name=display_name,
+        completion_date=link.completion_date or ctx.default_completion,
     )
-    if not cert:
-        cert = Certificate(session_id=session.id, participant_id=participant_id)
-        db.session.add(cert)
 
-    needs_badge_number = not bool(cert.certification_number)
-    assigned_badge_number = False
-    if needs_badge_number:
-        cert.certification_number = generate_badge_number(session, series_code)
-        assigned_badge_number = True
-    certification_number = cert.certification_number
 
-    base_reader = PdfReader(template_path)
-    base_page = base_reader.pages[0]
+def _render_certificate_pdf(
+    ctx: CertificateRenderContext,
+    display_name: str,
+    completion: date,
+    certification_number: str | None,
+) -> bytes:
+    base_page = PdfReader(BytesIO(ctx.template_pdf)).pages[0]
     w = float(base_page.mediabox.width)
     h = float(base_page.mediabox.height)
     mm = lambda v: v * 72.0 / 25.4
     center_x = w / 2.0
-
-    series_layout = sanitize_series_layout(series.layout_config)
-    size_layout = series_layout.get(effective_size, series_layout["A4"])
-    allowed_fonts = _language_allowed_fonts(session.workshop_language)
-    available_fonts = _available_font_codes()
-
-    name_font = _resolve_font(
-        size_layout["name"]["font"],
-        allowed_fonts,
-        available_fonts,
-        session,
-        effective_size,
-        "name",
-    )
-    workshop_font = _resolve_font(
-        size_layout["workshop"]["font"],
-        allowed_fonts,
-        available_fonts,
-        session,
-        effective_size,
-        "workshop",
-    )
-    date_font = _resolve_font(
-        size_layout["date"]["font"],
-        allowed_fonts,
-        available_fonts,
-        session,
-        effective_size,
-        "date",
-    )
+    size_layout = ctx.layout
+    name_font = ctx.fonts["name"]
+    workshop_font = ctx.fonts["workshop"]
+    date_font = ctx.fonts["date"]
     name_y = mm(size_layout["name"]["y_mm"])
     workshop_y = mm(size_layout["workshop"]["y_mm"])
     date_y = mm(size_layout["date"]["y_mm"])
@@ -789,13 +990,14 @@ def render_certificate(
     c = canvas.Canvas(buffer, pagesize=(w, h))
     base_name_width = w - mm(40)
     name_width = base_name_width
-    if effective_size == "LETTER":
+    if ctx.paper_size == "LETTER":
         name_width -= mm(2 * LETTER_NAME_INSET_MM)
     name_pt = fit_text(display_name, name_font, 48, 32, name_width)
     c.setFont(name_font, name_pt)
     c.setFillGray(0.25)
     c.drawCentredString(center_x, name_y, display_name)
 
+    workshop = ctx.workshop_name
     workshop_pt = fit_text(workshop, workshop_font, 40, 28, w - mm(40))
     c.setFont(workshop_font, workshop_pt)
     c.setFillGray(0.3)
@@ -810,46 +1012,34 @@ def render_certificate(
     )
 
     details_cfg = size_layout.get("details", {})
-    if details_cfg.get("enabled"):
-        detail_lines = _build_details_lines(
-            session,
-            details_cfg.get("variables", []),
-            certification_number=certification_number,
-        )
-        if detail_lines:
-            detail_font = _resolve_font(
-                date_font,
-                allowed_fonts,
-                available_fonts,
-                session,
-                effective_size,
-                "details",
+    detail_lines = ctx.detail_lines(certification_number)
+    if detail_lines:
+        detail_font = ctx.fonts["details"]
+        margin_x = mm(DEFAULT_BOTTOM_MARGIN_MM)
+        size_percent_raw = details_cfg.get("size_percent", DETAIL_SIZE_MAX_PERCENT)
+        try:
+            size_percent_int = int(size_percent_raw)
+        except (TypeError, ValueError):
+            size_percent_int = DETAIL_SIZE_MAX_PERCENT
+        if size_percent_int < DETAIL_SIZE_MIN_PERCENT or size_percent_int > DETAIL_SIZE_MAX_PERCENT:
+            size_percent_int = max(
+                DETAIL_SIZE_MIN_PERCENT,
+                min(size_percent_int, DETAIL_SIZE_MAX_PERCENT),
             )
-            margin_x = mm(DEFAULT_BOTTOM_MARGIN_MM)
-            size_percent_raw = details_cfg.get("size_percent", DETAIL_SIZE_MAX_PERCENT)
-            try:
-                size_percent_int = int(size_percent_raw)
-            except (TypeError, ValueError):
-                size_percent_int = DETAIL_SIZE_MAX_PERCENT
-            if size_percent_int < DETAIL_SIZE_MIN_PERCENT or size_percent_int > DETAIL_SIZE_MAX_PERCENT:
-                size_percent_int = max(
-                    DETAIL_SIZE_MIN_PERCENT,
-                    min(size_percent_int, DETAIL_SIZE_MAX_PERCENT),
-                )
-            scale = size_percent_int / 100.0
-            detail_font_size = DETAILS_FONT_SIZE_PT * scale
-            line_spacing = DETAILS_LINE_SPACING_PT * scale
-            c.setFont(detail_font, detail_font_size)
-            c.setFillGray(0.3)
-            total_lines = len(detail_lines)
-            for index, line in enumerate(detail_lines):
-                y_pos = mm(DEFAULT_BOTTOM_MARGIN_MM) + (
-                    total_lines - index - 1
-                ) * line_spacing
-                if details_cfg.get("side", "LEFT") == "RIGHT":
-                    c.drawRightString(w - margin_x, y_pos, line)
-                else:
-                    c.drawString(margin_x, y_pos, line)
+        scale = size_percent_int / 100.0
+        detail_font_size = DETAILS_FONT_SIZE_PT * scale
+        line_spacing = DETAILS_LINE_SPACING_PT * scale
+        c.setFont(detail_font, detail_font_size)
+        c.setFillGray(0.3)
+        total_lines = len(detail_lines)
+        for index, line in enumerate(detail_lines):
+            y_pos = mm(DEFAULT_BOTTOM_MARGIN_MM) + (
+                total_lines - index - 1
+            ) * line_spacing
+            if details_cfg.get("side", "LEFT") == "RIGHT":
+                c.drawRightString(w - margin_x, y_pos, line)
+            else:
+                c.drawString(margin_x, y_pos, line)
 
     c.save()
     buffer.seek(0)
@@ -857,21 +1047,56 @@ def render_certificate(
     base_page.merge_page(overlay_page)
     writer = PdfWriter()
     writer.add_page(base_page)
-
-    cert_root, rel_dir, abs_dir = _certificate_storage_paths(session)
-    ensure_dir(abs_dir)
-    code = (
-        session.workshop_type.code
-        if session.workshop_type and session.workshop_type.code
-        else "WORKSHOP"
-    )
-    filename = f"{code}_{slug_certificate_name(display_name)}_{completion.strftime('%Y-%m-%d')}.pdf"
-    rel_path = os.path.join(rel_dir, filename)
-    full_path = os.path.join(cert_root, rel_path)
     out_buf = BytesIO()
     writer.write(out_buf)
-    write_atomic(full_path, out_buf.getvalue())
-    os.chmod(full_path, 0o644)  # world-readable for Caddy
+    return out_buf.getvalue()
+
+
+def render_participant_certificate(
+    ctx: CertificateRenderContext,
+    recipient: CertificateRecipient,
+    *,
+    write_badge: bool = True,
+) -> str:
+    """Render, store and record one learner's certificate; return its path."""
+
+    participant_id = recipient.participant_id
+    if not ctx.has_full_attendance(participant_id):
+        current_app.logger.info(
+            "[cert-gate] blocked generation: participant_id=%s session_id=%s reason=not_full_attendance",
+            participant_id,
+            ctx.session_id,
+        )
+        raise CertificateAttendanceError(
+            "Full attendance required to generate certificate."
+        )
+    completion = recipient.completion_date
+    if not completion:
+        raise ValueError("missing completion date")
+    display_name = recipient.display_name
+    workshop = ctx.workshop_name
+
+    cert = (
+        db.session.query(Certificate)
+        .filter_by(session_id=ctx.session_id, participant_id=participant_id)
+        .one_or_none()
+    )
+    if not cert:
+        cert = Certificate(session_id=ctx.session_id, participant_id=participant_id)
+        db.session.add(cert)
+
+    needs_badge_number = not bool(cert.certification_number)
+    if needs_badge_number:
+        cert.certification_number = generate_badge_number(ctx.session, ctx.series_code)
+    certification_number = cert.certification_number
+
+    filename = f"{ctx.workshop_code}_{slug_certificate_name(display_name)}_{completion.strftime('%Y-%m-%d')}.pdf"
+    rel_path = os.path.join(ctx.rel_dir, filename)
+    # Stored 0644 so Caddy can serve it.
+    get_store().put_bytes(
+        _certificate_key(rel_path),
+        _render_certificate_pdf(ctx, display_name, completion, certification_number),
+    )
 
     def _apply_certificate_updates(target: Certificate) -> None:
         target.certificate_name = display_name
@@ -892,43 +1117,62 @@ def render_certificate(
                 raise
             attempts += 1
             db.session.rollback()
-            assigned_badge_number = False
             cert = (
                 db.session.query(Certificate)
-                .filter_by(session_id=session.id, participant_id=participant_id)
+                .filter_by(session_id=ctx.session_id, participant_id=participant_id)
                 .one_or_none()
             )
             if not cert:
-                cert = Certificate(session_id=session.id, participant_id=participant_id)
+                cert = Certificate(session_id=ctx.session_id, participant_id=participant_id)
                 db.session.add(cert)
             _apply_certificate_updates(cert)
             if not cert.certification_number:
-                cert.certification_number = generate_badge_number(session, series_code)
-                assigned_badge_number = True
+                cert.certification_number = generate_badge_number(
+                    ctx.session, ctx.series_code
+                )
             needs_badge_number = not bool(cert.certification_number)
-            certification_number = cert.certification_number
     certification_number = cert.certification_number
-    should_write_badge = assigned_badge_number
-    if certification_number:
-        badge_abs_path, _, _ = _badge_output_paths(
-            session, certification_number
-        )
-        if os.path.exists(badge_abs_path):
-            should_write_badge = False
-        else:
-            should_write_badge = True
-    if should_write_badge and certification_number:
-        write_badge_png_for_certificate(cert)
+    if write_badge and certification_number:
+        _badge_abs_path, badge_rel_path = ctx.badge_paths(certification_number)
+        if not get_store().exists(_certificate_key(badge_rel_path)):
+            write_badge_png_for_certificate(cert)
 
     current_app.logger.info(
         "[CERT] email=%s session=%s path=%s",
-        participant_account.email,
-        session.id,
+        recipient.email,
+        ctx.session_id,
         rel_path,
     )
     return rel_path
 
 
+def render_certificate(
+    session: Session,
+    participant_account: ParticipantAccount,
+    layout_version: str = "v1",
+    *,
+    write_badge: bool = True,
+    context: CertificateRenderContext | None = None,
+) -> str:
+    ctx = context or build_render_context(session)
+    in_session = (
+        db.session.query(Participant, SessionParticipant)
+        .join(SessionParticipant, SessionParticipant.participant_id == Participant.id)
+        .filter(SessionParticipant.session_id == session.id)
+    )
+    row = in_session.filter(Participant.account_id == participant_account.id).first()
+    if row is None:
+        # Rows created before the account existed are only linked by email.
+        row = in_session.filter(
+            db.func.lower(Participant.email) == participant_account.email.lower()
+        ).first()
+    if row is None:
+        raise ValueError("participant not in session")
+    participant, link = row
+    recipient = certificate_recipient(ctx, participant, participant_account, link)
+    return render_participant_certificate(ctx, recipient, write_badge=write_badge)
+
+
 def render_for_session(
     session_id: int, emails: Iterable[str] | None = None
 ) -> tuple[int, int, list[str]]:
@@ -936,47 +1180,68 @@ def render_for_session(
     if not session or getattr(session, "cancelled", False):
         return 0, 0, []
     q = (
-        db.session.query(SessionParticipant)
-        .join(Participant, SessionParticipant.participant_id == Participant.id)
+        db.session.query(Participant, SessionParticipant)
+        .join(SessionParticipant, SessionParticipant.participant_id == Participant.id)
         .filter(SessionParticipant.session_id == session_id)
+        .options(selectinload(Participant.account))
     )
     if emails:
         emails = [e.lower() for e in emails]
         q = q.filter(db.func.lower(Participant.email).in_(emails))
+    rows = q.all()
+    if not any(participant.account for participant, _ in rows):
+        return 0, 0, []
+    try:
+        ctx = build_render_context(session)
+    except Exception:
+        # Callers run after their own commit; a missing template must not
+        # turn an already-saved change into a 500.
+        current_app.logger.exception("[CERT-FAIL] session=%s render context", session_id)
+        return 0, 0, []
+    # Snapshot learner data up front: each render commits, which expires ORM rows.
+    recipients = [
+        certificate_recipient(ctx, participant, participant.account, link)
+        for participant, link in rows
+        if participant.account
+    ]
     count = 0
     skipped = 0
     paths: list[str] = []
-    for link in q.all():
-        participant = db.session.get(Participant, link.participant_id)
-        if not participant or not participant.account:
-            continue
+    rendered_ids: list[int] = []
+    for recipient in recipients:
         try:
-            rel_path = render_certificate(session, participant.account)
+            rel_path = render_participant_certificate(ctx, recipient, write_badge=False)
             count += 1
             paths.append(rel_path)
+            rendered_ids.append(recipient.participant_id)
         except CertificateAttendanceError:
             skipped += 1
             continue
         except Exception:
             current_app.logger.exception(
-                "[CERT-FAIL] email=%s session=%s", participant.email, session.id
+                "[CERT-FAIL] email=%s session=%s", recipient.email, session_id
             )
+    if rendered_ids:
+        certs = (
+            db.session.query(Certificate)
+            .filter(
+                Certificate.session_id == session_id,
+                Certificate.participant_id.in_(rendered_ids),
+            )
+            .all()
+        )
+        write_badge_pngs(certs)
     return count, skipped, paths
 
 
 def remove_session_certificates(session_id: int, end_date: date) -> int:
     year = (end_date or date.today()).year
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    base_dir = os.path.join(site_root, "certificates", str(year), str(session_id))
+    store = get_store()
     removed = 0
-    if os.path.isdir(base_dir):
-        for name in os.listdir(base_dir):
-            if name.lower().endswith(".pdf"):
-                try:
-                    os.remove(os.path.join(base_dir, name))
-                    removed += 1
-                except FileNotFoundError:
-                    pass
+    for info in list(store.list(f"certificates/{year}/{session_id}")):
+        if info.key.lower().endswith(".pdf"):
+            store.delete(info.key)
+            removed += 1
     return removed
 
 
@@ -993,15 +1258,9 @@ def _language_allowed_fonts(lang_code: str | None) -> list[str]:
     if not lang_code:
         return DEFAULT_LANGUAGE_FONT_CODES.copy()
     lang_name = LANG_CODE_NAMES.get(lang_code, lang_code)
-    lang = (
-        db.session.query(Language)
-        .filter(db.func.lower(Language.name) == lang_name.lower())
-        .one_or_none()
-    )
-    fonts: Sequence[str] | None = getattr(lang, "allowed_fonts", None)
-    filtered = [f for f in (fonts or []) if isinstance(f, str)]
-    if filtered:
-        return filtered
+    lang = reference_data.language_by_name(lang_name)
+    if lang and lang.allowed_fonts:
+        return list(lang.allowed_fonts)
     return DEFAULT_LANGUAGE_FONT_CODES.copy()
 
 
@@ -1091,35 +1350,6 @@ def compose_detail_panel_lines(
     return lines
 
 
-def _build_details_lines(
-    session: Session,
-    variables: Sequence[str],
-    *,
-    certification_number: str | None,
-) -> list[str]:
-    ordered = [var for var in DETAIL_RENDER_SEQUENCE if var in variables]
-    if not ordered:
-        return []
-    facilitators = _format_facilitators(session) if "facilitators" in ordered else None
-    location = _format_location(session) if "location_title" in ordered else None
-    dates = _format_session_dates(session) if "dates" in ordered else None
-    class_days = _format_class_days(session) if "class_days" in ordered else None
-    contact_hours = (
-        _format_contact_hours(session) if "contact_hours" in ordered else None
-    )
-    return compose_detail_panel_lines(
-        ordered,
-        facilitators=facilitators,
-        location=location,
-        dates=dates,
-        class_days=class_days,
-        contact_hours=contact_hours,
-        certification_number=(
-            certification_number if "certification_number" in ordered else None
-        ),
-    )
-
-
 def _format_contact_hours(session: Session) -> str | None:
     start = session.daily_start_time
     end = session.daily_end_time
@@ -0,0 +1,280 @@
+"""Ranked lookup across sessions, clients, learners and certificates.
+
+Backs ``/search/global`` and the nav search box. Every searched column is
+matched with ``lower(column) LIKE '%q%'``; on PostgreSQL those filters are
+answered by the ``pg_trgm`` GIN indexes from migration 0088, which need at
+least three characters to narrow anything, hence ``MIN_QUERY_LENGTH``. Each
+kind fetches a few candidates ordered by how well the main column matches,
+then every hit is ranked in Python across all of its columns:
+
+0. exact match, 1. prefix, 2. prefix of a later word, 3. substring.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from flask import url_for
+from sqlalchemy import case, func, or_, select
+
+from ..app import db
+from ..models import (
+    Certificate,
+    Client,
+    Participant,
+    ParticipantAccount,
+    Session,
+    SessionParticipant,
+)
+
+MIN_QUERY_LENGTH = 3
+PER_KIND_LIMIT = 5
+MAX_PER_KIND_LIMIT = 20
+# Candidates fetched per kind before ranking across all columns.
+CANDIDATE_FACTOR = 4
+
+KINDS = ("session", "client", "participant", "account", "certificate")
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    label: str
+    detail: str
+    url: str | None
+    rank: int
+
+    def as_dict(self) -> dict:
+        return self._asdict()
+
+
+def normalize_query(raw: str | None) -> str:
+    return " ".join((raw or "").split()).lower()
+
+
+def _pattern(q: str) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _contains(pattern: str, *columns):
+    return or_(*(func.lower(col).like(pattern, escape="\\") for col in columns))
+
+
+def _candidate_order(column, q: str, pattern: str):
+    lowered = func.lower(column)
+    prefix = pattern[1:]
+    return (
+        case(
+            (lowered == q, 0),
+            (lowered.like(prefix, escape="\\"), 1),
+            (lowered.like(f"% {prefix}", escape="\\"), 2),
+            else_=3,
+        ),
+        func.length(column),
+    )
+
+
+def match_rank(q: str, *values: str | None) -> int | None:
+    best = None
+    for value in values:
+        text = (value or "").lower()
+        if not text or q not in text:
+            continue
+        if text == q:
+            rank = 0
+        elif text.startswith(q):
+            rank = 1
+        elif f" {q}" in text:
+            rank = 2
+        else:
+            rank = 3
+        best = rank if best is None else min(best, rank)
+    return best
+
+
+def _session_url(session_id: int | None) -> str | None:
+    if not session_id:
+        return None
+    return url_for("sessions.session_detail", session_id=session_id)
+
+
+def _sessions(q: str, pattern: str, limit: int) -> list[SearchHit]:
+    rows = db.session.execute(
+        select(
+            Session.id,
+            Session.title,
+            Session.location,
+            Session.start_date,
+            Client.name,
+        )
+        .outerjoin(Client, Session.client_id == Client.id)
+        .where(_contains(pattern, Session.title, Session.location))
+        .order_by(*_candidate_order(Session.title, q, pattern), Session.id.desc())
+        .limit(limit)
+    ).all()
+    hits = []
+    for sid, title, location, start_date, client_name in rows:
+        detail = " · ".join(
+            part
+            for part in (client_name, location, start_date and start_date.isoformat())
+            if part
+        )
+        hits.append(
+            SearchHit(
+                "session",
+                sid,
+                title or f"Session {sid}",
+                detail,
+                _session_url(sid),
+                match_rank(q, title, location),
+            )
+        )
+    return hits
+
+
+def _clients(q: str, pattern: str, limit: int) -> list[SearchHit]:
+    rows = db.session.execute(
+        select(Client.id, Client.name, Client.status)
+        .where(_contains(pattern, Client.name))
+        .order_by(*_candidate_order(Client.name, q, pattern))
+        .limit(limit)
+    ).all()
+    return [
+        SearchHit(
+            "client",
+            cid,
+            name,
+            status or "",
+            url_for("clients.edit_client", client_id=cid),
+            match_rank(q, name),
+        )
+        for cid, name, status in rows
+    ]
+
+
+def _participants(q: str, pattern: str, limit: int) -> list[SearchHit]:
+    latest_session = (
+        select(func.max(SessionParticipant.session_id))
+        .where(SessionParticipant.participant_id == Participant.id)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(
+        select(
+            Participant.id,
+            Participant.email,
+            Participant.full_name,
+            Participant.first_name,
+            Participant.last_name,
+            latest_session,
+        )
+        .where(
+            _contains(
+                pattern,
+                Participant.email,
+                Participant.full_name,
+                Participant.first_name,
+                Participant.last_name,
+            )
+        )
+        .order_by(*_candidate_order(Participant.email, q, pattern))
+        .limit(limit)
+    ).all()
+    hits = []
+    for pid, email, full_name, first_name, last_name, session_id in rows:
+        name = (full_name or " ".join(p for p in (first_name, last_name) if p)).strip()
+        hits.append(
+            SearchHit(
+                "participant",
+                pid,
+                name or email,
+                email if name else "",
+                _session_url(session_id),
+                match_rank(q, email, full_name, first_name, last_name),
+            )
+        )
+    return hits
+
+
+def _accounts(q: str, pattern: str, limit: int) -> list[SearchHit]:
+    latest_session = (
+        select(func.max(SessionParticipant.session_id))
+        .join(Participant, Participant.id == SessionParticipant.participant_id)
+        .where(Participant.account_id == ParticipantAccount.id)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(
+        select(
+            ParticipantAccount.id,
+            ParticipantAccount.email,
+            ParticipantAccount.full_name,
+            latest_session,
+        )
+        .where(_contains(pattern, ParticipantAccount.email, ParticipantAccount.full_name))
+        .order_by(*_candidate_order(ParticipantAccount.email, q, pattern))
+        .limit(limit)
+    ).all()
+    return [
+        SearchHit(
+            "account",
+            aid,
+            full_name or email,
+            email,
+            _session_url(session_id),
+            match_rank(q, email, full_name),
+        )
+        for aid, email, full_name, session_id in rows
+    ]
+
+
+def _certificates(q: str, pattern: str, limit: int) -> list[SearchHit]:
+    rows = db.session.execute(
+        select(
+            Certificate.id,
+            Certificate.certification_number,
+            Certificate.certificate_name,
+            Certificate.workshop_name,
+            Certificate.session_id,
+        )
+        .where(_contains(pattern, Certificate.certification_number))
+        .order_by(*_candidate_order(Certificate.certification_number, q, pattern))
+        .limit(limit)
+    ).all()
+    return [
+        SearchHit(
+            "certificate",
+            cid,
+            number,
+            " · ".join(part for part in (name, workshop) if part),
+            _session_url(session_id),
+            match_rank(q, number),
+        )
+        for cid, number, name, workshop, session_id in rows
+    ]
+
+
+_SEARCHERS = {
+    "session": _sessions,
+    "client": _clients,
+    "participant": _participants,
+    "account": _accounts,
+    "certificate": _certificates,
+}
+
+
+def search(raw_query: str | None, limit: int = PER_KIND_LIMIT) -> list[SearchHit]:
+    """Return up to ``limit`` hits per kind, best matches first."""
+
+    q = normalize_query(raw_query)
+    if len(q) < MIN_QUERY_LENGTH:
+        return []
+    limit = max(1, min(limit, MAX_PER_KIND_LIMIT))
+    pattern = _pattern(q)
+    hits: list[SearchHit] = []
+    for kind in KINDS:
+        found = _SEARCHERS[kind](q, pattern, limit * CANDIDATE_FACTOR)
+        found = [hit for hit in found if hit.rank is not None]
+        found.sort(key=lambda hit: (hit.rank, len(hit.label)))
+        hits.extend(found[:limit])
+    hits.sort(key=lambda hit: (hit.rank, KINDS.index(hit.kind)))
+    return hits
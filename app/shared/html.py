@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import hashlib
 import html
 import re
+import threading
 from html.parser import HTMLParser
 from urllib.parse import urlparse
 
@@ -32,15 +34,57 @@ PREWORK_ALLOWED_TAGS = ["p", "br", "strong", "em", "ul", "ol", "li", "a"]
 PREWORK_ALLOWED_ATTRS = {"a": ["href"]}
 
 
-def _clean_html(raw: str, tags: list[str], attrs: dict[str, list[str]]) -> str:
-    if bleach:
-        cleaner = bleach.Cleaner(
+# bleach.Cleaner keeps parser state and is not thread-safe, so each worker
+# thread builds its cleaners once and reuses them for every call.
+_cleaners = threading.local()
+
+# Sanitized output keyed by (whitelist, content hash). Rows saved before
+# sanitize-on-write and legacy prework snapshots render through this memo.
+_MEMO_LIMIT = 4096
+_memo: dict[tuple[str, str], str] = {}
+_memo_lock = threading.Lock()
+
+
+def content_hash(raw: str | None) -> str:
+    """Return the SHA-256 hex digest used to key sanitized HTML."""
+
+    return hashlib.sha256((raw or "").encode("utf-8")).hexdigest()
+
+
+def _cleaner(tags: list[str], attrs: dict[str, list[str]]):
+    key = (tuple(tags), tuple((tag, tuple(v)) for tag, v in sorted(attrs.items())))
+    cache = getattr(_cleaners, "by_whitelist", None)
+    if cache is None:
+        cache = _cleaners.by_whitelist = {}
+    cleaner = cache.get(key)
+    if cleaner is None:
+        cleaner = cache[key] = bleach.Cleaner(
             tags=tags,
             attributes=attrs,
             protocols=["http", "https"],
             strip=True,
         )
-        return cleaner.clean(raw or "")
+    return cleaner
+
+
+def _memoized(kind: str, raw: str, clean) -> str:
+    if not raw:
+        return ""
+    key = (kind, content_hash(raw))
+    cached = _memo.get(key)
+    if cached is not None:
+        return cached
+    cleaned = clean(raw)
+    with _memo_lock:
+        if len(_memo) >= _MEMO_LIMIT:
+            _memo.clear()
+        _memo[key] = cleaned
+    return cleaned
+
+
+def _clean_html(raw: str, tags: list[str], attrs: dict[str, list[str]]) -> str:
+    if bleach:
+        return _cleaner(tags, attrs).clean(raw or "")
     if not raw:
         return ""
 
@@ -124,12 +168,12 @@ def _clean_html(raw: str, tags: list[str], attrs: dict[str, list[str]]) -> str:
 def sanitize_html(raw: str) -> str:
     """Sanitize HTML based on a small whitelist."""
 
-    return _clean_html(raw, ALLOWED_TAGS, ALLOWED_ATTRS)
-
+    return _memoized(
+        "rich", raw, lambda value: _clean_html(value, ALLOWED_TAGS, ALLOWED_ATTRS)
+    )
 
-def sanitize_prework_html(raw: str) -> str:
-    """Sanitize prework question text allowing limited rich text."""
 
+def _prework_html(raw: str) -> str:
     cleaned = _clean_html(raw, PREWORK_ALLOWED_TAGS, PREWORK_ALLOWED_ATTRS)
     if not cleaned:
         return ""
@@ -140,3 +184,9 @@ def sanitize_prework_html(raw: str) -> str:
         flags=re.IGNORECASE,
     )
 
+
+def sanitize_prework_html(raw: str) -> str:
+    """Sanitize prework question text allowing limited rich text."""
+
+    return _memoized("prework", raw, _prework_html)
+
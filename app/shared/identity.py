@@ -0,0 +1,94 @@
+"""The authenticated identity behind the current request, loaded once.
+
+Decorators, the ``inject_user`` context processor, ``before_request`` hooks and
+handlers all need the logged-in ``User`` and, for staff, the participant
+account that shares their email. ``current_identity()`` resolves both lazily
+and keeps them in the request's WSGI environ (not ``flask.g``, which outlives
+the request when an app context is shared, e.g. in tests, benchmarks and CLI
+tasks) so every caller in one request shares the same objects and derived role
+flags. The cached identity is keyed on the session's
+``user_id``/``participant_account_id`` and is rebuilt if a handler logs someone
+in or out mid-request.
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+
+from flask import request, session
+
+from ..app import db
+from ..models import ParticipantAccount, Session, User
+from . import acl
+
+_ENVIRON_KEY = "cbs.identity"
+
+
+class RequestIdentity:
+    def __init__(self, user_id: int | None, account_id: int | None):
+        self.user_id = user_id
+        self.session_account_id = account_id
+
+    @property
+    def key(self) -> tuple[int | None, int | None]:
+        return (self.user_id, self.session_account_id)
+
+    @cached_property
+    def user(self) -> User | None:
+        if not self.user_id:
+            return None
+        return db.session.get(User, self.user_id)
+
+    @cached_property
+    def account(self) -> ParticipantAccount | None:
+        """The session's participant account, or the staff user's shadow account."""
+
+        if self.session_account_id:
+            return db.session.get(ParticipantAccount, self.session_account_id)
+        user = self.user
+        if not user or not user.email:
+            return None
+        return (
+            db.session.query(ParticipantAccount)
+            .filter(db.func.lower(ParticipantAccount.email) == user.email.lower())
+            .one_or_none()
+        )
+
+    @property
+    def account_id(self) -> int | None:
+        if self.session_account_id:
+            return self.session_account_id
+        account = self.account
+        return account.id if account else None
+
+    @cached_property
+    def is_kt_staff(self) -> bool:
+        return acl.is_kt_staff(self.user)
+
+    @cached_property
+    def is_certificate_manager_only(self) -> bool:
+        return acl.is_certificate_manager_only(self.user)
+
+    @cached_property
+    def is_csa(self) -> bool:
+        """True when the (shadow) participant account is CSA on any session."""
+
+        account_id = self.account_id
+        if not account_id:
+            return False
+        return (
+            db.session.query(Session.id)
+            .filter(Session.csa_account_id == account_id)
+            .first()
+            is not None
+        )
+
+
+def current_identity() -> RequestIdentity:
+    key = (session.get("user_id"), session.get("participant_account_id"))
+    identity = request.environ.get(_ENVIRON_KEY)
+    if identity is None or identity.key != key:
+        identity = RequestIdentity(*key)
+        request.environ[_ENVIRON_KEY] = identity
+    return identity
+
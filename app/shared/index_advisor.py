@@ -0,0 +1,100 @@
+"""PostgreSQL index usage report behind ``manage.py index_advisor``.
+
+Statistics come from ``pg_stat_user_indexes`` / ``pg_stat_user_tables`` and
+accumulate from the last ``pg_stat_reset()``, so run the report against a
+database that has served real traffic for a while.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Non-unique indexes that back no constraint and have been scanned at most
+# ``max_scans`` times. Constraint indexes are excluded because dropping them
+# changes behaviour, not just performance.
+UNUSED_INDEXES_SQL = text(
+    """
+    SELECT s.relname AS table_name,
+           s.indexrelname AS index_name,
+           s.idx_scan AS scans,
+           pg_relation_size(s.indexrelid) AS size_bytes
+      FROM pg_stat_user_indexes s
+      JOIN pg_index i ON i.indexrelid = s.indexrelid
+     WHERE s.schemaname = current_schema()
+       AND s.idx_scan <= :max_scans
+       AND NOT i.indisunique
+       AND NOT i.indisprimary
+       AND NOT EXISTS (
+             SELECT 1 FROM pg_constraint c WHERE c.conindid = s.indexrelid
+           )
+     ORDER BY size_bytes DESC, table_name, index_name
+    """
+)
+
+# Foreign keys whose columns are not the leading columns of any index. Joins
+# and ``ON DELETE`` cascades on these columns fall back to sequential scans.
+UNINDEXED_FOREIGN_KEYS_SQL = text(
+    """
+    SELECT c.conrelid::regclass::text AS table_name,
+           c.conname AS constraint_name,
+           (
+             SELECT string_agg(a.attname, ', ' ORDER BY k.n)
+               FROM unnest(c.conkey) WITH ORDINALITY AS k(attnum, n)
+               JOIN pg_attribute a
+                 ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+           ) AS columns
+      FROM pg_constraint c
+     WHERE c.contype = 'f'
+       AND c.connamespace = current_schema()::regnamespace
+       AND NOT EXISTS (
+             SELECT 1
+               FROM pg_index i
+              WHERE i.indrelid = c.conrelid
+                AND (string_to_array(i.indkey::text, ' ')::int2[])
+                    [1:cardinality(c.conkey)] @> c.conkey
+           )
+     ORDER BY table_name, constraint_name
+    """
+)
+
+# Tables read mostly by sequential scan despite holding enough rows for an
+# index to matter; usually a filter column without a supporting index.
+SEQ_SCAN_HEAVY_SQL = text(
+    """
+    SELECT relname AS table_name,
+           seq_scan,
+           seq_tup_read,
+           COALESCE(idx_scan, 0) AS idx_scan,
+           n_live_tup AS live_rows
+      FROM pg_stat_user_tables
+     WHERE schemaname = current_schema()
+       AND n_live_tup >= :min_rows
+       AND seq_scan > COALESCE(idx_scan, 0)
+     ORDER BY seq_tup_read DESC, table_name
+    """
+)
+
+
+def index_report(
+    conn: Connection, *, max_scans: int = 0, min_rows: int = 1000
+) -> dict[str, list[dict]]:
+    """Return unused indexes and likely missing ones for the current schema."""
+
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("index advisor requires PostgreSQL statistics views")
+    return {
+        "unused": [
+            dict(row)
+            for row in conn.execute(
+                UNUSED_INDEXES_SQL, {"max_scans": max_scans}
+            ).mappings()
+        ],
+        "unindexed_foreign_keys": [
+            dict(row) for row in conn.execute(UNINDEXED_FOREIGN_KEYS_SQL).mappings()
+        ],
+        "seq_scan_heavy": [
+            dict(row)
+            for row in conn.execute(SEQ_SCAN_HEAVY_SQL, {"min_rows": min_rows}).mappings()
+        ],
+    }
@@ -2,8 +2,6 @@ from __future__ import annotations
 
 from typing import List, Tuple
 
-from ..models import Language
-
 # Mapping of language codes to human-readable names
 LANG_CODE_NAMES: dict[str, str] = {
     "en": "English",
@@ -20,17 +18,13 @@ NAME_TO_CODE = {v: k for k, v in LANG_CODE_NAMES.items()}
 
 def get_language_options() -> List[Tuple[str, str]]:
     """Return active language code/name pairs sorted by Language.sort_order."""
-    langs = (
-        Language.query.filter_by(is_active=True)
-        .order_by(Language.sort_order, Language.name)
-        .all()
-    )
-    opts: List[Tuple[str, str]] = []
-    for lang in langs:
-        code = NAME_TO_CODE.get(lang.name)
-        if code:
-            opts.append((code, lang.name))
-    return opts
+    from . import reference_data
+
+    return [
+        (lang.code, lang.name)
+        for lang in reference_data.languages()
+        if lang.is_active and lang.code
+    ]
 
 
 def code_to_label(code: str) -> str:
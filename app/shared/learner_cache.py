@@ -0,0 +1,110 @@
+"""Per-account cache for the learner My Workshops / My Resources pages.
+
+Entries are plain data (no ORM instances) keyed by ``(page, account_id)`` and
+tagged with the ``learner_pages`` row of ``reference_data_versions`` they were
+built at. Any flushed change to resources, enrollments, sessions, facilitators
+or prework assignments bumps that row inside the writing transaction, so every
+Gunicorn worker drops its entries once it re-reads the versions (at most every
+``reference_data.VERSION_CHECK_SECONDS``). The committing worker clears its
+own entries immediately.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, TypeVar
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as OrmSession
+
+from . import reference_data
+
+VERSION_NAME = "learner_pages"
+_MAX_ENTRIES = 5000
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_entries: dict[tuple[str, int], tuple[int, object]] = {}
+
+# Model class names whose changes can alter a learner page. Matched by name so
+# this module stays importable before the models are.
+_WATCHED = frozenset(
+    {
+        "Resource",
+        "WorkshopType",
+        "Session",
+        "SessionParticipant",
+        "SessionFacilitator",
+        "Participant",
+        "PreworkAssignment",
+        "ClientWorkshopLocation",
+        "User",
+    }
+)
+# Login bookkeeping on staff users never shows up on the learner pages.
+_IGNORED_ATTRS = frozenset({"last_login", "password_hash", "must_change_password"})
+_PENDING_KEY = "learner_cache_dirty"
+
+
+def cached(page: str, account_id: int, build: Callable[[], T]) -> T:
+    """Return the cached value for ``(page, account_id)`` or build it."""
+
+    key = (page, account_id)
+    # Read the version before the data, so a concurrent write can only make
+    # an entry look older than it is.
+    version = reference_data._current_versions().get(VERSION_NAME, 0)
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == version:
+            return entry[1]  # type: ignore[return-value]
+    value = build()
+    with _lock:
+        if len(_entries) >= _MAX_ENTRIES:
+            _entries.clear()
+        _entries[key] = (version, value)
+    return value
+
+
+def invalidate() -> None:
+    """Drop this worker's entries and re-read the versions next time."""
+
+    with _lock:
+        _entries.clear()
+    reference_data.invalidate(VERSION_NAME)
+
+
+def _changes_page_data(obj) -> bool:
+    if type(obj).__name__ not in _WATCHED:
+        return False
+    state = inspect(obj)
+    if not state.persistent:
+        return True
+    changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+    return bool(changed - _IGNORED_ATTRS)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _bump_on_flush(session, flush_context):
+    # Attribute history is still intact in ``after_flush``.
+    if not any(
+        map(_changes_page_data, (*session.new, *session.dirty, *session.deleted))
+    ):
+        return
+    reference_data.bump(session.connection(), (VERSION_NAME,))
+    session.info[_PENDING_KEY] = True
+    # A rebuild inside this transaction would otherwise be cached against the
+    # pre-bump version.
+    invalidate()
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(_PENDING_KEY, False):
+        invalidate()
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _invalidate_on_rollback(session):
+    if session.info.pop(_PENDING_KEY, False):
+        invalidate()
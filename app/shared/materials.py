@@ -24,6 +24,14 @@ PHYSICAL_COMPONENTS = [
 ]
 
 
+def friendly_order_type(order_type: str) -> str:
+    if order_type.startswith("KT-Run Standard materials"):
+        return order_type.replace("KT-Run Standard materials", "Standard", 1)
+    if order_type.startswith("KT-Run Modular materials"):
+        return order_type.replace("KT-Run Modular materials", "Modular", 1)
+    return order_type
+
+
 def material_format_choices() -> list[tuple[str, str]]:
     """Return material format options paired with labels."""
     return [(k, MATERIAL_FORMAT_LABELS[k]) for k in MATERIAL_FORMATS]
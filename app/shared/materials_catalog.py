@@ -0,0 +1,132 @@
+"""Indexed snapshot of active ``MaterialsOption`` rows for the material pickers.
+
+``/workshop-types/material-options`` is called every time an order or
+workshop-type default row changes. The catalog is loaded once per version of
+the ``materials_options`` reference-data group (see ``reference_data``), with
+languages, bulk flags and labels precomputed. Each ``(language,
+include_bulk)`` view is built on first use with its items already
+JSON-encoded, so a response only joins bytes and compares an ETag.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import NamedTuple
+
+from sqlalchemy.orm import selectinload
+
+from .languages import NAME_TO_CODE
+from .materials import friendly_order_type
+
+BULK_ORDER_TYPE = "Client-run Bulk order"
+
+
+class MaterialOptionRef(NamedTuple):
+    id: int
+    order_type: str
+    title: str
+    label: str
+    langs: tuple[str, ...]
+    lang_names: frozenset[str]
+    formats: tuple[str, ...]
+    basis: str
+    is_bulk: bool
+
+
+class CatalogView(NamedTuple):
+    options: tuple[MaterialOptionRef, ...]
+    fragments: tuple[tuple[int, bytes], ...]
+    etag: str
+
+    def encode(self, exclude_ids: frozenset[int] = frozenset()) -> tuple[bytes, str]:
+        """Return the ``{"items": [...]}`` body and its ETag."""
+
+        fragments = self.fragments
+        etag = self.etag
+        if exclude_ids:
+            fragments = tuple(f for f in fragments if f[0] not in exclude_ids)
+            skipped = ",".join(str(i) for i in sorted(exclude_ids))
+            etag = hashlib.sha1(f"{etag}-{skipped}".encode()).hexdigest()[:20]
+        return b'{"items":[' + b",".join(f for _id, f in fragments) + b"]}", etag
+
+
+def is_bulk(order_type: str | None, title: str | None, description: str | None) -> bool:
+    """Bulk options are the "Client-run Bulk order" catalog or any option
+    mentioning "bulk" in its title or description."""
+
+    return (
+        (order_type or "").strip().lower() == BULK_ORDER_TYPE.lower()
+        or "bulk" in (title or "").lower()
+        or "bulk" in (description or "").lower()
+    )
+
+
+def _option_ref(option) -> MaterialOptionRef:
+    names = [lang.name for lang in option.languages]
+    langs = tuple(sorted(code for code in (NAME_TO_CODE.get(n) for n in names) if code))
+    label = f"{friendly_order_type(option.order_type)} • {option.title}"
+    if langs:
+        label += f" • [{', '.join(langs)}]"
+    return MaterialOptionRef(
+        id=option.id,
+        order_type=option.order_type,
+        title=option.title,
+        label=label,
+        langs=langs,
+        lang_names=frozenset(n.lower() for n in names),
+        formats=tuple(option.formats or ()),
+        basis=option.quantity_basis,
+        is_bulk=is_bulk(option.order_type, option.title, option.description),
+    )
+
+
+def _fragment(ref: MaterialOptionRef) -> bytes:
+    item = {
+        "id": ref.id,
+        "label": ref.label,
+        "langs": list(ref.langs),
+        "formats": list(ref.formats),
+        "basis": ref.basis,
+    }
+    return json.dumps(item, separators=(",", ":")).encode()
+
+
+class MaterialsCatalog:
+    """Active options ordered by order type then title."""
+
+    def __init__(self, options: tuple[MaterialOptionRef, ...]):
+        self.options = options
+        self._views: dict[tuple[str, bool], CatalogView] = {}
+
+    def view(self, lang_name: str | None, include_bulk: bool) -> CatalogView:
+        """Options offered in ``lang_name`` (any language when empty)."""
+
+        key = ((lang_name or "").lower(), bool(include_bulk))
+        cached = self._views.get(key)
+        if cached is not None:
+            return cached
+        lang, with_bulk = key
+        options = tuple(
+            ref
+            for ref in self.options
+            if (not lang or lang in ref.lang_names) and (with_bulk or not ref.is_bulk)
+        )
+        fragments = tuple((ref.id, _fragment(ref)) for ref in options)
+        digest = hashlib.sha1(b"\n".join(f for _id, f in fragments)).hexdigest()[:20]
+        view = CatalogView(options, fragments, digest)
+        # Racing builders produce equal views, so last write wins harmlessly.
+        self._views[key] = view
+        return view
+
+
+def load() -> MaterialsCatalog:
+    from ..models import MaterialsOption
+
+    rows = (
+        MaterialsOption.query.options(selectinload(MaterialsOption.languages))
+        .filter(MaterialsOption.is_active.is_(True))
+        .order_by(MaterialsOption.order_type, MaterialsOption.title)
+        .all()
+    )
+    return MaterialsCatalog(tuple(_option_ref(row) for row in rows))
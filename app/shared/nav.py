@@ -149,6 +149,11 @@ MAIL_SETTINGS: MenuItem = {
     "label": "Mail & Notification",
     "endpoint": "settings_mail.settings",
 }
+PERFORMANCE: MenuItem = {
+    "id": "performance",
+    "label": "Performance",
+    "endpoint": "settings_performance.report",
+}
 
 SETTINGS_ALL = [
     CLIENTS,
@@ -160,6 +165,7 @@ SETTINGS_ALL = [
     CERT_TEMPLATES,
     USERS,
     MAIL_SETTINGS,
+    PERFORMANCE,
 ]
 SETTINGS_SESSION_MANAGER = [CLIENTS, WORKSHOP_TYPES, RESOURCES_SETTING, CERT_TEMPLATES]
 SETTINGS_MATERIAL_MANAGER = [
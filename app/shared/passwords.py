@@ -1,4 +1,10 @@
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Sequence
+
 from passlib.context import CryptContext
 from passlib.handlers import bcrypt as passlib_bcrypt
 
@@ -32,6 +38,35 @@ def hash_password(plain: str) -> str:
     return pwd_ctx.hash(plain)
 
 
+# Below this many hashes, starting worker processes costs more than it saves.
+HASH_POOL_MIN = 8
+HASH_POOL_MAX_WORKERS = 4
+
+
+def hash_passwords(plains: Sequence[str], *, pool_min: int = HASH_POOL_MIN) -> list[str]:
+    """Hash many passwords, spreading large batches over worker processes.
+
+    Each bcrypt hash is deliberately slow, so bulk account creation hashes
+    in a ``spawn`` pool (safe inside threaded Gunicorn workers) and falls
+    back to hashing inline if the pool cannot start.
+    """
+
+    if len(plains) < max(pool_min, 2):
+        return [hash_password(plain) for plain in plains]
+    workers = min(HASH_POOL_MAX_WORKERS, os.cpu_count() or 1, len(plains))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            chunksize = max(1, len(plains) // (workers * 4))
+            return list(pool.map(hash_password, plains, chunksize=chunksize))
+    except (BrokenProcessPool, OSError):
+        logging.getLogger(__name__).warning(
+            "[PASSWORDS] hash pool unavailable; hashing %d inline", len(plains)
+        )
+        return [hash_password(plain) for plain in plains]
+
+
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify plain password against hash."""
     if not plain or not hashed:
@@ -1,26 +1,32 @@
 from __future__ import annotations
 
+import hashlib
 import io
-import os
 import re
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
 
-from flask import current_app
-from PIL import Image, UnidentifiedImageError
+from PIL import Image, ImageOps, UnidentifiedImageError, features
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+from .blobstore import BlobStoreError, get_store
+
 
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg"}
 MAX_BYTES = 2 * 1024 * 1024
 MAX_DIMENSION = 4096
 PROFILE_ROOT = "uploads/profile_pics"
+# Square thumbnails written next to the original; named
+# "<sha256[:16]>-<px>.<ext>" so they can be cached forever.
+DERIVATIVE_SIZES = (64, 128, 256)
+DERIVATIVE_NAME_RE = re.compile(r"^[0-9a-f]{16}-\d+\.(?:webp|png)$")
 
 
 @dataclass
 class ProfileImageResult:
     relative_path: str
+    variants: dict[str, str] = field(default_factory=dict)
 
 
 class ProfileImageError(ValueError):
@@ -40,10 +46,6 @@ def _validate_extension(filename: str) -> None:
         raise ProfileImageError("Only PNG and JPG images are allowed.")
 
 
-def _ensure_directory(path: str) -> None:
-    os.makedirs(path, exist_ok=True)
-
-
 def _validate_image_bytes(raw: bytes) -> tuple[int, int]:
     if len(raw) > MAX_BYTES:
         raise ProfileImageError("Image is larger than 2 MB.")
@@ -59,8 +61,48 @@ def _validate_image_bytes(raw: bytes) -> tuple[int, int]:
     return width, height
 
 
+def _derivative_format() -> str:
+    return "webp" if features.check("webp") else "png"
+
+
+def _encode_derivative(image: Image.Image, size: int, fmt: str) -> bytes:
+    thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buf = io.BytesIO()
+    if fmt == "webp":
+        thumb.save(buf, format="WEBP", quality=82, method=6)
+    else:
+        thumb.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def build_derivatives(raw: bytes, owner_segment: str) -> dict[str, str]:
+    """Write the square thumbnails for ``raw`` and return ``{px: public path}``."""
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(raw)))
+    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    fmt = _derivative_format()
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    store = get_store()
+    variants: dict[str, str] = {}
+    for size in DERIVATIVE_SIZES:
+        key = f"{PROFILE_ROOT}/{owner_segment}/{digest}-{size}.{fmt}"
+        store.put_bytes(key, _encode_derivative(image, size, fmt))
+        variants[str(size)] = "/" + key
+    return variants
+
+
+def _owner_segment(owner_key: str) -> str:
+    owner_segment = re.sub(r"[^A-Za-z0-9_-]", "", owner_key)
+    if not owner_segment:
+        raise ProfileImageError("Invalid owner identifier.")
+    return owner_segment
+
+
 def save_profile_image(
-    upload: FileStorage, owner_key: str, previous_path: Optional[str] = None
+    upload: FileStorage,
+    owner_key: str,
+    previous_path: Optional[str] = None,
+    previous_variants: Optional[Mapping[str, str]] = None,
 ) -> ProfileImageResult:
     filename = _sanitize_filename(upload.filename or "")
     _validate_extension(filename)
@@ -69,32 +111,35 @@ def save_profile_image(
     upload.stream.seek(0)
     _validate_image_bytes(data)
 
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    owner_segment = re.sub(r"[^A-Za-z0-9_-]", "", owner_key)
-    if not owner_segment:
-        raise ProfileImageError("Invalid owner identifier.")
-    directory = os.path.join(site_root, PROFILE_ROOT, owner_segment)
-    _ensure_directory(directory)
-
-    target_path = os.path.join(directory, filename)
-    with open(target_path, "wb") as fh:
-        fh.write(data)
+    owner_segment = _owner_segment(owner_key)
+    key = f"{PROFILE_ROOT}/{owner_segment}/{filename}"
+    get_store().put_bytes(key, data)
+    variants = build_derivatives(data, owner_segment)
 
     if previous_path:
-        _cleanup_previous(previous_path, target_path)
+        _cleanup_previous(previous_path, key)
+    for old_path in (previous_variants or {}).values():
+        if old_path not in variants.values():
+            _cleanup_previous(old_path, key)
+
+    return ProfileImageResult(relative_path="/" + key, variants=variants)
+
+
+def regenerate_derivatives(relative_path: str, owner_key: str) -> dict[str, str]:
+    """Build thumbnails for an already stored original (backfill)."""
 
-    relative = os.path.relpath(target_path, site_root)
-    return ProfileImageResult(relative_path="/" + relative.replace(os.sep, "/"))
+    data = get_store().read_bytes(relative_path.lstrip("/"))
+    _validate_image_bytes(data)
+    return build_derivatives(data, _owner_segment(owner_key))
 
 
-def _cleanup_previous(previous_path: str, current_path: str) -> None:
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    normalized = previous_path.lstrip("/")
-    candidate = os.path.join(site_root, normalized)
+def _cleanup_previous(previous_path: str, current_key: str) -> None:
+    key = previous_path.strip().lstrip("/")
+    if not key or key == current_key:
+        return
     try:
-        if os.path.isfile(candidate) and os.path.abspath(candidate) != os.path.abspath(current_path):
-            os.remove(candidate)
-    except OSError:
+        get_store().delete(key)
+    except (BlobStoreError, OSError):
         pass
 
 
@@ -104,21 +149,42 @@ def resolve_profile_image(relative_path: Optional[str]) -> Optional[str]:
     safe = relative_path.strip()
     if not safe.startswith("/"):
         safe = "/" + safe
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    candidate = os.path.join(site_root, safe.lstrip("/"))
-    if not os.path.isfile(candidate):
+    try:
+        if not get_store().exists(safe.lstrip("/")):
+            return None
+    except BlobStoreError:
         return None
     return safe
 
 
-def delete_profile_image(relative_path: Optional[str]) -> None:
-    if not relative_path:
-        return
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    normalized = relative_path.lstrip("/")
-    candidate = os.path.join(site_root, normalized)
-    try:
-        if os.path.isfile(candidate):
-            os.remove(candidate)
-    except OSError:
-        pass
+def profile_image_src(
+    relative_path: Optional[str],
+    variants: Optional[Mapping[str, str]],
+    size: int,
+) -> Optional[str]:
+    """Smallest stored thumbnail covering ``size`` px; no filesystem access.
+
+    Images uploaded before thumbnails existed fall back to the original,
+    which still costs a stat.
+    """
+
+    if variants:
+        ordered = sorted((int(px), path) for px, path in variants.items())
+        for px, path in ordered:
+            if px >= size:
+                return path
+        return ordered[-1][1]
+    return resolve_profile_image(relative_path)
+
+
+def delete_profile_image(
+    relative_path: Optional[str], variants: Optional[Mapping[str, str]] = None
+) -> None:
+    store = get_store()
+    for path in [relative_path, *(variants or {}).values()]:
+        if not path:
+            continue
+        try:
+            store.delete(path.strip().lstrip("/"))
+        except (BlobStoreError, OSError):
+            pass
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Dict
 
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 
 from ..app import db, User
 from .constants import DEFAULT_PARTICIPANT_PASSWORD
@@ -11,22 +12,39 @@ from ..models import Participant, ParticipantAccount, SessionParticipant, Sessio
 
 def provision_for_session(session: Session) -> Dict[str, int]:
     created = skipped_staff = reactivated = already_active = 0
-    links = SessionParticipant.query.filter_by(session_id=session.id).all()
-    for link in links:
-        participant = db.session.get(Participant, link.participant_id)
-        if not participant:
-            continue
+    participants = (
+        db.session.query(Participant)
+        .join(SessionParticipant, SessionParticipant.participant_id == Participant.id)
+        .filter(SessionParticipant.session_id == session.id)
+        .all()
+    )
+    emails = {
+        (participant.email or "").lower()
+        for participant in participants
+        if participant.email
+    }
+    staff_emails: set[str] = set()
+    accounts: dict[str, ParticipantAccount] = {}
+    if emails:
+        staff_emails = {
+            email
+            for (email,) in db.session.query(func.lower(User.email)).filter(
+                func.lower(User.email).in_(emails)
+            )
+        }
+        for account in ParticipantAccount.query.filter(
+            func.lower(ParticipantAccount.email).in_(emails)
+        ).order_by(ParticipantAccount.id):
+            accounts.setdefault((account.email or "").lower(), account)
+    for participant in participants:
         email = (participant.email or "").lower()
         if not email:
             continue
         # skip if staff user exists
-        user = User.query.filter(func.lower(User.email) == email).first()
-        if user:
+        if email in staff_emails:
             skipped_staff += 1
             continue
-        account = ParticipantAccount.query.filter(
-            func.lower(ParticipantAccount.email) == email
-        ).first()
+        account = accounts.get(email)
         display_name = participant.display_name
         if not account:
             account = ParticipantAccount(
@@ -37,6 +55,7 @@ def provision_for_session(session: Session) -> Dict[str, int]:
             )
             account.set_password(DEFAULT_PARTICIPANT_PASSWORD)
             db.session.add(account)
+            accounts[email] = account
             created += 1
         else:
             if not account.is_active:
@@ -52,8 +71,8 @@ def provision_for_session(session: Session) -> Dict[str, int]:
                 account.certificate_name = account.full_name
             if account.password_hash is None:
                 account.set_password(DEFAULT_PARTICIPANT_PASSWORD)
-        if participant.account_id != account.id:
-            participant.account_id = account.id
+        if account.id is None or participant.account_id != account.id:
+            participant.account = account
     db.session.commit()
     return {
         "created": created,
@@ -78,24 +97,34 @@ def provision_new_participants_if_ready(session: Session) -> Dict[str, int]:
 
 def deactivate_orphan_accounts_for_session(session_id: int) -> int:
     deactivated = 0
-    links = SessionParticipant.query.filter_by(session_id=session_id).all()
-    for link in links:
-        participant = db.session.get(Participant, link.participant_id)
-        if not participant or not participant.account_id:
-            continue
-        account = db.session.get(ParticipantAccount, participant.account_id)
+    participants = (
+        db.session.query(Participant)
+        .join(SessionParticipant, SessionParticipant.participant_id == Participant.id)
+        .filter(
+            SessionParticipant.session_id == session_id,
+            Participant.account_id.isnot(None),
+        )
+        .options(selectinload(Participant.account))
+        .all()
+    )
+    if not participants:
+        db.session.commit()
+        return 0
+    active_links = dict(
+        db.session.query(SessionParticipant.participant_id, func.count())
+        .join(Session, SessionParticipant.session_id == Session.id)
+        .filter(
+            SessionParticipant.participant_id.in_([p.id for p in participants]),
+            Session.status.notin_(["Cancelled", "Closed", "On Hold"]),
+        )
+        .group_by(SessionParticipant.participant_id)
+        .all()
+    )
+    for participant in participants:
+        account = participant.account
         if not account or not account.is_active:
             continue
-        active_links = (
-            db.session.query(SessionParticipant)
-            .join(Session, SessionParticipant.session_id == Session.id)
-            .filter(
-                SessionParticipant.participant_id == participant.id,
-                Session.status.notin_(["Cancelled", "Closed", "On Hold"]),
-            )
-            .count()
-        )
-        if active_links == 0:
+        if active_links.get(participant.id, 0) == 0:
             account.is_active = False
             deactivated += 1
     db.session.commit()
@@ -2,22 +2,22 @@ from functools import wraps
 
 from flask import abort, redirect, session, url_for, flash
 
-from ..app import db, User
-from ..models import Session, ParticipantAccount
+from ..app import db
+from ..models import Session
 from .acl import (
     is_csa_for_session,
     can_manage_users,
     can_manage_certificate_sessions,
 )
+from .identity import current_identity
 
 
 def app_admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = session.get("user_id")
-        if not user_id:
+        if not session.get("user_id"):
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not user.is_app_admin:
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -30,10 +30,9 @@ def admin_required(fn):
 
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = session.get("user_id")
-        if not user_id:
+        if not session.get("user_id"):
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not (user.is_app_admin or user.is_admin):
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -44,10 +43,9 @@ def admin_required(fn):
 def manage_users_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = session.get("user_id")
-        if not user_id:
+        if not session.get("user_id"):
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not can_manage_users(user):
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -58,10 +56,9 @@ def manage_users_required(fn):
 def certificate_session_manager_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = session.get("user_id")
-        if not user_id:
+        if not session.get("user_id"):
             return redirect(url_for("auth.login"))
-        user = db.session.get(User, user_id)
+        user = current_identity().user
         if not user or not can_manage_certificate_sessions(user):
             abort(403)
         return fn(*args, **kwargs, current_user=user)
@@ -78,9 +75,10 @@ def csa_allowed_for_session(fn=None, *, allow_delivered_view=False):
             sess = db.session.get(Session, session_id)
             if not sess:
                 abort(404)
-            user_id = session.get("user_id")
+            identity = current_identity()
+            user_id = identity.user_id
             if user_id:
-                user = db.session.get(User, user_id)
+                user = identity.user
                 if user:
                     return fn(
                         session_id,
@@ -91,9 +89,9 @@ def csa_allowed_for_session(fn=None, *, allow_delivered_view=False):
                         csa_view=False,
                         csa_account=None,
                     )
-            account_id = session.get("participant_account_id")
+            account_id = identity.session_account_id
             if account_id:
-                account = db.session.get(ParticipantAccount, account_id)
+                account = identity.account
                 if is_csa_for_session(account, sess):
                     if sess.delivered and not allow_delivered_view:
                         abort(403)
@@ -0,0 +1,433 @@
+"""Per-worker snapshots of slow-changing reference tables.
+
+Languages, workshop types, simulation outlines, material defaults, the
+materials catalog, processor assignments and the mail/app settings change a few times a month but are read
+on most requests. Each table group has a row in ``reference_data_versions``;
+any ORM write to a watched model bumps that row inside the writing
+transaction. Every worker keeps plain-data snapshots (no ORM instances) tagged
+with the version they were built at, re-reads the version rows at most every
+``VERSION_CHECK_SECONDS`` and rebuilds a snapshot only when its version moved.
+The committing worker drops its own snapshots immediately, so settings pages
+see their saves on the next request without any explicit cache call.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from typing import Callable, NamedTuple, TypeVar
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as OrmSession
+
+VERSION_CHECK_SECONDS = 1.0
+
+T = TypeVar("T")
+
+# Model class name -> snapshot names its writes invalidate. Matched by name so
+# this module stays importable before the models are.
+_WATCHED = {
+    "Language": ("languages", "materials_options"),
+    "MaterialsOption": ("materials_options",),
+    "WorkshopType": ("workshop_types",),
+    "SimulationOutline": ("simulation_outlines",),
+    "WorkshopTypeMaterialDefault": ("material_defaults",),
+    "ProcessorAssignment": ("processor_assignments",),
+    "Settings": ("settings",),
+    "AppSetting": ("app_settings",),
+}
+# Processor snapshots carry user emails and sort by name.
+_USER_ATTRS = frozenset({"email", "first_name", "last_name", "full_name"})
+_PENDING_KEY = "reference_data_dirty"
+
+_lock = threading.Lock()
+_snapshots: dict[str, tuple[int, object]] = {}
+_versions: dict[str, int] = {}
+_checked_at = float("-inf")
+_engine_ref: weakref.ref | None = None
+
+
+class LanguageRef(NamedTuple):
+    id: int
+    name: str
+    code: str | None
+    is_active: bool
+    sort_order: int
+    allowed_fonts: tuple[str, ...]
+
+
+class WorkshopTypeRef(NamedTuple):
+    id: int
+    code: str
+    name: str
+    active: bool
+    simulation_based: bool
+    supported_languages: tuple[str, ...]
+    cert_series: str | None
+
+
+class SimulationOutlineRef(NamedTuple):
+    id: int
+    number: str
+    skill: str
+    descriptor: str
+    level: str
+
+
+class MaterialDefaultRef(NamedTuple):
+    id: int
+    workshop_type_id: int
+    delivery_type: str
+    region_code: str
+    language: str
+    catalog_ref: str
+    default_format: str
+    quantity_basis: str
+    active: bool
+
+
+def _db():
+    from ..app import db
+
+    return db
+
+
+def _read_versions() -> dict[str, int]:
+    from ..models import ReferenceDataVersion
+
+    db = _db()
+    rows = db.session.execute(
+        db.select(ReferenceDataVersion.name, ReferenceDataVersion.version)
+    ).all()
+    return {name: int(version) for name, version in rows}
+
+
+def _current_versions() -> dict[str, int]:
+    global _checked_at, _engine_ref
+    engine = _db().engine
+    now = time.monotonic()
+    with _lock:
+        if _engine_ref is None or _engine_ref() is not engine:
+            # A different database (tests, CLI against another URL).
+            _snapshots.clear()
+            _engine_ref = weakref.ref(engine)
+            _checked_at = float("-inf")
+        if now - _checked_at < VERSION_CHECK_SECONDS:
+            return _versions
+    versions = _read_versions()
+    with _lock:
+        _versions.clear()
+        _versions.update(versions)
+        _checked_at = now
+        return _versions
+
+
+def _snapshot(name: str, build: Callable[[], T]) -> T:
+    # Versions are read before the data, so a concurrent write can only make a
+    # snapshot look older than it is, never newer.
+    version = _current_versions().get(name, 0)
+    with _lock:
+        entry = _snapshots.get(name)
+        if entry and entry[0] == version:
+            return entry[1]  # type: ignore[return-value]
+    value = build()
+    with _lock:
+        _snapshots[name] = (version, value)
+    return value
+
+
+def invalidate(*names: str) -> None:
+    """Drop local snapshots (all when no names) and re-read versions next time."""
+
+    global _checked_at
+    with _lock:
+        for name in names or tuple(_snapshots):
+            _snapshots.pop(name, None)
+        _checked_at = float("-inf")
+
+
+def bump(connection, names) -> None:
+    """Increment the version rows for ``names`` on ``connection``."""
+
+    from ..models import ReferenceDataVersion
+
+    table = ReferenceDataVersion.__table__
+    for name in sorted(set(names)):
+        result = connection.execute(
+            table.update()
+            .where(table.c.name == name)
+            .values(version=table.c.version + 1)
+        )
+        if not result.rowcount:
+            connection.execute(table.insert().values(name=name, version=1))
+
+
+# -- typed accessors -------------------------------------------------------
+
+
+def _load_languages() -> tuple[LanguageRef, ...]:
+    from ..models import Language
+    from .languages import NAME_TO_CODE
+
+    rows = Language.query.order_by(Language.sort_order, Language.name).all()
+    return tuple(
+        LanguageRef(
+            id=row.id,
+            name=row.name,
+            code=NAME_TO_CODE.get(row.name),
+            is_active=bool(row.is_active),
+            sort_order=row.sort_order,
+            allowed_fonts=tuple(
+                f for f in (row.allowed_fonts or []) if isinstance(f, str)
+            ),
+        )
+        for row in rows
+    )
+
+
+def languages() -> tuple[LanguageRef, ...]:
+    """All languages ordered by ``sort_order`` then name."""
+
+    return _snapshot("languages", _load_languages)
+
+
+def language_by_name(name: str) -> LanguageRef | None:
+    lowered = (name or "").lower()
+    return next((lang for lang in languages() if lang.name.lower() == lowered), None)
+
+
+def _load_workshop_types() -> tuple[WorkshopTypeRef, ...]:
+    from ..models import WorkshopType
+
+    rows = WorkshopType.query.order_by(WorkshopType.code).all()
+    return tuple(
+        WorkshopTypeRef(
+            id=row.id,
+            code=row.code,
+            name=row.name,
+            active=bool(row.active),
+            simulation_based=bool(row.simulation_based),
+            supported_languages=tuple(row.supported_languages or ()),
+            cert_series=row.cert_series,
+        )
+        for row in rows
+    )
+
+
+def workshop_types(*, include_id: int | None = None) -> list[WorkshopTypeRef]:
+    """Active workshop types by code, plus ``include_id`` even if inactive."""
+
+    return [
+        wt
+        for wt in _snapshot("workshop_types", _load_workshop_types)
+        if wt.active or wt.id == include_id
+    ]
+
+
+def _load_simulation_outlines() -> tuple[SimulationOutlineRef, ...]:
+    from ..models import SimulationOutline
+
+    rows = SimulationOutline.query.order_by(
+        SimulationOutline.number, SimulationOutline.skill
+    ).all()
+    return tuple(
+        SimulationOutlineRef(
+            id=row.id,
+            number=row.number,
+            skill=row.skill,
+            descriptor=row.descriptor,
+            level=row.level,
+        )
+        for row in rows
+    )
+
+
+def simulation_outlines() -> tuple[SimulationOutlineRef, ...]:
+    return _snapshot("simulation_outlines", _load_simulation_outlines)
+
+
+def _load_material_defaults() -> dict[tuple, tuple[MaterialDefaultRef, ...]]:
+    from ..models import WorkshopTypeMaterialDefault as Default
+
+    grouped: dict[tuple, list[MaterialDefaultRef]] = {}
+    for row in Default.query.filter(Default.active.is_(True)).order_by(Default.id):
+        key = (row.workshop_type_id, row.delivery_type, row.region_code, row.language)
+        grouped.setdefault(key, []).append(
+            MaterialDefaultRef(
+                id=row.id,
+                workshop_type_id=row.workshop_type_id,
+                delivery_type=row.delivery_type,
+                region_code=row.region_code,
+                language=row.language,
+                catalog_ref=row.catalog_ref,
+                default_format=row.default_format,
+                quantity_basis=row.quantity_basis,
+                active=True,
+            )
+        )
+    return {key: tuple(rows) for key, rows in grouped.items()}
+
+
+def material_defaults(
+    workshop_type_id: int | None,
+    delivery_type: str | None,
+    region_code: str | None,
+    language: str | None,
+) -> tuple[MaterialDefaultRef, ...]:
+    """Active defaults for one session context, ordered by id."""
+
+    snapshot = _snapshot("material_defaults", _load_material_defaults)
+    return snapshot.get((workshop_type_id, delivery_type, region_code, language), ())
+
+
+def materials_catalog():
+    """Active materials options indexed for the pickers (``materials_catalog``)."""
+
+    from .materials_catalog import load
+
+    return _snapshot("materials_options", load)
+
+
+class ProcessorRouting:
+    """Processor emails per ``(region, bucket)`` plus the resolved fallback
+    matrix, filled in as combinations are first asked for."""
+
+    def __init__(self, emails: dict[tuple[str, str], tuple[str, ...]]):
+        self.emails = emails
+        self._resolved: dict[tuple[str, str], tuple[str, ...]] = {}
+
+    def recipients(self, region: str | None, bucket: str | None) -> tuple[str, ...]:
+        """Normalized recipients for the first of ``(region, bucket)``,
+        ``(region, Other)``, ``(Other, bucket)``, ``(Other, Other)`` that has any."""
+
+        key = ((region or "").strip() or "Other", bucket or "Other")
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+        region_key, bucket_key = key
+        resolved: tuple[str, ...] = ()
+        for candidate in (
+            (region_key, bucket_key),
+            (region_key, "Other"),
+            ("Other", bucket_key),
+            ("Other", "Other"),
+        ):
+            normalized = (
+                (email or "").strip().lower() for email in self.emails.get(candidate, ())
+            )
+            resolved = tuple(dict.fromkeys(email for email in normalized if email))
+            if resolved:
+                break
+        self._resolved[key] = resolved
+        return resolved
+
+
+def _load_processor_emails() -> ProcessorRouting:
+    from sqlalchemy import func
+
+    from ..models import ProcessorAssignment, User
+
+    db = _db()
+    rows = (
+        db.session.query(
+            ProcessorAssignment.region, ProcessorAssignment.processing_type, User.email
+        )
+        .join(User, ProcessorAssignment.user_id == User.id)
+        .order_by(
+            func.lower(User.last_name).nullslast(),
+            func.lower(User.first_name).nullslast(),
+            func.lower(User.full_name).nullslast(),
+            User.email,
+        )
+        .all()
+    )
+    grouped: dict[tuple[str, str], list[str]] = {}
+    for region, processing_type, email in rows:
+        grouped.setdefault((region, processing_type), []).append(email)
+    return ProcessorRouting({key: tuple(emails) for key, emails in grouped.items()})
+
+
+def processor_routing() -> ProcessorRouting:
+    return _snapshot("processor_assignments", _load_processor_emails)
+
+
+def processor_emails(region: str, processing_type: str) -> tuple[str, ...]:
+    """Raw processor emails for a region/bucket, ordered by last, first name."""
+
+    return processor_routing().emails.get((region, processing_type), ())
+
+
+def _load_settings():
+    from ..models import Settings
+
+    row = Settings.get()
+    if row is None:
+        return None
+    # A transient copy: callers read fields and call get_smtp_pass(), and it is
+    # never attached to a database session.
+    return Settings(**{col.key: getattr(row, col.key) for col in Settings.__table__.columns})
+
+
+def mail_settings():
+    """Read-only copy of the ``Settings`` singleton, or ``None``."""
+
+    return _snapshot("settings", _load_settings)
+
+
+def _load_app_settings() -> dict[str, str]:
+    from ..app import AppSetting
+
+    db = _db()
+    return dict(db.session.execute(db.select(AppSetting.key, AppSetting.value)).all())
+
+
+def app_setting(key: str, default=None):
+    return _snapshot("app_settings", _load_app_settings).get(key, default)
+
+
+# -- write tracking --------------------------------------------------------
+
+
+def _touched(obj) -> tuple[str, ...]:
+    name = type(obj).__name__
+    if name in _WATCHED:
+        return _WATCHED[name]
+    if name == "User":
+        state = inspect(obj)
+        if not state.persistent or state.deleted or state.was_deleted:
+            return ("processor_assignments",)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        if changed & _USER_ATTRS:
+            return ("processor_assignments",)
+    return ()
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _bump_on_flush(session, flush_context):
+    names = {
+        snapshot
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        for snapshot in _touched(obj)
+    }
+    if not names:
+        return
+    bump(session.connection(), names)
+    session.info.setdefault(_PENDING_KEY, set()).update(names)
+    # Also drop local copies now: a rebuild inside this transaction would
+    # otherwise be cached against the pre-bump version.
+    invalidate(*names)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_on_commit(session):
+    names = session.info.pop(_PENDING_KEY, None)
+    if names:
+        invalidate(*names)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _invalidate_on_rollback(session):
+    names = session.info.pop(_PENDING_KEY, None)
+    if names:
+        invalidate(*names)
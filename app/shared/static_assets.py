@@ -0,0 +1,151 @@
+"""Content-hashed static files and the ``static_url`` template helper.
+
+``python manage.py build_static`` copies every file under ``app/static`` to
+``<SITE_ROOT>/static/<dir>/<name>.<hash>.<ext>`` with ``.gz`` (and ``.br`` when
+the optional ``brotli`` package is installed) siblings, then writes
+``manifest.json`` mapping logical names to hashed ones. Caddy serves the hashed
+names straight from ``/srv`` as immutable. ``static_url()`` emits the hashed
+URL when the manifest lists the file and falls back to the plain Flask static
+URL otherwise, so development and tests work without a build.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from flask import Flask, current_app, url_for
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+POLL_SECONDS = 5.0
+IMMUTABLE_MAX_AGE = 31536000
+# Text types worth precompressing; images and fonts are already compressed.
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".txt", ".json", ".map")
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{%d}\.[A-Za-z0-9]+$" % HASH_LENGTH)
+
+_lock = threading.Lock()
+_manifests: dict[str, tuple[float, float, dict[str, str], dict[str, str]]] = {}
+
+
+def _hashed_name(rel_path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(64 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _write_compressed(path: str) -> list[str]:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    written = []
+    with open(f"{path}.gz", "wb") as fh:
+        fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+    written.append(f"{path}.gz")
+    try:
+        import brotli  # optional; Caddy falls back to the .gz sibling
+    except ImportError:
+        return written
+    with open(f"{path}.br", "wb") as fh:
+        fh.write(brotli.compress(data, quality=11))
+    written.append(f"{path}.br")
+    return written
+
+
+def build_static(source_dir: str, out_dir: str) -> dict[str, str]:
+    """Publish hashed copies of ``source_dir`` into ``out_dir``; return the manifest."""
+
+    manifest: dict[str, str] = {}
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            src = os.path.join(dirpath, name)
+            rel = os.path.relpath(src, source_dir).replace(os.sep, "/")
+            hashed = _hashed_name(rel, _file_digest(src))
+            dest = os.path.join(out_dir, *hashed.split("/"))
+            if not os.path.exists(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                tmp = f"{dest}.tmp"
+                shutil.copyfile(src, tmp)
+                os.replace(tmp, dest)
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS) and not os.path.exists(
+                f"{dest}.gz"
+            ):
+                _write_compressed(dest)
+            manifest[rel] = hashed
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, f"{MANIFEST_NAME}.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=0, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+    return manifest
+
+
+def manifest_path(app: Flask | None = None) -> str:
+    app = app or current_app
+    return app.config.get("STATIC_MANIFEST") or os.path.join(
+        app.config.get("SITE_ROOT", "/srv"), "static", MANIFEST_NAME
+    )
+
+
+def _load(path: str) -> tuple[dict[str, str], dict[str, str]]:
+    now = time.monotonic()
+    with _lock:
+        cached = _manifests.get(path)
+        if cached and now - cached[0] < POLL_SECONDS:
+            return cached[2], cached[3]
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        mtime = None
+    if cached and cached[1] == mtime:
+        forward, reverse = cached[2], cached[3]
+    elif mtime is None:
+        forward, reverse = {}, {}
+    else:
+        with open(path, encoding="utf-8") as fh:
+            forward = json.load(fh)
+        reverse = {hashed: rel for rel, hashed in forward.items()}
+    with _lock:
+        _manifests[path] = (now, mtime, forward, reverse)
+    return forward, reverse
+
+
+def static_url(filename: str) -> str:
+    forward, _ = _load(manifest_path())
+    return url_for("static", filename=forward.get(filename, filename))
+
+
+def init_app(app: Flask) -> None:
+    """Register ``static_url`` and let Flask answer hashed names itself."""
+
+    app.jinja_env.globals["static_url"] = static_url
+    serve_static = app.view_functions["static"]
+
+    def static(filename: str):
+        if HASHED_NAME_RE.search(filename):
+            _, reverse = _load(manifest_path(app))
+            original = reverse.get(filename)
+            if original:
+                resp = app.send_static_file(original)
+                resp.cache_control.public = True
+                resp.cache_control.max_age = IMMUTABLE_MAX_AGE
+                resp.cache_control.immutable = True
+                return resp
+        return serve_static(filename=filename)
+
+    app.view_functions["static"] = static
@@ -3,6 +3,8 @@ import tempfile
 from datetime import date
 from typing import Optional
 
+from .blobstore import get_store
+
 
 def ensure_dir(path: str) -> None:
     """Create directory if missing (mkdir -p equivalent)."""
@@ -42,7 +44,6 @@ def badge_png_exists(
 ) -> bool:
     if not certification_number or not session_end_date:
         return False
-    path = (
-        f"/srv/certificates/{session_end_date.year}/{session_id}/{certification_number}.png"
+    return get_store().exists(
+        f"certificates/{session_end_date.year}/{session_id}/{certification_number}.png"
     )
-    return os.path.exists(path)
@@ -7,34 +7,15 @@ import shutil
 import unicodedata
 from typing import Optional
 
-from flask import current_app
+from .blobstore import BlobStoreError, get_store
 
 _RESOURCE_DIR_NAME = "resources"
 
 
-def _site_root() -> str:
-    """Resolve the site root (default `/srv`)."""
-    try:
-        site_root = current_app.config.get("SITE_ROOT", "/srv")
-    except RuntimeError:
-        site_root = "/srv"
-    return site_root or "/srv"
-
-
-def resources_root() -> str:
-    """Return the absolute path to the resources root directory."""
-    return os.path.join(_site_root(), _RESOURCE_DIR_NAME)
-
-
-def resource_fs_dir(resource_id: int) -> str:
-    """Return the filesystem directory for a resource's stored files."""
-    return os.path.join(resources_root(), str(resource_id))
-
-
-def resource_fs_path(resource_id: int, filename: str) -> str:
-    """Return the absolute filesystem path for a specific resource file."""
+def resource_key(resource_id: int, filename: str) -> str:
+    """Return the storage key for a specific resource file."""
     safe_name = filename.strip("/\\")
-    return os.path.join(resource_fs_dir(resource_id), safe_name)
+    return f"{_RESOURCE_DIR_NAME}/{resource_id}/{safe_name}"
 
 
 def resource_web_url(resource_id: int, filename: str) -> str:
@@ -67,8 +48,8 @@ def sanitize_filename(name: str) -> str:
     return f"{base}-{digest}{ext}"
 
 
-def resource_path_from_value(resource_id: int, stored_value: Optional[str]) -> Optional[str]:
-    """Derive the filesystem path from a stored resource value."""
+def resource_key_from_value(resource_id: int, stored_value: Optional[str]) -> Optional[str]:
+    """Derive the storage key from a stored resource value."""
     if not stored_value:
         return None
 
@@ -78,39 +59,34 @@ def resource_path_from_value(resource_id: int, stored_value: Optional[str]) -> O
 
     prefix = f"/{_RESOURCE_DIR_NAME}/"
     if value.startswith(prefix):
-        rel = value[len(prefix) :]
-        parts = rel.split("/", 1)
-        if len(parts) == 2:
-            rid, filename = parts
-            if rid == str(resource_id):
-                return resource_fs_path(resource_id, filename)
-            return os.path.join(resources_root(), rel)
-        return os.path.join(resources_root(), rel)
+        return f"{_RESOURCE_DIR_NAME}/{value[len(prefix):]}"
 
     if value.startswith("/"):
-        return os.path.join(_site_root(), value.lstrip("/"))
+        return value.lstrip("/") or None
 
     if value.startswith(("http://", "https://")):
         return None
 
-    if "/" in value or "\\" in value:
-        return os.path.join(resources_root(), value.strip("/\\"))
-
-    return os.path.join(resources_root(), value)
+    return f"{_RESOURCE_DIR_NAME}/" + value.strip("/\\")
 
 
 def remove_resource_file(resource_id: int, stored_value: Optional[str]) -> None:
     """Delete a stored resource file if it exists."""
-    path = resource_path_from_value(resource_id, stored_value)
-    if path and os.path.isfile(path):
-        try:
-            os.remove(path)
-        except FileNotFoundError:
-            pass
+    key = resource_key_from_value(resource_id, stored_value)
+    if not key:
+        return
+    try:
+        get_store().delete(key)
+    except BlobStoreError:
+        pass
 
 
 def remove_resource_dir(resource_id: int) -> None:
-    """Delete the resource directory for an id (ignore if missing)."""
-    dir_path = resource_fs_dir(resource_id)
-    if os.path.isdir(dir_path):
+    """Delete every stored file for a resource id (ignore if missing)."""
+    store = get_store()
+    prefix = f"{_RESOURCE_DIR_NAME}/{resource_id}"
+    for info in list(store.list(prefix)):
+        store.delete(info.key)
+    dir_path = store.local_path(prefix)
+    if dir_path and os.path.isdir(dir_path):
         shutil.rmtree(dir_path, ignore_errors=True)
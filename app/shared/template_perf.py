@@ -0,0 +1,181 @@
+"""Jinja bytecode cache, boot warm-up and per-template render timings.
+
+Compiled templates are cached on disk under ``JINJA_CACHE_DIR`` (default
+``SITE_ROOT/jinja-cache``) in a subdirectory named after a fingerprint of
+``app/templates``, so every Gunicorn worker of a deploy shares one set of
+compiled templates and a deploy that changes any template starts a fresh
+directory. Directories of earlier deploys are removed at boot once nothing has
+been written to them for :data:`PRUNE_AFTER_SECONDS`, so workers of the
+previous image still running during a rollout keep their cache. Jinja also checks each entry
+against its source checksum, so a stale file is never executed.
+
+``JINJA_WARMUP=1`` loads :data:`WARMUP_TEMPLATES` at boot so the first
+request after a deploy does not pay for compiling them.
+
+Every ``render_template`` call is timed per template name (includes, macros
+and parent templates count towards the template that was rendered). Timings
+are kept per worker process and shown on the admin performance page.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, g, template_rendered
+from jinja2 import FileSystemBytecodeCache, TemplateNotFound
+
+logger = logging.getLogger("cbs.templates")
+
+# Pages hit first after a deploy and the email bodies sent in bulk.
+WARMUP_TEMPLATES = (
+    "base.html",
+    "nav.html",
+    "home.html",
+    "dashboard.html",
+    "sessions.html",
+    "session_detail.html",
+    "materials_orders.html",
+    "my_workshops.html",
+    "email/prework.html",
+    "email/prework.txt",
+)
+# Idle time after which another deploy's cache directory is removed.
+PRUNE_AFTER_SECONDS = 24 * 3600
+# Durations kept per template for the percentile columns.
+SAMPLE_SIZE = 200
+
+_lock = threading.Lock()
+_stats: dict[str, dict] = {}
+
+
+def templates_fingerprint(template_dir: str) -> str:
+    """Hash of every template's path, size and mtime."""
+
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(template_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            rel_path = os.path.relpath(path, template_dir)
+            digest.update(f"{rel_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:12]
+
+
+def _prune(cache_root: str, keep: str, *, max_age: float = PRUNE_AFTER_SECONDS) -> None:
+    cutoff = time.time() - max_age
+    for name in os.listdir(cache_root):
+        path = os.path.join(cache_root, name)
+        if name == keep or not os.path.isdir(path):
+            continue
+        # New cache entries bump the directory mtime, so a deploy that is
+        # still serving is left alone.
+        if os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def warm_up(app, names=WARMUP_TEMPLATES) -> int:
+    """Load (and so compile or read from the bytecode cache) ``names``."""
+
+    loaded = 0
+    for name in names:
+        try:
+            app.jinja_env.get_template(name)
+            loaded += 1
+        except TemplateNotFound:
+            logger.warning("[TEMPLATES] warm-up skipped missing %s", name)
+    return loaded
+
+
+def _started(sender, template, context, **extra) -> None:
+    g.setdefault("_template_timers", []).append(time.perf_counter())
+
+
+def _finished(sender, template, context, **extra) -> None:
+    timers = g.get("_template_timers")
+    if not timers:
+        return
+    record(template.name or "<string>", (time.perf_counter() - timers.pop()) * 1000)
+
+
+def record(name: str, elapsed_ms: float) -> None:
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = {
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "samples": deque(maxlen=SAMPLE_SIZE),
+            }
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["samples"].append(elapsed_ms)
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def render_stats() -> list[dict]:
+    """Per-template timings for this worker, slowest total first."""
+
+    with _lock:
+        snapshot = {
+            name: (entry["count"], entry["total_ms"], entry["max_ms"], sorted(entry["samples"]))
+            for name, entry in _stats.items()
+        }
+    rows = [
+        {
+            "name": name,
+            "count": count,
+            "total_ms": total,
+            "avg_ms": total / count,
+            "p50_ms": _percentile(samples, 0.5),
+            "p95_ms": _percentile(samples, 0.95),
+            "max_ms": max_ms,
+        }
+        for name, (count, total, max_ms, samples) in snapshot.items()
+    ]
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def init_app(app) -> None:
+    cache_root = os.getenv(
+        "JINJA_CACHE_DIR", os.path.join(app.config.get("SITE_ROOT", "/srv"), "jinja-cache")
+    )
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    fingerprint = templates_fingerprint(template_dir)
+    cache_dir = os.path.join(cache_root, fingerprint)
+    app.config["JINJA_BYTECODE_DIR"] = cache_dir
+    app.config["JINJA_TEMPLATES_FINGERPRINT"] = fingerprint
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _prune(cache_root, fingerprint)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    except OSError as exc:
+        logger.warning("[TEMPLATES] bytecode cache disabled: %s", exc)
+    before_render_template.connect(_started, app)
+    template_rendered.connect(_finished, app)
+    if os.getenv("JINJA_WARMUP") == "1":
+        started = time.perf_counter()
+        loaded = warm_up(app)
+        logger.info(
+            "[TEMPLATES] warmed %d templates in %.0f ms",
+            loaded,
+            (time.perf_counter() - started) * 1000,
+        )
@@ -0,0 +1,95 @@
+(function (window, document) {
+  'use strict';
+
+  // The nav search form (data-global-search="<json url>") submits to the
+  // full results page; while typing it shows the top hits from the JSON
+  // endpoint underneath the box.
+  var DEBOUNCE_MS = 200;
+  var KIND_LABELS = {
+    session: 'Session',
+    client: 'Client',
+    participant: 'Participant',
+    account: 'Learner',
+    certificate: 'Certificate'
+  };
+
+  function attach(form) {
+    var input = form.querySelector('input[name="q"]');
+    if (!input) {
+      return;
+    }
+    var list = document.createElement('ul');
+    list.className = 'kt-nav-search-results';
+    list.hidden = true;
+    form.appendChild(list);
+    var timer = null;
+    var controller = null;
+
+    function render(results) {
+      list.innerHTML = '';
+      results.forEach(function (hit) {
+        if (!hit.url) {
+          return;
+        }
+        var item = document.createElement('li');
+        var link = document.createElement('a');
+        link.href = hit.url;
+        link.textContent = (KIND_LABELS[hit.kind] || hit.kind) + ': ' + hit.label;
+        if (hit.detail) {
+          link.title = hit.detail;
+        }
+        item.appendChild(link);
+        list.appendChild(item);
+      });
+      list.hidden = !list.children.length;
+    }
+
+    function lookup() {
+      var query = input.value.trim();
+      var minLength = parseInt(input.dataset.minLength || '3', 10);
+      if (query.length < minLength) {
+        render([]);
+        return;
+      }
+      if (controller) {
+        controller.abort();
+      }
+      controller = new AbortController();
+      var url = new URL(form.dataset.globalSearch, window.location.origin);
+      url.searchParams.set('q', query);
+      fetch(url.toString(), {
+        credentials: 'same-origin',
+        signal: controller.signal
+      })
+        .then(function (resp) {
+          return resp.ok ? resp.json() : { results: [] };
+        })
+        .then(function (data) {
+          render(data.results || []);
+        })
+        .catch(function () {});
+    }
+
+    input.addEventListener('input', function () {
+      window.clearTimeout(timer);
+      timer = window.setTimeout(lookup, DEBOUNCE_MS);
+    });
+    input.addEventListener('keydown', function (event) {
+      if (event.key === 'Escape') {
+        render([]);
+      }
+    });
+    document.addEventListener('click', function (event) {
+      if (!form.contains(event.target)) {
+        list.hidden = true;
+      }
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    Array.prototype.forEach.call(
+      document.querySelectorAll('form[data-global-search]'),
+      attach
+    );
+  });
+})(window, document);
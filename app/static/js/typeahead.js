@@ -0,0 +1,126 @@
+(function (window, document) {
+  'use strict';
+
+  // Selects marked with data-typeahead="<url>" render only their selected
+  // option server-side. A search box in front of the select fetches matching
+  // options as the user types; every result key besides id/label becomes a
+  // data-* attribute on its option (e.g. data-crm on clients).
+  var DEBOUNCE_MS = 200;
+
+  function fieldValue(selector) {
+    var field = document.querySelector(selector);
+    if (!field) {
+      return '';
+    }
+    if (field.type === 'checkbox') {
+      return field.checked ? '1' : '';
+    }
+    return field.value || '';
+  }
+
+  function buildUrl(select, query) {
+    var url = new URL(select.dataset.typeahead, window.location.origin);
+    url.searchParams.set('q', query);
+    // data-typeahead-params="region=#region&include_all=#include-all-fac"
+    // copies other form fields into the request.
+    var extra = new URLSearchParams(select.dataset.typeaheadParams || '');
+    extra.forEach(function (selector, name) {
+      var value = fieldValue(selector);
+      if (value) {
+        url.searchParams.set(name, value);
+      }
+    });
+    return url.toString();
+  }
+
+  function render(select, results) {
+    var current = select.value;
+    Array.prototype.slice.call(select.options).forEach(function (opt) {
+      if (opt.value !== '' && opt.value !== current) {
+        select.removeChild(opt);
+      }
+    });
+    results.forEach(function (item) {
+      if (String(item.id) === current) {
+        return;
+      }
+      var opt = document.createElement('option');
+      opt.value = String(item.id);
+      opt.textContent = item.label;
+      Object.keys(item).forEach(function (key) {
+        if (key !== 'id' && key !== 'label' && item[key] !== null) {
+          opt.dataset[key] = String(item[key]);
+        }
+      });
+      select.appendChild(opt);
+    });
+  }
+
+  function attach(select) {
+    if (!select || select.dataset.typeaheadBound) {
+      return;
+    }
+    select.dataset.typeaheadBound = '1';
+    var input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'typeahead-input';
+    input.autocomplete = 'off';
+    input.placeholder = select.dataset.typeaheadPlaceholder || 'Search';
+    input.setAttribute('aria-label', input.placeholder);
+    select.parentNode.insertBefore(input, select);
+
+    var timer = null;
+    var sequence = 0;
+
+    function load() {
+      var request = ++sequence;
+      fetch(buildUrl(select, input.value.trim()), {
+        credentials: 'same-origin',
+        headers: { Accept: 'application/json' }
+      })
+        .then(function (resp) { return resp.ok ? resp.json() : { results: [] }; })
+        .then(function (data) {
+          if (request !== sequence) {
+            return;
+          }
+          render(select, data.results || []);
+          select.dataset.typeaheadLoaded = '1';
+          select.dispatchEvent(new CustomEvent('typeahead:loaded', { bubbles: true }));
+        });
+    }
+
+    function ensureLoaded() {
+      if (!select.dataset.typeaheadLoaded) {
+        load();
+      }
+    }
+
+    input.addEventListener('input', function () {
+      window.clearTimeout(timer);
+      timer = window.setTimeout(load, DEBOUNCE_MS);
+    });
+    input.addEventListener('focus', ensureLoaded);
+    select.addEventListener('focus', ensureLoaded);
+    select.addEventListener('mousedown', ensureLoaded);
+  }
+
+  function reset(select) {
+    // Forces the next focus to refetch, e.g. after a filter field changed.
+    delete select.dataset.typeaheadLoaded;
+  }
+
+  function init(root) {
+    Array.prototype.forEach.call(
+      (root || document).querySelectorAll('select[data-typeahead]'),
+      attach
+    );
+  }
+
+  window.Typeahead = { attach: attach, reset: reset, init: init };
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', function () { init(document); });
+  } else {
+    init(document);
+  }
+})(window, document);
@@ -1,14 +1,14 @@
 from app.app import create_app, db
 import os
+from datetime import datetime
 
 from flask_migrate import Migrate
 from flask.cli import FlaskGroup
 import click
-import re
 from sqlalchemy import func
 from flask import current_app
 from app.shared.certificates import render_certificate
-from app.models import Session, ParticipantAccount, User, Certificate
+from app.models import Session, ParticipantAccount, User
 
 
 migrate = Migrate()
@@ -74,10 +74,21 @@ def account_dupes(fix_sync: bool):
 @click.option(
     "--dry-run", is_flag=True, help="List orphaned certificate PDFs without deleting"
 )
-def purge_orphan_certs(dry_run: bool):
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    cert_root = os.path.join(site_root, "certificates")
-    if not os.path.isdir(cert_root):
+@click.option("--batch-size", default=5000, show_default=True, help="DB rows per fetch")
+@click.option("--workers", default=4, show_default=True, help="Parallel directory scanners")
+def purge_orphan_certs(dry_run: bool, batch_size: int, workers: int):
+    """Delete certificate PDFs that no Certificate row points at."""
+    from app.shared.blobstore import get_store
+    from app.shared.cert_reconcile import (
+        CERT_PREFIX,
+        SAMPLE_LIMIT,
+        reconcile,
+        referenced_paths,
+    )
+
+    store = get_store()
+    cert_root = store.local_path(CERT_PREFIX)
+    if cert_root is not None and not os.path.isdir(cert_root):
         click.echo("Certificate directory missing", err=True)
         return
     if (
@@ -90,68 +101,207 @@ def purge_orphan_certs(dry_run: bool):
         )
         return
 
-    total = deleted = kept = errors = 0
-    samples: list[str] = []
-    for root, dirs, files in os.walk(cert_root):
-        dirs[:] = [d for d in dirs if not d.startswith("_")]
-        for name in files:
-            if not name.lower().endswith(".pdf"):
-                continue
-            full_path = os.path.join(root, name)
-            rel_path = os.path.relpath(full_path, site_root)
-            total += 1
-            exists = (
-                db.session.query(Certificate.id).filter_by(pdf_path=rel_path).first()
-            )
-            if exists:
-                kept += 1
-                continue
-            if len(samples) < 5:
-                samples.append(full_path)
-            if dry_run:
+    report = reconcile(store, batch_size=batch_size, workers=workers)
+    deleted = errors = 0
+    if not dry_run:
+        # Re-check right before unlinking: a row may have committed since.
+        claimed = referenced_paths([rel_path for rel_path, _size in report.orphans])
+        for rel_path, _size in report.orphans:
+            if rel_path in claimed:
                 continue
+            key = f"{CERT_PREFIX}/{rel_path}"
             try:
-                os.remove(full_path)
+                store.delete(key)
                 deleted += 1
+            except FileNotFoundError:
+                pass
             except Exception:
                 errors += 1
-                current_app.logger.exception(
-                    "[CERT-PURGE] failed to remove %s", full_path
-                )
-    summary = f"scanned={total} deleted={deleted} kept={kept} errors={errors}"
-    for path in samples:
-        click.echo(path)
+                current_app.logger.exception("[CERT-PURGE] failed to remove %s", key)
+    for rel_path, _size in report.orphans[:SAMPLE_LIMIT]:
+        click.echo(f"{CERT_PREFIX}/{rel_path}")
+    for rel_path in report.missing[:SAMPLE_LIMIT]:
+        click.echo(f"missing: {rel_path}")
+    summary = f"{report.summary()} deleted={deleted} errors={errors}"
     click.echo(summary)
     current_app.logger.info("[CERT-PURGE] %s", summary)
 
 
 @cli.command("backfill_cert_paths")
-def backfill_cert_paths():
+@click.option("--batch-size", default=5000, show_default=True, help="Rows per commit")
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Resume file storing the last committed certificate id",
+)
+def backfill_cert_paths(batch_size: int, checkpoint: str | None):
     """Update legacy certificate paths that used workshop codes."""
-    site_root = current_app.config.get("SITE_ROOT", "/srv")
-    cert_root = os.path.join(site_root, "certificates")
-    legacy_re = re.compile(r"^\d{4}/[^/0-9][^/]*/")
-    updated = skipped = 0
-    for cert in db.session.query(Certificate).all():
-        rel = (cert.pdf_path or "").lstrip("/")
-        if rel.startswith("certificates/"):
-            rel = rel.split("/", 1)[1]
-        if not legacy_re.match(rel):
-            continue
-        year, rest = rel.split("/", 1)
-        _old_code, filename = rest.split("/", 1)
-        new_rel = os.path.join(year, str(cert.session_id), filename)
-        if os.path.isfile(os.path.join(cert_root, new_rel)):
-            cert.pdf_path = new_rel
-            updated += 1
-        else:
-            skipped += 1
-    if updated:
-        db.session.commit()
+    from app.shared.blobstore import get_store
+    from app.shared.cert_reconcile import Checkpoint, backfill_legacy_paths
+
+    updated, skipped = backfill_legacy_paths(
+        get_store(), batch_size=batch_size, checkpoint=Checkpoint(checkpoint)
+    )
     summary = f"updated={updated} skipped={skipped}"
     click.echo(summary)
     current_app.logger.info("[CERT-BACKFILL] %s", summary)
 
 
+@cli.command("index_advisor")
+@click.option(
+    "--max-scans",
+    default=0,
+    show_default=True,
+    help="Report non-constraint indexes scanned at most this many times",
+)
+@click.option(
+    "--min-rows",
+    default=1000,
+    show_default=True,
+    help="Only flag sequential-scan heavy tables with at least this many rows",
+)
+def index_advisor(max_scans: int, min_rows: int):
+    """Report unused and likely missing indexes from PostgreSQL statistics."""
+    from app.shared.index_advisor import index_report
+
+    with db.engine.connect() as conn:
+        try:
+            report = index_report(conn, max_scans=max_scans, min_rows=min_rows)
+        except RuntimeError as exc:
+            click.echo(str(exc), err=True)
+            raise SystemExit(1)
+    click.echo(f"Unused indexes (idx_scan <= {max_scans}):")
+    for row in report["unused"]:
+        click.echo(
+            f"  {row['table_name']}.{row['index_name']} scans={row['scans']} "
+            f"size={row['size_bytes']}"
+        )
+    click.echo("Foreign keys without a leading index:")
+    for row in report["unindexed_foreign_keys"]:
+        click.echo(
+            f"  {row['table_name']} ({row['columns']}) [{row['constraint_name']}]"
+        )
+    click.echo(f"Sequential-scan heavy tables (rows >= {min_rows}):")
+    for row in report["seq_scan_heavy"]:
+        click.echo(
+            f"  {row['table_name']} seq_scan={row['seq_scan']} "
+            f"idx_scan={row['idx_scan']} rows={row['live_rows']}"
+        )
+    summary = " ".join(f"{key}={len(rows)}" for key, rows in report.items())
+    current_app.logger.info("[INDEX-ADVISOR] %s", summary)
+
+
+@cli.command("blobstore_gc")
+def blobstore_gc():
+    """Delete stored blobs that no longer back any certificate or upload."""
+    from app.shared.blobstore import LocalBlobStore, assets_store, get_store
+
+    removed = freed = 0
+    for store in (get_store(), assets_store()):
+        if isinstance(store, LocalBlobStore):
+            count, size = store.gc()
+            removed += count
+            freed += size
+    summary = f"removed={removed} bytes={freed}"
+    click.echo(summary)
+    current_app.logger.info("[BLOBSTORE-GC] %s", summary)
+
+
+@cli.command("profile_image_derivatives")
+def profile_image_derivatives():
+    """Generate thumbnails for profile photos uploaded before they existed."""
+    from app.shared.profile_images import regenerate_derivatives
+
+    generated = failed = 0
+    for model, owner_key in (
+        (User, lambda row: str(row.id)),
+        (ParticipantAccount, lambda row: f"participant-{row.id}"),
+    ):
+        rows = (
+            db.session.query(model)
+            .filter(model.profile_image_path.isnot(None))
+            .filter(model.profile_image_variants.is_(None))
+            .all()
+        )
+        for row in rows:
+            try:
+                row.profile_image_variants = regenerate_derivatives(
+                    row.profile_image_path, owner_key(row)
+                )
+                generated += 1
+            except (OSError, ValueError):
+                failed += 1
+                current_app.logger.exception(
+                    "[PROFILE-THUMBS] failed for %s %s", model.__name__, row.id
+                )
+        db.session.commit()
+    summary = f"generated={generated} failed={failed}"
+    click.echo(summary)
+    current_app.logger.info("[PROFILE-THUMBS] %s", summary)
+
+
+@cli.command("build_static")
+def build_static():
+    """Publish content-hashed copies of app/static under SITE_ROOT/static."""
+    from app.shared import static_assets
+
+    out_dir = os.path.dirname(static_assets.manifest_path())
+    manifest = static_assets.build_static(current_app.static_folder, out_dir)
+    summary = f"files={len(manifest)} out={out_dir}"
+    click.echo(summary)
+    current_app.logger.info("[STATIC-BUILD] %s", summary)
+
+
+@cli.command("audit_maintain")
+@click.option(
+    "--retention-months",
+    default=24,
+    show_default=True,
+    help="Archive and drop whole months older than this many months",
+)
+@click.option(
+    "--out-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Archive directory (default AUDIT_ARCHIVE_DIR or SITE_ROOT/audit-archive)",
+)
+@click.option("--skip-archive", is_flag=True, help="Only create upcoming partitions")
+def audit_maintain(retention_months: int, out_dir: str | None, skip_archive: bool):
+    """Create upcoming audit log partitions and archive expired months."""
+    from app.shared import audit
+
+    out_dir = out_dir or current_app.config["AUDIT_ARCHIVE_DIR"]
+    with db.engine.begin() as conn:
+        created = audit.ensure_partitions(conn)
+    archived = []
+    if not skip_archive:
+        cutoff = audit.add_months(
+            audit.month_start(datetime.utcnow().date()), -retention_months
+        )
+        with db.engine.begin() as conn:
+            archived = audit.archive_before(conn, cutoff, out_dir)
+    for name, rows in archived:
+        click.echo(f"archived {name} rows={rows}")
+    summary = (
+        f"created={len(created)} archived={len(archived)} "
+        f"rows={sum(rows for _name, rows in archived)} out={out_dir}"
+    )
+    click.echo(summary)
+    current_app.logger.info("[AUDIT-MAINTAIN] %s", summary)
+
+
+@cli.command("materials_notify_flush")
+@click.option("--force", is_flag=True, help="Send every queued session now")
+def materials_notify_flush(force: bool):
+    """Send queued materials processor notifications that are due."""
+    from app.services.materials_notifications import flush_pending
+
+    result = flush_pending(force=force)
+    summary = " ".join(f"{key}={value}" for key, value in result.items())
+    click.echo(summary)
+    current_app.logger.info("[MATERIALS-NOTIFY] %s", summary)
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,80 @@
+"""Secondary indexes for participant, facilitator, CSA and list lookups"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0083_hot_path_indexes"
+down_revision = "0082_certificates_badge_number"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial predicate). Both PostgreSQL and SQLite accept
+# ``CREATE INDEX IF NOT EXISTS`` and partial ``WHERE`` clauses, so the same
+# statements cover production and local databases.
+_INDEXES = (
+    (
+        "ix_participants_account_id",
+        "participants",
+        "account_id",
+        "account_id IS NOT NULL",
+    ),
+    (
+        "ix_session_participants_participant_id",
+        "session_participants",
+        "participant_id",
+        None,
+    ),
+    (
+        "ix_sessions_csa_account_id",
+        "sessions",
+        "csa_account_id",
+        "csa_account_id IS NOT NULL",
+    ),
+    (
+        "ix_sessions_lead_facilitator_id",
+        "sessions",
+        "lead_facilitator_id, start_date",
+        "lead_facilitator_id IS NOT NULL",
+    ),
+    ("ix_sessions_start_date", "sessions", "start_date", None),
+    ("ix_sessions_region_start_date", "sessions", "region, start_date", None),
+    (
+        "ix_session_facilitators_session_id",
+        "session_facilitators",
+        "session_id",
+        None,
+    ),
+    (
+        "ix_session_facilitators_user_id",
+        "session_facilitators",
+        "user_id, session_id",
+        None,
+    ),
+    ("ix_certificates_participant_id", "certificates", "participant_id", None),
+    (
+        "ix_prework_assignments_participant_account_id",
+        "prework_assignments",
+        "participant_account_id, due_at",
+        None,
+    ),
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    for name, table, columns, predicate in _INDEXES:
+        statement = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+        if predicate:
+            statement += f" WHERE {predicate}"
+        conn.execute(sa.text(statement))
+    if conn.dialect.name == "postgresql":
+        for table in sorted({table for _, table, _, _ in _INDEXES}):
+            conn.execute(sa.text(f"ANALYZE {table}"))
+
+
+def downgrade():
+    conn = op.get_bind()
+    for name, _table, _columns, _predicate in reversed(_INDEXES):
+        conn.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
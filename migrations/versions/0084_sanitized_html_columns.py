@@ -0,0 +1,37 @@
+"""Store sanitized prework question HTML and content hashes"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0084_sanitized_html_columns"
+down_revision = "0083_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+_COLUMNS = (
+    ("prework_questions", "text_html", sa.Text()),
+    ("prework_questions", "text_hash", sa.String(length=64)),
+    ("resources", "description_hash", sa.String(length=64)),
+)
+
+
+def upgrade():
+    # Existing rows keep NULLs; they render through the hash-keyed sanitizer
+    # memo until their next save fills the columns.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, column, column_type in _COLUMNS:
+        existing = {col["name"] for col in inspector.get_columns(table)}
+        if column not in existing:
+            op.add_column(table, sa.Column(column, column_type, nullable=True))
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, column, _column_type in reversed(_COLUMNS):
+        existing = {col["name"] for col in inspector.get_columns(table)}
+        if column in existing:
+            op.drop_column(table, column)
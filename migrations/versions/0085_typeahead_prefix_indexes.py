@@ -0,0 +1,43 @@
+"""Prefix-search indexes for the typeahead lookups"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0085_typeahead_prefix_indexes"
+down_revision = "0084_sanitized_html_columns"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, expression). ``text_pattern_ops`` lets PostgreSQL answer
+# ``lower(col) LIKE 'abc%'`` from a btree regardless of the database
+# collation. SQLite has no operator classes and its LIKE is case-insensitive
+# already, so these indexes are PostgreSQL-only and not declared on the models.
+_INDEXES = (
+    ("ix_users_email_prefix", "users", "lower(email) text_pattern_ops"),
+    ("ix_users_first_name_prefix", "users", "lower(first_name) text_pattern_ops"),
+    ("ix_users_last_name_prefix", "users", "lower(last_name) text_pattern_ops"),
+    ("ix_users_full_name_prefix", "users", "lower(full_name) text_pattern_ops"),
+    ("ix_clients_name_prefix", "clients", "lower(name) text_pattern_ops"),
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+    for name, table, expression in _INDEXES:
+        conn.execute(
+            sa.text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({expression})")
+        )
+    for table in sorted({table for _, table, _ in _INDEXES}):
+        conn.execute(sa.text(f"ANALYZE {table}"))
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+    for name, _table, _expression in reversed(_INDEXES):
+        conn.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
@@ -0,0 +1,52 @@
+"""reference_data_versions table
+
+Revision ID: 0086_reference_data_versions
+Revises: 0085_typeahead_prefix_indexes
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0086_reference_data_versions"
+down_revision = "0085_typeahead_prefix_indexes"
+branch_labels = None
+depends_on = None
+
+
+_NAMES = (
+    "languages",
+    "workshop_types",
+    "simulation_outlines",
+    "material_defaults",
+    "processor_assignments",
+    "settings",
+    "app_settings",
+    "learner_pages",
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table("reference_data_versions"):
+        op.create_table(
+            "reference_data_versions",
+            sa.Column("name", sa.String(40), primary_key=True),
+            sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        )
+    existing = {
+        row[0] for row in conn.execute(sa.text("SELECT name FROM reference_data_versions"))
+    }
+    for name in _NAMES:
+        if name not in existing:
+            conn.execute(
+                sa.text(
+                    "INSERT INTO reference_data_versions (name, version) VALUES (:name, 0)"
+                ),
+                {"name": name},
+            )
+
+
+def downgrade():
+    op.drop_table("reference_data_versions")
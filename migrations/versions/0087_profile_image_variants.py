@@ -0,0 +1,34 @@
+"""profile image derivative paths
+
+Revision ID: 0087_profile_image_variants
+Revises: 0086_reference_data_versions
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0087_profile_image_variants"
+down_revision = "0086_reference_data_versions"
+branch_labels = None
+depends_on = None
+
+
+_TABLES = ("users", "participant_accounts")
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in _TABLES:
+        columns = {col["name"] for col in inspector.get_columns(table)}
+        if "profile_image_variants" not in columns:
+            op.add_column(table, sa.Column("profile_image_variants", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in _TABLES:
+        columns = {col["name"] for col in inspector.get_columns(table)}
+        if "profile_image_variants" in columns:
+            op.drop_column(table, "profile_image_variants")
@@ -0,0 +1,51 @@
+"""Trigram indexes for the global search"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0088_global_search_trgm"
+down_revision = "0087_profile_image_variants"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, column). ``gin_trgm_ops`` lets PostgreSQL answer
+# ``lower(col) LIKE '%abc%'`` (app/shared/global_search.py) from the index
+# instead of a sequential scan. PostgreSQL-only, like 0085; SQLite scans.
+_INDEXES = (
+    ("ix_sessions_title_trgm", "sessions", "title"),
+    ("ix_sessions_location_trgm", "sessions", "location"),
+    ("ix_clients_name_trgm", "clients", "name"),
+    ("ix_participants_email_trgm", "participants", "email"),
+    ("ix_participants_full_name_trgm", "participants", "full_name"),
+    ("ix_participants_first_name_trgm", "participants", "first_name"),
+    ("ix_participants_last_name_trgm", "participants", "last_name"),
+    ("ix_participant_accounts_email_trgm", "participant_accounts", "email"),
+    ("ix_participant_accounts_full_name_trgm", "participant_accounts", "full_name"),
+    ("ix_certificates_number_trgm", "certificates", "certification_number"),
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for name, table, column in _INDEXES:
+        conn.execute(
+            sa.text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                f"USING gin (lower({column}) gin_trgm_ops)"
+            )
+        )
+    for table in sorted({table for _, table, _ in _INDEXES}):
+        conn.execute(sa.text(f"ANALYZE {table}"))
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+    for name, _table, _column in reversed(_INDEXES):
+        conn.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
@@ -0,0 +1,186 @@
+"""monthly partitions for audit_logs and user_audit_logs
+
+Revision ID: 0089_audit_log_partitions
+Revises: 0088_global_search_trgm
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0089_audit_log_partitions"
+down_revision = "0088_global_search_trgm"
+branch_labels = None
+depends_on = None
+
+
+# On PostgreSQL each table is rebuilt as ``PARTITION BY RANGE (<key>)`` with
+# one partition per month (``<table>_pYYYYMM``) from the oldest row to two
+# months ahead, plus ``<table>_default``. The primary key must include the
+# partition key, hence ``(id, <key>)``; ids keep coming from the original
+# sequence. app/shared/audit.py adds later months and archives old ones.
+_TABLES = {
+    "audit_logs": {
+        "key": "created_at",
+        "columns": """
+            id integer NOT NULL,
+            user_id integer REFERENCES users(id) ON DELETE SET NULL,
+            session_id integer REFERENCES sessions(id) ON DELETE SET NULL,
+            participant_id integer REFERENCES participants(id) ON DELETE SET NULL,
+            action varchar(255) NOT NULL,
+            details text,
+            created_at timestamp without time zone NOT NULL DEFAULT now()
+        """,
+        "copy": "id, user_id, session_id, participant_id, action, details",
+        "indexes": (
+            ("ix_audit_logs_session_created", ("session_id", "created_at")),
+            ("ix_audit_logs_user_created", ("user_id", "created_at")),
+            ("ix_audit_logs_participant_created", ("participant_id", "created_at")),
+        ),
+        "legacy_indexes": (
+            "ix_audit_logs_user_id",
+            "ix_audit_logs_session_id",
+            "ix_audit_logs_participant_id",
+        ),
+    },
+    "user_audit_logs": {
+        "key": "changed_at",
+        "columns": """
+            id integer NOT NULL,
+            actor_user_id integer NOT NULL REFERENCES users(id) ON DELETE RESTRICT,
+            target_user_id integer NOT NULL REFERENCES users(id) ON DELETE RESTRICT,
+            field varchar(64) NOT NULL,
+            old_value varchar(255),
+            new_value varchar(255),
+            changed_at timestamp without time zone NOT NULL DEFAULT now()
+        """,
+        "copy": "id, actor_user_id, target_user_id, field, old_value, new_value",
+        "indexes": (
+            ("ix_user_audit_logs_target_changed", ("target_user_id", "changed_at")),
+            ("ix_user_audit_logs_actor_changed", ("actor_user_id", "changed_at")),
+        ),
+        "legacy_indexes": (),
+    },
+}
+
+_MONTHS_AHEAD = 2
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(conn, table):
+    return bool(
+        conn.execute(
+            sa.text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table "
+                "AND c.relnamespace = current_schema()::regnamespace"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def _partition(conn, table, month):
+    upper = _add_months(month, 1)
+    conn.execute(
+        sa.text(
+            f"CREATE TABLE IF NOT EXISTS {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+    )
+
+
+def _partition_table(conn, table, spec):
+    key = spec["key"]
+    legacy = f"{table}_legacy"
+    sequence = conn.execute(
+        sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+    ).scalar()
+    if not sequence:
+        sequence = f"{table}_id_seq"
+        conn.execute(sa.text(f"CREATE SEQUENCE IF NOT EXISTS {sequence}"))
+        conn.execute(
+            sa.text(
+                f"SELECT setval('{sequence}', COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+            )
+        )
+    oldest = conn.execute(sa.text(f"SELECT min({key}) FROM {table}")).scalar()
+
+    conn.execute(sa.text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    for name in spec["legacy_indexes"]:
+        conn.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
+    conn.execute(
+        sa.text(
+            f"CREATE TABLE {table} ({spec['columns']}) PARTITION BY RANGE ({key})"
+        )
+    )
+    conn.execute(
+        sa.text(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+    )
+    conn.execute(sa.text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    today = date.today()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), _MONTHS_AHEAD)
+    while month <= last:
+        _partition(conn, table, month)
+        month = _add_months(month, 1)
+    conn.execute(
+        sa.text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+    )
+
+    conn.execute(
+        sa.text(
+            f"INSERT INTO {table} ({spec['copy']}, {key}) "
+            f"SELECT {spec['copy']}, COALESCE({key}, now()) FROM {legacy}"
+        )
+    )
+    conn.execute(sa.text(f"DROP TABLE {legacy}"))
+    conn.execute(
+        sa.text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})")
+    )
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        inspector = sa.inspect(conn)
+        for table, spec in _TABLES.items():
+            existing = {ix["name"] for ix in inspector.get_indexes(table)}
+            for name, columns in spec["indexes"]:
+                if name not in existing:
+                    op.create_index(name, table, list(columns))
+        return
+    for table, spec in _TABLES.items():
+        if not _is_partitioned(conn, table):
+            _partition_table(conn, table, spec)
+        # Indexes on the parent cascade to every partition, present and future.
+        for name, columns in spec["indexes"]:
+            conn.execute(
+                sa.text(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+                )
+            )
+        conn.execute(sa.text(f"ANALYZE {table}"))
+
+
+def downgrade():
+    # Partitioned tables keep the same columns and ids; queries work either
+    # way, so the partitioning is left in place.
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        return
+    inspector = sa.inspect(conn)
+    for table, spec in _TABLES.items():
+        existing = {ix["name"] for ix in inspector.get_indexes(table)}
+        for name, _columns in spec["indexes"]:
+            if name in existing:
+                op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""reference data version row for the materials catalog
+
+Revision ID: 0090_materials_catalog_version
+Revises: 0089_audit_log_partitions
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0090_materials_catalog_version"
+down_revision = "0089_audit_log_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    exists = conn.execute(
+        sa.text("SELECT 1 FROM reference_data_versions WHERE name = 'materials_options'")
+    ).scalar()
+    if not exists:
+        conn.execute(
+            sa.text(
+                "INSERT INTO reference_data_versions (name, version) "
+                "VALUES ('materials_options', 0)"
+            )
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    conn.execute(
+        sa.text("DELETE FROM reference_data_versions WHERE name = 'materials_options'")
+    )
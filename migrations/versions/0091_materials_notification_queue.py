@@ -0,0 +1,45 @@
+"""materials_notification_queue table
+
+Revision ID: 0091_materials_notification_queue
+Revises: 0090_materials_catalog_version
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0091_materials_notification_queue"
+down_revision = "0090_materials_catalog_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if sa.inspect(conn).has_table("materials_notification_queue"):
+        return
+    op.create_table(
+        "materials_notification_queue",
+        sa.Column(
+            "session_id",
+            sa.Integer(),
+            sa.ForeignKey("sessions.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("first_dirty_at", sa.DateTime(), nullable=False),
+        sa.Column("dirty_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_materials_notification_queue_dirty_at",
+        "materials_notification_queue",
+        ["dirty_at"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_materials_notification_queue_dirty_at",
+        table_name="materials_notification_queue",
+    )
+    op.drop_table("materials_notification_queue")
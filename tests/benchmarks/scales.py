@@ -0,0 +1,29 @@
+"""Scale presets for the benchmark suite.
+
+Kept free of application imports so the runner can list scales before the
+app factory is configured.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ScaleConfig:
+    sessions: int
+    participants_per_session: int
+    class_days: int = 2
+    certified_fraction: float = 0.5
+    material_order_fraction: float = 0.5
+    items_per_order: int = 4
+    facilitators: int = 10
+    clients: int = 10
+
+
+SCALES: dict[str, ScaleConfig] = {
+    "tiny": ScaleConfig(sessions=3, participants_per_session=4, facilitators=2, clients=2),
+    "small": ScaleConfig(sessions=25, participants_per_session=12),
+    "medium": ScaleConfig(sessions=200, participants_per_session=20, facilitators=40, clients=60),
+    "large": ScaleConfig(sessions=1000, participants_per_session=30, facilitators=120, clients=300),
+}
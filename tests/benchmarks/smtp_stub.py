@@ -0,0 +1,77 @@
+"""Minimal in-process SMTP sink used by the prework invite benchmark.
+
+It speaks just enough SMTP for :mod:`smtplib` (EHLO/HELO, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT) and counts accepted messages without storing them, so the
+benchmark measures the application side of the send path rather than a real
+mail relay.
+"""
+
+from __future__ import annotations
+
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        self._reply("220 bench.local ESMTP stub")
+        in_data = False
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    in_data = False
+                    self.server.count_message()
+                    self._reply("250 OK queued")
+                continue
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-bench.local")
+                self._reply("250 8BITMIME")
+            elif verb in {"HELO", "MAIL", "RCPT", "RSET", "NOOP"}:
+                self._reply("250 OK")
+            elif verb == "DATA":
+                in_data = True
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _SMTPHandler)
+        self._lock = threading.Lock()
+        self.messages = 0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count_message(self) -> None:
+        with self._lock:
+            self.messages += 1
+
+    def __enter__(self) -> "StubSMTPServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
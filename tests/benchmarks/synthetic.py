@@ -0,0 +1,322 @@
+"""Synthetic data generation for the benchmark suite.
+
+Rows are inserted through the ORM so the generator works unchanged on SQLite
+and PostgreSQL. Every email, code and certification number is derived from a
+deterministic counter so two runs at the same scale produce identical data.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from app.app import db
+from app.models import (
+    Certificate,
+    CertificateTemplateSeries,
+    Client,
+    Language,
+    MaterialOrderItem,
+    Participant,
+    ParticipantAccount,
+    ParticipantAttendance,
+    PreworkQuestion,
+    PreworkTemplate,
+    Session,
+    SessionParticipant,
+    SessionShipping,
+    Settings,
+    User,
+    WorkshopType,
+)
+
+from scales import ScaleConfig
+
+# The series code must match a badge asset shipped in ``app/assets/badges`` and
+# the canonical ``fncert_template_a4_en.pdf`` template so rendering benchmarks
+# exercise the real resolver instead of failing on a missing file.
+BENCH_SERIES_CODE = "FOUNDATIONS"
+BENCH_REGION = "EU"
+BENCH_PASSWORD = "benchmark-pass"
+
+
+@dataclass
+class BenchmarkDataset:
+    scale: ScaleConfig
+    admin_user_id: int
+    series_id: int
+    workshop_type_id: int
+    render_session_id: int
+    prework_session_id: int
+    import_session_id: int
+    session_ids: list[int] = field(default_factory=list)
+    render_participant_ids: list[int] = field(default_factory=list)
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "sessions": Session.query.count(),
+            "participants": Participant.query.count(),
+            "attendance": ParticipantAttendance.query.count(),
+            "certificates": Certificate.query.count(),
+            "material_orders": SessionShipping.query.count(),
+            "material_order_items": MaterialOrderItem.query.count(),
+        }
+
+
+def _add_roster(
+    session: Session,
+    start_index: int,
+    size: int,
+    *,
+    full_attendance: bool,
+) -> list[Participant]:
+    participants: list[Participant] = []
+    for offset in range(size):
+        n = start_index + offset
+        email = f"learner{n:07d}@bench.example.com"
+        account = ParticipantAccount(
+            email=email,
+            full_name=f"Learner {n:07d}",
+            certificate_name=f"Learner {n:07d}",
+            is_active=True,
+        )
+        participant = Participant(
+            email=email,
+            first_name="Learner",
+            last_name=f"{n:07d}",
+            full_name=f"Learner {n:07d}",
+            account=account,
+        )
+        participants.append(participant)
+    db.session.add_all(participants)
+    db.session.flush()
+    links = [
+        SessionParticipant(
+            session_id=session.id,
+            participant_id=p.id,
+            completion_date=session.end_date,
+            company_client_id=session.client_id,
+        )
+        for p in participants
+    ]
+    db.session.add_all(links)
+    attendance = [
+        ParticipantAttendance(
+            session_id=session.id,
+            participant_id=p.id,
+            day_index=day,
+            attended=full_attendance or day == 1,
+        )
+        for p in participants
+        for day in range(1, (session.number_of_class_days or 0) + 1)
+    ]
+    db.session.add_all(attendance)
+    return participants
+
+
+def build_dataset(scale: ScaleConfig) -> BenchmarkDataset:
+    """Populate the current database with a synthetic workload."""
+
+    if not db.session.get(Settings, 1):
+        db.session.add(Settings(id=1))
+    if not Language.query.filter_by(name="English").first():
+        db.session.add(Language(name="English", sort_order=1))
+
+    admin = User(
+        email="bench-admin@bench.example.com",
+        full_name="Bench Admin",
+        is_app_admin=True,
+        is_admin=True,
+        region=BENCH_REGION,
+    )
+    admin.set_password(BENCH_PASSWORD)
+    db.session.add(admin)
+
+    facilitators = [
+        User(
+            email=f"facilitator{n:04d}@bench.example.com",
+            first_name="Facilitator",
+            last_name=f"{n:04d}",
+            full_name=f"Facilitator {n:04d}",
+            is_kt_delivery=True,
+            region=BENCH_REGION,
+        )
+        for n in range(max(scale.facilitators, 1))
+    ]
+    db.session.add_all(facilitators)
+
+    clients = [
+        Client(name=f"Bench Client {n:04d}", status="active", data_region=BENCH_REGION)
+        for n in range(max(scale.clients, 1))
+    ]
+    db.session.add_all(clients)
+
+    series = CertificateTemplateSeries(
+        code=BENCH_SERIES_CODE, name="Foundations", layout_config={}
+    )
+    db.session.add(series)
+    workshop_type = WorkshopType(
+        code="BENCH",
+        name="Benchmark Workshop",
+        cert_series=BENCH_SERIES_CODE,
+        supported_languages=["en"],
+    )
+    db.session.add(workshop_type)
+    db.session.flush()
+
+    template = PreworkTemplate(
+        workshop_type_id=workshop_type.id, language="en", is_active=True
+    )
+    template.questions = [
+        PreworkQuestion(position=1, text="<p>What do you want to <strong>learn</strong>?</p>"),
+        PreworkQuestion(position=2, text="<p>Describe a recent decision.</p>"),
+    ]
+    db.session.add(template)
+
+    today = date.today()
+    session_ids: list[int] = []
+    participant_counter = 0
+    order_every = (
+        max(int(round(1 / scale.material_order_fraction)), 1)
+        if scale.material_order_fraction > 0
+        else 0
+    )
+    certify_every = (
+        max(int(round(1 / scale.certified_fraction)), 1)
+        if scale.certified_fraction > 0
+        else 0
+    )
+    cert_counter = 0
+    for index in range(scale.sessions):
+        start = today - timedelta(days=(index % 365))
+        sess = Session(
+            title=f"Bench Session {index:05d}",
+            start_date=start,
+            end_date=start + timedelta(days=scale.class_days - 1),
+            region=BENCH_REGION,
+            delivery_type="Onsite",
+            workshop_language="en",
+            number_of_class_days=scale.class_days,
+            workshop_type=workshop_type,
+            client=clients[index % len(clients)],
+            lead_facilitator=facilitators[index % len(facilitators)],
+            location=f"City {index % 50}",
+        )
+        if len(facilitators) > 1:
+            sess.facilitators = [facilitators[(index + 1) % len(facilitators)]]
+        db.session.add(sess)
+        db.session.flush()
+        session_ids.append(sess.id)
+        roster = _add_roster(
+            sess,
+            participant_counter,
+            scale.participants_per_session,
+            full_attendance=True,
+        )
+        participant_counter += len(roster)
+
+        if certify_every and index % certify_every == 0:
+            sess.delivered = True
+            year = (sess.end_date or start).year
+            for participant in roster:
+                cert_counter += 1
+                db.session.add(
+                    Certificate(
+                        session_id=sess.id,
+                        participant_id=participant.id,
+                        certification_number=f"KTBENCH-{cert_counter:08d}",
+                        certificate_name=participant.full_name,
+                        workshop_name=workshop_type.name,
+                        workshop_date=sess.end_date,
+                        pdf_path=f"{year}/{sess.id}/BENCH_{participant.id}.pdf",
+                    )
+                )
+
+        if order_every and index % order_every == 0:
+            sess.materials_ordered = True
+            db.session.add(
+                SessionShipping(
+                    session_id=sess.id,
+                    created_by=None,
+                    order_type="KT-Run Standard materials",
+                    status="New",
+                    arrival_date=start,
+                )
+            )
+            db.session.add_all(
+                [
+                    MaterialOrderItem(
+                        session_id=sess.id,
+                        catalog_ref=f"materials_options:{item}",
+                        title_snapshot=f"Bench Item {item}",
+                        language="en",
+                        format="Physical" if item % 2 else "Digital",
+                        quantity=scale.participants_per_session,
+                    )
+                    for item in range(scale.items_per_order)
+                ]
+            )
+    db.session.flush()
+
+    def _dedicated_session(title: str, *, delivered: bool) -> Session:
+        sess = Session(
+            title=title,
+            start_date=today,
+            end_date=today + timedelta(days=scale.class_days - 1),
+            region=BENCH_REGION,
+            delivery_type="Onsite",
+            workshop_language="en",
+            number_of_class_days=scale.class_days,
+            workshop_type=workshop_type,
+            client=clients[0],
+            lead_facilitator=facilitators[0],
+            delivered=delivered,
+            daily_start_time=None,
+        )
+        db.session.add(sess)
+        db.session.flush()
+        return sess
+
+    render_session = _dedicated_session("Bench Render", delivered=True)
+    render_roster = _add_roster(
+        render_session,
+        participant_counter,
+        scale.participants_per_session,
+        full_attendance=True,
+    )
+    participant_counter += len(render_roster)
+
+    prework_session = _dedicated_session("Bench Prework", delivered=False)
+    prework_roster = _add_roster(
+        prework_session,
+        participant_counter,
+        scale.participants_per_session,
+        full_attendance=False,
+    )
+    participant_counter += len(prework_roster)
+
+    import_session = _dedicated_session("Bench Import", delivered=False)
+    db.session.commit()
+
+    return BenchmarkDataset(
+        scale=scale,
+        admin_user_id=admin.id,
+        series_id=series.id,
+        workshop_type_id=workshop_type.id,
+        render_session_id=render_session.id,
+        prework_session_id=prework_session.id,
+        import_session_id=import_session.id,
+        session_ids=session_ids,
+        render_participant_ids=[p.id for p in render_roster],
+    )
+
+
+def import_csv_payload(batch: int, rows: int) -> bytes:
+    """Return a participant CSV with ``rows`` unique learners for ``batch``."""
+
+    lines = ["First Name,Last Name,Email,Title"]
+    for n in range(rows):
+        lines.append(
+            f"Import,{batch:04d}-{n:05d},import{batch:04d}-{n:05d}@bench.example.com,Analyst"
+        )
+    return ("\n".join(lines) + "\n").encode()
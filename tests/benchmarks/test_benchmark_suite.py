@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import runner
+
+
+def _report(**medians):
+    return {"results": {name: {"median_ms": value} for name, value in medians.items()}}
+
+
+@pytest.mark.no_smoke
+def test_compare_results_flags_regressions_beyond_threshold():
+    baseline = _report(list_sessions=10.0, import_csv=20.0, render_certificate=30.0)
+    current = _report(list_sessions=14.0, import_csv=10.0, generate_preview=5.0)
+
+    rows = {row["name"]: row for row in runner.compare_results(current, baseline, 0.25)}
+
+    assert rows["list_sessions"]["status"] == "regressed"
+    assert rows["list_sessions"]["ratio"] == pytest.approx(1.4)
+    assert rows["import_csv"]["status"] == "improved"
+    assert rows["render_certificate"]["status"] == "missing"
+    assert rows["generate_preview"]["status"] == "new"
+
+
+@pytest.mark.slow
+def test_benchmark_suite_runs_at_tiny_scale(tmp_path, monkeypatch):
+    for key in ("DATABASE_URL", "SITE_ROOT", "FLASK_SKIP_SEED"):
+        monkeypatch.setenv(key, "")
+    output = tmp_path / "bench.json"
+
+    exit_code = runner.main(
+        [
+            "--scale",
+            "tiny",
+            "--repeats",
+            "1",
+            "--warmup",
+            "0",
+            "--database-url",
+            f"sqlite:///{tmp_path / 'bench.sqlite'}",
+            "--site-root",
+            str(tmp_path / "site"),
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert exit_code == 0
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == set(runner.benchmark_names())
+    assert report["dataset"]["certificates"] > 0
+    assert report["smtp_messages"] == runner.SCALES["tiny"].participants_per_session
+    assert list((tmp_path / "site" / "certificates").rglob("*.pdf"))
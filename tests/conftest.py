@@ -3,6 +3,7 @@ import pathlib
 import sys
 
 import pytest
+from sqlalchemy import event
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
@@ -24,6 +25,8 @@ def pytest_collection_modifyitems(config, items):
 @pytest.fixture
 def app():
     os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+    # Send materials processor emails inline unless a test opts into the queue.
+    os.environ.setdefault("MATERIALS_NOTIFY_QUIET_SECONDS", "0")
     os.makedirs("/srv", exist_ok=True)
     application = create_app()
     with application.app_context():
@@ -35,3 +38,50 @@ def app():
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+
+class SQLRecorder:
+    """Collect SQL statements issued on ``db.engine`` while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: list[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def selects(self) -> list[str]:
+        return [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+
+    def report(self) -> str:
+        return "\n".join(
+            f"{index:3d}: {' '.join(statement.split())[:200]}"
+            for index, statement in enumerate(self.statements, 1)
+        )
+
+
+@pytest.fixture
+def sql_recorder(app):
+    """Return a factory for :class:`SQLRecorder` bound to the app engine.
+
+    Usage::
+
+        with sql_recorder() as rec:
+            client.get("/sessions")
+        assert rec.count <= 20, rec.report()
+    """
+
+    return lambda: SQLRecorder(db.engine)
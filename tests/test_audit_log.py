@@ -0,0 +1,76 @@
+import csv
+import gzip
+import os
+from datetime import datetime
+
+import pytest
+
+from app.app import create_app, db
+from app.models import AuditLog, UserAuditLog
+from app.shared import audit
+
+
+@pytest.fixture
+def buffered_app(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///:memory:")
+    monkeypatch.setenv("AUDIT_BUFFERED", "1")
+    # Keep the background thread asleep so the test drains the queue itself.
+    monkeypatch.setenv("AUDIT_BUFFER_INTERVAL", "60")
+    application = create_app()
+    with application.app_context():
+        db.create_all()
+        yield application
+        db.session.remove()
+
+
+def test_archive_before_writes_and_drops_old_months(app, tmp_path):
+    db.session.add_all(
+        [
+            AuditLog(action="old-a", created_at=datetime(2024, 1, 5, 9, 30)),
+            AuditLog(action="old-b", session_id=7, created_at=datetime(2024, 1, 31, 23)),
+            AuditLog(action="feb", created_at=datetime(2024, 2, 10)),
+            AuditLog(action="kept", created_at=datetime(2024, 3, 1)),
+            UserAuditLog(
+                actor_user_id=1,
+                target_user_id=2,
+                field="region",
+                changed_at=datetime(2024, 2, 2),
+            ),
+        ]
+    )
+    db.session.commit()
+
+    with db.engine.begin() as conn:
+        archived = audit.archive_before(conn, datetime(2024, 3, 15).date(), str(tmp_path))
+
+    assert archived == [
+        ("audit_logs_p202401", 2),
+        ("audit_logs_p202402", 1),
+        ("user_audit_logs_p202402", 1),
+    ]
+    assert sorted(os.listdir(tmp_path)) == [
+        "audit_logs_p202401.csv.gz",
+        "audit_logs_p202402.csv.gz",
+        "user_audit_logs_p202402.csv.gz",
+    ]
+    with gzip.open(tmp_path / "audit_logs_p202401.csv.gz", "rt") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [row["action"] for row in rows] == ["old-a", "old-b"]
+    assert rows[0]["created_at"] == "2024-01-05T09:30:00"
+    assert rows[1]["session_id"] == "7"
+    assert [row.action for row in AuditLog.query.all()] == ["kept"]
+    assert UserAuditLog.query.count() == 0
+
+
+def test_buffered_writer_inserts_after_commit_only(buffered_app):
+    db.session.add(AuditLog(action="login", user_id=3, session_id=11))
+    db.session.commit()
+    assert AuditLog.query.count() == 0
+
+    db.session.add(AuditLog(action="rolled-back"))
+    db.session.flush()
+    db.session.rollback()
+
+    assert audit.flush() == 1
+    (row,) = AuditLog.query.all()
+    assert (row.action, row.user_id, row.created_at is not None) == ("login", 3, True)
@@ -0,0 +1,94 @@
+import os
+from datetime import date
+from io import BytesIO
+
+from PIL import Image
+
+from app.app import db
+from app.models import Certificate, Session, WorkshopType
+from app.shared import certificates as certs_module
+from app.shared.certificates import (
+    _badge_base_png,
+    _badge_png_bytes,
+    write_badge_pngs,
+)
+
+
+def _source(tmp_path, color=(200, 30, 30, 255), name="src.png"):
+    path = tmp_path / name
+    Image.new("RGBA", (300, 150), color).save(path)
+    return str(path)
+
+
+def test_metadata_is_spliced_into_cached_composite(app, tmp_path, monkeypatch):
+    certs_module._badge_base_cache.clear()
+    source = _source(tmp_path)
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(
+        certs_module.Image, "open", lambda *a, **k: opened.append(a[0]) or real_open(*a, **k)
+    )
+
+    first = _badge_png_bytes(source, [("Title", "Foundations badge"), ("Certification#", "KTFN-1")])
+    second = _badge_png_bytes(source, [("Title", "Fundamentos – insignia"), ("Certification#", "KTFN-2")])
+    assert opened == [source]
+
+    with real_open(BytesIO(first)) as img:
+        img.load()
+        assert img.size == (600, 600)
+        assert img.text["Certification#"] == "KTFN-1"
+        first_pixels = img.convert("RGBA").tobytes()
+    with real_open(BytesIO(second)) as img:
+        img.load()
+        assert img.text["Title"] == "Fundamentos – insignia"
+        assert img.text["Certification#"] == "KTFN-2"
+        assert img.convert("RGBA").tobytes() == first_pixels
+    with real_open(BytesIO(_badge_base_png(source))) as base:
+        assert base.convert("RGBA").getpixel((300, 300)) == (200, 30, 30, 255)
+        assert base.convert("RGBA").getpixel((5, 5))[3] == 0
+
+
+def test_cache_follows_source_mtime(app, tmp_path):
+    certs_module._badge_base_cache.clear()
+    source = _source(tmp_path)
+    red = _badge_base_png(source)
+    Image.new("RGBA", (300, 150), (0, 0, 255, 255)).save(source)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    blue = _badge_base_png(source)
+    assert red != blue
+    with Image.open(BytesIO(blue)) as img:
+        assert img.convert("RGBA").getpixel((300, 300)) == (0, 0, 255, 255)
+
+
+def test_write_badge_pngs_batches_a_session(app, tmp_path, monkeypatch):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    wt = WorkshopType(code="FN", name="Foundations", cert_series="FOUNDATIONS")
+    sess = Session(
+        title="S", start_date=date(2025, 3, 1), end_date=date(2025, 3, 2), workshop_type=wt
+    )
+    db.session.add_all([wt, sess])
+    db.session.flush()
+    batch = [
+        Certificate(session_id=sess.id, certification_number=f"KTFN-25{i:05d}")
+        for i in range(6)
+    ]
+    db.session.add_all(batch + [Certificate(session_id=sess.id)])
+    db.session.commit()
+
+    resolved = []
+    real_resolve = certs_module.resolve_badge_source
+    monkeypatch.setattr(
+        certs_module,
+        "resolve_badge_source",
+        lambda session: resolved.append(session.id) or real_resolve(session),
+    )
+    assert write_badge_pngs(Certificate.query.all()) == 6
+    assert resolved == [sess.id]
+    out = tmp_path / "certificates" / "2025" / str(sess.id) / "KTFN-2500003.png"
+    with Image.open(out) as img:
+        assert img.text["Title"] == "FOUNDATIONS badge"
+        assert img.text["Certification#"] == "KTFN-2500003"
+    assert oct(os.stat(out).st_mode & 0o777) == "0o644"
+    assert write_badge_pngs(Certificate.query.all()) == 0
+
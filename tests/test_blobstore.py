@@ -0,0 +1,246 @@
+import errno
+import os
+from datetime import date, datetime, timezone
+from io import BytesIO
+
+import pytest
+
+from app.shared import blobstore
+from app.shared.blobstore import (
+    BlobStoreError,
+    LocalBlobStore,
+    S3BlobStore,
+    blob_response,
+)
+
+
+class _Missing(Exception):
+    def __init__(self):
+        super().__init__("missing")
+        self.response = {"Error": {"Code": "404"}}
+
+
+class FakeS3:
+    """In-memory stand-in for an S3-compatible endpoint (MinIO style)."""
+
+    modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = 0
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise _Missing()
+        data, meta = self.objects[(Bucket, Key)]
+        return {
+            "ContentLength": len(data),
+            "Metadata": dict(meta),
+            "LastModified": self.modified,
+        }
+
+    def put_object(self, Bucket, Key, Body, ContentLength, Metadata):
+        data = Body.read()
+        assert len(data) == ContentLength
+        self.objects[(Bucket, Key)] = (data, dict(Metadata))
+        self.puts += 1
+
+    def get_object(self, Bucket, Key, Range=None):
+        if (Bucket, Key) not in self.objects:
+            raise _Missing()
+        data = self.objects[(Bucket, Key)][0]
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            data = data[int(start) : int(end) + 1 if end else None]
+        return {"Body": BytesIO(data)}
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start : start + 2]
+        more = start + 2 < len(keys)
+        return {
+            "Contents": [
+                {
+                    "Key": key,
+                    "Size": len(self.objects[(Bucket, key)][0]),
+                    "LastModified": self.modified,
+                }
+                for key in page
+            ],
+            "IsTruncated": more,
+            "NextContinuationToken": str(start + 2) if more else None,
+        }
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def test_local_put_is_atomic_and_deduplicated(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    first = store.put_bytes("certificates/2025/1/a.pdf", b"same bytes")
+    second = store.put_stream("uploads/x/b.pdf", BytesIO(b"same bytes"))
+    assert first.sha256 == second.sha256
+    assert (first.deduplicated, second.deduplicated) == (False, True)
+
+    a = tmp_path / "certificates" / "2025" / "1" / "a.pdf"
+    b = tmp_path / "uploads" / "x" / "b.pdf"
+    assert os.path.samefile(a, b)
+    assert os.stat(a).st_nlink == 3
+    assert oct(os.stat(a).st_mode & 0o777) == "0o644"
+    assert not [p for p in a.parent.iterdir() if p.name.startswith(".")]
+
+    # Rewriting one key replaces its directory entry; the other keeps its bytes.
+    store.put_bytes("uploads/x/b.pdf", b"new bytes")
+    assert a.read_bytes() == b"same bytes"
+    assert b.read_bytes() == b"new bytes"
+
+
+def test_dedupe_leaves_shared_inode_metadata_alone(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    store.put_bytes("certificates/2025/1/a.pdf", b"same bytes", mode=0o600)
+    a = tmp_path / "certificates" / "2025" / "1" / "a.pdf"
+    os.utime(a, (1_000_000, 1_000_000))
+
+    assert store.put_bytes("certificates/2025/2/b.pdf", b"same bytes").deduplicated
+    assert os.stat(a).st_mtime == 1_000_000
+    assert oct(os.stat(a).st_mode & 0o777) == "0o600"
+    assert not [p for p in (tmp_path / "_blobs").rglob(".upload-*")]
+
+
+def test_local_range_reads_and_gc(tmp_path):
+    store = LocalBlobStore(str(tmp_path), fsync=False)
+    payload = bytes(range(256)) * 1000
+    store.put_bytes("resources/1/file.bin", payload)
+    assert store.size("resources/1/file.bin") == len(payload)
+    assert b"".join(store.open_range("resources/1/file.bin", 1000, 70000)) == payload[1000:71000]
+    assert store.read_bytes("resources/1/file.bin") == payload
+
+    store.put_bytes("resources/1/file.bin", b"replacement")
+    assert store.gc() == (0, 0)  # the orphaned blob is still too new
+    assert store.gc(min_age_seconds=0) == (1, len(payload))
+    assert store.read_bytes("resources/1/file.bin") == b"replacement"
+    store.delete("resources/1/file.bin")
+    assert not store.exists("resources/1/file.bin")
+
+    with pytest.raises(BlobStoreError):
+        store.put_bytes("../escape", b"x")
+    with pytest.raises(BlobStoreError):
+        store.put_bytes("_blobs/ab/cd", b"x")
+
+
+def test_assets_store_does_not_hardlink(app, tmp_path):
+    with app.app_context():
+        assert blobstore.assets_store().dedupe is False
+    store = LocalBlobStore(str(tmp_path), dedupe=False)
+    store.put_bytes("templates/a.pdf", b"same")
+    store.put_bytes("templates/b.pdf", b"same")
+    assert os.stat(tmp_path / "templates" / "a.pdf").st_nlink == 1
+    assert not (tmp_path / "_blobs").exists()
+
+
+def test_local_falls_back_to_copy_across_devices(tmp_path, monkeypatch):
+    def no_link(src, dst):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(blobstore.os, "link", no_link)
+    store = LocalBlobStore(str(tmp_path))
+    store.put_bytes("badges/a.webp", b"badge")
+    assert (tmp_path / "badges" / "a.webp").read_bytes() == b"badge"
+    assert os.stat(tmp_path / "badges" / "a.webp").st_nlink == 1
+
+
+def test_s3_backend_skips_unchanged_uploads_and_serves_ranges(app):
+    client = FakeS3()
+    store = S3BlobStore(client, "bucket", prefix="site")
+    assert store.put_bytes("certificates/2025/1/a.pdf", b"%PDF-1.4 body").deduplicated is False
+    assert store.put_bytes("certificates/2025/1/a.pdf", b"%PDF-1.4 body").deduplicated is True
+    assert client.puts == 1
+    assert ("bucket", "site/certificates/2025/1/a.pdf") in client.objects
+    assert store.size("certificates/2025/1/a.pdf") == 13
+    assert store.local_path("certificates/2025/1/a.pdf") is None
+
+    with app.test_request_context(headers={"Range": "bytes=0-3"}):
+        resp = blob_response(
+            store,
+            "certificates/2025/1/a.pdf",
+            download_name="a.pdf",
+            mimetype="application/pdf",
+        )
+        assert resp.status_code == 206
+        assert resp.headers["Content-Range"] == "bytes 0-3/13"
+        assert b"".join(resp.response) == b"%PDF"
+
+    for name in ("b.pdf", "c.pdf", "_tmp/d.pdf"):
+        store.put_bytes(f"certificates/2025/1/{name}", b"x")
+    store.put_bytes("resources/1/r.txt", b"r")
+    assert [info.key for info in store.list("certificates/2025")] == [
+        "certificates/2025/1/_tmp/d.pdf",
+        "certificates/2025/1/a.pdf",
+        "certificates/2025/1/b.pdf",
+        "certificates/2025/1/c.pdf",
+    ]
+
+    store.delete("certificates/2025/1/a.pdf")
+    assert not store.exists("certificates/2025/1/a.pdf")
+
+
+def test_app_reads_go_through_a_remote_store(app, client, tmp_path):
+    from app.shared.cert_links import signed_certificate_url
+    from app.shared.cert_reconcile import reconcile
+    from app.shared.storage import badge_png_exists
+
+    app.config["SITE_ROOT"] = str(tmp_path)
+    app.config["CERT_DOWNLOAD_ACCEL"] = True
+    store = S3BlobStore(FakeS3(), "bucket")
+    app.extensions["blobstore"] = store
+    store.put_bytes("certificates/2025/7/KTFN-1.png", b"png")
+    store.put_bytes("certificates/2025/7/orphan.pdf", b"%PDF")
+    store.put_bytes("uploads/profile_pics/u1/me.png", b"photo")
+    store.put_bytes("resources/3/guide.pdf", b"guide")
+
+    assert badge_png_exists(7, date(2025, 3, 2), "KTFN-1")
+    assert client.get("/certificates/2025/7/KTFN-1.png").data == b"png"
+    assert client.get("/certificates/2025/7/orphan.pdf").status_code == 404
+    assert client.get("/uploads/profile_pics/u1/me.png").data == b"photo"
+    assert client.get("/uploads/profile_pics/u1/gone.png").status_code == 404
+    assert client.get("/resources/3/guide.pdf").data == b"guide"
+    assert client.get("/uploads/profile_pics/../secret").status_code == 404
+    with app.test_request_context():
+        url = signed_certificate_url(5, "2025/7/orphan.pdf")
+    resp = client.get(url)
+    assert resp.data == b"%PDF" and "X-Accel-Redirect" not in resp.headers
+    assert not list(tmp_path.iterdir())
+
+    report = reconcile(store, grace_seconds=0)
+    assert report.orphans == [("2025/7/orphan.pdf", 4)]
+
+
+def test_profile_image_upload_goes_through_store(app, tmp_path):
+    from PIL import Image
+    from werkzeug.datastructures import FileStorage
+
+    from app.shared.profile_images import save_profile_image
+
+    app.config["SITE_ROOT"] = str(tmp_path)
+    buf = BytesIO()
+    Image.new("RGB", (8, 8), (10, 20, 30)).save(buf, format="PNG")
+    with app.test_request_context():
+        result = save_profile_image(
+            FileStorage(BytesIO(buf.getvalue()), filename="me.png"), "user-7"
+        )
+    assert result.relative_path == "/uploads/profile_pics/user-7/me.png"
+    saved = tmp_path / "uploads" / "profile_pics" / "user-7" / "me.png"
+    assert saved.read_bytes() == buf.getvalue()
+    assert os.stat(saved).st_nlink == 2
+
+
+def test_badge_existence_checks_the_store_under_site_root(app, tmp_path):
+    from datetime import date
+
+    from app.shared.storage import badge_png_exists
+
+    app.config["SITE_ROOT"] = str(tmp_path)
+    assert not badge_png_exists(7, date(2025, 3, 2), "KTFN-1")
+    blobstore.get_store().put_bytes("certificates/2025/7/KTFN-1.png", b"png")
+    assert badge_png_exists(7, date(2025, 3, 2), "KTFN-1")
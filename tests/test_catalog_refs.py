@@ -0,0 +1,123 @@
+from datetime import date
+
+from app.app import db
+from app.models import (
+    Client,
+    MaterialOrderItem,
+    MaterialsOption,
+    Session,
+    SessionShipping,
+    SimulationOutline,
+    User,
+    WorkshopType,
+    WorkshopTypeMaterialDefault,
+)
+from app.shared import catalog_refs
+
+
+def _options(count):
+    options = [
+        MaterialsOption(
+            order_type="KT-Run Standard materials",
+            title=f"Guide {n}",
+            formats=["Digital"],
+            sku_physical=f"SKU-{n}",
+        )
+        for n in range(count)
+    ]
+    options.append(
+        MaterialsOption(
+            order_type="KT-Run Modular materials", title="Bulk cards", formats=["Physical"]
+        )
+    )
+    outline = SimulationOutline(
+        number="291104", skill="Systematic Troubleshooting", descriptor="Primary", level="Novice"
+    )
+    db.session.add_all([*options, outline])
+    db.session.flush()
+    return options, outline
+
+
+def test_resolve_batches_one_query_per_kind(app, sql_recorder):
+    options, outline = _options(3)
+    db.session.commit()
+    refs = [f"materials_options:{opt.id}" for opt in options] + [
+        f"simulation_outlines:{outline.id}",
+        "materials_options:999",
+        "materials_options:x",
+        "resources:1",
+        None,
+    ]
+
+    with sql_recorder() as rec:
+        resolved = catalog_refs.resolve(refs)
+    assert len(rec.selects()) == 2, rec.report()
+
+    assert set(resolved) == set(refs[:5])
+    guide = resolved[f"materials_options:{options[0].id}"]
+    assert (guide.title, guide.sku_physical, guide.is_bulk) == ("Guide 0", "SKU-0", False)
+    assert resolved[f"materials_options:{options[-1].id}"].is_bulk
+    assert resolved[f"simulation_outlines:{outline.id}"].label == outline.label
+    assert catalog_refs.parse_ref("simulation_outlines:7") == ("simulation_outline", 7)
+
+
+def test_apply_defaults_resolves_refs_in_bulk(app, client, sql_recorder):
+    admin = User(email="admin@example.com", is_admin=True, region="NA")
+    wt = WorkshopType(code="GEN", name="General", cert_series="fn")
+    customer = Client(name="Client", status="active")
+    db.session.add_all([admin, wt, customer])
+    options, outline = _options(6)
+    for ref in [f"materials_options:{opt.id}" for opt in options] + [
+        f"simulation_outline:{outline.id}"
+    ]:
+        db.session.add(
+            WorkshopTypeMaterialDefault(
+                workshop_type_id=wt.id,
+                delivery_type="Virtual",
+                region_code="NA",
+                language="en",
+                catalog_ref=ref,
+                default_format="Physical",
+                quantity_basis="Per learner",
+            )
+        )
+    sess = Session(
+        title="Defaults",
+        start_date=date.today(),
+        end_date=date.today(),
+        delivery_type="Virtual",
+        region="NA",
+        workshop_language="en",
+        capacity=10,
+        number_of_class_days=1,
+        workshop_type=wt,
+        client=customer,
+    )
+    db.session.add(sess)
+    db.session.flush()
+    db.session.add(
+        SessionShipping(
+            session_id=sess.id,
+            created_by=admin.id,
+            order_type="KT-Run Standard materials",
+            material_sets=5,
+        )
+    )
+    db.session.commit()
+    with client.session_transaction() as flask_sess:
+        flask_sess["user_id"] = admin.id
+
+    with sql_recorder() as rec:
+        resp = client.post(f"/sessions/{sess.id}/materials/apply-defaults")
+    assert resp.status_code == 302
+    option_selects = [
+        s for s in rec.selects() if "FROM materials_options" in s and "IN (" in s
+    ]
+    assert len(option_selects) == 1, rec.report()
+
+    items = MaterialOrderItem.query.filter_by(session_id=sess.id).all()
+    by_title = {item.title_snapshot: item for item in items}
+    assert "Bulk cards" not in by_title
+    assert by_title["Guide 5"].sku_physical_snapshot == "SKU-5"
+    assert by_title[outline.label].format == "Digital"
+    assert len([i for i in items if i.title_snapshot.startswith("Guide")]) == 6
@@ -0,0 +1,84 @@
+import os
+
+from app.app import db
+from app.models import CertificateTemplate, CertificateTemplateSeries, User
+from app.shared import cert_assets
+from app.shared import certificates as certs_module
+from app.shared.cert_assets import AssetCatalog
+
+
+def _touch(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_catalog_indexes_templates_and_badges(tmp_path):
+    assets = tmp_path / "assets"
+    _touch(assets / "fncert_template_a4_en.pdf")
+    _touch(assets / "custom" / "nested.pdf")
+    _touch(assets / "_blobs" / "ab" / ("ab" + "0" * 62))
+    _touch(assets / "badges" / "foundations.webp")
+    _touch(tmp_path / "extra" / "kt_coach_badge.png")
+    (tmp_path / "outside.pdf").write_bytes(b"x")
+    os.symlink(tmp_path / "outside.pdf", assets / "escape.pdf")
+
+    catalog = AssetCatalog.build(
+        str(assets), [str(assets / "badges"), str(tmp_path / "extra"), str(tmp_path / "nope")]
+    )
+    assert catalog.template_names() == ["fncert_template_a4_en.pdf"]
+    assert catalog.template("custom/nested.pdf")
+    assert catalog.template("../outside.pdf") is None
+    assert catalog.template("escape.pdf") is None
+    assert catalog.badge(["coach.webp", "kt_coach_badge.png"]).path.endswith("kt_coach_badge.png")
+    assert catalog.badge_names() == ["foundations.webp"]
+    assert not catalog.is_stale()
+
+    _touch(assets / "fncert_template_letter_en.pdf")
+    assert catalog.is_stale()
+    fresh = AssetCatalog.build(str(assets), [str(assets / "badges")])
+    assert "fncert_template_letter_en.pdf" in fresh.template_names()
+
+
+def test_resolution_does_not_probe_the_filesystem(app, monkeypatch):
+    series = CertificateTemplateSeries(code="fn", name="Foundations")
+    db.session.add(series)
+    db.session.flush()
+    db.session.add(
+        CertificateTemplate(
+            series_id=series.id, language="en", size="A4", filename="fncert_template_a4_en.pdf"
+        )
+    )
+    db.session.commit()
+    cert_assets.invalidate()
+    cert_assets.get_catalog()
+
+    def _no_probe(*args, **kwargs):
+        raise AssertionError("filesystem probed during resolution")
+
+    monkeypatch.setattr(os.path, "isfile", _no_probe)
+    monkeypatch.setattr(os.path, "getmtime", _no_probe)
+    resolution = certs_module.resolve_series_template(series.id, "a4", "en")
+    assert resolution.source == "explicit"
+    assert resolution.path.endswith("fncert_template_a4_en.pdf")
+    assert certs_module._resolve_badge_source("foundations", None).endswith("foundations.webp")
+
+
+def test_settings_page_reports_missing_assets(client):
+    admin = User(email="admin@example.com", is_admin=True)
+    series = CertificateTemplateSeries(code="zz", name="Unknown")
+    db.session.add_all([admin, series])
+    db.session.flush()
+    db.session.add(
+        CertificateTemplate(
+            series_id=series.id, language="en", size="A4", filename="missing_template.pdf"
+        )
+    )
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin.id
+
+    resp = client.get(f"/settings/cert-templates/{series.id}/templates")
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert "A4 / en: template missing_template.pdf" in body
+    assert "badge for series code zz" in body
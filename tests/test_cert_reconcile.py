@@ -0,0 +1,95 @@
+import os
+from datetime import date
+
+from app.app import db
+from app.models import Certificate, Session
+from app.shared.blobstore import LocalBlobStore
+from app.shared.cert_reconcile import (
+    Checkpoint,
+    backfill_legacy_paths,
+    reconcile,
+    referenced_paths,
+)
+
+
+def _write(path, data=b"%PDF"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def _session():
+    sess = Session(title="S", start_date=date(2025, 1, 1), end_date=date(2025, 1, 1))
+    db.session.add(sess)
+    db.session.flush()
+    return sess
+
+
+def test_reconcile_reports_orphans_missing_and_sizes(app, tmp_path):
+    root = tmp_path / "certificates"
+    _write(root / "2024" / "1" / "kept.pdf", b"12345")
+    _write(root / "2025" / "2" / "orphan.pdf", b"123")
+    _write(root / "2025" / "2" / "badge.png", b"png")
+    _write(root / "_tmp" / "ignored.pdf")
+    _write(root / "stray.pdf", b"12")
+    sess = _session()
+    db.session.add_all(
+        [
+            Certificate(session_id=sess.id, pdf_path="2024/1/kept.pdf"),
+            Certificate(session_id=sess.id, pdf_path="/certificates/2025/2/gone.pdf"),
+            Certificate(session_id=sess.id, pdf_path=None),
+        ]
+    )
+    db.session.commit()
+
+    store = LocalBlobStore(str(tmp_path))
+    report = reconcile(store, batch_size=1, workers=2, grace_seconds=0)
+    assert report.scanned == 3
+    assert report.scanned_bytes == 10
+    assert report.referenced == 2
+    assert report.orphans == [("2025/2/orphan.pdf", 3), ("stray.pdf", 2)]
+    assert report.orphan_bytes == 5
+    assert report.missing == ["2025/2/gone.pdf"]
+
+
+def test_recent_files_and_late_rows_are_not_purged(app, tmp_path):
+    root = tmp_path / "certificates"
+    _write(root / "2025" / "3" / "old.pdf")
+    _write(root / "2025" / "3" / "fresh.pdf")
+    old = root / "2025" / "3" / "old.pdf"
+    os.utime(old, (old.stat().st_atime - 7200, old.stat().st_mtime - 7200))
+
+    report = reconcile(LocalBlobStore(str(tmp_path)))
+    assert report.orphans == [("2025/3/old.pdf", 4)]
+    assert report.recent == 1
+
+    # The render commits its row after the reconcile read the database.
+    db.session.add(Certificate(session_id=_session().id, pdf_path="/certificates/2025/3/old.pdf"))
+    db.session.commit()
+    assert referenced_paths(["2025/3/old.pdf", "2025/3/gone.pdf"]) == {"2025/3/old.pdf"}
+
+
+def test_backfill_commits_in_batches_and_resumes(app, tmp_path):
+    root = tmp_path / "certificates"
+    sess = _session()
+    certs = [
+        Certificate(session_id=sess.id, pdf_path=f"2025/FN/cert{i}.pdf") for i in range(5)
+    ]
+    certs.append(Certificate(session_id=sess.id, pdf_path="2025/FN/no_file.pdf"))
+    db.session.add_all(certs)
+    db.session.commit()
+    for i in range(5):
+        _write(root / "2025" / str(sess.id) / f"cert{i}.pdf")
+
+    checkpoint_path = tmp_path / "backfill.json"
+    # Pretend an earlier run committed the first two rows.
+    Checkpoint(str(checkpoint_path)).save(certs[1].id)
+    updated, skipped = backfill_legacy_paths(
+        LocalBlobStore(str(tmp_path)), batch_size=2, checkpoint=Checkpoint(str(checkpoint_path))
+    )
+    assert (updated, skipped) == (3, 1)
+    assert not checkpoint_path.exists()
+    db.session.expire_all()
+    paths = [db.session.get(Certificate, c.id).pdf_path for c in certs]
+    assert paths[:2] == ["2025/FN/cert0.pdf", "2025/FN/cert1.pdf"]
+    assert paths[2:5] == [f"2025/{sess.id}/cert{i}.pdf" for i in range(2, 5)]
+    assert paths[5] == "2025/FN/no_file.pdf"
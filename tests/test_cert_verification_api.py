@@ -0,0 +1,121 @@
+from datetime import date
+
+import pytest
+
+from app.app import db
+from app.models import Certificate
+from app.routes import verify as verify_routes
+from app.shared import cert_verification
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(app):
+    cert_verification.clear_cache()
+    verify_routes.limiter.reset()
+    yield
+    cert_verification.clear_cache()
+    verify_routes.limiter.reset()
+
+
+def _seed(count=3):
+    db.session.add_all(
+        [
+            Certificate(
+                certification_number=f"KTFN-25{i:05d}",
+                certificate_name=f"Learner {i}",
+                workshop_name="Foundations",
+                workshop_date=date(2025, 1, 2),
+            )
+            for i in range(count)
+        ]
+    )
+    db.session.commit()
+
+
+def test_single_number_lookup(client):
+    _seed()
+    resp = client.get("/verify/number/ktfn-2500001")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["valid"] is True
+    assert body["certification_number"] == "KTFN-2500001"
+    assert body["participant"] == "L***"
+    assert body["completion_date"] == "2025-01-02"
+    assert "max-age" in resp.headers["Cache-Control"]
+    again = client.get(
+        "/verify/number/ktfn-2500001", headers={"If-None-Match": resp.headers["ETag"]}
+    )
+    assert again.status_code == 304
+    assert client.get("/verify/number/KTFN-9999999").status_code == 404
+
+
+def test_batch_uses_one_query_and_cache(client, sql_recorder):
+    _seed(5)
+    numbers = [f"KTFN-25{i:05d}" for i in range(5)] + ["NOPE-1"]
+    with sql_recorder() as rec:
+        resp = client.post("/verify/batch", json={"numbers": numbers})
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [r["valid"] for r in results] == [True] * 5 + [False]
+    assert len(rec.selects()) == 1
+    with sql_recorder() as rec:
+        resp = client.get("/verify/batch?numbers=" + ",".join(numbers))
+    assert len(resp.get_json()["results"]) == 6
+    assert rec.selects() == []
+
+
+def test_certificate_commit_clears_cache(client):
+    _seed(1)
+    assert client.get("/verify/number/KTFN-2500000").status_code == 200
+    Certificate.query.filter_by(certification_number="KTFN-2500000").delete()
+    db.session.commit()
+    # Query-level deletes bypass the ORM flush hooks; the TTL bounds those.
+    cert_verification.clear_cache()
+    assert client.get("/verify/number/KTFN-2500000").status_code == 404
+    db.session.add(Certificate(certification_number="KTFN-2500000"))
+    db.session.commit()
+    assert client.get("/verify/number/KTFN-2500000").status_code == 200
+
+
+def test_batch_validation(client):
+    too_many = {"numbers": [f"N{i}" for i in range(cert_verification.MAX_BATCH + 1)]}
+    assert client.post("/verify/batch", json=too_many).status_code == 400
+    assert client.post("/verify/batch", json={"numbers": "A"}).status_code == 400
+    assert client.get("/verify/batch").status_code == 400
+
+
+def test_rate_limit(client):
+    for _ in range(verify_routes.RATE_LIMIT):
+        assert client.get("/verify/number/X").status_code == 404
+    resp = client.get("/verify/number/X")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_rate_limit_ignores_spoofed_forwarded_for(client):
+    for i in range(verify_routes.RATE_LIMIT):
+        resp = client.get(
+            "/verify/number/X",
+            headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"},
+        )
+        assert resp.status_code == 404
+    resp = client.get(
+        "/verify/number/X", headers={"X-Forwarded-For": "10.9.9.9, 203.0.113.7"}
+    )
+    assert resp.status_code == 429
+    # A different client, as reported by the trusted proxy hop, has its own bucket.
+    resp = client.get("/verify/number/X", headers={"X-Forwarded-For": "198.51.100.2"})
+    assert resp.status_code == 404
+
+
+def test_rate_limiter_prunes_idle_clients(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(cert_verification, "_MAX_ENTRIES", 3)
+    monkeypatch.setattr(cert_verification.time, "monotonic", lambda: clock[0])
+    limiter = cert_verification.RateLimiter(5, 10)
+    for key in ("a", "b", "c"):
+        limiter.retry_after(key)
+    clock[0] = 60.0
+    limiter.retry_after("d")
+    limiter.retry_after("e")
+    assert set(limiter._hits) == {"d", "e"}
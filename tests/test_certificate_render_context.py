@@ -0,0 +1,115 @@
+import os
+from datetime import date
+
+from app.app import db
+from app.models import (
+    Certificate,
+    CertificateTemplate,
+    CertificateTemplateSeries,
+    Participant,
+    ParticipantAccount,
+    ParticipantAttendance,
+    Session,
+    SessionParticipant,
+    WorkshopType,
+)
+from app.shared import certificates as certs_module
+
+
+def _seed_session(count, days=0):
+    series = CertificateTemplateSeries(code="foundations", name="Foundations")
+    wt = WorkshopType(code="FN", name="Foundations", cert_series="foundations")
+    db.session.add_all([series, wt])
+    db.session.flush()
+    db.session.add(
+        CertificateTemplate(
+            series_id=series.id, language="en", size="A4", filename="fncert_template_a4_en.pdf"
+        )
+    )
+    sess = Session(
+        title="Cohort",
+        start_date=date(2025, 3, 1),
+        end_date=date(2025, 3, 2),
+        workshop_type=wt,
+        workshop_language="en",
+        region="EU",
+        number_of_class_days=days,
+    )
+    db.session.add(sess)
+    db.session.flush()
+    participants = []
+    for i in range(count):
+        account = ParticipantAccount(email=f"p{i}@example.com", full_name=f"Learner {i}")
+        db.session.add(account)
+        db.session.flush()
+        participant = Participant(
+            email=f"p{i}@example.com", full_name=f"Learner {i}", account_id=account.id
+        )
+        db.session.add(participant)
+        db.session.flush()
+        db.session.add(SessionParticipant(session_id=sess.id, participant_id=participant.id))
+        participants.append(participant)
+    db.session.commit()
+    return sess, participants
+
+
+def _count_calls(monkeypatch, name, calls):
+    real = getattr(certs_module, name)
+
+    def wrapper(*args, **kwargs):
+        calls[name] = calls.get(name, 0) + 1
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(certs_module, name, wrapper)
+
+
+def test_bulk_generation_resolves_session_lookups_once(app, tmp_path, monkeypatch):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    sess, _ = _seed_session(5)
+    calls = {}
+    for name in ("get_template_mapping", "resolve_series_template", "_language_allowed_fonts"):
+        _count_calls(monkeypatch, name, calls)
+
+    count, skipped, paths = certs_module.render_for_session(sess.id)
+    assert (count, skipped) == (5, 0)
+    assert calls["get_template_mapping"] == 2  # render context + badge source
+    assert calls["resolve_series_template"] == 1
+    assert calls["_language_allowed_fonts"] == 1
+    for rel_path in paths:
+        assert os.path.isfile(tmp_path / "certificates" / rel_path)
+    numbers = sorted(c.certification_number for c in Certificate.query.all())
+    assert numbers == [f"KTFOUNDATIONS-2500{sess.id:03d}0{i}" for i in range(1, 6)]
+    for number in numbers:
+        assert os.path.isfile(tmp_path / "certificates" / "2025" / str(sess.id) / f"{number}.png")
+
+
+def test_context_gates_on_prefetched_attendance(app, tmp_path):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    sess, (full, partial) = _seed_session(2, days=2)
+    db.session.add_all(
+        [
+            ParticipantAttendance(session_id=sess.id, participant_id=full.id, day_index=1, attended=True),
+            ParticipantAttendance(session_id=sess.id, participant_id=full.id, day_index=2, attended=True),
+            ParticipantAttendance(session_id=sess.id, participant_id=partial.id, day_index=1, attended=True),
+            ParticipantAttendance(session_id=sess.id, participant_id=partial.id, day_index=2, attended=False),
+        ]
+    )
+    db.session.commit()
+
+    ctx = certs_module.build_render_context(db.session.get(Session, sess.id))
+    assert ctx.has_full_attendance(full.id)
+    assert not ctx.has_full_attendance(partial.id)
+    assert certs_module.render_for_session(sess.id)[:2] == (1, 1)
+
+
+def test_missing_series_template_logs_and_returns_zeros(app, tmp_path, caplog):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    sess, _ = _seed_session(2)
+    # The workshop type names a series that has no template set at all.
+    sess.workshop_type.cert_series = "retired"
+    db.session.commit()
+
+    with caplog.at_level("ERROR"):
+        assert certs_module.render_for_session(sess.id) == (0, 0, [])
+    assert any("[CERT-FAIL]" in record.getMessage() for record in caplog.records)
+    assert Certificate.query.count() == 0
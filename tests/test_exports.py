@@ -0,0 +1,151 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+
+from app.app import db
+from app.models import (
+    Client,
+    MaterialOrderItem,
+    Participant,
+    ParticipantAttendance,
+    Session,
+    SessionParticipant,
+    SessionShipping,
+    User,
+    WorkshopType,
+)
+from app.shared import exports
+
+
+def _seed(count: int = 3) -> dict[str, int]:
+    admin = User(email="admin@example.com", is_admin=True, region="NA")
+    fac = User(email="fac@example.com", full_name="Fac One", is_kt_delivery=True)
+    wt = WorkshopType(code="EX", name="Export Workshop", cert_series="fn")
+    db.session.add_all([admin, fac, wt])
+    db.session.flush()
+    ids = []
+    for index in range(count):
+        client_row = Client(name=f"Client {index}", status="active")
+        db.session.add(client_row)
+        db.session.flush()
+        sess = Session(
+            title=f"Export {index}",
+            start_date=date(2025, 1, index + 1),
+            end_date=date(2025, 1, index + 2),
+            region="NA" if index else "EU",
+            delivery_type="Onsite",
+            number_of_class_days=2,
+            workshop_type=wt,
+            client_id=client_row.id,
+            lead_facilitator_id=fac.id,
+        )
+        db.session.add(sess)
+        db.session.flush()
+        ids.append(sess.id)
+        db.session.add(
+            SessionShipping(
+                session_id=sess.id,
+                created_by=admin.id,
+                order_type="KT-Run Standard materials",
+                status="New",
+                credits=index + 1,
+            )
+        )
+        db.session.add(
+            MaterialOrderItem(
+                session_id=sess.id,
+                catalog_ref="materials_options:1",
+                title_snapshot="Item",
+                language="en",
+                format="Physical",
+                quantity=1,
+            )
+        )
+        learner = Participant(
+            email=f"p{index}@example.com", first_name="Pat", last_name=f"L{index}"
+        )
+        db.session.add(learner)
+        db.session.flush()
+        db.session.add(
+            SessionParticipant(
+                session_id=sess.id,
+                participant_id=learner.id,
+                company_client_id=client_row.id,
+            )
+        )
+        db.session.add(
+            ParticipantAttendance(
+                session_id=sess.id, participant_id=learner.id, day_index=1, attended=True
+            )
+        )
+    db.session.commit()
+    return {"admin_id": admin.id, "session_ids": ids}
+
+
+def _login(client, user_id):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+
+def test_session_export_streams_filtered_csv(app, client, monkeypatch):
+    ids = _seed()
+    _login(client, ids["admin_id"])
+    monkeypatch.setattr("app.routes.sessions.EXPORT_BATCH_SIZE", 1)
+
+    resp = client.get("/sessions/export.csv?global=1&region=NA&sort=start_date&dir=desc")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "text/csv"
+    assert "workshops.csv" in resp.headers["Content-Disposition"]
+    rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+    assert rows[0][:3] == ["ID", "Title", "Client"]
+    assert [row[1] for row in rows[1:]] == ["Export 2", "Export 1"]
+    assert rows[1][5] == "Fac One"
+    assert rows[1][9] == "New"
+
+    assert client.get("/sessions/export.pdf").status_code == 404
+
+
+def test_materials_export_writes_xlsx_in_batches(app, client, monkeypatch):
+    ids = _seed()
+    _login(client, ids["admin_id"])
+    monkeypatch.setattr("app.routes.materials_orders.EXPORT_BATCH_SIZE", 2)
+
+    resp = client.get("/materials/export.xlsx?workshop_status=all&sort=client")
+    assert resp.status_code == 200
+    assert resp.mimetype == exports.EXPORT_FORMATS["xlsx"]
+    with zipfile.ZipFile(io.BytesIO(resp.get_data())) as book:
+        assert book.testzip() is None
+        sheet = book.read("xl/worksheets/sheet1.xml").decode()
+    assert sheet.count("<row ") == 4
+    assert re.findall(r">(Client \d)<", sheet) == ["Client 0", "Client 1", "Client 2"]
+    assert "Pat L1" in sheet
+
+
+def test_participant_export_includes_attendance(app, client):
+    ids = _seed(1)
+    _login(client, ids["admin_id"])
+
+    resp = client.get(f"/sessions/{ids['session_ids'][0]}/participants/export.csv")
+    assert resp.status_code == 200
+    rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+    assert rows[0][-2:] == ["Day 1", "Day 2"]
+    assert rows[1][:5] == ["Pat", "L0", "p0@example.com", "", "Client 0"]
+    assert rows[1][-2:] == ["Yes", "No"]
+
+
+def test_formula_like_text_is_neutralized():
+    rows = [["=HYPERLINK(\"http://x\")", "+1", "-2", "@SUM(A1)", "\tx", -3, 1.5, "plain"]]
+
+    text = b"".join(exports.iter_csv(["a"] * 8, rows)).decode()
+    assert list(csv.reader(io.StringIO(text)))[1] == [
+        "'=HYPERLINK(\"http://x\")", "'+1", "'-2", "'@SUM(A1)", "'\tx", "-3", "1.5", "plain"
+    ]
+
+    cells = exports._xlsx_row(2, rows[0])
+    assert '<t xml:space="preserve">=HYPERLINK' in cells
+    assert '<t xml:space="preserve">+1</t>' in cells
+    assert "<v>-3</v>" in cells
+    assert "'" not in cells
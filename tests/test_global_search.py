@@ -0,0 +1,88 @@
+from datetime import date
+
+from app.app import db
+from app.models import (
+    Certificate,
+    Client,
+    Participant,
+    ParticipantAccount,
+    Session,
+    SessionParticipant,
+    User,
+)
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user.id
+
+
+def _seed():
+    admin = User(email="admin@example.com", is_admin=True)
+    acme = Client(name="Acme Robotics", status="active")
+    db.session.add_all([admin, acme, Client(name="Northwind", status="active")])
+    db.session.flush()
+    sess = Session(
+        title="Robotics Leadership",
+        start_date=date(2025, 3, 1),
+        end_date=date(2025, 3, 2),
+        client_id=acme.id,
+        location="Boston",
+    )
+    account = ParticipantAccount(email="robin@learners.test", full_name="Robin Robotham")
+    learner = Participant(
+        email="robin@learners.test", full_name="Robin Robotham", account=account
+    )
+    db.session.add_all([sess, learner])
+    db.session.flush()
+    db.session.add(SessionParticipant(session_id=sess.id, participant_id=learner.id))
+    db.session.add(
+        Certificate(
+            session_id=sess.id,
+            participant_id=learner.id,
+            certification_number="ROBO-2025-0042",
+            certificate_name="Robin Robotham",
+        )
+    )
+    db.session.commit()
+    return admin, sess
+
+
+def test_global_search_ranks_across_kinds(app, client):
+    admin, sess = _seed()
+    _login(client, admin)
+
+    resp = client.get("/search/global?q=Robo")
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    kinds = {hit["kind"] for hit in results}
+    assert kinds == {"session", "client", "participant", "account", "certificate"}
+    ranks = [hit["rank"] for hit in results]
+    assert ranks == sorted(ranks)
+    # "Robotics Leadership" starts with the query, "Acme Robotics" only has a word
+    # starting with it, and both rank above plain substrings.
+    session_hit = next(hit for hit in results if hit["kind"] == "session")
+    client_hit = next(hit for hit in results if hit["kind"] == "client")
+    assert (session_hit["rank"], client_hit["rank"]) == (1, 2)
+    assert session_hit["url"] == f"/sessions/{sess.id}"
+
+    cert = client.get("/search/global?q=0042").get_json()["results"]
+    assert [hit["label"] for hit in cert] == ["ROBO-2025-0042"]
+    assert client.get("/search/global?q=ro").get_json()["results"] == []
+    assert client.get("/search/global?q=50%25").get_json()["results"] == []
+
+
+def test_global_search_page_and_access(app, client):
+    admin, _sess = _seed()
+    manager = User(email="certs@example.com", is_certificate_manager=True)
+    db.session.add(manager)
+    db.session.commit()
+
+    _login(client, admin)
+    page = client.get("/search/?q=northwind")
+    assert page.status_code == 200
+    assert b"Northwind" in page.data
+    assert b'data-global-search="/search/global"' in client.get("/sessions?global=1").data
+
+    _login(client, manager)
+    assert client.get("/search/global?q=robo").status_code == 403
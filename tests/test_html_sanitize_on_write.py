@@ -0,0 +1,138 @@
+from datetime import date
+
+from app.app import db
+from app.models import (
+    ParticipantAccount,
+    PreworkAssignment,
+    PreworkQuestion,
+    PreworkTemplate,
+    Resource,
+    Session,
+    WorkshopType,
+)
+from app.models import resource as resource_module
+from app.shared import html as html_module
+from app.shared.html import content_hash, sanitize_prework_html
+
+
+RAW = '<p>Read <a href="https://example.com/guide">this</a><script>alert(1)</script></p>'
+
+
+def test_prework_question_stores_sanitized_html_and_hash(app):
+    wt = WorkshopType(code="WT", name="Workshop", cert_series="fn")
+    template = PreworkTemplate(workshop_type=wt, language="en")
+    question = PreworkQuestion(template=template, position=1, text=RAW)
+    db.session.add_all([wt, template, question])
+    db.session.commit()
+
+    assert question.text == RAW
+    assert question.text_hash == content_hash(RAW)
+    assert "<script>" not in question.text_html
+    assert 'target="_blank"' in question.text_html
+    assert question.rendered_html == question.text_html
+
+    # A row written behind the ORM's back falls back to the sanitizer.
+    db.session.execute(
+        PreworkQuestion.__table__.update().values(text="<p>Changed<script></script></p>")
+    )
+    db.session.commit()
+    db.session.refresh(question)
+    assert question.rendered_html == "<p>Changed</p>"
+
+
+def test_resource_description_sanitized_on_assignment(app):
+    resource = Resource(
+        name="Guide",
+        type="LINK",
+        resource_value="https://example.com",
+        description_html='<p onclick="x()">Hi<script>bad()</script></p>',
+    )
+    db.session.add(resource)
+    db.session.commit()
+
+    assert resource.description_html == "<p>Hibad()</p>"
+    assert resource.description_hash == content_hash(resource.description_html)
+
+
+def test_resource_resave_of_unchanged_description_skips_sanitizer(app, monkeypatch):
+    resource = Resource(
+        name="Guide", type="LINK", resource_value="https://example.com", description_html=RAW
+    )
+    db.session.add(resource)
+    db.session.commit()
+    stored = resource.description_html
+
+    calls = []
+    original = resource_module.sanitize_html
+
+    def counting(raw):
+        calls.append(raw)
+        return original(raw)
+
+    monkeypatch.setattr(resource_module, "sanitize_html", counting)
+    resource.description_html = stored
+    assert calls == []
+
+    resource.description_html = "<p>New<script>x()</script></p>"
+    assert calls == ["<p>New<script>x()</script></p>"]
+    assert resource.description_html == "<p>Newx()</p>"
+    assert resource.description_hash == content_hash("<p>Newx()</p>")
+
+
+def test_sanitizer_memo_skips_repeat_parsing(monkeypatch):
+    calls = []
+    original = html_module._prework_html
+
+    def counting(raw):
+        calls.append(raw)
+        return original(raw)
+
+    monkeypatch.setattr(html_module, "_prework_html", counting)
+    monkeypatch.setattr(html_module, "_memo", {})
+    first = sanitize_prework_html(RAW)
+    second = sanitize_prework_html(RAW)
+
+    assert first == second
+    assert len(calls) == 1
+
+
+def test_prework_form_renders_stored_snapshot_html(app, client):
+    wt = WorkshopType(code="WT", name="Workshop", cert_series="fn")
+    account = ParticipantAccount(email="learner@example.com", full_name="Learner")
+    sess = Session(
+        title="Prework",
+        start_date=date.today(),
+        end_date=date.today(),
+        workshop_type=wt,
+        number_of_class_days=1,
+    )
+    db.session.add_all([wt, account, sess])
+    db.session.flush()
+    stored = PreworkAssignment(
+        session_id=sess.id,
+        participant_account_id=account.id,
+        status="SENT",
+        snapshot_json={
+            "questions": [
+                {
+                    "index": 1,
+                    "text": "<p>raw text</p>",
+                    "html": "<p>stored safe html</p>",
+                    "kind": "TEXT",
+                },
+                {"index": 2, "text": RAW, "kind": "TEXT"},
+            ]
+        },
+    )
+    db.session.add(stored)
+    db.session.commit()
+    with client.session_transaction() as s:
+        s["participant_account_id"] = account.id
+
+    page = client.get(f"/prework/{stored.id}").get_data(as_text=True)
+
+    assert "stored safe html" in page
+    assert "raw text" not in page
+    # Legacy snapshots without stored HTML still render sanitized.
+    assert "<script>alert" not in page
+    assert 'target="_blank" rel="noopener" href="https://example.com/guide"' in page
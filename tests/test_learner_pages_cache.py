@@ -0,0 +1,155 @@
+from datetime import date, timedelta
+
+from app.app import db
+from app.shared import learner_cache, reference_data
+from app.models import (
+    Participant,
+    ParticipantAccount,
+    Resource,
+    Session,
+    SessionParticipant,
+    User,
+    WorkshopType,
+    resource_workshop_types,
+)
+
+
+def _resource(name, workshop_type, language="en", audience="Participant"):
+    return Resource(
+        name=name,
+        type="LINK",
+        resource_value=f"https://example.com/{name.lower().replace(' ', '-')}",
+        audience=audience,
+        language=language,
+        workshop_types=[workshop_type],
+    )
+
+
+def _session(workshop_type, facilitator, language="en", days_ago=1):
+    start = date.today() - timedelta(days=days_ago)
+    return Session(
+        title=f"{workshop_type.code} {language}",
+        start_date=start,
+        end_date=start,
+        workshop_language=language,
+        region="NA",
+        number_of_class_days=1,
+        workshop_type=workshop_type,
+        lead_facilitator=facilitator,
+    )
+
+
+def _seed():
+    facilitator = User(
+        email="fac@example.com", full_name="Fac", is_kt_delivery=True, region="NA"
+    )
+    account = ParticipantAccount(email="learner@example.com", full_name="Learner")
+    participant = Participant(
+        email="learner@example.com", full_name="Learner", account=account
+    )
+    wt = WorkshopType(code="WT", name="Workshop", cert_series="fn")
+    other_wt = WorkshopType(code="OT", name="Other", cert_series="fn")
+    sess = _session(wt, facilitator)
+    db.session.add_all(
+        [
+            facilitator,
+            account,
+            participant,
+            wt,
+            other_wt,
+            sess,
+            _resource("Guide", wt),
+            _resource("Guide ES", wt, language="es"),
+            _resource("Playbook", wt, audience="Facilitator"),
+            _resource("Other Guide", other_wt),
+        ]
+    )
+    db.session.flush()
+    db.session.add(SessionParticipant(session_id=sess.id, participant_id=participant.id))
+    db.session.commit()
+    return account.id, participant.id, facilitator.id, other_wt.id
+
+
+def test_my_resources_filters_by_attended_type_language_and_audience(app, client):
+    account_id, *_ = _seed()
+    with client.session_transaction() as s:
+        s["participant_account_id"] = account_id
+
+    html = client.get("/my-resources").get_data(as_text=True)
+
+    assert "Guide" in html
+    assert "Guide ES" not in html
+    assert "Playbook" not in html
+    assert "Other Guide" not in html
+
+
+def test_learner_pages_cache_until_resources_or_enrollment_change(
+    app, client, sql_recorder
+):
+    account_id, participant_id, facilitator_id, other_wt_id = _seed()
+    with client.session_transaction() as s:
+        s["participant_account_id"] = account_id
+    client.get("/my-resources")
+    client.get("/my-workshops")
+
+    with sql_recorder() as rec:
+        assert "Guide" in client.get("/my-resources").get_data(as_text=True)
+        client.get("/my-workshops")
+    assert not [s for s in rec.statements if "FROM resources" in s]
+    assert not [s for s in rec.statements if "JOIN prework_assignments" in s]
+
+    # Login bookkeeping does not evict entries.
+    account = db.session.get(ParticipantAccount, account_id)
+    account.last_login = None
+    db.session.commit()
+    with sql_recorder() as rec:
+        client.get("/my-resources")
+    assert not [s for s in rec.statements if "FROM resources" in s]
+
+    # A new resource for the attended type shows up after commit.
+    wt = WorkshopType.query.filter_by(code="WT").one()
+    db.session.add(_resource("Workbook", wt))
+    db.session.commit()
+    assert "Workbook" in client.get("/my-resources").get_data(as_text=True)
+
+    # So does a new enrollment, on both pages.
+    other_wt = db.session.get(WorkshopType, other_wt_id)
+    sess = _session(other_wt, db.session.get(User, facilitator_id), days_ago=0)
+    db.session.add(sess)
+    db.session.flush()
+    db.session.add(SessionParticipant(session_id=sess.id, participant_id=participant_id))
+    db.session.commit()
+    assert "Other Guide" in client.get("/my-resources").get_data(as_text=True)
+    assert "Other –" in client.get("/my-workshops").get_data(as_text=True)
+
+
+def test_other_workers_writes_evict_through_the_version_row(app, client, monkeypatch):
+    account_id, *_ = _seed()
+    with client.session_transaction() as s:
+        s["participant_account_id"] = account_id
+    assert "Workbook" not in client.get("/my-resources").get_data(as_text=True)
+
+    # Another worker inserts a resource; this process sees no ORM event.
+    wt = WorkshopType.query.filter_by(code="WT").one()
+    with db.engine.begin() as conn:
+        resource_id = conn.execute(
+            Resource.__table__.insert().values(
+                name="Workbook",
+                type="LINK",
+                resource_value="https://example.com/workbook",
+                audience="Participant",
+                language="en",
+                active=True,
+            )
+        ).inserted_primary_key[0]
+        conn.execute(
+            resource_workshop_types.insert().values(
+                resource_id=resource_id, workshop_type_id=wt.id
+            )
+        )
+    monkeypatch.setattr(reference_data, "VERSION_CHECK_SECONDS", 0.0)
+    assert "Workbook" not in client.get("/my-resources").get_data(as_text=True)
+
+    with db.engine.begin() as conn:
+        reference_data.bump(conn, [learner_cache.VERSION_NAME])
+    assert "Workbook" in client.get("/my-resources").get_data(as_text=True)
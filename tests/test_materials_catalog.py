@@ -0,0 +1,108 @@
+from app.app import db
+from app.models import Language, MaterialsOption, User
+
+
+def _login_admin(client):
+    admin = User(email="admin@example.com", is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin.id
+
+
+def _seed():
+    en = Language(name="English", sort_order=1)
+    fr = Language(name="French", sort_order=2)
+    options = [
+        MaterialsOption(
+            order_type="KT-Run Standard materials",
+            title="Learner Kit",
+            formats=["Digital", "Physical"],
+            languages=[en, fr],
+        ),
+        MaterialsOption(
+            order_type="KT-Run Modular materials",
+            title="Module Cards",
+            formats=["Physical"],
+            languages=[en],
+        ),
+        MaterialsOption(
+            order_type="KT-Run Standard materials",
+            title="Starter",
+            description="Bulk pack",
+            formats=["Physical"],
+            languages=[en],
+        ),
+        MaterialsOption(
+            order_type="Client-run Bulk order",
+            title="Client Bulk",
+            formats=["Physical"],
+            languages=[fr],
+        ),
+        MaterialsOption(
+            order_type="Simulation",
+            title="Retired",
+            formats=["Digital"],
+            languages=[en],
+            is_active=False,
+        ),
+    ]
+    db.session.add_all(options)
+    db.session.commit()
+    return {opt.title: opt.id for opt in options}
+
+
+def test_picker_filters_language_bulk_and_exclusions(app, client, sql_recorder):
+    ids = _seed()
+    _login_admin(client)
+
+    items = client.get("/workshop-types/material-options?lang=en").get_json()["items"]
+    assert [it["label"] for it in items] == [
+        "Modular • Module Cards • [en]",
+        "Standard • Learner Kit • [en, fr]",
+    ]
+    assert items[1] == {
+        "id": ids["Learner Kit"],
+        "label": "Standard • Learner Kit • [en, fr]",
+        "langs": ["en", "fr"],
+        "formats": ["Digital", "Physical"],
+        "basis": "Per learner",
+    }
+
+    with sql_recorder() as rec:
+        resp = client.get(
+            f"/workshop-types/material-options?lang=en&exclude={ids['Module Cards']}"
+        )
+    assert [it["id"] for it in resp.get_json()["items"]] == [ids["Learner Kit"]]
+    assert not [s for s in rec.selects() if "materials_options" in s], rec.report()
+
+    bulk = client.get("/workshop-types/material-options?include_bulk=1").get_json()
+    assert {it["id"] for it in bulk["items"]} == {
+        ids["Client Bulk"],
+        ids["Learner Kit"],
+        ids["Module Cards"],
+        ids["Starter"],
+    }
+
+
+def test_picker_etag_revalidates_and_changes_with_options(app, client):
+    ids = _seed()
+    _login_admin(client)
+    url = "/workshop-types/material-options?lang=fr"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    option = db.session.get(MaterialsOption, ids["Learner Kit"])
+    option.title = "Learner Kit v2"
+    db.session.commit()
+
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [it["label"] for it in changed.get_json()["items"]] == [
+        "Standard • Learner Kit v2 • [en, fr]"
+    ]
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from flask import Flask
+
+from app.app import db
+from app.models import (
+    Client,
+    MaterialOrderItem,
+    MaterialsNotificationQueue,
+    ProcessorAssignment,
+    Session,
+    SessionShipping,
+    User,
+    WorkshopType,
+)
+from app.services import materials_notifications
+from app.services.materials_notifications import (
+    flush_pending,
+    queue_materials_notification,
+    resolve_processor_emails,
+)
+
+
+@pytest.fixture
+def queued(app, monkeypatch):
+    app.config["MATERIALS_NOTIFY_QUIET_SECONDS"] = 60
+    app.config["MATERIALS_NOTIFY_MAX_WAIT_SECONDS"] = 600
+    app.config["MATERIALS_NOTIFY_SERVER_NAME"] = "cbs.example.com"
+    app.extensions.pop("materials_notify_flusher", None)
+    sent: list[tuple[list[str], str, str, str | None]] = []
+
+    def fake_send(to_addr, subject, body, html=None):
+        sent.append((to_addr, subject, body, html))
+        return {"ok": True}
+
+    monkeypatch.setattr(materials_notifications.emailer, "send", fake_send)
+    return sent
+
+
+def _processor(email: str, region: str, bucket: str) -> None:
+    user = User(email=email, full_name=email.split("@")[0], is_admin=True)
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(ProcessorAssignment(region=region, processing_type=bucket, user_id=user.id))
+
+
+def _order(title: str, *, region: str = "NA") -> int:
+    wt = WorkshopType.query.filter_by(code="PSB").first() or WorkshopType(
+        code="PSB", name="Problem Solving Basics", cert_series="fn"
+    )
+    client = Client.query.filter_by(name="Acme Corp").first() or Client(name="Acme Corp")
+    session = Session(
+        title=title, client=client, workshop_type=wt, delivery_type="Virtual", region=region
+    )
+    db.session.add(session)
+    db.session.flush()
+    db.session.add(
+        SessionShipping(
+            session_id=session.id,
+            order_type="KT-Run Standard materials",
+            materials_format="ALL_PHYSICAL",
+            material_sets=4,
+        )
+    )
+    db.session.add(
+        MaterialOrderItem(
+            session_id=session.id,
+            catalog_ref="materials_options:1",
+            title_snapshot="Participant Guide",
+            language="en",
+            format="Physical",
+            quantity=4,
+        )
+    )
+    db.session.commit()
+    return session.id
+
+
+def _dirty_at(session_id):
+    return db.session.get(MaterialsNotificationQueue, session_id).dirty_at
+
+
+def test_edits_coalesce_into_one_email_after_quiet_period(app, queued):
+    _processor("proc@example.com", "NA", "Physical")
+    session_id = _order("Alpha")
+
+    for quantity in (5, 6, 7):
+        item = MaterialOrderItem.query.filter_by(session_id=session_id).one()
+        item.quantity = quantity
+        db.session.commit()
+        queue_materials_notification(session_id)
+    assert queued == []
+    last_edit = _dirty_at(session_id)
+
+    assert flush_pending(now=last_edit + timedelta(seconds=30))["sessions"] == 0
+    summary = flush_pending(now=last_edit + timedelta(seconds=61))
+    assert summary == {"sessions": 1, "unchanged": 0, "emails": 1, "sent": 1, "failed": 0}
+    assert len(queued) == 1
+    assert queued[0][1].startswith("[CBS] NEW Materials Order")
+    assert "× 7" in queued[0][2]
+    assert db.session.get(MaterialsNotificationQueue, session_id) is None
+
+    # Saving again without changing the order sends nothing.
+    queue_materials_notification(session_id)
+    summary = flush_pending(force=True)
+    assert summary["unchanged"] == 1 and summary["emails"] == 0
+    assert len(queued) == 1
+
+
+def test_sessions_sharing_recipients_get_one_digest(app, queued, sql_recorder):
+    _processor("na@example.com", "NA", "Physical")
+    _processor("eu@example.com", "EU", "Physical")
+    first, second = _order("Alpha"), _order("Beta")
+    other = _order("Gamma", region="EU")
+    for session_id in (first, second, other):
+        queue_materials_notification(session_id)
+
+    summary = flush_pending(force=True)
+    assert summary == {"sessions": 3, "unchanged": 0, "emails": 2, "sent": 3, "failed": 0}
+    by_recipient = {tuple(to): (subject, body) for to, subject, body, _html in queued}
+    digest_subject, digest_body = by_recipient[("na@example.com",)]
+    assert digest_subject == "[CBS] Materials Orders – 2 sessions (2 new, 0 updated)"
+    assert f"Session #{first}" in digest_body and f"Session #{second}" in digest_body
+    assert by_recipient[("eu@example.com",)][0].endswith(f"Session #{other}")
+    for session_id in (first, second, other):
+        assert db.session.get(Session, session_id).materials_order_fingerprint
+
+    # The fallback chain is resolved once per combination and then served
+    # from the cached routing matrix.
+    assert resolve_processor_emails("APAC", "Digital") == []
+    with sql_recorder() as rec:
+        assert resolve_processor_emails("NA", "Physical") == ["na@example.com"]
+        assert resolve_processor_emails("APAC", "Digital") == []
+    assert rec.count == 0, rec.report()
+
+
+def test_failed_sends_go_back_on_the_queue(app, queued, monkeypatch):
+    _processor("proc@example.com", "NA", "Physical")
+    session_id = _order("Alpha")
+    queue_materials_notification(session_id)
+
+    monkeypatch.setattr(
+        materials_notifications.emailer,
+        "send",
+        lambda *args, **kwargs: {"ok": False, "detail": "smtp down"},
+    )
+    summary = flush_pending(force=True)
+    assert summary["failed"] == 1 and summary["sent"] == 0
+    assert db.session.get(MaterialsNotificationQueue, session_id) is not None
+    assert db.session.get(Session, session_id).materials_notified_at is None
+
+    def broken_render(*args, **kwargs):
+        raise RuntimeError("template error")
+
+    monkeypatch.setattr(materials_notifications, "render_template", broken_render)
+    assert flush_pending(force=True)["failed"] == 1
+    assert db.session.get(MaterialsNotificationQueue, session_id) is not None
+
+
+def test_background_flush_links_to_configured_host(app, queued):
+    _processor("proc@example.com", "NA", "Physical")
+    session_id = _order("Alpha")
+    queue_materials_notification(session_id)
+
+    assert flush_pending(force=True)["sent"] == 1
+    assert f"View order: https://cbs.example.com/sessions/{session_id}/materials" in queued[0][2]
+
+    queue_materials_notification(session_id)
+    app.config["MATERIALS_NOTIFY_SERVER_NAME"] = ""
+    with pytest.raises(RuntimeError):
+        flush_pending(force=True)
+    assert db.session.get(MaterialsNotificationQueue, session_id) is not None
+
+
+def test_flusher_starts_on_first_request(monkeypatch):
+    started = []
+    monkeypatch.setattr(
+        materials_notifications.NotificationFlusher,
+        "ensure_running",
+        lambda self: started.append(self),
+    )
+    flask_app = Flask(__name__)
+    flask_app.config.update(
+        MATERIALS_NOTIFY_QUIET_SECONDS=60,
+        MATERIALS_NOTIFY_SERVER_NAME="cbs.example.com",
+        MATERIALS_NOTIFY_FLUSHER=True,
+    )
+    materials_notifications.init_app(flask_app)
+    flask_app.add_url_rule("/ping", "ping", lambda: "ok")
+
+    assert flask_app.test_client().get("/ping").status_code == 200
+    assert started == [flask_app.extensions["materials_notify_flusher"]]
+
+    # Without a host for links the queue is bypassed entirely.
+    inline_app = Flask(__name__)
+    inline_app.config.update(MATERIALS_NOTIFY_QUIET_SECONDS=60, MATERIALS_NOTIFY_FLUSHER=True)
+    materials_notifications.init_app(inline_app)
+    assert inline_app.config["MATERIALS_NOTIFY_QUIET_SECONDS"] == 0
+    assert "materials_notify_flusher" not in inline_app.extensions
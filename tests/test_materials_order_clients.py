@@ -35,11 +35,11 @@ def test_new_materials_order_lists_only_active_clients(app, client):
 
     _login(client, admin_id)
 
-    response = client.get("/sessions/new")
+    response = client.get("/search/clients")
     assert response.status_code == 200
-    html = response.get_data(as_text=True)
-    assert "Active Client" in html
-    assert "Inactive Client" not in html
+    names = [row["label"] for row in response.get_json()["results"]]
+    assert "Active Client" in names
+    assert "Inactive Client" not in names
 
 
 def test_edit_session_preserves_inactive_client(app, client):
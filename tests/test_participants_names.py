@@ -188,6 +188,10 @@ def test_render_certificate_uses_display_name(monkeypatch, tmp_path, app):
         )
         db.session.add(account)
         db.session.flush()
+        # An older row for the same account that is not in this session.
+        db.session.add(
+            Participant(email="old-cert@example.com", full_name="Old", account_id=account.id)
+        )
         participant.account_id = account.id
         link = SessionParticipant(
             session_id=sess.id,
@@ -0,0 +1,143 @@
+from datetime import date
+from email import message_from_string
+
+from app import emailer
+from app.app import db
+from app.models import (
+    Participant,
+    ParticipantAccount,
+    PreworkEmailLog,
+    PreworkInvite,
+    PreworkTemplate,
+    Session,
+    SessionParticipant,
+    User,
+    WorkshopType,
+)
+from app.services.prework_invites import send_prework_invites
+from app.shared.constants import DEFAULT_PARTICIPANT_PASSWORD
+from app.shared.passwords import hash_passwords, verify_password
+
+
+class _RecordingSMTP:
+    connections = []
+
+    def __init__(self, host, port):
+        self.messages = []
+        self.closed = False
+        _RecordingSMTP.connections.append(self)
+
+    def starttls(self):
+        return None
+
+    def login(self, user, password):
+        return None
+
+    def sendmail(self, from_addr, to_addrs, message):
+        self.messages.append((to_addrs, message))
+
+    def quit(self):
+        self.closed = True
+
+
+def _smtp(monkeypatch):
+    _RecordingSMTP.connections = []
+    monkeypatch.setattr("app.shared.reference_data.mail_settings", lambda: None)
+    monkeypatch.setenv("SMTP_HOST", "smtp.example.com")
+    monkeypatch.setenv("SMTP_PORT", "587")
+    monkeypatch.setenv("SMTP_FROM_DEFAULT", "noreply@example.com")
+    monkeypatch.setattr(emailer.smtplib, "SMTP", _RecordingSMTP)
+
+
+def _text_part(raw: str) -> str:
+    msg = message_from_string(raw)
+    return next(
+        part.get_payload(decode=True).decode()
+        for part in msg.walk()
+        if part.get_content_type() == "text/plain"
+    )
+
+
+def _html_part(raw: str) -> str:
+    msg = message_from_string(raw)
+    return next(
+        part.get_payload(decode=True).decode()
+        for part in msg.walk()
+        if part.get_content_type() == "text/html"
+    )
+
+
+def _session_with_learners(count: int) -> Session:
+    wt = WorkshopType(code="PP", name="Pipeline", cert_series="fn")
+    sess = Session(
+        title="Pipeline",
+        start_date=date(2030, 1, 10),
+        end_date=date(2030, 1, 10),
+        workshop_language="en",
+        workshop_type=wt,
+    )
+    template = PreworkTemplate(workshop_type=wt, language="en", is_active=True)
+    existing = ParticipantAccount(
+        email="known@example.com", full_name="Known Learner", is_active=True
+    )
+    existing.set_password("own-password")
+    staff = User(email="staff@example.com", first_name="Sam", last_name="Staff")
+    db.session.add_all([wt, sess, template, existing, staff])
+    db.session.flush()
+    people = [
+        Participant(email="known@example.com", full_name="Known Learner"),
+        Participant(email="STAFF@example.com"),
+    ] + [
+        Participant(email=f"new{n}@example.com", first_name=f"Ann & {n}", last_name="New")
+        for n in range(count)
+    ]
+    db.session.add_all(people)
+    db.session.flush()
+    db.session.add_all(
+        SessionParticipant(session_id=sess.id, participant_id=p.id) for p in people
+    )
+    db.session.commit()
+    return sess
+
+
+def test_invites_share_one_connection_and_record_in_bulk(app, monkeypatch):
+    _smtp(monkeypatch)
+    sess = _session_with_learners(4)
+
+    with app.test_request_context(base_url="https://cbs.test"):
+        result = send_prework_invites(sess, sender_id=None)
+
+    assert (result.sent_count, result.failure_count) == (6, 0)
+    assert len(_RecordingSMTP.connections) == 1
+    conn = _RecordingSMTP.connections[0]
+    assert conn.closed
+    messages = {to[0]: raw for to, raw in conn.messages}
+    assert len(messages) == 6
+
+    known = _text_part(messages["known@example.com"])
+    assert known.startswith("Hi Known Learner,")
+    assert "(You may use your existing password.)" in known
+    staff = _text_part(messages["staff@example.com"])
+    assert staff.startswith("Hi Sam,")
+    assert f"Temporary password: {DEFAULT_PARTICIPANT_PASSWORD}" in staff
+    assert "Username: new2@example.com" in _text_part(messages["new2@example.com"])
+    assert "Hi Ann &amp; 2," in _html_part(messages["new2@example.com"])
+    links = {raw.split("/prework/", 1)[1][:40] for raw in messages.values()}
+    assert len(links) == 6
+
+    accounts = {
+        a.email: a for a in ParticipantAccount.query.order_by(ParticipantAccount.id)
+    }
+    assert len(accounts) == 6
+    assert accounts["known@example.com"].check_password("own-password")
+    assert accounts["new0@example.com"].check_password(DEFAULT_PARTICIPANT_PASSWORD)
+    assert PreworkEmailLog.query.count() == 6
+    assert PreworkInvite.query.filter_by(session_id=sess.id).count() == 6
+    assert db.session.get(Session, sess.id).info_sent is True
+
+
+def test_hash_passwords_pool_matches_inline():
+    plains = ["secret-a", "secret-b", "secret-c"]
+    hashes = hash_passwords(plains, pool_min=2)
+    assert len(set(hashes)) == 3
+    assert all(verify_password(p, h) for p, h in zip(plains, hashes))
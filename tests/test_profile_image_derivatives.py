@@ -0,0 +1,63 @@
+import os
+from io import BytesIO
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app.shared import profile_images
+from app.shared.profile_images import profile_image_src, save_profile_image
+
+
+def _upload(color, size=(300, 200), name="me.png"):
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return FileStorage(BytesIO(buf.getvalue()), filename=name)
+
+
+def test_upload_writes_hashed_square_thumbnails(app, tmp_path):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    with app.test_request_context():
+        first = save_profile_image(_upload((10, 20, 30)), "user-7")
+        second = save_profile_image(
+            _upload((200, 20, 30)),
+            "user-7",
+            previous_path=first.relative_path,
+            previous_variants=first.variants,
+        )
+
+    assert sorted(second.variants, key=int) == ["64", "128", "256"]
+    for px, path in second.variants.items():
+        name = os.path.basename(path)
+        assert profile_images.DERIVATIVE_NAME_RE.match(name)
+        with Image.open(tmp_path / path.lstrip("/")) as thumb:
+            assert thumb.format == "WEBP"
+            assert thumb.size == (int(px), int(px))
+    for path in first.variants.values():
+        assert not (tmp_path / path.lstrip("/")).exists()
+    assert (tmp_path / second.relative_path.lstrip("/")).exists()
+
+
+def test_rendering_picks_a_thumbnail_without_stat(app, monkeypatch):
+    variants = {"64": "/a-64.webp", "128": "/a-128.webp", "256": "/a-256.webp"}
+
+    def _no_stat(*args, **kwargs):
+        raise AssertionError("filesystem probed while rendering")
+
+    monkeypatch.setattr(os.path, "isfile", _no_stat)
+    with app.app_context():
+        assert profile_image_src("/orig.png", variants, 32) == "/a-64.webp"
+        assert profile_image_src("/orig.png", variants, 100) == "/a-128.webp"
+        assert profile_image_src("/orig.png", variants, 512) == "/a-256.webp"
+
+
+def test_thumbnails_are_served_immutable(app, client, tmp_path):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    with app.test_request_context():
+        result = save_profile_image(_upload((1, 2, 3)), "9")
+
+    resp = client.get(result.variants["64"])
+    assert resp.status_code == 200
+    assert "immutable" in resp.headers["Cache-Control"]
+    original = client.get(result.relative_path)
+    assert original.status_code == 200
+    assert "immutable" not in (original.headers.get("Cache-Control") or "")
@@ -0,0 +1,270 @@
+"""Query-count budgets for the main list and detail routes.
+
+Each route is requested at two data sizes. The number of SQL statements must
+stay within the route's budget and must not grow with the size of the data,
+which catches N+1 regressions (a lazy relationship or ``db.session.get`` per
+row) long before they show up as slow pages in production.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.app import db
+from app.models import (
+    Certificate,
+    Client,
+    Language,
+    MaterialOrderItem,
+    Participant,
+    ParticipantAccount,
+    ParticipantAttendance,
+    PreworkAssignment,
+    Resource,
+    Session,
+    SessionParticipant,
+    SessionShipping,
+    Settings,
+    User,
+    WorkshopType,
+)
+
+SIZES = (2, 8)
+
+
+def _login(client, **values):
+    with client.session_transaction() as sess:
+        sess.update(values)
+
+
+def _seed(size: int) -> dict[str, int]:
+    """Create ``size`` sessions, each with a roster of ``size`` learners.
+
+    The first learner is enrolled in every session so learner-facing pages
+    scale with the same parameter as the staff lists.
+    """
+
+    db.session.add(Settings(id=1))
+    db.session.add(Language(name="English", sort_order=1))
+    admin = User(email="admin@example.com", is_app_admin=True, is_admin=True, region="NA")
+    facilitator = User(
+        email="fac@example.com", full_name="Fac One", is_kt_delivery=True, region="NA"
+    )
+    co_facilitator = User(
+        email="cofac@example.com", full_name="Fac Two", is_kt_delivery=True, region="NA"
+    )
+    crm = User(email="crm@example.com", full_name="CRM", is_kcrm=True, region="NA")
+    db.session.add_all([admin, facilitator, co_facilitator, crm])
+    db.session.flush()
+    wt = WorkshopType(code="QB", name="Budget Workshop", cert_series="fn")
+    db.session.add(wt)
+    db.session.flush()
+    resource = Resource(
+        name="Learner Guide",
+        type="LINK",
+        resource_value="https://example.com/guide",
+        active=True,
+        language="en",
+        audience="Participant",
+    )
+    resource.workshop_types = [wt]
+    db.session.add(resource)
+
+    learner_account = ParticipantAccount(
+        email="learner@example.com", full_name="Learner", is_active=True
+    )
+    learner = Participant(
+        email=learner_account.email,
+        first_name="Learner",
+        last_name="One",
+        full_name="Learner One",
+        account=learner_account,
+    )
+    db.session.add(learner)
+    db.session.flush()
+
+    today = date.today()
+    session_ids: list[int] = []
+    for index in range(size):
+        client_row = Client(
+            name=f"Client {index}", status="active", crm_user_id=crm.id
+        )
+        db.session.add(client_row)
+        db.session.flush()
+        sess = Session(
+            title=f"Budget {index}",
+            start_date=today - timedelta(days=index + 1),
+            end_date=today - timedelta(days=index),
+            region="NA",
+            delivery_type="Onsite",
+            workshop_language="en",
+            number_of_class_days=2,
+            workshop_type=wt,
+            client_id=client_row.id,
+            lead_facilitator_id=facilitator.id,
+            location="Room",
+            materials_ordered=True,
+        )
+        sess.facilitators = [co_facilitator]
+        db.session.add(sess)
+        db.session.flush()
+        session_ids.append(sess.id)
+        db.session.add(
+            SessionShipping(
+                session_id=sess.id,
+                created_by=admin.id,
+                order_type="KT-Run Standard materials",
+                status="New",
+            )
+        )
+        db.session.add(
+            MaterialOrderItem(
+                session_id=sess.id,
+                catalog_ref="materials_options:1",
+                title_snapshot="Item",
+                language="en",
+                format="Physical",
+                quantity=size,
+            )
+        )
+        for n in range(size):
+            if n == 0:
+                participant = learner
+            else:
+                participant = Participant(
+                    email=f"p{index}-{n}@example.com",
+                    first_name="Person",
+                    last_name=f"{index}-{n}",
+                    full_name=f"Person {index}-{n}",
+                    account=ParticipantAccount(
+                        email=f"p{index}-{n}@example.com",
+                        full_name=f"Person {index}-{n}",
+                        is_active=True,
+                    ),
+                )
+                db.session.add(participant)
+                db.session.flush()
+            db.session.add(
+                SessionParticipant(
+                    session_id=sess.id,
+                    participant_id=participant.id,
+                    company_client_id=client_row.id,
+                )
+            )
+            for day in (1, 2):
+                db.session.add(
+                    ParticipantAttendance(
+                        session_id=sess.id,
+                        participant_id=participant.id,
+                        day_index=day,
+                        attended=True,
+                    )
+                )
+            db.session.add(
+                Certificate(
+                    session_id=sess.id,
+                    participant_id=participant.id,
+                    certification_number=f"QB-{index:03d}-{n:03d}",
+                    certificate_name=participant.full_name,
+                    workshop_name=wt.name,
+                    workshop_date=sess.end_date,
+                    pdf_path=f"{today.year}/{sess.id}/cert_{participant.id}.pdf",
+                )
+            )
+            db.session.add(
+                PreworkAssignment(
+                    session_id=sess.id,
+                    participant_account_id=participant.account_id,
+                    template_id=None,
+                    status="SENT",
+                    snapshot_json={"questions": []},
+                )
+            )
+    db.session.commit()
+    return {
+        "admin_id": admin.id,
+        "facilitator_id": facilitator.id,
+        "crm_id": crm.id,
+        "learner_account_id": learner_account.id,
+        "session_id": session_ids[0],
+    }
+
+
+def _count(client, sql_recorder, path: str) -> tuple[int, str]:
+    db.session.expunge_all()
+    with sql_recorder() as rec:
+        response = client.get(path)
+    assert response.status_code == 200, path
+    return rec.count, rec.report()
+
+
+# (name, login, path, budget). Budgets carry two statements of headroom over
+# the measured count; growth across sizes is never allowed.
+ROUTES = [
+    ("list_sessions", {"user_id": "admin_id"}, "/sessions?global=1", 8),
+    ("session_detail", {"user_id": "admin_id"}, "/sessions/{session_id}", 15),
+    ("materials_orders", {"user_id": "admin_id"}, "/materials?workshop_status=all", 10),
+    ("my_sessions_facilitator", {"user_id": "facilitator_id"}, "/my-sessions", 9),
+    ("my_sessions_crm", {"user_id": "crm_id"}, "/my-sessions", 9),
+    ("my_sessions_learner", {"participant_account_id": "learner_account_id"}, "/my-sessions", 12),
+    ("my_workshops", {"participant_account_id": "learner_account_id"}, "/my-workshops", 10),
+    ("my_resources", {"participant_account_id": "learner_account_id"}, "/my-resources", 9),
+    ("my_certificates", {"participant_account_id": "learner_account_id"}, "/my-certificates", 9),
+]
+
+
+@pytest.mark.parametrize("name,login,path,budget", ROUTES, ids=[r[0] for r in ROUTES])
+def test_route_query_count_is_constant(app, client, sql_recorder, name, login, path, budget):
+    counts = {}
+    for size in SIZES:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            ids = _seed(size)
+            _login(client, **{key: ids[value] for key, value in login.items()})
+            counts[size] = _count(client, sql_recorder, path.format(**ids))
+    small, large = (counts[size] for size in SIZES)
+    assert large[0] == small[0], f"{name} grew with data size:\n{large[1]}"
+    assert large[0] <= budget, f"{name} issued {large[0]} queries:\n{large[1]}"
+
+
+def test_provisioning_select_count_is_constant(app, sql_recorder):
+    from app.shared.provisioning import (
+        deactivate_orphan_accounts_for_session,
+        provision_participant_accounts_for_session,
+    )
+
+    selects = {}
+    for size in SIZES:
+        db.drop_all()
+        db.create_all()
+        ids = _seed(size)
+        db.session.add(
+            User(email="P0-1@EXAMPLE.COM", is_kt_delivery=True, region="NA")
+        )
+        for n in range(size):
+            db.session.add(
+                Participant(email=f"new{n}@example.com", full_name=f"New {n}")
+            )
+        db.session.flush()
+        new_ids = [
+            p.id for p in Participant.query.filter(Participant.email.like("new%"))
+        ]
+        db.session.add_all(
+            SessionParticipant(session_id=ids["session_id"], participant_id=pid)
+            for pid in new_ids
+        )
+        db.session.commit()
+        db.session.expunge_all()
+        with sql_recorder() as rec:
+            summary = provision_participant_accounts_for_session(ids["session_id"])
+            deactivate_orphan_accounts_for_session(ids["session_id"])
+        assert summary["created"] == size
+        assert summary["skipped_staff"] == 1
+        linked = Participant.query.filter(
+            Participant.email.like("new%"), Participant.account_id.isnot(None)
+        ).count()
+        assert linked == size
+        selects[size] = rec.selects()
+    small, large = (selects[size] for size in SIZES)
+    assert len(large) == len(small), "\n".join(large)
@@ -0,0 +1,107 @@
+from app.app import db, get_setting, set_setting
+from app.models import (
+    Language,
+    ProcessorAssignment,
+    ReferenceDataVersion,
+    User,
+    WorkshopType,
+)
+from app.services.materials_notifications import _fetch_processor_emails
+from app.shared import reference_data
+from app.shared.languages import get_language_options
+
+
+def _version(name):
+    row = db.session.get(ReferenceDataVersion, name)
+    return row.version if row else 0
+
+
+def test_snapshots_are_reused_without_queries(app, sql_recorder):
+    db.session.add_all(
+        [
+            Language(name="English", sort_order=1),
+            Language(name="French", sort_order=2, allowed_fonts=["Roboto"]),
+            Language(name="Klingon", sort_order=3),
+        ]
+    )
+    db.session.commit()
+    assert get_language_options() == [("en", "English"), ("fr", "French")]
+
+    with sql_recorder() as rec:
+        assert get_language_options() == [("en", "English"), ("fr", "French")]
+        assert reference_data.language_by_name("french").allowed_fonts == ("Roboto",)
+    assert rec.count == 0, rec.report()
+
+
+def test_orm_writes_bump_versions_and_refresh_this_worker(app):
+    db.session.add(WorkshopType(code="AA", name="Alpha", cert_series="fn"))
+    db.session.commit()
+    before = _version("workshop_types")
+    assert [wt.code for wt in reference_data.workshop_types()] == ["AA"]
+
+    wt = WorkshopType.query.filter_by(code="AA").one()
+    wt.active = False
+    db.session.add(WorkshopType(code="BB", name="Beta", cert_series="fn"))
+    db.session.commit()
+    assert _version("workshop_types") == before + 1
+    assert [wt.code for wt in reference_data.workshop_types()] == ["BB"]
+    assert [w.code for w in reference_data.workshop_types(include_id=wt.id)] == ["AA", "BB"]
+
+    set_setting("banner", "hello")
+    db.session.commit()
+    assert get_setting("banner") == "hello"
+
+    user = User(email="p@example.com", first_name="Pat", last_name="Zed")
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(ProcessorAssignment(region="NA", processing_type="Physical", user_id=user.id))
+    db.session.commit()
+    assert _fetch_processor_emails("NA", "Physical") == ["p@example.com"]
+    user.email = "Pat@Example.com"
+    db.session.commit()
+    assert _fetch_processor_emails("NA", "Physical") == ["pat@example.com"]
+
+
+def test_other_workers_writes_are_seen_through_the_version_row(app, monkeypatch):
+    db.session.add(Language(name="English", sort_order=1))
+    db.session.commit()
+    assert get_language_options() == [("en", "English")]
+
+    # Another worker commits: data and version change, this process sees no
+    # ORM event.
+    table = Language.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.insert().values(name="German", sort_order=2, is_active=True))
+    monkeypatch.setattr(reference_data, "VERSION_CHECK_SECONDS", 0.0)
+    assert get_language_options() == [("en", "English")]  # version unchanged
+
+    with db.engine.begin() as conn:
+        reference_data.bump(conn, ["languages"])
+    assert get_language_options() == [("en", "English"), ("de", "German")]
+
+
+def test_clearing_every_processor_slot_refreshes_routing(app, client):
+    admin = User(email="admin@example.com", is_app_admin=True, is_admin=True)
+    proc = User(email="proc@example.com", is_admin=True)
+    db.session.add_all([admin, proc])
+    db.session.flush()
+    db.session.add_all(
+        [
+            ProcessorAssignment(region="NA", processing_type="Digital", user_id=proc.id),
+            ProcessorAssignment(region="EU", processing_type="Physical", user_id=proc.id),
+        ]
+    )
+    db.session.commit()
+    assert _fetch_processor_emails("NA", "Digital") == ["proc@example.com"]
+    assert _fetch_processor_emails("EU", "Physical") == ["proc@example.com"]
+    before = _version("processor_assignments")
+
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin.id
+    resp = client.post("/mail-settings/processors", data={})
+    assert resp.status_code == 302
+
+    assert ProcessorAssignment.query.count() == 0
+    assert _version("processor_assignments") > before
+    assert _fetch_processor_emails("NA", "Digital") == []
+    assert _fetch_processor_emails("EU", "Physical") == []
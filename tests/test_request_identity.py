@@ -0,0 +1,61 @@
+from app.app import db
+from app.models import ParticipantAccount, User
+from app.shared.identity import current_identity
+
+
+def _count(statements, needle):
+    return sum(1 for sql in statements if needle in sql)
+
+
+def test_staff_page_loads_identity_once(client, sql_recorder):
+    admin = User(email="Admin@Example.com", is_admin=True)
+    shadow = ParticipantAccount(email="admin@example.com", full_name="Admin")
+    db.session.add_all([admin, shadow])
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin.id
+    db.session.expunge_all()
+
+    with sql_recorder() as rec:
+        resp = client.get("/clients/")
+    assert resp.status_code == 200
+    selects = rec.selects()
+    assert _count(selects, "FROM users") == 1, rec.report()
+    assert _count(selects, "FROM participant_accounts") == 1, rec.report()
+    assert _count(selects, "sessions.csa_account_id") == 1, rec.report()
+
+
+def test_identity_follows_session_changes(app):
+    user = User(email="a@example.com")
+    account = ParticipantAccount(email="learner@example.com", full_name="Learner")
+    db.session.add_all([user, account])
+    db.session.commit()
+
+    with app.test_request_context():
+        from flask import session
+
+        assert current_identity().user is None
+        session["user_id"] = user.id
+        first = current_identity()
+        assert first.user is user
+        assert first.account is None
+        assert current_identity() is first
+        session.pop("user_id")
+        session["participant_account_id"] = account.id
+        assert current_identity().account is account
+        assert current_identity().user is None
+
+
+def test_identity_is_not_reused_across_requests(client):
+    admin = User(email="admin@example.com", is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin.id
+
+    # The fixture keeps one app context open, so anything cached on ``g``
+    # would outlive the first request and be detached (and expired) here.
+    assert client.get("/clients/").status_code == 200
+    db.session.commit()
+    db.session.remove()
+    assert client.get("/clients/").status_code == 200
@@ -0,0 +1,115 @@
+from datetime import date
+
+import pytest
+
+from app.app import db
+from app.models import (
+    Certificate,
+    Participant,
+    ParticipantAccount,
+    Session,
+    SessionParticipant,
+    WorkshopType,
+)
+from app.shared.cert_links import signed_certificate_url, verify_certificate_link
+
+REL_PATH = "2025/1/fn_doe.pdf"
+
+
+@pytest.fixture
+def cert_env(app, tmp_path):
+    app.config["SITE_ROOT"] = str(tmp_path)
+    pdf = tmp_path / "certificates" / REL_PATH
+    pdf.parent.mkdir(parents=True)
+    pdf.write_bytes(b"%PDF-1.4 test")
+    wt = WorkshopType(code="FN", name="Foundations", cert_series="fn")
+    sess = Session(
+        title="S",
+        start_date=date(2025, 1, 1),
+        end_date=date(2025, 1, 2),
+        workshop_type=wt,
+    )
+    account = ParticipantAccount(email="doe@example.com", full_name="Doe")
+    participant = Participant(email="doe@example.com", full_name="Doe", account=account)
+    other = ParticipantAccount(email="other@example.com", full_name="Other")
+    db.session.add_all([wt, sess, account, participant, other])
+    db.session.flush()
+    db.session.add(SessionParticipant(session_id=sess.id, participant_id=participant.id))
+    cert = Certificate(
+        session_id=sess.id,
+        participant_id=participant.id,
+        pdf_path=f"certificates/{REL_PATH}",
+    )
+    db.session.add(cert)
+    db.session.commit()
+    return {"cert_id": cert.id, "account_id": account.id, "other_id": other.id}
+
+
+def _login_account(client, account_id):
+    with client.session_transaction() as sess:
+        sess["participant_account_id"] = account_id
+
+
+def test_link_verification_rejects_tampering_and_expiry(app):
+    now = 1_700_000_000
+    with app.test_request_context():
+        url = signed_certificate_url(7, "/certificates/2025/1/a.pdf", now=now)
+    assert url.startswith("/certificate-downloads/7/2025/1/a.pdf?")
+    query = dict(part.split("=") for part in url.split("?", 1)[1].split("&"))
+    expires, sig = int(query["expires"]), query["sig"]
+    ttl = app.config["CERT_LINK_TTL_SECONDS"]
+    assert now + ttl <= expires <= now + 2 * ttl
+    with app.test_request_context():
+        # Links rendered within one TTL bucket are identical.
+        assert signed_certificate_url(7, "2025/1/a.pdf", now=now + 1) == url
+        assert verify_certificate_link(7, "2025/1/a.pdf", expires, sig, now=now)
+        assert not verify_certificate_link(8, "2025/1/a.pdf", expires, sig, now=now)
+        assert not verify_certificate_link(7, "2025/1/b.pdf", expires, sig, now=now)
+        assert not verify_certificate_link(7, "2025/1/a.pdf", expires + 1, sig, now=now)
+        assert not verify_certificate_link(7, "2025/1/a.pdf", expires, sig, now=expires + 1)
+        assert signed_certificate_url(7, "", now=now) is None
+
+
+def test_owner_is_redirected_to_signed_link_served_with_etag(app, client, cert_env):
+    _login_account(client, cert_env["account_id"])
+    resp = client.get(f"/certificates/{cert_env['cert_id']}")
+    assert resp.status_code == 302
+    location = resp.headers["Location"]
+    assert f"/certificate-downloads/{cert_env['cert_id']}/{REL_PATH}?" in location
+
+    with app.test_client() as anonymous:
+        first = anonymous.get(location)
+        assert first.status_code == 200
+        assert first.data == b"%PDF-1.4 test"
+        assert first.headers["ETag"]
+        assert first.headers["Last-Modified"]
+        assert "attachment" in first.headers["Content-Disposition"]
+        again = anonymous.get(
+            location, headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert again.status_code == 304
+        assert again.data == b""
+        tampered = location.replace("fn_doe", "fn_roe")
+        assert anonymous.get(tampered).status_code == 403
+
+
+def test_other_learner_cannot_get_a_link(client, cert_env):
+    _login_account(client, cert_env["other_id"])
+    assert client.get(f"/certificates/{cert_env['cert_id']}").status_code == 403
+
+
+def test_accel_mode_hands_the_file_to_the_proxy(app, client, cert_env):
+    app.config["CERT_DOWNLOAD_ACCEL"] = True
+    with app.test_request_context():
+        url = signed_certificate_url(cert_env["cert_id"], REL_PATH)
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.headers["X-Accel-Redirect"] == f"/certificates/{REL_PATH}"
+    assert resp.data == b""
+
+
+def test_my_certificates_renders_signed_link(client, cert_env):
+    _login_account(client, cert_env["account_id"])
+    html = client.get("/my-certificates").get_data(as_text=True)
+    assert f"/certificate-downloads/{cert_env['cert_id']}/{REL_PATH}?expires=" in html
+    assert f'href="/certificates/certificates/{REL_PATH}"' not in html
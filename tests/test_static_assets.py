@@ -0,0 +1,55 @@
+import gzip
+import json
+
+from flask import render_template_string
+
+from app.shared import static_assets
+
+
+def _source(tmp_path):
+    src = tmp_path / "src"
+    (src / "css").mkdir(parents=True)
+    (src / "img").mkdir()
+    (src / "css" / "ui.css").write_text("body { color: red; }")
+    (src / "img" / "dot.png").write_bytes(b"\x89PNG")
+    return src
+
+
+def test_build_writes_hashed_files_and_manifest(tmp_path):
+    src = _source(tmp_path)
+    out = tmp_path / "site" / "static"
+
+    manifest = static_assets.build_static(str(src), str(out))
+
+    css = manifest["css/ui.css"]
+    assert static_assets.HASHED_NAME_RE.search(css)
+    assert (out / css).read_text() == "body { color: red; }"
+    assert gzip.decompress((out / f"{css}.gz").read_bytes()) == b"body { color: red; }"
+    assert not (out / f"{manifest['img/dot.png']}.gz").exists()
+    assert json.loads((out / "manifest.json").read_text()) == manifest
+
+    (src / "css" / "ui.css").write_text("body { color: blue; }")
+    rebuilt = static_assets.build_static(str(src), str(out))
+    assert rebuilt["css/ui.css"] != css
+    assert (out / css).exists()
+
+
+def test_static_url_uses_manifest_and_serves_immutable(app, client, tmp_path):
+    manifest_file = tmp_path / "manifest.json"
+    app.config["STATIC_MANIFEST"] = str(manifest_file)
+    with app.test_request_context():
+        assert static_assets.static_url("css/ui.css") == "/static/css/ui.css"
+
+    manifest_file.write_text(json.dumps({"css/ui.css": "css/ui.0123456789ab.css"}))
+    static_assets._manifests.clear()
+    with app.test_request_context():
+        rendered = render_template_string("{{ static_url('css/ui.css') }}")
+    assert rendered == "/static/css/ui.0123456789ab.css"
+
+    hashed = client.get("/static/css/ui.0123456789ab.css")
+    assert hashed.status_code == 200
+    assert "immutable" in hashed.headers["Cache-Control"]
+    plain = client.get("/static/css/ui.css")
+    assert plain.status_code == 200
+    assert "immutable" not in (plain.headers.get("Cache-Control") or "")
+    static_assets._manifests.clear()
@@ -0,0 +1,58 @@
+import os
+import time
+
+import pytest
+
+from app.app import create_app, db
+from app.models import User
+from app.shared import template_perf
+
+
+@pytest.fixture
+def cached_app(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///:memory:")
+    monkeypatch.setenv("JINJA_CACHE_DIR", str(tmp_path))
+    old = tmp_path / "old-deploy"
+    old.mkdir()
+    stale = time.time() - template_perf.PRUNE_AFTER_SECONDS - 60
+    os.utime(old, (stale, stale))
+    (tmp_path / "previous-deploy").mkdir()
+    template_perf.reset_stats()
+    application = create_app()
+    with application.app_context():
+        db.create_all()
+        yield application
+        db.session.remove()
+
+
+def test_bytecode_cache_is_per_deploy_and_warmable(cached_app, tmp_path):
+    cache_dir = cached_app.config["JINJA_BYTECODE_DIR"]
+    # A deploy idle past the grace period is pruned; one that may still be
+    # serving during a rollout is kept.
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [cached_app.config["JINJA_TEMPLATES_FINGERPRINT"], "previous-deploy"]
+    )
+    assert template_perf.warm_up(cached_app) == len(template_perf.WARMUP_TEMPLATES)
+    assert len(os.listdir(cache_dir)) >= len(template_perf.WARMUP_TEMPLATES)
+
+
+def test_render_timings_show_in_performance_report(cached_app):
+    admin = User(email="sys@example.com", is_app_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    client = cached_app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin.id
+
+    assert client.get("/search/?q=ab").status_code == 200
+    assert client.get("/search/?q=abc").status_code == 200
+    (row,) = [r for r in template_perf.render_stats() if r["name"] == "search_results.html"]
+    assert row["count"] == 2
+    assert 0 < row["p50_ms"] <= row["max_ms"]
+
+    page = client.get("/settings/performance/")
+    assert page.status_code == 200
+    assert b"search_results.html" in page.data
+
+    client.post("/settings/performance/reset")
+    assert [r["name"] for r in template_perf.render_stats()] == []
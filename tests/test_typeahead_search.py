@@ -0,0 +1,135 @@
+from datetime import date
+
+from app.app import db
+from app.models import (
+    Client,
+    Language,
+    Session,
+    User,
+    WorkshopType,
+)
+from app.routes.search import SEARCH_LIMIT
+
+
+def _login(client, user_id):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+
+
+def _seed_admin():
+    if not Language.query.filter_by(name="English").first():
+        db.session.add(Language(name="English", sort_order=1))
+    admin = User(email="admin@example.com", is_admin=True, region="NA")
+    db.session.add(admin)
+    db.session.commit()
+    return admin.id
+
+
+def _labels(resp):
+    assert resp.status_code == 200
+    return [row["label"] for row in resp.get_json()["results"]]
+
+
+def test_user_search_matches_prefixes_and_limits(app, client):
+    admin_id = _seed_admin()
+    db.session.add_all(
+        [User(email=f"bulk{i:03d}@example.com") for i in range(SEARCH_LIMIT + 5)]
+        + [
+            User(email="zed@example.com", first_name="Ada", last_name="Lovelace"),
+            User(email="x_y@example.com", full_name="Under Score"),
+            User(email="xzy@example.com"),
+        ]
+    )
+    db.session.commit()
+    _login(client, admin_id)
+
+    assert len(_labels(client.get("/search/users?q=bulk"))) == SEARCH_LIMIT
+    assert _labels(client.get("/search/users?q=LOVE")) == ["Ada Lovelace"]
+    assert _labels(client.get("/search/users?q=ada")) == ["Ada Lovelace"]
+    assert _labels(client.get("/search/users?q=velace")) == []
+    # ``_`` is a literal, not a single-character wildcard.
+    assert _labels(client.get("/search/users?q=x_")) == ["Under Score"]
+    assert len(_labels(client.get("/search/users?q=bulk&limit=500"))) == SEARCH_LIMIT + 5
+
+
+def test_facilitator_search_filters_role_and_region(app, client):
+    admin_id = _seed_admin()
+    db.session.add_all(
+        [
+            User(email="fna@example.com", full_name="Fac NA", is_kt_delivery=True, region="NA"),
+            User(email="feu@example.com", full_name="Fac EU", is_kt_contractor=True, region="EU"),
+            User(email="fstaff@example.com", full_name="Fac Staff", region="NA"),
+        ]
+    )
+    db.session.commit()
+    _login(client, admin_id)
+
+    assert _labels(client.get("/search/facilitators?q=fac&region=NA")) == ["Fac NA"]
+    assert sorted(
+        _labels(client.get("/search/facilitators?q=fac&region=NA&include_all=1"))
+    ) == ["Fac EU", "Fac NA"]
+
+
+def test_client_search(app, client):
+    admin_id = _seed_admin()
+    crm = User(email="crm@example.com", full_name="Cara CRM", is_kcrm=True)
+    acme = Client(name="Acme", status="active", crm=crm)
+    db.session.add_all(
+        [crm, acme, Client(name="Acorn", status="inactive")]
+    )
+    db.session.commit()
+    _login(client, admin_id)
+
+    rows = client.get("/search/clients?q=ac").get_json()["results"]
+    assert rows == [{"id": acme.id, "label": "Acme", "crm": "Cara CRM"}]
+
+
+def test_search_requires_staff(app, client):
+    contractor = User(email="c@example.com", is_kt_contractor=True)
+    db.session.add(contractor)
+    db.session.commit()
+    assert client.get("/search/users?q=a").status_code == 302
+    _login(client, contractor.id)
+    assert client.get("/search/users?q=a").status_code == 403
+
+
+def test_session_form_html_does_not_grow_with_users(app, client):
+    admin_id = _seed_admin()
+    wt = WorkshopType(code="WT", name="Workshop", cert_series="fn")
+    acme = Client(name="Acme", status="active")
+    lead = User(email="lead@example.com", is_kt_delivery=True, region="NA")
+    db.session.add_all([wt, acme, lead])
+    db.session.flush()
+    sess = Session(
+        title="S",
+        start_date=date.today(),
+        end_date=date.today(),
+        region="NA",
+        workshop_language="en",
+        workshop_type=wt,
+        client_id=acme.id,
+        lead_facilitator_id=lead.id,
+    )
+    db.session.add(sess)
+    db.session.commit()
+    _login(client, admin_id)
+
+    def sizes():
+        return [
+            len(client.get(path).data)
+            for path in ("/sessions/new", f"/sessions/{sess.id}/edit", "/clients/new")
+        ]
+
+    before = sizes()
+    db.session.add_all(
+        [
+            User(email=f"u{i}@example.com", is_kt_delivery=True, region="NA")
+            for i in range(50)
+        ]
+        + [Client(name=f"Client {i}", status="active") for i in range(50)]
+    )
+    db.session.commit()
+    assert sizes() == before
+    html = client.get(f"/sessions/{sess.id}/edit").get_data(as_text=True)
+    assert f'value="{lead.id}" selected' in html
+    assert f'value="{acme.id}" selected' in html